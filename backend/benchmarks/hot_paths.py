@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Offline-Benchmarks für die Hot Paths des UnifiedService
+
+Misst process_trade, check_lifecycle_and_flush, CoinFilter.should_filter_coin,
+CoinCache.cleanup_expired_coins/get_cache_stats und check_cache_activation bei
+1k, 10k und 100k Coins. Pro Fall: Durchsatz, p50/p99-Latenz und Peak-Speicher.
+Ergebnisse werden als JSON gespeichert und können gegen eine Baseline geprüft
+werden (Exit-Code 1 bei Regression über dem Schwellwert).
+
+Keine DB, kein WebSocket: die DB wird durch einen In-Memory-Pool ersetzt,
+Konsolen-Ausgaben des Services landen in /dev/null.
+
+Verwendung (im backend-Verzeichnis):
+    python -m benchmarks.hot_paths
+    python -m benchmarks.hot_paths --scales 1000,10000 --output benchmarks/results/main.json
+    python -m benchmarks.hot_paths --baseline benchmarks/results/main.json --threshold 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+    import unified_service
+    from unified_service import CoinCache, CoinFilter, UnifiedService
+
+DEFAULT_SCALES = [1_000, 10_000, 100_000]
+# Fälle mit fester Skala (Szenario statt Coin-Anzahl)
+FIXED_SCALES = {
+    "spam_burst_storm": [100 * 300],  # 100 Coins/s, 300s Window
+    "cache_churn": [50_000],  # voller Cache mit 50k Coins
+}
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+# === IN-MEMORY DB ===
+class BenchConnection:
+    """Minimaler asyncpg-Ersatz: Queries kosten nichts, Ergebnisse sind vorgegeben"""
+
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.executed = 0
+
+    async def fetch(self, sql, *args):
+        return self.rows
+
+    async def execute(self, sql, *args):
+        self.executed += 1
+        return "OK"
+
+    async def executemany(self, sql, rows):
+        self.executed += len(rows)
+
+
+class BenchPool(BenchConnection):
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                return pool
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+
+# === BENCHMARK-FÄLLE ===
+class BenchCase:
+    """
+    Ein Benchmark-Fall: setup() baut den Zustand für N Coins auf, prepare() läuft
+    ungemessen vor jeder Operation, op() ist die gemessene Operation.
+    items_per_op gibt an, wie viele Coins/Trades eine Operation verarbeitet.
+    """
+
+    def __init__(self, name, scale, setup, op, prepare=None, items_per_op=1):
+        self.name = name
+        self.scale = scale
+        self.setup = setup
+        self.op = op
+        self.prepare = prepare
+        self.items_per_op = items_per_op
+
+
+def mint_for(i):
+    return f"BenchCoin{i:08d}".ljust(44, "x")
+
+
+def make_trade(mint, rng, v_sol=None):
+    sol = rng.choice((0.005, 0.05, 0.2, 0.5, 2.0))
+    v_sol = v_sol if v_sol is not None else rng.uniform(30, 80)
+    return {
+        "mint": mint,
+        "txType": "buy" if rng.random() < 0.55 else "sell",
+        "solAmount": sol,
+        "vSolInBondingCurve": v_sol,
+        "vTokensInBondingCurve": 1_073_000_000 * 30 / v_sol,
+        "traderPublicKey": f"Wallet{rng.randrange(50_000):06d}",
+    }
+
+
+def make_service(scale):
+    service = UnifiedService()
+    service.pool = BenchPool()
+    service.phases_config = {1: {"interval": 5, "max_age": 10**9, "name": "Bench"}}
+    service.sorted_phase_ids = [1]
+    return service
+
+
+def fill_watchlist(service, scale):
+    created_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+    now = time.time()
+    for i in range(scale):
+        mint = mint_for(i)
+        service.watchlist[mint] = {
+            "meta": {"phase_id": 1, "created_at": created_at, "started_at": created_at,
+                     "creator_address": f"Creator{i:08d}"},
+            "buffer": service.get_empty_buffer(),
+            "next_flush": now + 5,
+            "interval": 5,
+        }
+        service.subscribed_mints.add(mint)
+
+
+def case_process_trade(scale):
+    state = {}
+    rng = random.Random(1)
+
+    def setup():
+        service = make_service(scale)
+        fill_watchlist(service, scale)
+        # Zipf-ähnliche Popularität: wenige Coins bekommen die meisten Trades
+        trades = [make_trade(mint_for(min(int(rng.paretovariate(1.2)) - 1, scale - 1)), rng)
+                  for _ in range(5_000)]
+        state.update(service=service, trades=trades, i=0)
+
+    def op():
+        trade = state["trades"][state["i"] % len(state["trades"])]
+        state["i"] += 1
+        state["service"].process_trade(trade)
+
+    return BenchCase("process_trade", scale, setup, op)
+
+
+def case_lifecycle_flush(scale):
+    state = {}
+    rng = random.Random(2)
+
+    def setup():
+        service = make_service(scale)
+        fill_watchlist(service, scale)
+        state.update(service=service, round=0)
+
+    def prepare():
+        # Alle Buffer mit frischen Trades füllen und fällig machen
+        service = state["service"]
+        state["round"] += 1
+        for mint, entry in service.watchlist.items():
+            buf = entry["buffer"]
+            for _ in range(3):
+                price = rng.uniform(1e-8, 1e-6)
+                buf["open"] = buf["open"] or price
+                buf["close"] = price
+                buf["high"] = max(buf["high"], price)
+                buf["low"] = min(buf["low"], price)
+                buf["vol"] += 0.1 * state["round"]
+                buf["buys"] += 1
+                buf["vol_buy"] += 0.1
+                buf["wallets"].add(f"Wallet{rng.randrange(50_000)}")
+                buf["v_sol"] = 40.0
+                buf["mcap"] = price * 1_000_000_000
+            entry["next_flush"] = 0
+
+    async def op():
+        await state["service"].check_lifecycle_and_flush(time.time())
+
+    return BenchCase("check_lifecycle_and_flush", scale, setup, op, prepare, items_per_op=scale)
+
+
+def case_should_filter(scale):
+    state = {}
+
+    def setup():
+        coin_filter = CoinFilter(spam_burst_window=10**6)  # alle Einträge bleiben im Fenster
+        now = time.time()
+        for i in range(scale):
+            coin_filter.should_filter_coin({"name": f"Name {i}", "symbol": f"S{i}"}, now - (scale - i) * 0.001)
+        state.update(filter=coin_filter, i=0)
+
+    def op():
+        state["i"] += 1
+        state["filter"].should_filter_coin({"name": f"Fresh Coin {state['i']}", "symbol": f"F{state['i']}"})
+
+    return BenchCase("should_filter_coin", scale, setup, op)
+
+
+def case_spam_burst_storm(scale):
+    """Launch-Sturm: 100 Coins/s bei 300s Window (scale = Coins im Window), 5% Duplikate"""
+    state = {}
+    rate = 100
+    window = scale / rate
+    rng = random.Random(4)
+
+    def setup():
+        coin_filter = CoinFilter(spam_burst_window=window)
+        clock = time.time() - window
+        for i in range(scale):
+            clock += 1 / rate
+            coin_filter.should_filter_coin({"name": f"Storm {i}", "symbol": f"ST{i}"}, clock)
+        state.update(filter=coin_filter, clock=clock, i=scale)
+
+    def op():
+        state["clock"] += 1 / rate
+        state["i"] += 1
+        i = state["i"] if rng.random() > 0.05 else state["i"] - rng.randint(1, scale)
+        state["filter"].should_filter_coin({"name": f"Storm {i}", "symbol": f"ST{i}"}, state["clock"])
+
+    return BenchCase("spam_burst_storm", scale, setup, op)
+
+
+def fill_cache(cache, scale, start, spacing, activate_every=0):
+    """Befüllt den Cache über add_coin mit gleichmäßigen Discovery-Zeitpunkten"""
+    for i in range(scale):
+        mint = mint_for(i)
+        cache.add_coin(mint, {"mint": mint, "name": f"Coin {i}", "symbol": f"C{i}"}, start + i * spacing)
+        if activate_every and i % activate_every == 0:
+            cache.activate_coin(mint)
+    return start + scale * spacing
+
+
+def case_cache_cleanup(scale):
+    """Steady State: pro Operation werden 1% neue Coins entdeckt und die ältesten 1% laufen ab"""
+    state = {}
+    expired_per_op = max(1, scale // 100)
+
+    def setup():
+        cache = CoinCache(cache_seconds=120)
+        spacing = 120 / scale  # Cache-Fenster ist genau gefüllt
+        clock = fill_cache(cache, scale, time.time() - 120, spacing)
+        state.update(cache=cache, clock=clock, spacing=spacing, next_id=scale)
+
+    def prepare():
+        cache = state["cache"]
+        for _ in range(expired_per_op):
+            mint = mint_for(state["next_id"])
+            cache.add_coin(mint, {"mint": mint}, state["clock"])
+            state["clock"] += state["spacing"]
+            state["next_id"] += 1
+
+    def op():
+        state["cache"].cleanup_expired_coins(state["clock"])
+
+    return BenchCase("cache_cleanup_expired", scale, setup, op, prepare, items_per_op=scale)
+
+
+def case_cache_stats(scale):
+    state = {}
+
+    def setup():
+        cache = CoinCache(cache_seconds=120)
+        fill_cache(cache, scale, time.time() - 10, 10 / scale, activate_every=10)
+        state.update(cache=cache)
+
+    def op():
+        state["cache"].get_cache_stats()
+
+    return BenchCase("cache_stats", scale, setup, op, items_per_op=scale)
+
+
+def case_cache_churn(scale):
+    """Discovery-Sturm bei vollem Cache: neue Coins, Trades, Cleanup und Stats wie im Run-Loop"""
+    state = {}
+    rng = random.Random(5)
+    new_per_op = max(1, scale // 1000)
+
+    def setup():
+        cache = CoinCache(cache_seconds=120)
+        spacing = 120 / scale
+        clock = fill_cache(cache, scale, time.time() - 120, spacing, activate_every=50)
+        state.update(cache=cache, clock=clock, spacing=spacing, next_id=scale)
+
+    def op():
+        cache = state["cache"]
+        for _ in range(new_per_op):
+            mint = mint_for(state["next_id"])
+            cache.add_coin(mint, {"mint": mint}, state["clock"])
+            cache.add_trade(mint_for(rng.randrange(state["next_id"])), {"mint": mint, "solAmount": 0.1})
+            state["clock"] += state["spacing"]
+            state["next_id"] += 1
+        cache.cleanup_expired_coins(state["clock"])
+        cache.get_cache_stats()
+
+    return BenchCase("cache_churn", scale, setup, op, items_per_op=new_per_op)
+
+
+def case_cache_activation(scale):
+    state = {}
+    rng = random.Random(3)
+
+    def setup():
+        service = make_service(scale)
+        created_at = datetime.now(timezone.utc)
+        # 10% der Coins haben einen aktiven Stream (von n8n aktiviert)
+        service.pool.rows = [
+            {"token_address": mint_for(i), "current_phase_id": 1, "token_created_at": created_at,
+             "started_at": created_at, "trader_public_key": f"Creator{i:08d}", "ath_price_sol": 0.0}
+            for i in range(0, scale, 10)
+        ]
+        state.update(service=service)
+
+    def prepare():
+        # Cache mit fälligen Coins (inkl. Cache-Trades) neu befüllen
+        service = state["service"]
+        service.watchlist.clear()
+        service.subscribed_mints.clear()
+        cache = service.coin_cache = CoinCache(unified_service.COIN_CACHE_SECONDS)
+        discovered_at = time.time() - unified_service.COIN_CACHE_SECONDS - 1
+        for i in range(scale):
+            mint = mint_for(i)
+            cache.add_coin(mint, {"mint": mint}, discovered_at)
+            for _ in range(5):
+                cache.add_trade(mint, make_trade(mint, rng))
+
+    async def op():
+        await state["service"].check_cache_activation()
+
+    return BenchCase("check_cache_activation", scale, setup, op, prepare, items_per_op=scale)
+
+
+CASES = {
+    "process_trade": case_process_trade,
+    "check_lifecycle_and_flush": case_lifecycle_flush,
+    "should_filter_coin": case_should_filter,
+    "spam_burst_storm": case_spam_burst_storm,
+    "cache_cleanup_expired": case_cache_cleanup,
+    "cache_stats": case_cache_stats,
+    "cache_churn": case_cache_churn,
+    "check_cache_activation": case_cache_activation,
+}
+
+
+# === MESSUNG ===
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def call(op):
+    result = op()
+    if asyncio.iscoroutine(result):
+        await result
+
+
+async def run_case(case, time_budget, max_ops, min_ops, measure_memory):
+    """Führt einen Fall aus und liefert die Kennzahlen"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        case.setup()
+        latencies = []
+        started = time.perf_counter()
+        while len(latencies) < max_ops:
+            if case.prepare:
+                case.prepare()
+            t0 = time.perf_counter_ns()
+            await call(case.op)
+            latencies.append(time.perf_counter_ns() - t0)
+            if len(latencies) >= min_ops and time.perf_counter() - started > time_budget:
+                break
+
+        peak_memory = None
+        if measure_memory:
+            # Eigener Durchlauf unter tracemalloc (verfälscht sonst die Zeiten)
+            tracemalloc.start()
+            case.setup()
+            if case.prepare:
+                case.prepare()
+            await call(case.op)
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    total_s = sum(latencies) / 1e9
+    latencies.sort()
+    return {
+        "case": case.name,
+        "scale": case.scale,
+        "ops": len(latencies),
+        "items_per_op": case.items_per_op,
+        "throughput_ops_per_s": len(latencies) / total_s if total_s else 0.0,
+        "throughput_items_per_s": len(latencies) * case.items_per_op / total_s if total_s else 0.0,
+        "p50_ms": percentile(latencies, 50) / 1e6,
+        "p99_ms": percentile(latencies, 99) / 1e6,
+        "max_ms": latencies[-1] / 1e6 if latencies else 0.0,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def run_suite(cases, scales, time_budget=2.0, max_ops=20_000, min_ops=3, measure_memory=True, verbose=True):
+    results = []
+    for name in cases:
+        for scale in FIXED_SCALES.get(name, scales):
+            case = CASES[name](scale)
+            result = asyncio.run(run_case(case, time_budget, max_ops, min_ops, measure_memory))
+            results.append(result)
+            if verbose:
+                mem = f"{result['peak_memory_bytes'] / 1024 / 1024:.1f} MB" if result["peak_memory_bytes"] else "-"
+                print(f"  {name:<28} {scale:>7}  {result['throughput_items_per_s']:>14,.0f} items/s  "
+                      f"p50 {result['p50_ms']:>9.3f} ms  p99 {result['p99_ms']:>9.3f} ms  peak {mem}", flush=True)
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Vergleicht Ergebnisse mit einer Baseline.
+
+    Regression = Durchsatz mehr als threshold niedriger oder p99 mehr als threshold höher.
+    Returns: Liste der Regressionen (leer = ok)
+    """
+    base_index = {(r["case"], r["scale"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        base = base_index.get((result["case"], result["scale"]))
+        if not base:
+            continue
+        if result["throughput_items_per_s"] < base["throughput_items_per_s"] * (1 - threshold):
+            regressions.append({
+                "case": result["case"], "scale": result["scale"], "metric": "throughput_items_per_s",
+                "baseline": base["throughput_items_per_s"], "current": result["throughput_items_per_s"],
+            })
+        if base["p99_ms"] > 0 and result["p99_ms"] > base["p99_ms"] * (1 + threshold):
+            regressions.append({
+                "case": result["case"], "scale": result["scale"], "metric": "p99_ms",
+                "baseline": base["p99_ms"], "current": result["p99_ms"],
+            })
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=Path(__file__).parent, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline-Benchmarks für die Hot Paths")
+    parser.add_argument("--cases", default=",".join(CASES), help="Kommagetrennte Fälle")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="Anzahl Coins, kommagetrennt")
+    parser.add_argument("--time-budget", type=float, default=2.0, help="Sekunden pro Fall und Skala")
+    parser.add_argument("--max-ops", type=int, default=20_000, help="Max. Operationen pro Fall")
+    parser.add_argument("--no-memory", action="store_true", help="Peak-Speicher nicht messen")
+    parser.add_argument("--output", help="JSON-Ausgabedatei (Standard: benchmarks/results/<rev>.json)")
+    parser.add_argument("--baseline", help="JSON-Ergebnis eines früheren Laufs zum Vergleich")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Erlaubte Verschlechterung (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"Unbekannte Fälle: {', '.join(unknown)} (verfügbar: {', '.join(CASES)})")
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+
+    revision = git_revision()
+    print(f"🏁 Benchmarks @ {revision or 'unbekannt'} - Skalen: {scales}", flush=True)
+    results = run_suite(cases, scales, args.time_budget, args.max_ops, measure_memory=not args.no_memory)
+
+    report = {
+        "revision": revision,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{revision or int(time.time())}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"💾 Ergebnisse gespeichert: {output}", flush=True)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} Regression(en) über {args.threshold:.0%} gegenüber {baseline.get('revision')}:", flush=True)
+            for r in regressions:
+                print(f"   {r['case']} @ {r['scale']}: {r['metric']} {r['baseline']:.3f} -> {r['current']:.3f}", flush=True)
+            return 1
+        print(f"✅ Keine Regression über {args.threshold:.0%} gegenüber {baseline.get('revision')}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark für den Ring-Feed (SHARD_FEED=ring)
+
+Vergleicht die Verarbeitung in einem Prozess (JSON-Decoding + Aggregation) mit der
+Aufteilung auf einen Decoder und 1-4 Aggregator-Prozesse, die dekodierte Records über je
+einen TradeRing in Shared Memory lesen. Pro Anzahl Aggregatoren:
+
+- ring_drain: Ringe sind vorab gefüllt, gemessen wird nur das Leeren durch die Aggregatoren
+  (Skalierung der Aggregation über Prozesse)
+- ring_pipeline: Decoder und Aggregatoren laufen gleichzeitig (Ende-zu-Ende-Durchsatz,
+  Decoder-Rate, maximaler Füllstand, Wartezyklen bei vollem Ring)
+
+Keine DB, kein WebSocket. Ergebnisse werden als JSON gespeichert.
+
+Verwendung (im backend-Verzeichnis):
+    python -m benchmarks.trade_ring
+    python -m benchmarks.trade_ring --trades 500000 --aggregators 1,2,4 --slots 16384
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+    from unified_service import (HashRing, TradeRing, aggregate_trade, decode_trade_record,
+                                 empty_trade_buffer, parse_trade)
+
+from benchmarks.hot_paths import RESULTS_DIR, git_revision, make_trade, mint_for
+
+DEFAULT_AGGREGATORS = [1, 2, 3, 4]
+
+
+def make_frames(trades, coins, seed=1):
+    """Rohe WebSocket-Frames wie von pumpportal (JSON-Text)"""
+    rng = random.Random(seed)
+    mints = [mint_for(i) for i in range(coins)]
+    return [json.dumps(make_trade(rng.choice(mints), rng)) for _ in range(trades)]
+
+
+def aggregate_records(records, buffers):
+    for record in records:
+        mint, (sol, price, is_buy, trader_key, v_sol), _ = decode_trade_record(record)
+        buf = buffers.get(mint)
+        if buf is None:
+            buf = buffers[mint] = empty_trade_buffer()
+        aggregate_trade(buf, sol, price, is_buy, trader_key, v_sol, None)
+
+
+def run_aggregator(ring_name, expected, batch, poll_interval, ready, go, results):
+    """Aggregator-Prozess: liest expected Records aus seinem Ring (wartet bei leerem Ring wie der Worker)"""
+    ring = TradeRing.attach(ring_name)
+    buffers = {}
+    ready.set()
+    go.wait()
+    consumed = 0
+    while consumed < expected:
+        records = ring.pop(batch)
+        if not records:
+            time.sleep(poll_interval)
+            continue
+        aggregate_records(records, buffers)
+        consumed += len(records)
+    results.put((os.getpid(), consumed, time.perf_counter()))
+    ring.close()
+
+
+def bench_single_process(frames):
+    """Baseline: alles in einem Prozess wie im UnifiedService ohne Sharding"""
+    buffers = {}
+    started = time.perf_counter()
+    for frame in frames:
+        data = json.loads(frame)
+        parsed = parse_trade(data)
+        if parsed is None:
+            continue
+        mint = data["mint"]
+        buf = buffers.get(mint)
+        if buf is None:
+            buf = buffers[mint] = empty_trade_buffer()
+        sol, price, is_buy, trader_key, v_sol = parsed
+        aggregate_trade(buf, sol, price, is_buy, trader_key, v_sol, None)
+    elapsed = time.perf_counter() - started
+    return {"case": "single_process", "aggregators": 0, "trades": len(frames),
+            "seconds": round(elapsed, 4), "throughput_trades_per_s": round(len(frames) / elapsed, 1)}
+
+
+def decode_into(ring, data, recv_ts):
+    """Decoder-Schritt wie ShardCoordinator.route_trade (ohne Metriken).
+
+    Returns:
+        Anzahl Wartezyklen, weil der Ring voll war
+    """
+    sol, price, is_buy, trader_key, v_sol = parse_trade(data)
+    mint, trader = data["mint"].encode("ascii"), trader_key.encode("ascii")
+    stalls = 0
+    while not ring.push(mint, trader, sol, price, v_sol, recv_ts, is_buy):
+        stalls += 1
+    return stalls
+
+
+def bench_ring(frames, aggregators, slots, batch, poll_interval, prefill):
+    ctx = multiprocessing.get_context("spawn")
+    hash_ring = HashRing(range(aggregators))
+    owners = [hash_ring.owner(json.loads(frame)["mint"]) for frame in frames]
+    expected = [owners.count(shard) for shard in range(aggregators)]
+    if prefill:
+        # Vorab befüllte Ringe müssen alle Records aufnehmen
+        slots = max(slots, max(expected))
+    rings = [TradeRing.create(f"pf_bench_{uuid.uuid4().hex[:8]}_{shard}", slots) for shard in range(aggregators)]
+
+    ready = [ctx.Event() for _ in range(aggregators)]
+    go = ctx.Event()
+    results = ctx.Queue()
+    processes = [ctx.Process(target=run_aggregator,
+                             args=(rings[shard].shm.name, expected[shard], batch, poll_interval, ready[shard], go, results))
+                 for shard in range(aggregators)]
+    stalls = 0
+    max_occupancy = 0.0
+    try:
+        for process in processes:
+            process.start()
+        for event in ready:
+            event.wait()
+
+        if prefill:
+            for frame, shard in zip(frames, owners):
+                decode_into(rings[shard], json.loads(frame), 0.0)
+            started = time.perf_counter()
+            go.set()
+            decoder_seconds = None
+        else:
+            started = time.perf_counter()
+            go.set()
+            for i, (frame, shard) in enumerate(zip(frames, owners)):
+                stalls += decode_into(rings[shard], json.loads(frame), 0.0)
+                if i % 1024 == 0:
+                    max_occupancy = max(max_occupancy, max(ring.occupancy() for ring in rings))
+            decoder_seconds = time.perf_counter() - started
+
+        finished = [results.get(timeout=300) for _ in processes]
+        elapsed = max(done for _, _, done in finished) - started
+        consumed = sum(count for _, count, _ in finished)
+        for process in processes:
+            process.join(timeout=10)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for ring in rings:
+            ring.close()
+
+    result = {
+        "case": "ring_drain" if prefill else "ring_pipeline",
+        "aggregators": aggregators,
+        "trades": consumed,
+        "slots": slots,
+        "seconds": round(elapsed, 4),
+        "throughput_trades_per_s": round(consumed / elapsed, 1),
+        "per_aggregator": expected,
+    }
+    if not prefill:
+        result.update({
+            "decoder_throughput_trades_per_s": round(len(frames) / decoder_seconds, 1),
+            "max_occupancy": round(max_occupancy, 3),
+            "full_ring_stalls": stalls,
+        })
+    return result
+
+
+def format_result(result):
+    line = (f"   {result['case']:<15} x{result['aggregators']}: "
+            f"{result['throughput_trades_per_s']:>12,.0f} Trades/s ({result['seconds']:.3f}s)")
+    if "decoder_throughput_trades_per_s" in result:
+        line += (f" | Decoder {result['decoder_throughput_trades_per_s']:,.0f}/s, "
+                 f"Füllstand max {result['max_occupancy']:.0%}, Wartezyklen {result['full_ring_stalls']}")
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Ring-Feed: Decoder + 1-4 Aggregator-Prozesse")
+    parser.add_argument("--trades", type=int, default=200_000, help="Anzahl Trades")
+    parser.add_argument("--coins", type=int, default=2_000, help="Anzahl verschiedener Coins")
+    parser.add_argument("--aggregators", default=",".join(map(str, DEFAULT_AGGREGATORS)),
+                        help="Anzahl Aggregator-Prozesse, kommagetrennt")
+    parser.add_argument("--slots", type=int, default=65_536, help="Records je Ring (Pipeline)")
+    parser.add_argument("--batch", type=int, default=512, help="Max. Records je Lesezugriff")
+    parser.add_argument("--poll-interval", type=float, default=0.005, help="Wartezeit bei leerem Ring (s)")
+    parser.add_argument("--output", help="JSON-Ausgabedatei (Standard: benchmarks/results/trade_ring-<rev>.json)")
+    args = parser.parse_args(argv)
+
+    counts = [int(c) for c in args.aggregators.split(",") if c.strip()]
+    revision = git_revision()
+    print(f"🏁 Ring-Feed-Benchmark @ {revision or 'unbekannt'} - {args.trades} Trades, "
+          f"{args.coins} Coins, {os.cpu_count()} CPUs", flush=True)
+    if os.cpu_count() and max(counts) + 1 > os.cpu_count():
+        print(f"⚠️ Mehr Prozesse als CPUs - Decoder und Aggregatoren teilen sich Kerne, keine Skalierung messbar", flush=True)
+    frames = make_frames(args.trades, args.coins)
+
+    results = [bench_single_process(frames)]
+    print(format_result(results[0]), flush=True)
+    for prefill in (True, False):
+        for count in counts:
+            result = bench_ring(frames, count, args.slots, args.batch, args.poll_interval, prefill)
+            results.append(result)
+            print(format_result(result), flush=True)
+
+    report = {
+        "revision": revision,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"trade_ring-{revision or int(time.time())}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"💾 Ergebnisse gespeichert: {output}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,62 +1,135 @@
 """
 Database migration utilities for Pump Find
+
+Versionierte Migrationen aus migrations/NNNN_name.sql. Angewendete Versionen stehen mit
+Prüfsumme in schema_migrations; offene laufen unter einem Advisory-Lock, damit mehrere
+Replikas gleichzeitig starten können. Ist alles angewendet, kostet der Aufruf eine Query.
 """
 
 import asyncpg
-import os
+import hashlib
+import re
+import time
+from pathlib import Path
+
+# Kanal für coin_streams-Änderungen (LISTEN im Service, Trigger in migrations/0003_stream_notify.sql)
+STREAM_NOTIFY_CHANNEL = "coin_streams_changed"
+STREAM_NOTIFY_TRIGGER = "coin_streams_notify"
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+MIGRATION_LOCK = 0x6D696772  # Advisory-Lock für das Anwenden von Migrationen ("migr")
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    duration_ms INTEGER
+);
+"""
+
+
+class Migration:
+    """Eine Migrationsdatei (Version, Name, SQL, SHA-256 des Inhalts)"""
+
+    def __init__(self, version, name, sql):
+        self.version = version
+        self.name = name
+        self.sql = sql
+        self.checksum = hashlib.sha256(sql.encode()).hexdigest()
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Liest alle Migrationen, sortiert nach Version (doppelte Versionen sind ein Fehler)"""
+    migrations = {}
+    for path in sorted(Path(directory).glob("*.sql")):
+        match = MIGRATION_FILE.match(path.name)
+        if not match:
+            print(f"⚠️ Migration {path.name} ignoriert (erwartet NNNN_name.sql)")
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Migration {version:04d} doppelt: {migrations[version]} und {path.name}")
+        migrations[version] = Migration(version, match.group(2), path.read_text())
+    return [migrations[version] for version in sorted(migrations)]
+
 
-async def check_and_create_schema(pool: asyncpg.Pool):
+async def fetch_applied(conn):
+    """Angewendete Versionen {version: checksum} - ohne Tabelle (erster Start) leer"""
+    try:
+        rows = await conn.fetch("SELECT version, checksum FROM schema_migrations")
+    except asyncpg.exceptions.UndefinedTableError:
+        return {}
+    return {row["version"]: row["checksum"] for row in rows}
+
+
+def check_checksums(migrations, applied):
+    """Warnt bei nachträglich geänderten Migrationen (werden nicht erneut ausgeführt)"""
+    for migration in migrations:
+        checksum = applied.get(migration.version)
+        if checksum is not None and checksum.strip() != migration.checksum:
+            print(f"⚠️ Migration {migration} wurde nach dem Anwenden geändert (Prüfsumme weicht ab) - "
+                  f"Änderungen gehören in eine neue Migration")
+
+
+async def apply_migrations(pool: asyncpg.Pool, migrations=None):
     """
-    Erstellt die notwendigen Tabellen und Views für Pump Find
+    Wendet offene Migrationen an (jede in einer eigenen Transaktion).
+    Schlägt eine fehl, bleiben sie und alle späteren offen, der Lock wird freigegeben und
+    der Fehler weitergereicht - der Verbindungsaufbau gilt dann als fehlgeschlagen, statt
+    mit einem halb migrierten Schema weiterzulaufen.
+
+    Returns:
+        Liste der jetzt angewendeten Versionen
     """
-    try:
-        # Lade Schema-Dateien
-        schema_dir = "/app/sql"
-
-        # Erstelle discovered_coins Tabelle
-        schema_path = os.path.join(schema_dir, "schema.sql")
-        if os.path.exists(schema_path):
-            with open(schema_path, 'r') as f:
-                schema_sql = f.read()
-
-            async with pool.acquire() as conn:
-                await conn.execute(schema_sql)
-                print("✅ discovered_coins Schema erstellt")
-
-        # Erstelle Views
-        views_path = os.path.join(schema_dir, "views.sql")
-        if os.path.exists(views_path):
-            with open(views_path, 'r') as f:
-                views_sql = f.read()
-
-            async with pool.acquire() as conn:
-                await conn.execute(views_sql)
-                print("✅ Views erstellt")
-
-        # Erstelle coin_streams Tabelle (aus pump-metric)
-        complete_schema_path = os.path.join(schema_dir, "complete_schema.sql")
-        if os.path.exists(complete_schema_path):
-            with open(complete_schema_path, 'r') as f:
-                complete_sql = f.read()
-
-            async with pool.acquire() as conn:
-                # Splitte an Semikolons und führe jeden Befehl aus
-                statements = [stmt.strip() for stmt in complete_sql.split(';') if stmt.strip()]
-                for stmt in statements:
-                    if stmt:
-                        try:
-                            await conn.execute(stmt)
-                        except asyncpg.exceptions.DuplicateTableError:
-                            pass  # Tabelle existiert bereits
-                        except asyncpg.exceptions.DuplicateObjectError:
-                            pass  # Objekt existiert bereits
-
-                print("✅ Vollständiges Schema erstellt")
-
-        print("✅ Datenbank-Schema ist bereit")
-
-    except Exception as e:
-        print(f"❌ Fehler beim Erstellen des Schemas: {e}")
-        raise
+    if migrations is None:
+        migrations = load_migrations()
+
+    async with pool.acquire() as conn:
+        applied = await fetch_applied(conn)
+        if all(migration.version in applied for migration in migrations):
+            check_checksums(migrations, applied)
+            return []
+
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK)
+        try:
+            await conn.execute(SCHEMA_MIGRATIONS_SQL)
+            # Eine andere Replika kann sie inzwischen angewendet haben
+            applied = await fetch_applied(conn)
+            check_checksums(migrations, applied)
+
+            done = []
+            for migration in migrations:
+                if migration.version in applied:
+                    continue
+                started = time.monotonic()
+                try:
+                    async with conn.transaction():
+                        await conn.execute(migration.sql)
+                        await conn.execute(
+                            "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES ($1, $2, $3, $4)",
+                            migration.version, migration.name, migration.checksum,
+                            int((time.monotonic() - started) * 1000))
+                except Exception as e:
+                    print(f"❌ Migration {migration} fehlgeschlagen: {e}")
+                    raise
+                done.append(migration.version)
+                print(f"✅ Migration {migration} angewendet ({(time.monotonic() - started) * 1000:.0f} ms)")
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK)
+
+    if done:
+        print(f"✅ Datenbank-Schema auf Version {done[-1]:04d}")
+    return done
 
 
+async def stream_notify_installed(conn):
+    """Prüft, ob der NOTIFY-Trigger auf coin_streams existiert (ohne ihn kommen über LISTEN keine Events)"""
+    return await conn.fetchval(
+        "SELECT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = $1 AND tgrelid = to_regclass('coin_streams'))",
+        STREAM_NOTIFY_TRIGGER)
@@ -0,0 +1,23 @@
+-- Änderungs-Sequenz auf coin_streams: jede neue Zeile und jede Änderung von Phase/Status bekommt
+-- eine neue change_seq, der Sync liest nur Zeilen mit change_seq > letztem gesehenen Wert (ATH-Updates zählen nicht)
+CREATE SEQUENCE IF NOT EXISTS coin_streams_change_seq;
+ALTER TABLE coin_streams ADD COLUMN IF NOT EXISTS change_seq BIGINT;
+ALTER TABLE coin_streams ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION bump_coin_stream_change_seq() RETURNS trigger AS $$
+BEGIN
+    NEW.change_seq := nextval('coin_streams_change_seq');
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS coin_streams_change_seq ON coin_streams;
+CREATE TRIGGER coin_streams_change_seq
+    BEFORE INSERT OR UPDATE OF current_phase_id, is_active, is_graduated ON coin_streams
+    FOR EACH ROW EXECUTE FUNCTION bump_coin_stream_change_seq();
+
+-- Bestandszeilen einmalig nummerieren (löst den Trigger nicht aus)
+UPDATE coin_streams SET change_seq = nextval('coin_streams_change_seq') WHERE change_seq IS NULL;
+CREATE INDEX IF NOT EXISTS idx_coin_streams_change_seq ON coin_streams(change_seq);
+COMMENT ON COLUMN coin_streams.change_seq IS 'Wird bei Insert und Änderung von Phase/Status per Trigger hochgezählt (inkrementeller Sync)';
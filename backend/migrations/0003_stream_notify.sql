@@ -0,0 +1,29 @@
+-- NOTIFY-Trigger auf coin_streams (Kanal coin_streams_changed, siehe STREAM_NOTIFY_CHANNEL):
+-- meldet neue Streams, Phasenwechsel und Deaktivierungen - ATH-Updates lösen nichts aus
+CREATE OR REPLACE FUNCTION notify_coin_stream_change() RETURNS trigger AS $$
+DECLARE
+    rec RECORD;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := OLD;
+    ELSE
+        rec := NEW;
+    END IF;
+    IF TG_OP = 'UPDATE' AND OLD.current_phase_id IS NOT DISTINCT FROM NEW.current_phase_id
+            AND OLD.is_active IS NOT DISTINCT FROM NEW.is_active THEN
+        RETURN NULL;
+    END IF;
+    PERFORM pg_notify('coin_streams_changed', json_build_object(
+        'op', TG_OP,
+        'mint', rec.token_address,
+        'phase_id', rec.current_phase_id,
+        'is_active', rec.is_active AND TG_OP <> 'DELETE'
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS coin_streams_notify ON coin_streams;
+CREATE TRIGGER coin_streams_notify
+    AFTER INSERT OR DELETE OR UPDATE OF current_phase_id, is_active ON coin_streams
+    FOR EACH ROW EXECUTE FUNCTION notify_coin_stream_change();
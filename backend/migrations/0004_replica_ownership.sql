@@ -0,0 +1,12 @@
+-- Multi-Replica: Lease je Replika, Eigentümer je Stream (Zuteilung durch die Leader-Replika)
+CREATE TABLE IF NOT EXISTS service_replicas (
+    replica_id VARCHAR(64) PRIMARY KEY,
+    hostname VARCHAR(255),
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    heartbeat_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    lease_until TIMESTAMP WITH TIME ZONE NOT NULL,
+    coins_owned INTEGER DEFAULT 0
+);
+ALTER TABLE coin_streams ADD COLUMN IF NOT EXISTS owner_replica VARCHAR(64);
+CREATE INDEX IF NOT EXISTS idx_coin_streams_owner ON coin_streams(owner_replica) WHERE is_active = TRUE;
+COMMENT ON COLUMN coin_streams.owner_replica IS 'Replika, die den Stream trackt (NULL = noch nicht zugeteilt)';
@@ -0,0 +1,3 @@
+-- Multi-Replica: Umverteilung als Übergabe - die Quelle bleibt Eigentümer, bis sie ihren Teil-Buffer geschrieben hat
+ALTER TABLE coin_streams ADD COLUMN IF NOT EXISTS handoff_to VARCHAR(64);
+COMMENT ON COLUMN coin_streams.handoff_to IS 'Ziel-Replika einer laufenden Umverteilung (Quelle bestätigt durch Setzen von owner_replica)';
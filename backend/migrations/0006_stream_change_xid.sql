@@ -0,0 +1,17 @@
+-- Änderungs-Sequenz mit Transaktions-ID: nextval() vergibt change_seq vor dem Commit, Transaktionen
+-- committen aber nicht in Sequenz-Reihenfolge. Der Delta-Sync liest deshalb zusätzlich alle Zeilen
+-- von Transaktionen, die beim letzten Abruf noch offen waren (change_xid >= damaliges Snapshot-xmin).
+ALTER TABLE coin_streams ADD COLUMN IF NOT EXISTS change_xid xid8;
+
+CREATE OR REPLACE FUNCTION bump_coin_stream_change_seq() RETURNS trigger AS $$
+BEGIN
+    -- Transaktions-ID vor der Sequenz vergeben: wer change_seq hat, ist im Snapshot als offen sichtbar
+    NEW.change_xid := pg_current_xact_id();
+    NEW.change_seq := nextval('coin_streams_change_seq');
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE INDEX IF NOT EXISTS idx_coin_streams_change_xid ON coin_streams(change_xid);
+COMMENT ON COLUMN coin_streams.change_xid IS 'Transaktion der letzten change_seq-Vergabe (Delta-Sync holt Nachzügler offener Transaktionen)';
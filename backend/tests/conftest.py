@@ -31,6 +31,28 @@ def sample_coin_data() -> Dict[str, Any]:
     }
 
 
+@pytest.fixture
+def create_frame() -> Dict[str, Any]:
+    """create-Frame wie von pumpportal (subscribeNewToken) - ohne Bild-Feld, nur die Metadata-URI"""
+    return {
+        "signature": "5Vw6Hq1ZgcNQ3RP9EnGSXjAzvK9yqQG6mGJUNbMGQ1CqhzJ2t9uCq7k1dyGnQXmKpBLjL4nYF3xW5aRsTpE8uHcD",
+        "mint": "7GCihgDB8fe6KNjn2MYtkzZcRjQy3t9GHdC8uHYmW2hrpump",
+        "traderPublicKey": "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM",
+        "txType": "create",
+        "initialBuy": 35584285.714286,
+        "solAmount": 1.0,
+        "bondingCurveKey": "HfNgxDLsnMJ8MNm5hCszbQj7cnq6YuQz7TVhH2dN9W6J",
+        "vTokensInBondingCurve": 1037415714.285714,
+        "vSolInBondingCurve": 31.029066,
+        "marketCapSol": 29.9104,
+        "name": "Good Coin",
+        "symbol": "GOOD",
+        "uri": "https://ipfs.io/ipfs/QmYwAPJzv5CZsnA625s3Xf2nemtYgPpHdWEz79ojWnPbdG",
+        "pool": "pump",
+        "is_mayhem_mode": False
+    }
+
+
 @pytest.fixture
 def sample_bad_name_coin() -> Dict[str, Any]:
     """Coin mit Bad Name für Filter Tests"""
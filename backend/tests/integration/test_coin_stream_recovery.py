@@ -55,9 +55,9 @@ class TestCoinStreamRecovery:
         }
 
         # Aktiviere Coin
-        cached_trades = self.service.coin_cache.activate_coin(mint)
+        cached_buffer = self.service.coin_cache.activate_coin(mint)
 
-        assert len(cached_trades) == 5
+        assert cached_buffer["buys"] + cached_buffer["sells"] == 5
         assert self.service.coin_cache.cache[mint]["activated"] is True
 
     @pytest.mark.asyncio
@@ -79,23 +79,31 @@ class TestCoinStreamRecovery:
         assert mint not in self.service.coin_cache.cache
 
     @pytest.mark.asyncio
-    async def test_cached_trades_processed_chronologically(self, sample_coin_data, sample_trade_data):
-        """Test Cached Trades werden chronologisch verarbeitet"""
+    async def test_cached_buffer_becomes_first_watchlist_bucket(self, sample_coin_data, sample_trade_data):
+        """Test Aggregierter Cache-Buffer wird ohne Replay in die Watchlist übernommen"""
         mint = sample_coin_data["mint"]
         self.service.coin_cache.add_coin(mint, sample_coin_data)
+        self.service.phases_config = {1: {"interval": 5}}
+        self.service.sorted_phase_ids = [1]
+        self.service.ath_cache = {}
+        self.service.dirty_aths = set()
 
-        # Trades mit Zeitstempeln hinzufügen
         for i in range(5):
             trade = sample_trade_data.copy()
             trade["signature"] = f"sig_{i}"
             self.service.coin_cache.add_trade(mint, trade)
-            time.sleep(0.01)  # Kleine Verzögerung
 
-        cached_trades = self.service.coin_cache.activate_coin(mint)
+        cached_buffer = self.service.coin_cache.activate_coin(mint)
+        with patch('unified_service.trades_processed') as mock_processed:
+            await self.service.process_cached_trades(mint, cached_buffer, {"phase_id": 1})
 
-        # Prüfe chronologische Reihenfolge
-        timestamps = [t[0] for t in cached_trades]
-        assert timestamps == sorted(timestamps)
+        entry = self.service.watchlist[mint]
+        assert entry["buffer"] is cached_buffer
+        assert entry["buffer"]["buys"] == 5
+        assert mint in self.service.subscribed_mints
+        assert self.service.ath_cache[mint] == cached_buffer["high"]
+        assert mint in self.service.dirty_aths
+        mock_processed.inc.assert_called_once_with(5)
 
     @pytest.mark.asyncio
     async def test_watchlist_entry_created_on_activation(self, sample_coin_data):
@@ -226,12 +234,12 @@ class TestCacheActivationFlow:
             trade["signature"] = f"sig_{i}"
             self.cache.add_trade(mint, trade)
 
-        assert len(self.cache.cache[mint]["trades"]) == 10
+        assert self.cache.cache[mint]["buffer"]["buys"] == 10
 
         # 3. DB bestätigt Aktivierung
-        cached_trades = self.cache.activate_coin(mint)
+        cached_buffer = self.cache.activate_coin(mint)
 
-        assert len(cached_trades) == 10
+        assert cached_buffer["buys"] + cached_buffer["sells"] == 10
         assert self.cache.cache[mint]["activated"] is True
         self.mock_activations.inc.assert_called_once()
 
@@ -262,10 +270,9 @@ class TestCacheActivationFlow:
         self.cache.add_coin(mint, sample_coin_data)
         self.cache.activate_coin(mint)
 
-        initial_trades = len(self.cache.cache[mint]["trades"])
-
         # Versuche Trade hinzuzufügen
         self.cache.add_trade(mint, sample_trade_data)
+        assert self.cache.trade_count(self.cache.cache[mint]) == 0
 
         # Trades sollten nicht hinzugefügt werden (activated=True)
         # Da add_trade prüft auf activated
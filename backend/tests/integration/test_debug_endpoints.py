@@ -0,0 +1,122 @@
+"""
+Integration Tests für Debug-/Profiling-Endpoints
+Testet Zugriffsschutz, CPU-Profil und tracemalloc-Report
+"""
+
+import pytest
+import tracemalloc
+import httpx
+from unittest.mock import patch
+
+
+TOKEN = "secret-debug-token"
+
+
+@pytest.fixture
+def debug_client():
+    """HTTP-Client gegen die FastAPI-App mit aktivierten Debug-Endpoints"""
+    from unified_service import app
+
+    with patch('unified_service.DEBUG_ENDPOINTS_ENABLED', True), \
+         patch('unified_service.DEBUG_TOKEN', TOKEN):
+        transport = httpx.ASGITransport(app=app)
+        yield httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+class TestDebugAccess:
+    """Tests für require_debug_access"""
+
+    @pytest.mark.asyncio
+    async def test_disabled_returns_404(self):
+        """Test Endpoints sind standardmäßig deaktiviert"""
+        from unified_service import app
+
+        with patch('unified_service.DEBUG_ENDPOINTS_ENABLED', False):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                resp = await client.get("/debug/memory", headers={"X-Debug-Token": TOKEN})
+
+        assert resp.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_wrong_token_returns_401(self, debug_client):
+        """Test falscher Token wird abgelehnt"""
+        async with debug_client as client:
+            resp = await client.get("/debug/memory", headers={"X-Debug-Token": "wrong"})
+
+        assert resp.status_code == 401
+
+
+class TestCpuProfile:
+    """Tests für /debug/profile"""
+
+    @pytest.mark.asyncio
+    async def test_collapsed_profile(self, debug_client):
+        """Test collapsed-Format enthält Stacks mit Sample-Zähler"""
+        async with debug_client as client:
+            resp = await client.get(
+                "/debug/profile",
+                params={"seconds": 1, "format": "collapsed"},
+                headers={"X-Debug-Token": TOKEN}
+            )
+
+        assert resp.status_code == 200
+        lines = [line for line in resp.text.splitlines() if line]
+        assert lines
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    @pytest.mark.asyncio
+    async def test_speedscope_profile(self, debug_client):
+        """Test speedscope-Format ist ein gültiges sampled Profil"""
+        async with debug_client as client:
+            resp = await client.get(
+                "/debug/profile",
+                params={"seconds": 1},
+                headers={"X-Debug-Token": TOKEN}
+            )
+
+        data = resp.json()
+        profile = data["profiles"][0]
+        assert profile["type"] == "sampled"
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert all(idx < len(data["shared"]["frames"]) for sample in profile["samples"] for idx in sample)
+
+    @pytest.mark.asyncio
+    async def test_invalid_seconds_rejected(self, debug_client):
+        """Test seconds außerhalb 1-120 wird abgelehnt"""
+        async with debug_client as client:
+            resp = await client.get("/debug/profile", params={"seconds": 500}, headers={"X-Debug-Token": TOKEN})
+
+        assert resp.status_code == 400
+
+
+class TestMemoryProfile:
+    """Tests für /debug/memory"""
+
+    @pytest.mark.asyncio
+    async def test_memory_report_requires_tracing(self, debug_client):
+        """Test ohne tracemalloc wird nur ein Hinweis geliefert"""
+        async with debug_client as client:
+            resp = await client.get("/debug/memory", headers={"X-Debug-Token": TOKEN})
+
+        assert resp.json()["tracing"] is False
+
+    @pytest.mark.asyncio
+    async def test_memory_report_and_diff(self, debug_client):
+        """Test Top-Allokationen und Diff gegen vorherige Abfrage"""
+        headers = {"X-Debug-Token": TOKEN}
+        async with debug_client as client:
+            resp = await client.post("/debug/memory/tracing", params={"enabled": True}, headers=headers)
+            assert resp.json()["tracing"] is True
+
+            first = (await client.get("/debug/memory", headers=headers)).json()
+            second = (await client.get("/debug/memory", params={"diff": True}, headers=headers)).json()
+
+            resp = await client.post("/debug/memory/tracing", params={"enabled": False}, headers=headers)
+            assert resp.json()["tracing"] is False
+
+        assert first["diff"] is False
+        assert second["diff"] is True
+        assert "size_diff_bytes" in second["top"][0]
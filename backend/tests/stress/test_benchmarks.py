@@ -0,0 +1,67 @@
+"""
+Stress Tests für die Offline-Benchmark-Suite
+Prüft dass alle Fälle laufen und der Regressions-Check greift
+"""
+
+import json
+import pytest
+
+
+@pytest.mark.slow
+@pytest.mark.stress
+class TestBenchmarkSuite:
+    """Tests für benchmarks/hot_paths.py"""
+
+    def test_all_cases_run_at_small_scale(self):
+        """Alle Fälle liefern Durchsatz, Perzentile und Peak-Speicher"""
+        from benchmarks.hot_paths import CASES, FIXED_SCALES, run_suite
+
+        results = run_suite(list(CASES), [200], time_budget=0.05, max_ops=50, verbose=False)
+
+        assert {r["case"] for r in results} == set(CASES)
+        for result in results:
+            assert result["scale"] in FIXED_SCALES.get(result["case"], [200])
+            assert result["ops"] >= 3
+            assert result["throughput_items_per_s"] > 0
+            assert result["p50_ms"] <= result["p99_ms"] <= result["max_ms"]
+            assert result["peak_memory_bytes"] > 0
+
+    def test_compare_to_baseline_detects_regression(self):
+        """Durchsatz-Einbruch und p99-Anstieg über dem Schwellwert werden gemeldet"""
+        from benchmarks.hot_paths import compare_to_baseline
+
+        baseline = {"results": [
+            {"case": "process_trade", "scale": 1000, "throughput_items_per_s": 1000.0, "p99_ms": 1.0},
+            {"case": "cache_stats", "scale": 1000, "throughput_items_per_s": 1000.0, "p99_ms": 1.0},
+        ]}
+        results = [
+            {"case": "process_trade", "scale": 1000, "throughput_items_per_s": 700.0, "p99_ms": 1.1},
+            {"case": "cache_stats", "scale": 1000, "throughput_items_per_s": 950.0, "p99_ms": 1.5},
+            {"case": "should_filter_coin", "scale": 1000, "throughput_items_per_s": 1.0, "p99_ms": 99.0},
+        ]
+
+        regressions = compare_to_baseline(results, baseline, threshold=0.2)
+
+        assert {(r["case"], r["metric"]) for r in regressions} == {
+            ("process_trade", "throughput_items_per_s"),
+            ("cache_stats", "p99_ms"),
+        }
+
+    def test_main_writes_json_and_gates(self, tmp_path):
+        """main() speichert JSON und liefert Exit-Code 1 bei Regression"""
+        from benchmarks.hot_paths import main
+
+        output = tmp_path / "run.json"
+        args = ["--cases", "cache_stats", "--scales", "100", "--time-budget", "0.01",
+                "--max-ops", "20", "--no-memory", "--output", str(output)]
+        assert main(args) == 0
+
+        report = json.loads(output.read_text())
+        assert report["results"][0]["case"] == "cache_stats"
+        assert report["results"][0]["peak_memory_bytes"] is None
+
+        # Baseline mit unerreichbarem Durchsatz -> Regression
+        report["results"][0]["throughput_items_per_s"] *= 1000
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text(json.dumps(report))
+        assert main(args + ["--baseline", str(baseline)]) == 1
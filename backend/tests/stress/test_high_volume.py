@@ -193,6 +193,8 @@ class TestHighVolume:
                     trade = {
                         "signature": f"sig_{i}_{j}",
                         "solAmount": 0.1 * j,
+                        "vSolInBondingCurve": 30.0 + j,
+                        "vTokensInBondingCurve": 1_000_000_000,
                         "txType": "buy"
                     }
                     cache.add_trade(mint, trade)
@@ -200,9 +202,9 @@ class TestHighVolume:
             stats = cache.get_cache_stats()
 
             assert stats["total_coins"] == num_coins
-            # Verifiziere dass alle Trades gespeichert wurden
+            # Verifiziere dass alle Trades aggregiert wurden
             total_cached_trades = sum(
-                len(data["trades"]) for data in cache.cache.values()
+                CoinCache.trade_count(data) for data in cache.cache.values()
             )
             assert total_cached_trades == num_coins * trades_per_coin
 
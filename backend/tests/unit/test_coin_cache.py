@@ -38,14 +38,15 @@ class TestCoinCache:
 
         assert "discovered_at" in cached
         assert "metadata" in cached
-        assert "trades" in cached
+        assert "buffer" in cached
         assert "n8n_sent" in cached
         assert "activated" in cached
 
         # Verifiziere Werte
         assert cached["metadata"]["name"] == sample_coin_data["name"]
         assert cached["metadata"]["symbol"] == sample_coin_data["symbol"]
-        assert cached["trades"] == []
+        assert cached["buffer"]["buys"] == 0
+        assert cached["buffer"]["sells"] == 0
         assert cached["n8n_sent"] is False
         assert cached["activated"] is False
 
@@ -63,8 +64,10 @@ class TestCoinCache:
         # Trade hinzufügen
         self.cache.add_trade(mint, sample_trade_data)
 
-        assert len(self.cache.cache[mint]["trades"]) == 1
-        assert self.cache.cache[mint]["trades"][0][1] == sample_trade_data
+        buf = self.cache.cache[mint]["buffer"]
+        assert buf["buys"] == 1
+        assert buf["vol"] == sample_trade_data["solAmount"]
+        assert buf["wallets"] == {sample_trade_data["traderPublicKey"]}
 
     def test_add_trade_ignored_for_activated_coins(self, sample_coin_data, sample_trade_data):
         """Verify Trades werden ignoriert wenn Coin aktiviert ist"""
@@ -101,9 +104,9 @@ class TestCoinCache:
             trade["signature"] = f"sig_{i}"
             self.cache.add_trade(mint, trade)
 
-        trades = self.cache.activate_coin(mint)
+        buf = self.cache.activate_coin(mint)
 
-        assert len(trades) == 5
+        assert buf["buys"] + buf["sells"] == 5
         assert self.cache.cache[mint]["activated"] is True
 
     def test_activate_coin_sets_activated_flag(self, sample_coin_data):
@@ -124,11 +127,19 @@ class TestCoinCache:
 
         self.mock_activations.inc.assert_called_once()
 
-    def test_activate_unknown_coin_returns_empty(self):
-        """Verify activate_coin() für unbekannten Coin gibt leere Liste zurück"""
-        trades = self.cache.activate_coin("UnknownCoin")
+    def test_activate_unknown_coin_returns_none(self):
+        """Verify activate_coin() für unbekannten Coin gibt None zurück"""
+        assert self.cache.activate_coin("UnknownCoin") is None
 
-        assert trades == []
+    def test_reactivation_hands_over_buffer_only_once(self, sample_coin_data, sample_trade_data):
+        """Verify Buffer wird bei Aktivierung übergeben - erneute Aktivierung liefert nichts doppelt"""
+        mint = sample_coin_data["mint"]
+        self.cache.add_coin(mint, sample_coin_data)
+        self.cache.add_trade(mint, sample_trade_data)
+
+        assert self.cache.activate_coin(mint)["buys"] == 1
+        assert self.cache.activate_coin(mint) is None
+        assert self.cache.trade_count(self.cache.cache[mint]) == 0
 
     def test_remove_coin_clears_entry(self, sample_coin_data):
         """Verify Coin wird aus Cache entfernt"""
@@ -262,23 +273,36 @@ class TestCoinCache:
 
             assert removed == 1
 
-    def test_multiple_trades_chronological_order(self, sample_coin_data, sample_trade_data):
-        """Verify Trades werden in chronologischer Reihenfolge gespeichert"""
+    def test_trades_aggregated_in_arrival_order(self, sample_coin_data, sample_trade_data, sample_sell_trade):
+        """Verify Buffer hat konstante Größe und OHLC folgt der Ankunftsreihenfolge"""
         mint = sample_coin_data["mint"]
         self.cache.add_coin(mint, sample_coin_data)
 
-        # Trades mit unterschiedlichen Zeitstempeln hinzufügen
-        for i in range(5):
-            trade = sample_trade_data.copy()
-            trade["signature"] = f"sig_{i}"
+        prices = [10.0, 30.0, 5.0, 20.0]
+        for i, v_sol in enumerate(prices):
+            trade = (sample_trade_data if i % 2 == 0 else sample_sell_trade).copy()
+            trade["vSolInBondingCurve"] = v_sol
+            trade["vTokensInBondingCurve"] = 1_000_000_000
             self.cache.add_trade(mint, trade)
-            time.sleep(0.01)  # Kleine Verzögerung
 
-        trades = self.cache.cache[mint]["trades"]
+        buf = self.cache.cache[mint]["buffer"]
+        assert buf["open"] == prices[0] / 1_000_000_000
+        assert buf["close"] == prices[-1] / 1_000_000_000
+        assert buf["high"] == max(prices) / 1_000_000_000
+        assert buf["low"] == min(prices) / 1_000_000_000
+        assert (buf["buys"], buf["sells"]) == (2, 2)
+        assert buf["v_sol"] == prices[-1]
+
+    def test_creator_sell_counts_as_dev_sold(self, sample_coin_data, sample_sell_trade):
+        """Verify Sells des Creators landen im Cache-Buffer als dev_sold_amount"""
+        mint = sample_coin_data["mint"]
+        self.cache.add_coin(mint, sample_coin_data)
 
-        # Prüfe chronologische Reihenfolge
-        timestamps = [t[0] for t in trades]
-        assert timestamps == sorted(timestamps)
+        trade = sample_sell_trade.copy()
+        trade["traderPublicKey"] = sample_coin_data["traderPublicKey"]
+        self.cache.add_trade(mint, trade)
+
+        assert self.cache.cache[mint]["buffer"]["dev_sold_amount"] == trade["solAmount"]
 
     def test_cache_size_updates_on_multiple_operations(self, sample_coin_data):
         """Verify cache_size Metrik wird bei allen Operationen aktualisiert"""
@@ -293,3 +317,65 @@ class TestCoinCache:
 
         # Prüfe dass set() mehrfach aufgerufen wurde
         assert self.mock_cache_size.set.call_count >= 4  # 3 adds + 1 remove
+
+    def test_cache_keeps_discovery_order(self, sample_coin_data):
+        """Verify erneut entdeckter Coin wandert ans Ende (Reihenfolge = discovered_at)"""
+        for i in range(3):
+            self.cache.add_coin(f"Coin{i}", sample_coin_data, current_time=1000.0 + i)
+
+        self.cache.add_coin("Coin0", sample_coin_data, current_time=1010.0)
+
+        assert list(self.cache.cache) == ["Coin1", "Coin2", "Coin0"]
+        assert list(self.cache.pending_expiry) == ["Coin1", "Coin2", "Coin0"]
+
+    def test_cleanup_only_removes_expired_prefix(self, sample_coin_data):
+        """Verify Cleanup entfernt nur die abgelaufenen Coins am Anfang"""
+        for i in range(10):
+            self.cache.add_coin(f"Coin{i}", sample_coin_data, current_time=1000.0 + i)
+        self.cache.activate_coin("Coin1")
+
+        removed = self.cache.cleanup_expired_coins(current_time=1000.0 + 120 + 4.5)
+
+        # Coin0, Coin2-4 abgelaufen, aktivierter Coin1 bleibt
+        assert removed == 4
+        assert list(self.cache.cache) == ["Coin1"] + [f"Coin{i}" for i in range(5, 10)]
+
+    def test_activated_counter_is_incremental(self, sample_coin_data):
+        """Verify activated_coins bleibt bei Aktivierung, Re-Aktivierung und Entfernen korrekt"""
+        for i in range(4):
+            self.cache.add_coin(f"Coin{i}", sample_coin_data)
+
+        self.cache.activate_coin("Coin0")
+        self.cache.activate_coin("Coin0")  # doppelt aktivieren zählt nur einmal
+        self.cache.activate_coin("Coin1")
+        self.cache.remove_coin("Coin1")
+        self.cache.add_coin("Coin0", sample_coin_data)  # erneut entdeckt -> nicht mehr aktiviert
+
+        stats = self.cache.get_cache_stats()
+
+        assert stats["total_coins"] == 3
+        assert stats["activated_coins"] == 0
+        assert stats["expired_coins"] == 3
+        assert stats["activated_coins"] == sum(1 for d in self.cache.cache.values() if d["activated"])
+
+    def test_get_cache_stats_ages_from_order(self, sample_coin_data):
+        """Verify Altersangaben entsprechen min/max über alle Coins"""
+        now = time.time()
+        self.cache.add_coin("Old", sample_coin_data, current_time=now - 100)
+        self.cache.add_coin("Mid", sample_coin_data, current_time=now - 50)
+        self.cache.add_coin("New", sample_coin_data, current_time=now - 10)
+
+        stats = self.cache.get_cache_stats()
+
+        # oldest_age_seconds = kleinstes Alter, newest_age_seconds = größtes Alter (bisheriges Verhalten)
+        assert stats["oldest_age_seconds"] == 10
+        assert stats["newest_age_seconds"] == 100
+
+    def test_iter_due_coins_stops_at_first_fresh_coin(self, sample_coin_data):
+        """Verify nur fällige Coins vom Anfang des Caches geliefert werden"""
+        for i in range(5):
+            self.cache.add_coin(f"Coin{i}", sample_coin_data, current_time=1000.0 + i * 10)
+
+        due = [mint for mint, _ in self.cache.iter_due_coins(1000.0 + 140, 120)]
+
+        assert due == ["Coin0", "Coin1", "Coin2"]
@@ -311,3 +311,183 @@ class TestCoinFilter:
         should_filter, reason = self.filter.should_filter_coin(coin)
 
         assert should_filter is False
+
+    def test_index_tracks_window_entries(self):
+        """Test Name- und Symbol-Index enthalten nur Coins im Window"""
+        now = 1_000_000.0
+        self.filter.should_filter_coin({"name": "Alpha", "symbol": "ALP"}, now)
+        self.filter.should_filter_coin({"name": "Beta", "symbol": "BET"}, now + 10)
+
+        assert self.filter.name_index == {"Alpha": 1, "Beta": 1}
+        assert self.filter.symbol_index == {"ALP": 1, "BET": 1}
+
+        # Alpha läuft ab (30s Window), Beta bleibt
+        self.filter.should_filter_coin({"name": "Gamma", "symbol": "GAM"}, now + 35)
+
+        assert "Alpha" not in self.filter.name_index
+        assert "ALP" not in self.filter.symbol_index
+        assert [entry[1] for entry in self.filter.recent_coins] == ["Beta", "Gamma"]
+
+    def test_window_boundary_with_explicit_time(self):
+        """Test Duplikat knapp im Window gefiltert, genau am Window-Ende erlaubt"""
+        now = 1_000_000.0
+        self.filter.should_filter_coin({"name": "Edge", "symbol": "EDG"}, now)
+
+        should_filter, reason = self.filter.should_filter_coin({"name": "Edge", "symbol": "EDG2"}, now + 29.9)
+        assert should_filter is True
+        assert reason == "spam_burst"
+
+        should_filter, _ = self.filter.should_filter_coin({"name": "Edge", "symbol": "EDG2"}, now + 30)
+        assert should_filter is False
+
+    def test_filtered_coins_not_indexed(self):
+        """Test gefilterte Coins verlängern das Window nicht"""
+        now = 1_000_000.0
+        self.filter.should_filter_coin({"name": "Burst", "symbol": "BRS"}, now)
+        for i in range(1, 20):
+            self.filter.should_filter_coin({"name": "Burst", "symbol": f"B{i}"}, now + i)
+
+        assert len(self.filter.recent_coins) == 1
+        assert self.filter.name_index == {"Burst": 1}
+
+
+class TestFilterPipeline:
+    """Tests für die Filter-Pipeline (zusätzliche Stufen und Umsortierung)"""
+
+    @pytest.fixture(autouse=True)
+    def setup_pipeline(self):
+        """Setup mit allen optionalen Stufen deaktiviert"""
+        with patch('unified_service.coins_filtered') as self.mock_filtered, \
+             patch('unified_service.BAD_NAMES', re.compile(r'(test|bot|rug|scam)', re.IGNORECASE)), \
+             patch('unified_service.FILTER_MIN_INITIAL_BUY_SOL', 0.0), \
+             patch('unified_service.FILTER_MIN_SOCIAL_COUNT', 0), \
+             patch('unified_service.FILTER_CREATOR_MAX_COINS', 0), \
+             patch('unified_service.FILTER_IMAGE_DUPLICATES', False), \
+             patch('unified_service.FILTER_HISTORY_WINDOW', 3600), \
+             patch('unified_service.FILTER_AUTO_REORDER', False):
+
+            self.mock_filtered.labels = MagicMock(return_value=MagicMock(inc=MagicMock()))
+
+            from unified_service import CoinFilter
+            self.filter = CoinFilter(spam_burst_window=30)
+            yield
+
+    def test_disabled_stages_not_checked(self):
+        """Test deaktivierte Stufen werden übersprungen"""
+        self.filter.should_filter_coin({"name": "Plain", "symbol": "PLN"}, 1000.0)
+
+        stats = {s["stage"]: s for s in self.filter.get_pipeline_stats()}
+        assert stats["bad_name"]["checks"] == 1
+        assert stats["spam_burst"]["checks"] == 1
+        assert stats["initial_buy"]["checks"] == 0
+        assert stats["initial_buy"]["enabled"] is False
+
+    def test_initial_buy_stage(self):
+        """Test Coins unter dem Mindest-Initial-Buy werden abgelehnt"""
+        with patch('unified_service.FILTER_MIN_INITIAL_BUY_SOL', 0.5):
+            small = self.filter.should_filter_coin({"name": "Small", "symbol": "SML", "solAmount": 0.1}, 1000.0)
+            large = self.filter.should_filter_coin({"name": "Large", "symbol": "LRG", "solAmount": 2.0}, 1000.0)
+
+        assert small == (True, "initial_buy")
+        assert large == (False, None)
+
+    def test_social_count_stage(self):
+        """Test Coins ohne genug Social-Links werden abgelehnt"""
+        with patch('unified_service.FILTER_MIN_SOCIAL_COUNT', 2):
+            bare = self.filter.should_filter_coin({"name": "Bare", "symbol": "BAR", "twitter": "x"}, 1000.0)
+            social = self.filter.should_filter_coin(
+                {"name": "Social", "symbol": "SOC", "twitter": "x", "telegram": "t"}, 1000.0)
+
+        assert bare == (True, "social_count")
+        assert social == (False, None)
+
+    def test_creator_reputation_stage(self):
+        """Test Creator mit zu vielen Coins im History-Window wird abgelehnt"""
+        with patch('unified_service.FILTER_CREATOR_MAX_COINS', 2):
+            results = [
+                self.filter.should_filter_coin(
+                    {"name": f"Serial {i}", "symbol": f"SR{i}", "traderPublicKey": "Creator1"}, 1000.0 + i)
+                for i in range(3)
+            ]
+            other = self.filter.should_filter_coin(
+                {"name": "Other", "symbol": "OTH", "traderPublicKey": "Creator2"}, 1003.0)
+            # Nach Ablauf des History-Windows wieder erlaubt
+            later = self.filter.should_filter_coin(
+                {"name": "Comeback", "symbol": "CMB", "traderPublicKey": "Creator1"}, 1000.0 + 3601.5)
+
+        assert [r[0] for r in results] == [False, False, True]
+        assert results[2][1] == "creator_reputation"
+        assert other == (False, None)
+        assert later == (False, None)
+
+    def test_image_duplicate_stage(self, create_frame):
+        """Test gleiche Metadata-CID (uri des create-Frames) wird als Duplikat erkannt, auch über andere Gateways"""
+        copy_frame = dict(create_frame, mint="CopyMint", name="Copy", symbol="CPY", traderPublicKey="OtherCreator",
+                          uri=create_frame["uri"].replace("https://ipfs.io", "https://cf-ipfs.com"))
+        other_frame = dict(create_frame, mint="OtherMint", name="Other", symbol="OTH",
+                           uri="https://ipfs.io/ipfs/QmOtherMetadata")
+        with patch('unified_service.FILTER_IMAGE_DUPLICATES', True):
+            first = self.filter.should_filter_coin(create_frame, 1000.0)
+            copy = self.filter.should_filter_coin(copy_frame, 1001.0)
+            other = self.filter.should_filter_coin(other_frame, 1002.0)
+            no_uri = self.filter.should_filter_coin(
+                dict(create_frame, mint="NoUri", name="NoUri", symbol="NUR", uri=None), 1003.0)
+
+        assert first == (False, None)
+        assert copy == (True, "image_duplicate")
+        assert other == (False, None)
+        assert no_uri == (False, None)
+
+    def test_filter_stage_is_abstract(self):
+        """Test Stufen ohne check() lassen sich nicht instanziieren"""
+        from unified_service import FilterStage
+
+        class Incomplete(FilterStage):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_rejected_coin_not_remembered(self):
+        """Test abgelehnte Coins landen in keiner Historie"""
+        with patch('unified_service.FILTER_CREATOR_MAX_COINS', 5), \
+             patch('unified_service.FILTER_MIN_INITIAL_BUY_SOL', 1.0):
+            self.filter.should_filter_coin(
+                {"name": "Cheap", "symbol": "CHP", "solAmount": 0.1, "traderPublicKey": "Creator1"}, 1000.0)
+
+        assert len(self.filter.recent_coins) == 0
+        assert "Cheap" not in self.filter.name_index
+
+    def test_reorder_puts_selective_stage_first(self):
+        """Test Stufe mit hoher Ablehnungsrate wandert nach vorne"""
+        with patch('unified_service.FILTER_MIN_INITIAL_BUY_SOL', 1.0):
+            for i in range(50):
+                self.filter.should_filter_coin({"name": f"Coin {i}", "symbol": f"C{i}", "solAmount": 0.1}, 1000.0 + i)
+            self.filter.reorder_stages()
+
+        order = [stage.name for stage in self.filter.stages]
+        assert order[0] == "initial_buy"
+        # Statistik wird halbiert, damit sich die Reihenfolge an neue Muster anpasst
+        assert self.filter.stages[0].checks == 25
+
+    def test_auto_reorder_after_interval(self):
+        """Test automatische Umsortierung nach FILTER_REORDER_INTERVAL Coins"""
+        with patch('unified_service.FILTER_MIN_INITIAL_BUY_SOL', 1.0), \
+             patch('unified_service.FILTER_AUTO_REORDER', True), \
+             patch('unified_service.FILTER_REORDER_INTERVAL', 10):
+            for i in range(11):
+                self.filter.should_filter_coin({"name": f"Coin {i}", "symbol": f"C{i}", "solAmount": 0.1}, 1000.0 + i)
+
+        assert self.filter.stages[0].name == "initial_buy"
+        assert self.filter.checked_since_reorder == 1
+
+    def test_spam_burst_window_update_via_config(self):
+        """Test SPAM_BURST_WINDOW-Änderung über /config erreicht den laufenden Filter"""
+        import unified_service
+        service = MagicMock()
+        service.coin_filter = self.filter
+        with patch('unified_service._unified_instance', service), \
+             patch('unified_service.SPAM_BURST_WINDOW', 30):
+            unified_service.update_global_config({"SPAM_BURST_WINDOW": "120"})
+
+        assert self.filter.spam_burst_window == 120
@@ -0,0 +1,165 @@
+"""
+Unit Tests für DeadLetterQueue
+Testet Persistenz, Deduplizierung, Ablauf und rate-limitiertes Nachsenden fehlgeschlagener n8n-Batches
+"""
+
+import pytest
+import asyncio
+import json
+import time
+from unittest.mock import patch, AsyncMock
+
+
+def coins(*mints):
+    return [{"mint": mint, "symbol": mint[:4]} for mint in mints]
+
+
+class TestDeadLetterQueue:
+    """Tests für DeadLetterQueue Klasse"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        self.directory = tmp_path / "dlq"
+        from unified_service import DeadLetterQueue
+        self.DeadLetterQueue = DeadLetterQueue
+        self.dlq = DeadLetterQueue(self.directory, max_age_seconds=3600)
+
+    @pytest.mark.asyncio
+    async def test_append_deduplicates_by_mint(self):
+        """Test Mints, die schon in der Queue sind, werden übersprungen"""
+        assert await self.dlq.append(coins("CoinA", "CoinB")) == 2
+        assert await self.dlq.append(coins("CoinB", "CoinC")) == 1
+
+        lines = self.dlq.queue_path.read_text().splitlines()
+        assert [json.loads(line)["coin"]["mint"] for line in lines] == ["CoinA", "CoinB", "CoinC"]
+        assert self.dlq.get_stats()["coins"] == 3
+
+    @pytest.mark.asyncio
+    async def test_survives_restart(self):
+        """Test offene Einträge werden nach Neustart geladen, bestätigte nicht"""
+        await self.dlq.append(coins("CoinA", "CoinB", "CoinC"))
+        batch, offset, count = await self.dlq.read_batch(1)
+        await self.dlq.commit(offset, count)
+
+        restarted = self.DeadLetterQueue(self.directory)
+
+        assert [mint for _, mint in restarted.entries] == ["CoinB", "CoinC"]
+        batch, _, _ = await restarted.read_batch(10)
+        assert [c["mint"] for c in batch] == ["CoinB", "CoinC"]
+
+    @pytest.mark.asyncio
+    async def test_partial_line_truncated_on_load(self):
+        """Test abgebrochener Schreibvorgang (halbe Zeile) wird beim Laden entfernt"""
+        await self.dlq.append(coins("CoinA"))
+        with open(self.dlq.queue_path, "ab") as f:
+            f.write(b'{"ts": 1, "coin": {"mi')
+
+        restarted = self.DeadLetterQueue(self.directory)
+        assert len(restarted.entries) == 1
+
+        await restarted.append(coins("CoinB"))
+        batch, _, _ = await restarted.read_batch(10)
+        assert [c["mint"] for c in batch] == ["CoinA", "CoinB"]
+
+    @pytest.mark.asyncio
+    async def test_commit_compacts_empty_queue(self):
+        """Test vollständig ausgelieferte Queue wird auf 0 Bytes gekürzt"""
+        await self.dlq.append(coins("CoinA", "CoinB"))
+        batch, offset, count = await self.dlq.read_batch(10)
+        await self.dlq.commit(offset, count)
+
+        assert self.dlq.queue_path.stat().st_size == 0
+        assert self.dlq.cursor == 0
+        assert not self.dlq.pending_mints
+        # Nach Auslieferung darf derselbe Mint wieder aufgenommen werden
+        assert await self.dlq.append(coins("CoinA")) == 1
+
+    @pytest.mark.asyncio
+    async def test_commit_compacts_partially_drained_queue(self):
+        """Test großer ausgelieferter Anfang wird auch bei offenen Einträgen abgeschnitten"""
+        dlq = self.DeadLetterQueue(self.directory, compact_bytes=1)
+        await dlq.append(coins("CoinA", "CoinB", "CoinC"))
+        batch, offset, count = await dlq.read_batch(2)
+        await dlq.commit(offset, count)
+
+        lines = dlq.queue_path.read_text().splitlines()
+        assert [json.loads(line)["coin"]["mint"] for line in lines] == ["CoinC"]
+        assert dlq.cursor == 0
+        assert dlq.file_size == dlq.queue_path.stat().st_size
+
+        restarted = self.DeadLetterQueue(self.directory)
+        assert [mint for _, mint in restarted.entries] == ["CoinC"]
+        await restarted.append(coins("CoinD"))
+        batch, _, _ = await restarted.read_batch(10)
+        assert [c["mint"] for c in batch] == ["CoinC", "CoinD"]
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_dropped(self):
+        """Test Einträge älter als max_age werden beim Lesen verworfen, aber bestätigt"""
+        await self.dlq.append(coins("CoinOld"))
+        with patch('unified_service.time.time', return_value=time.time() + 7200):
+            await self.dlq.append(coins("CoinNew"))
+            batch, offset, count = await self.dlq.read_batch(10)
+
+        assert [c["mint"] for c in batch] == ["CoinNew"]
+        assert count == 2
+
+    @pytest.mark.asyncio
+    async def test_run_drains_when_n8n_recovers(self):
+        """Test Hintergrund-Task sendet nach, bestätigt erst nach Erfolg und markiert Coins"""
+        from unified_service import N8nSender
+
+        await self.dlq.append(coins("CoinA", "CoinB", "CoinC"))
+        sender = N8nSender(queue_size=10, max_in_flight=1)
+        delivered = []
+        send = AsyncMock(side_effect=[False, True, True])
+
+        with patch('unified_service.N8N_WEBHOOK_URL', "http://n8n.local/webhook/test"), \
+             patch('unified_service.N8N_DLQ_DRAIN_RATE', 0), \
+             patch('unified_service.n8n_backoff', return_value=0), \
+             patch('unified_service.send_batch_to_n8n', send):
+            task = asyncio.create_task(self.dlq.run(sender, 2, delivered.extend))
+            async with asyncio.timeout(2):
+                while len(delivered) < 3:
+                    await asyncio.sleep(0.005)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert send.await_count == 3
+        assert [c["mint"] for c in delivered] == ["CoinA", "CoinB", "CoinC"]
+        assert self.dlq.get_stats()["bytes"] == 0
+
+
+class TestDeadLetterIntegration:
+    """Tests für die Anbindung der Dead-Letter-Queue an den Discovery-Flush"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        with patch('unified_service.n8n_buffer_size'), \
+             patch('unified_service.BATCH_SIZE', 2):
+            from unified_service import UnifiedService, DeadLetterQueue
+            self.service = UnifiedService()
+            self.service.dead_letter = DeadLetterQueue(tmp_path / "dlq")
+            yield
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_goes_to_disk(self):
+        """Test fehlgeschlagener Batch landet in der DLQ statt im Speicher"""
+        await self.service.handle_failed_batch(coins("CoinA", "CoinB"))
+
+        assert self.service.discovery_buffer == []
+        assert self.service.dead_letter.get_stats()["coins"] == 2
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_spilled_during_backoff(self):
+        """Test im Backoff wächst der Discovery-Buffer nicht, sondern geht in die DLQ"""
+        self.service.n8n_sender.paused_until = float("inf")
+        self.service.n8n_sender.enqueue(coins("CoinQ"))
+        self.service.discovery_buffer = coins("CoinA", "CoinB")
+
+        await self.service.flush_discovery_buffer()
+
+        assert self.service.discovery_buffer == []
+        assert self.service.n8n_sender.queue.empty()
+        assert [mint for _, mint in self.service.dead_letter.entries] == ["CoinA", "CoinB", "CoinQ"]
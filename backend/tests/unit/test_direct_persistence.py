@@ -0,0 +1,173 @@
+"""
+Unit Tests für die direkte Persistenz
+Testet COPY-Zeilen, lokale Aktivierungsregeln und die sofortige Stream-Aktivierung ohne n8n
+"""
+
+import pytest
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch, AsyncMock, MagicMock
+
+
+def mock_pool(stream_rows=None, fail=False):
+    """Pool-Mock mit Connection inkl. Transaktion und COPY"""
+    conn = AsyncMock()
+    transaction = MagicMock()
+    transaction.__aenter__ = AsyncMock()
+    transaction.__aexit__ = AsyncMock(return_value=False)
+    conn.transaction = MagicMock(return_value=transaction)
+    conn.copy_records_to_table = AsyncMock(side_effect=Exception("connection lost") if fail else None)
+    conn.fetch = AsyncMock(return_value=stream_rows or [])
+
+    pool = AsyncMock()
+    pool.acquire = MagicMock()
+    pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+    return pool, conn
+
+
+class TestDiscoveredCoinRecord:
+    """Tests für discovered_coin_record und passes_activation_rules"""
+
+    def test_record_matches_columns_and_limits(self, sample_coin_data):
+        """Test Zeile passt zu den Spalten, Texte gekürzt, Zahlen als Decimal"""
+        from unified_service import discovered_coin_record, DISCOVERED_COIN_COLUMNS
+
+        coin = dict(sample_coin_data, symbol="S" * 50, twitter="https://x.com/good")
+        now_dt = datetime.now(timezone.utc)
+        row = dict(zip(DISCOVERED_COIN_COLUMNS, discovered_coin_record(coin, now_dt)))
+
+        assert len(row) == len(DISCOVERED_COIN_COLUMNS)
+        assert row["token_address"] == coin["mint"]
+        assert row["symbol"] == "S" * 30
+        assert row["market_cap_sol"] == Decimal("1000.0")
+        assert row["pool_type"] == "pump"
+        assert row["discovered_at"] == now_dt
+        assert row["twitter_url"] == "https://x.com/good"
+        assert row["has_socials"] is True
+        assert row["initial_buy_sol"] is None
+
+    def test_activation_rules(self, sample_coin_data):
+        """Test Aktivierungsregeln greifen einzeln, Default (0) aktiviert alles"""
+        from unified_service import passes_activation_rules
+
+        coin = dict(sample_coin_data, social_count=0, solAmount=0.5)
+        assert passes_activation_rules(coin)
+
+        with patch('unified_service.ACTIVATION_MIN_SOCIAL_COUNT', 1):
+            assert not passes_activation_rules(coin)
+        with patch('unified_service.ACTIVATION_MIN_INITIAL_BUY_SOL', 1.0):
+            assert not passes_activation_rules(coin)
+        with patch('unified_service.ACTIVATION_MIN_MARKET_CAP_SOL', 500):
+            assert passes_activation_rules(coin)
+
+    def test_activation_rules_reject_unparseable_values(self, sample_coin_data):
+        """Test nicht lesbare Payload-Werte lassen die Regel scheitern statt eine Exception zu werfen"""
+        from unified_service import passes_activation_rules
+
+        assert not passes_activation_rules(dict(sample_coin_data, solAmount="n/a"))
+        assert not passes_activation_rules(dict(sample_coin_data, marketCapSol={"value": 1}))
+        assert not passes_activation_rules(dict(sample_coin_data, social_count="many"))
+
+
+class TestFlushPersistBuffer:
+    """Tests für UnifiedService.flush_persist_buffer"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        with patch.dict('unified_service.unified_status', {"db_connected": True}), \
+             patch('unified_service.DIRECT_PERSISTENCE', True), \
+             patch('unified_service.coins_persisted'), \
+             patch('unified_service.streams_created_direct'), \
+             patch('unified_service.direct_activation_latency'):
+            from unified_service import UnifiedService
+            self.service = UnifiedService()
+            self.service.phases_config = {1: {"interval": 5, "max_age": 10, "name": "Baby Zone"}}
+            self.service.sorted_phase_ids = [1]
+            yield
+
+    def coin(self, mint, **extra):
+        return {"mint": mint, "symbol": mint[:4], "name": mint, "traderPublicKey": "Creator" + mint,
+                "marketCapSol": 30.0, "vTokensInBondingCurve": 1e9, "price_sol": 3e-8, **extra}
+
+    @pytest.mark.asyncio
+    async def test_copies_and_activates_immediately(self):
+        """Test COPY in Staging, Merge und Stream in einer Transaktion, Coin sofort in der Watchlist"""
+        coin = self.coin("CoinA")
+        self.service.coin_cache.add_coin("CoinA", coin)
+        self.service.coin_cache.add_trade("CoinA", {"mint": "CoinA", "txType": "buy", "solAmount": 1.0,
+                                                   "tokenAmount": 1000, "vSolInBondingCurve": 31.0,
+                                                   "vTokensInBondingCurve": 1e9, "traderPublicKey": "Buyer"})
+        self.service.persist_buffer = [coin]
+        pool, conn = mock_pool([{"token_address": "CoinA", "current_phase_id": 1,
+                                 "started_at": datetime.now(timezone.utc)}])
+        self.service.pool = pool
+
+        assert await self.service.flush_persist_buffer(force=True) == 1
+
+        conn.copy_records_to_table.assert_awaited_once()
+        assert conn.copy_records_to_table.await_args.args[0] == "discovered_coins_staging"
+        merge_sql = conn.execute.await_args_list[-1].args[0]
+        assert "ON CONFLICT (token_address) DO UPDATE" in merge_sql
+        assert conn.fetch.await_args.args[1:] == (["CoinA"], 1)
+
+        assert self.service.persist_buffer == []
+        entry = self.service.watchlist["CoinA"]
+        assert entry["buffer"]["buys"] == 1
+        assert entry["meta"]["creator_address"] == "CreatorCoinA"
+        assert "CoinA" in self.service.subscribed_mints
+        assert self.service.coin_cache.cache["CoinA"]["activated"]
+
+    @pytest.mark.asyncio
+    async def test_rules_limit_stream_creation(self):
+        """Test Coins ohne erfüllte Regel werden nur gespeichert, nicht aktiviert"""
+        self.service.persist_buffer = [self.coin("CoinA", social_count=2), self.coin("CoinB", social_count=0)]
+        pool, conn = mock_pool([{"token_address": "CoinA", "current_phase_id": 1, "started_at": None}])
+        self.service.pool = pool
+
+        with patch('unified_service.ACTIVATION_MIN_SOCIAL_COUNT', 1):
+            await self.service.flush_persist_buffer(force=True)
+
+        assert conn.fetch.await_args.args[1] == ["CoinA"]
+        assert list(self.service.watchlist) == ["CoinA"]
+        assert self.service.watchlist["CoinA"]["buffer"]["buys"] == 0
+
+    @pytest.mark.asyncio
+    async def test_waits_for_interval_or_batch_size(self):
+        """Test ohne force wird erst nach Intervall oder voller Batch-Größe geschrieben"""
+        self.service.persist_buffer = [self.coin("CoinA")]
+        pool, conn = mock_pool()
+        self.service.pool = pool
+
+        with patch('unified_service.PERSIST_FLUSH_INTERVAL', 60):
+            assert await self.service.flush_persist_buffer() == 0
+        conn.copy_records_to_table.assert_not_awaited()
+
+        with patch('unified_service.PERSIST_FLUSH_INTERVAL', 60), \
+             patch('unified_service.PERSIST_BATCH_SIZE', 1):
+            await self.service.flush_persist_buffer()
+        conn.copy_records_to_table.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failure_keeps_coins(self):
+        """Test bei DB-Fehler bleiben die Coins vorne im Buffer und nichts wird aktiviert"""
+        self.service.persist_buffer = [self.coin("CoinA"), self.coin("CoinB")]
+        pool, _ = mock_pool(fail=True)
+        self.service.pool = pool
+
+        with patch('unified_service.db_errors') as errors:
+            assert await self.service.flush_persist_buffer(force=True) == 0
+
+        errors.labels.assert_called_with(type="persist")
+        assert [c["mint"] for c in self.service.persist_buffer] == ["CoinA", "CoinB"]
+        assert self.service.watchlist == {}
+
+    @pytest.mark.asyncio
+    async def test_process_new_coin_buffers_when_enabled(self, sample_coin_data):
+        """Test neue Coins gehen zusätzlich zum n8n-Buffer in den Persistenz-Buffer"""
+        with patch('unified_service.n8n_buffer_size'), \
+             patch('unified_service.coins_received'):
+            await self.service.process_new_coin(sample_coin_data)
+
+        assert [c["mint"] for c in self.service.persist_buffer] == [sample_coin_data["mint"]]
+        assert len(self.service.discovery_buffer) == 1
@@ -0,0 +1,74 @@
+"""
+Unit Tests für FrameRecorder
+Testet Aufzeichnung, gebündeltes Schreiben und Segment-Rotation
+"""
+
+import pytest
+import gzip
+import json
+import time
+
+
+def read_segments(directory):
+    """Liest alle Capture-Zeilen als (recv_ts, frame)"""
+    frames = []
+    for path in sorted(directory.glob("frames-*.log.gz")):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                ts, _, frame = line.rstrip("\n").partition("\t")
+                frames.append((float(ts), frame))
+    return frames
+
+
+class TestFrameRecorder:
+    """Tests für FrameRecorder Klasse"""
+
+    @pytest.mark.asyncio
+    async def test_roundtrip_preserves_frames_and_timestamps(self, tmp_path):
+        """Test Frames und Empfangszeit werden verlustfrei geschrieben"""
+        from unified_service import FrameRecorder
+
+        recorder = FrameRecorder(tmp_path)
+        frame = json.dumps({"txType": "buy", "mint": "Mint1", "solAmount": 0.5})
+        recorder.record(1700000000.123456, frame)
+        await recorder.flush(force=True)
+
+        assert read_segments(tmp_path) == [(1700000000.123456, frame)]
+        assert recorder.frames_written == 1
+
+    @pytest.mark.asyncio
+    async def test_newlines_in_frame_do_not_break_lines(self, tmp_path):
+        """Test mehrzeiliges JSON bleibt eine Zeile und parsebar"""
+        from unified_service import FrameRecorder
+
+        recorder = FrameRecorder(tmp_path)
+        recorder.record(time.time(), '{\n  "txType": "create",\n  "mint": "Mint1"\n}')
+        await recorder.flush(force=True)
+
+        frames = read_segments(tmp_path)
+        assert len(frames) == 1
+        assert json.loads(frames[0][1])["mint"] == "Mint1"
+
+    @pytest.mark.asyncio
+    async def test_flush_waits_for_batch(self, tmp_path):
+        """Test ohne force wird erst nach flush_frames geschrieben"""
+        from unified_service import FrameRecorder
+
+        recorder = FrameRecorder(tmp_path, flush_interval=3600, flush_frames=3)
+        for i in range(2):
+            recorder.record(time.time(), "{}")
+        await recorder.flush()
+        assert recorder.frames_written == 0
+
+        recorder.record(time.time(), "{}")
+        await recorder.flush()
+        assert recorder.frames_written == 3
+
+    def test_segment_rotation(self, tmp_path):
+        """Test nach segment_seconds wird eine neue Datei begonnen"""
+        from unified_service import FrameRecorder
+
+        recorder = FrameRecorder(tmp_path, segment_seconds=60)
+        first = recorder.current_segment(1700000000)
+        assert recorder.current_segment(1700000030) == first
+        assert recorder.current_segment(1700000061) != first
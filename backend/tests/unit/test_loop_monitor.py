@@ -0,0 +1,61 @@
+"""
+Unit Tests für LoopMonitor
+Testet Loop-Lag-Messung und Erkennung blockierender Callbacks
+"""
+
+import pytest
+import asyncio
+import time
+
+
+class TestLoopMonitor:
+    """Tests für LoopMonitor Klasse"""
+
+    @pytest.mark.asyncio
+    async def test_records_lag_samples(self):
+        """Test Sampler erfasst Lag-Messwerte"""
+        from unified_service import LoopMonitor
+
+        monitor = LoopMonitor(interval=0.01, slow_threshold_ms=500)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        summary = monitor.get_summary()
+        assert summary["samples"] > 0
+        assert summary["lag_seconds"]["max"] >= 0
+        assert summary["worst_offenders"] == []
+
+    @pytest.mark.asyncio
+    async def test_detects_blocking_callback(self):
+        """Test blockierender Aufruf wird mit Stack erfasst"""
+        from unified_service import LoopMonitor
+
+        def blocking_handler():
+            time.sleep(0.25)
+
+        monitor = LoopMonitor(interval=0.01, slow_threshold_ms=50)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        blocking_handler()
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        summary = monitor.get_summary()
+        # Auf einem ausgelasteten Runner kann es weitere langsame Callbacks geben
+        assert summary["slow_callbacks_total"] >= 1
+        offender = next(o for o in summary["worst_offenders"] if "blocking_handler" in o["stack"])
+        assert offender["max_blocked_seconds"] > summary["slow_callback_threshold_ms"] / 1000
+
+    def test_threshold_can_be_changed_at_runtime(self):
+        """Test Schwellwert lässt sich zur Laufzeit ändern"""
+        from unified_service import LoopMonitor
+
+        monitor = LoopMonitor(slow_threshold_ms=100)
+        monitor.set_threshold(250)
+
+        assert monitor.get_summary()["slow_callback_threshold_ms"] == 250
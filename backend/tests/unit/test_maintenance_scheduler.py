@@ -0,0 +1,200 @@
+"""
+Unit Tests für den MaintenanceScheduler
+Testet Jitter, Single-Flight, Timeouts und die Wartungs-Jobs des UnifiedService
+"""
+
+import pytest
+import asyncio
+import time
+from unittest.mock import patch, AsyncMock
+
+
+class TestMaintenanceScheduler:
+    """Tests für MaintenanceScheduler Klasse"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        with patch('unified_service.maintenance_job_runs') as runs, \
+             patch('unified_service.maintenance_job_duration'), \
+             patch('unified_service.maintenance_job_last_success'):
+            self.runs = runs
+            yield
+
+    def results(self):
+        return [c.kwargs["result"] for c in self.runs.labels.call_args_list]
+
+    def test_jitter_bounds(self):
+        """Test nächster Lauf liegt im Intervall ± Jitter"""
+        from unified_service import MaintenanceScheduler
+
+        scheduler = MaintenanceScheduler(jitter=0.1)
+        job = scheduler.add_job("job", lambda: None, 100)
+        for _ in range(200):
+            assert 90 <= scheduler.next_time(job, 0) <= 110
+
+    @pytest.mark.asyncio
+    async def test_single_flight_skips_running_job(self):
+        """Test läuft ein Job noch, wird der fällige Lauf übersprungen statt parallel gestartet"""
+        from unified_service import MaintenanceScheduler
+
+        started = 0
+        release = asyncio.Event()
+
+        async def slow():
+            nonlocal started
+            started += 1
+            await release.wait()
+
+        scheduler = MaintenanceScheduler(tick=0.01, jitter=0)
+        job = scheduler.add_job("slow", slow, 0.01, initial_delay=0)
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.1)
+
+        assert started == 1
+        assert job.running
+        assert job.skipped > 0
+        assert "skipped" in self.results()
+
+        # Scheduler beenden bricht den hängenden Lauf ab - nichts läuft in den nächsten Test weiter
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert not job.running
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_running_jobs(self):
+        """Test beim Beenden des Schedulers werden laufende Jobs abgebrochen statt weiterzulaufen"""
+        from unified_service import MaintenanceScheduler
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        scheduler = MaintenanceScheduler(tick=0.01, jitter=0)
+        job = scheduler.add_job("hang", hang, 60, initial_delay=0)
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.05)
+        assert job.running and len(scheduler.tasks) == 1
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert not job.running
+        assert scheduler.tasks == set()
+        assert "cancelled" in self.results()
+
+    @pytest.mark.asyncio
+    async def test_timeout_and_error_are_counted(self):
+        """Test Timeout und Exception zählen als Fehler, Job bleibt aktiv"""
+        from unified_service import MaintenanceScheduler
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        def broken():
+            raise RuntimeError("kaputt")
+
+        scheduler = MaintenanceScheduler()
+        hanging = scheduler.add_job("hang", hang, 60, timeout=0.01)
+        failing = scheduler.add_job("broken", broken, 60)
+        await scheduler.run_job(hanging)
+        await scheduler.run_job(failing)
+
+        assert self.results() == ["timeout", "error"]
+        assert hanging.failures == 1 and not hanging.running
+        assert failing.last_error == "kaputt" and failing.enabled
+
+    @pytest.mark.asyncio
+    async def test_disabled_job_not_started(self):
+        """Test deaktivierter Job wird nicht mehr gestartet"""
+        from unified_service import MaintenanceScheduler
+
+        calls = []
+        scheduler = MaintenanceScheduler(tick=0.01)
+        scheduler.add_job("job", lambda: calls.append(1), 0.01, initial_delay=0)
+        scheduler.disable("job", "test")
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+        assert calls == []
+        assert scheduler.get_stats()["job"]["enabled"] is False
+
+    @pytest.mark.asyncio
+    async def test_back_off_doubles_interval_until_success(self):
+        """Test back_off lässt den Job aktiv, verdoppelt das Intervall (begrenzt) und setzt es nach Erfolg zurück"""
+        from unified_service import MaintenanceScheduler
+
+        missing = True
+
+        def job_func():
+            if missing:
+                scheduler.back_off("job", "fehlt noch")
+
+        scheduler = MaintenanceScheduler(jitter=0, max_backoff=4)
+        job = scheduler.add_job("job", job_func, 10)
+        delays = []
+        for _ in range(3):
+            await scheduler.run_job(job)
+            delays.append(round(job.next_run - time.time()))
+
+        assert delays == [20, 40, 40]
+        assert job.enabled and job.last_error == "fehlt noch" and job.failures == 0
+        assert self.results() == ["backoff"] * 3
+
+        missing = False
+        await scheduler.run_job(job)
+
+        assert round(job.next_run - time.time()) == 10
+        assert job.last_error is None
+        assert scheduler.get_stats()["job"]["backoff_factor"] == 1
+
+
+class TestMaintenanceJobs:
+    """Tests für die Wartungs-Jobs des UnifiedService"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mock_db_pool):
+        with patch.dict('unified_service.unified_status', {"db_connected": True}), \
+             patch('unified_service.orphan_streams') as gauge, \
+             patch('unified_service.orphan_entries_pruned'):
+            from unified_service import UnifiedService
+            self.service = UnifiedService()
+            self.service.pool = mock_db_pool
+            self.gauge = gauge
+            yield
+
+    @pytest.mark.asyncio
+    async def test_orphan_pruning_keeps_live_and_dirty(self):
+        """Test Per-Coin-Einträge ohne Watchlist/Cache werden entfernt, ungespeicherte ATHs bleiben"""
+        self.service.watchlist["Live"] = {}
+        self.service.coin_cache.add_coin("Cached", {"mint": "Cached"})
+        for mint in ("Live", "Cached", "Gone", "Dirty"):
+            self.service.last_trade_timestamps[mint] = 1
+            self.service.ath_cache[mint] = 1.0
+        self.service.dirty_aths.add("Dirty")
+        self.service.pool.fetchval.return_value = 3
+
+        assert await self.service.detect_orphans() == 3
+
+        assert set(self.service.last_trade_timestamps) == {"Live", "Cached"}
+        assert set(self.service.ath_cache) == {"Live", "Cached", "Dirty"}
+        self.gauge.set.assert_called_once_with(3)
+
+    @pytest.mark.asyncio
+    async def test_missing_repair_function_backs_off(self, capsys):
+        """Test fehlt repair_missing_streams(), warnt der Job und versucht es seltener weiter, statt
+        dauerhaft abgeschaltet zu werden (die Migration kann die Funktion nachliefern)"""
+        import asyncpg
+
+        self.service.pool.fetchval = AsyncMock(side_effect=asyncpg.exceptions.UndefinedFunctionError("repair"))
+        job = self.service.maintenance.jobs["stream_repair"]
+
+        await self.service.maintenance.run_job(job)
+
+        assert job.enabled and job.backoff_streak == 1
+        assert "repair_missing_streams() existiert nicht" in capsys.readouterr().out
+
+        self.service.pool.fetchval = AsyncMock(return_value=2)
+        await self.service.maintenance.run_job(job)
+
+        assert job.backoff_streak == 0 and job.last_result == 2
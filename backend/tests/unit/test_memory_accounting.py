@@ -0,0 +1,130 @@
+"""
+Unit Tests für die Speicher-Abschätzung
+Testet deep_sizeof, estimate_structure und report_memory_structures()
+"""
+
+import pytest
+import sys
+import time
+from unittest.mock import patch
+
+
+class TestDeepSizeof:
+    """Tests für deep_sizeof()"""
+
+    def test_nested_containers_counted(self):
+        """Test verschachtelte Container werden mitgezählt"""
+        from unified_service import deep_sizeof
+
+        inner = ["a" * 100]
+        outer = {"key": inner}
+
+        assert deep_sizeof(outer) > sys.getsizeof(outer) + sys.getsizeof(inner)
+
+    def test_shared_objects_counted_once(self):
+        """Test geteilte Objekte werden nur einmal gezählt"""
+        from unified_service import deep_sizeof
+
+        shared = "x" * 1000
+        single = deep_sizeof([shared])
+        double = deep_sizeof([shared, shared])
+
+        assert double - single < 1000
+
+
+class TestEstimateStructure:
+    """Tests für estimate_structure()"""
+
+    def test_small_structure_measured_completely(self):
+        """Test kleine Strukturen werden vollständig vermessen"""
+        from unified_service import estimate_structure
+
+        items = [10, 20, 30]
+        total, per_entry, sampled = estimate_structure(items, 3, lambda x: x, 100, 200)
+
+        assert sampled == 3
+        assert per_entry == 20
+        assert total == 160
+
+    def test_large_structure_sampled(self):
+        """Test große Strukturen werden per Stichprobe hochgerechnet"""
+        from unified_service import estimate_structure
+
+        items = list(range(10000))
+        total, per_entry, sampled = estimate_structure(items, 10000, lambda x: 8, 0, 50)
+
+        assert sampled == 50
+        assert total == 80000
+
+    def test_empty_structure(self):
+        """Test leere Struktur liefert nur die Hülle"""
+        from unified_service import estimate_structure
+
+        assert estimate_structure([], 0, lambda x: 1, 64, 200) == (64, 0.0, 0)
+
+    def test_dict_sampled_across_whole_structure(self):
+        """Test große dicts werden ohne Kopie über die ganze Struktur verteilt gezogen"""
+        from unified_service import sample_entries
+
+        items = {f"Mint{i}": i for i in range(10000)}
+        sample = sample_entries(items, len(items), 50)
+
+        assert len(sample) == 50
+        assert sample[0] == "Mint0" and sample[-1] == "Mint9800"
+
+    def test_removed_entries_skipped(self):
+        """Test inzwischen entfernte Einträge (Messung im Thread) werden übersprungen"""
+        from unified_service import measure_sample
+
+        container = {"a": 10, "b": 30}
+        total, per_entry, sampled = measure_sample(["a", "gone", "b"], 2, lambda key: container[key], 0)
+
+        assert (total, per_entry, sampled) == (40, 20, 2)
+
+
+class TestMemoryReport:
+    """Tests für UnifiedService.report_memory_structures()"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        with patch('unified_service.cache_size'), \
+             patch('unified_service.coins_tracked'):
+            from unified_service import UnifiedService
+            self.service = UnifiedService()
+            yield
+
+    def test_report_covers_all_structures(self):
+        """Test Report enthält alle überwachten Strukturen"""
+        report = self.service.report_memory_structures()
+
+        for name in ["watchlist_buffers", "watchlist_wallets", "coin_cache_trades", "ath_cache",
+                     "last_saved_signatures", "trade_buffer", "discovery_buffer", "coin_filter_recent_coins"]:
+            assert name in report["structures"]
+
+    def test_wallet_growth_visible_per_coin(self):
+        """Test wachsende Wallet-Sets erhöhen die Bytes pro Coin"""
+        for i in range(5):
+            buf = self.service.get_empty_buffer()
+            buf["wallets"] = {f"Wallet{i}_{j:040d}" for j in range(200)}
+            self.service.watchlist[f"Mint{i}"] = {"buffer": buf, "meta": {}, "interval": 5, "next_flush": time.time()}
+
+        report = self.service.report_memory_structures()
+        wallets = report["structures"]["watchlist_wallets"]
+
+        assert wallets["entries"] == 5
+        assert wallets["bytes_per_entry"] > 200 * 40
+        assert report["tracked_coins"] == 5
+
+    @pytest.mark.asyncio
+    async def test_async_estimate_matches_sync_report(self):
+        """Test die Abschätzung im Thread liefert dieselben Strukturen"""
+        report = await self.service.estimate_memory_structures()
+
+        assert set(report["structures"]) == set(self.service.report_memory_structures()["structures"])
+
+    def test_endpoint_requires_debug_access(self):
+        """Test /debug/memory/structures ist wie die übrigen Debug-Endpoints geschützt"""
+        from unified_service import app, require_debug_access
+
+        route = next(r for r in app.routes if getattr(r, "path", None) == "/debug/memory/structures")
+        assert require_debug_access in [dep.call for dep in route.dependant.dependencies]
@@ -0,0 +1,134 @@
+"""
+Unit Tests für die versionierten Migrationen (db_migration)
+Testet das Laden der Migrationsdateien, den schnellen Pfad ohne offene Migrationen, das Anwenden
+unter Advisory-Lock und das Verhalten bei Fehlern und geänderten Prüfsummen
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+
+@pytest.fixture
+def conn(mock_db_pool):
+    """Verbindung aus mock_db_pool mit Transaktions-Kontext"""
+    conn = mock_db_pool.acquire.return_value.__aenter__.return_value
+    conn.transaction = MagicMock()
+    conn.transaction.return_value.__aenter__ = AsyncMock()
+    conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+    return conn
+
+
+def applied(*migrations):
+    return [{"version": m.version, "checksum": m.checksum} for m in migrations]
+
+
+def executed(conn):
+    return [call.args[0] for call in conn.execute.await_args_list]
+
+
+class TestLoadMigrations:
+    """Tests für load_migrations"""
+
+    def test_shipped_migrations_are_ordered_and_non_destructive(self):
+        """Test mitgelieferte Migrationen: lückenlos ab 1, Baseline löscht keine Tabellen"""
+        from db_migration import load_migrations
+
+        migrations = load_migrations()
+
+        assert [m.version for m in migrations] == list(range(1, len(migrations) + 1))
+        assert migrations[0].name == "baseline"
+        assert all("DROP TABLE" not in m.sql for m in migrations)
+        assert "CREATE TABLE IF NOT EXISTS coin_streams" in migrations[0].sql
+
+    def test_invalid_names_ignored_duplicates_rejected(self, tmp_path):
+        """Test Dateien ohne NNNN_name.sql werden übersprungen, doppelte Versionen abgelehnt"""
+        from db_migration import load_migrations
+
+        (tmp_path / "0002_second.sql").write_text("SELECT 2;")
+        (tmp_path / "0001_first.sql").write_text("SELECT 1;")
+        (tmp_path / "notes.sql").write_text("SELECT 0;")
+        assert [repr(m) for m in load_migrations(tmp_path)] == ["0001_first", "0002_second"]
+
+        (tmp_path / "0002_other.sql").write_text("SELECT 3;")
+        with pytest.raises(ValueError):
+            load_migrations(tmp_path)
+
+
+class TestApplyMigrations:
+    """Tests für apply_migrations"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from db_migration import Migration
+        self.first = Migration(1, "first", "CREATE TABLE a (id INT);")
+        self.second = Migration(2, "second", "CREATE TABLE b (id INT);")
+
+    @pytest.mark.asyncio
+    async def test_up_to_date_costs_one_query(self, mock_db_pool, conn):
+        """Test ohne offene Migrationen: eine Abfrage, kein Lock, nichts ausgeführt"""
+        from db_migration import apply_migrations
+
+        conn.fetch.return_value = applied(self.first, self.second)
+
+        assert await apply_migrations(mock_db_pool, [self.first, self.second]) == []
+        assert conn.fetch.await_count == 1
+        conn.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_pending_applied_under_lock(self, mock_db_pool, conn):
+        """Test nur offene Migrationen laufen, je in einer Transaktion und unter Advisory-Lock"""
+        from db_migration import apply_migrations, MIGRATION_LOCK
+
+        conn.fetch.return_value = applied(self.first)
+
+        assert await apply_migrations(mock_db_pool, [self.first, self.second]) == [2]
+
+        statements = executed(conn)
+        assert statements[0] == "SELECT pg_advisory_lock($1)"
+        assert statements[-1] == "SELECT pg_advisory_unlock($1)"
+        assert self.second.sql in statements and self.first.sql not in statements
+        insert = next(c for c in conn.execute.await_args_list if "INSERT INTO schema_migrations" in c.args[0])
+        assert insert.args[1:4] == (2, "second", self.second.checksum)
+        assert conn.execute.await_args_list[0].args[1] == MIGRATION_LOCK
+        assert conn.transaction.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_replica_already_applied(self, mock_db_pool, conn):
+        """Test hat eine andere Replika während des Wartens auf den Lock migriert, läuft nichts doppelt"""
+        from db_migration import apply_migrations
+
+        conn.fetch.side_effect = [[], applied(self.first, self.second)]
+
+        assert await apply_migrations(mock_db_pool, [self.first, self.second]) == []
+        assert self.first.sql not in executed(conn)
+
+    @pytest.mark.asyncio
+    async def test_failure_stops_and_releases_lock(self, mock_db_pool, conn):
+        """Test fehlgeschlagene Migration bricht ab (Fehler wird weitergereicht, spätere bleiben offen), der Lock wird freigegeben"""
+        import asyncpg
+        from db_migration import apply_migrations
+
+        async def execute(sql, *args):
+            if sql == self.first.sql:
+                raise asyncpg.exceptions.InsufficientPrivilegeError("permission denied")
+            return "OK"
+
+        conn.fetch.side_effect = asyncpg.exceptions.UndefinedTableError("schema_migrations")
+        conn.execute.side_effect = execute
+
+        with pytest.raises(asyncpg.exceptions.InsufficientPrivilegeError):
+            await apply_migrations(mock_db_pool, [self.first, self.second])
+        statements = executed(conn)
+        assert self.second.sql not in statements
+        assert statements[-1] == "SELECT pg_advisory_unlock($1)"
+
+    @pytest.mark.asyncio
+    async def test_changed_checksum_warns_without_rerun(self, mock_db_pool, conn, capsys):
+        """Test nachträglich geänderte Migration wird gemeldet, aber nicht erneut ausgeführt"""
+        from db_migration import apply_migrations
+
+        conn.fetch.return_value = [{"version": 1, "checksum": "0" * 64}]
+
+        assert await apply_migrations(mock_db_pool, [self.first]) == []
+        assert "Prüfsumme weicht ab" in capsys.readouterr().out
+        conn.execute.assert_not_awaited()
@@ -0,0 +1,288 @@
+"""
+Unit Tests für N8nSender
+Testet die nicht-blockierende n8n-Auslieferung über Queue, Verbindungs-Pool und Backoff
+sowie Projektion, Byte-Budget-Split und Kompression der Payloads
+"""
+
+import pytest
+import asyncio
+import httpx
+import gzip
+import json
+import urllib.parse
+from unittest.mock import patch
+
+
+def mock_client(handler):
+    """httpx-Client mit MockTransport statt echter Verbindungen"""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestN8nSender:
+    """Tests für N8nSender Klasse"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        with patch('unified_service.N8N_WEBHOOK_URL', "http://n8n.local/webhook/test"), \
+             patch('unified_service.N8N_WEBHOOK_METHOD', "POST"), \
+             patch('unified_service.N8N_MAX_RETRIES', 2), \
+             patch('unified_service.N8N_RETRY_DELAY', 0), \
+             patch('unified_service.coins_sent_n8n'), \
+             patch('unified_service.n8n_batches_sent'):
+            yield
+
+    async def run_until_idle(self, sender, timeout=2.0):
+        task = asyncio.create_task(sender.run())
+        try:
+            async with asyncio.timeout(timeout):
+                while not sender.queue.empty() or sender.in_flight:
+                    await asyncio.sleep(0.005)
+        finally:
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    @pytest.mark.asyncio
+    async def test_delivers_batches_over_one_client(self):
+        """Test alle Batches gehen über denselben langlebigen Client"""
+        from unified_service import N8nSender
+
+        delivered = []
+        sender = N8nSender(queue_size=10, max_in_flight=2, on_delivered=delivered.append)
+        requests = []
+        client = mock_client(lambda request: requests.append(request) or httpx.Response(200))
+        sender.get_client = lambda: client
+
+        for i in range(5):
+            assert sender.enqueue([{"mint": f"Coin{i}"}])
+        await self.run_until_idle(sender)
+
+        assert len(delivered) == 5
+        assert len(requests) == 5
+        assert sender.batches_delivered == 5
+        assert sender.consecutive_failures == 0
+
+    @pytest.mark.asyncio
+    async def test_in_flight_limit(self):
+        """Test nie mehr als max_in_flight gleichzeitige Sendungen"""
+        from unified_service import N8nSender
+
+        active = 0
+        peak = 0
+
+        async def slow_send(batch, client):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            return True
+
+        sender = N8nSender(queue_size=10, max_in_flight=2)
+        for i in range(6):
+            sender.enqueue([{"mint": f"Coin{i}"}])
+
+        with patch('unified_service.send_batch_to_n8n', side_effect=slow_send):
+            await self.run_until_idle(sender)
+
+        assert peak == 2
+        assert sender.batches_delivered == 6
+
+    @pytest.mark.asyncio
+    async def test_failure_requeues_and_backs_off(self):
+        """Test fehlgeschlagener Batch geht zurück und Sender pausiert neue Annahmen"""
+        from unified_service import N8nSender
+
+        failed = []
+        sender = N8nSender(queue_size=10, max_in_flight=1, on_failed=failed.append)
+        client = mock_client(lambda request: httpx.Response(500))
+        sender.get_client = lambda: client
+
+        with patch('unified_service.N8N_RETRY_DELAY', 5):
+            sender.enqueue([{"mint": "Coin0"}])
+            with patch('unified_service.asyncio.sleep'):
+                await sender.deliver(sender.queue.get_nowait())
+
+        assert failed == [[{"mint": "Coin0"}]]
+        assert sender.consecutive_failures == 1
+        assert not sender.ready()
+
+    def test_queue_full_rejects_batch(self):
+        """Test volle Queue lehnt ab statt zu blockieren"""
+        from unified_service import N8nSender
+
+        sender = N8nSender(queue_size=1, max_in_flight=1)
+        assert sender.enqueue([{"mint": "Coin0"}]) is True
+        assert sender.enqueue([{"mint": "Coin1"}]) is False
+        assert sender.ready() is False
+
+    def test_backoff_is_exponential_and_capped(self):
+        """Test Backoff verdoppelt sich und wird bei N8N_RETRY_MAX_DELAY gekappt (Jitter fixiert)"""
+        from unified_service import n8n_backoff
+
+        with patch('unified_service.N8N_RETRY_DELAY', 5), \
+             patch('unified_service.N8N_RETRY_MAX_DELAY', 60), \
+             patch('unified_service.random.uniform', return_value=1.0):
+            assert [n8n_backoff(a) for a in range(1, 6)] == [5, 10, 20, 40, 60]
+
+
+class TestDiscoveryFlush:
+    """Tests für flush_discovery_buffer mit Hintergrund-Sender"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        with patch('unified_service.n8n_buffer_size'), \
+             patch('unified_service.BATCH_SIZE', 2):
+            from unified_service import UnifiedService
+            self.service = UnifiedService()
+            yield
+
+    @pytest.mark.asyncio
+    async def test_flush_only_enqueues(self):
+        """Test Flush übergibt Batch an die Queue ohne n8n aufzurufen"""
+        self.service.discovery_buffer = [{"mint": "Coin0"}, {"mint": "Coin1"}]
+
+        with patch('unified_service.send_batch_to_n8n') as mock_send:
+            await self.service.flush_discovery_buffer()
+
+        mock_send.assert_not_called()
+        assert self.service.discovery_buffer == []
+        assert self.service.n8n_sender.queue.qsize() == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_waits_during_backoff(self):
+        """Test im Backoff bleiben Coins im Discovery-Buffer"""
+        self.service.discovery_buffer = [{"mint": "Coin0"}, {"mint": "Coin1"}]
+        self.service.n8n_sender.paused_until = float("inf")
+
+        await self.service.flush_discovery_buffer()
+
+        assert len(self.service.discovery_buffer) == 2
+        assert self.service.n8n_sender.queue.empty()
+
+    def test_failed_batch_goes_back_to_front(self):
+        """Test fehlgeschlagener Batch wird vor neue Coins gestellt"""
+        self.service.discovery_buffer = [{"mint": "Coin2"}]
+        self.service.requeue_discovery_batch([{"mint": "Coin0"}, {"mint": "Coin1"}])
+
+        assert [c["mint"] for c in self.service.discovery_buffer] == ["Coin0", "Coin1", "Coin2"]
+
+    @pytest.mark.asyncio
+    async def test_standalone_start_runs_sender(self):
+        """Test direkter Start (__main__) startet den n8n-Sender und beendet ihn wie der Lifespan"""
+        import os
+        import signal
+        from unified_service import standalone_main
+
+        started = asyncio.Event()
+        seen = {}
+
+        async def start_engine(service):
+            seen["sender"] = asyncio.create_task(service.n8n_sender.run())
+            started.set()
+            return [seen["sender"]]
+
+        async def stop_engine(service, tasks):
+            seen["stopped"] = tasks
+
+        with patch('unified_service.start_engine', start_engine), \
+             patch('unified_service.stop_engine', stop_engine):
+            main = asyncio.create_task(standalone_main())
+            await asyncio.wait_for(started.wait(), timeout=5)
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.wait_for(main, timeout=5)
+
+        assert seen["stopped"] == [seen["sender"]]
+        seen["sender"].cancel()
+
+
+class TestN8nPayload:
+    """Tests für Projektion, Byte-Budget-Split und Kompression der n8n-Payloads"""
+
+    def make_coin(self, i, description_len=100):
+        return {"mint": f"Coin{i}", "symbol": f"C{i}", "name": f"Coin {i}",
+                "description": "x" * description_len, "social_count": 1}
+
+    def test_split_respects_byte_budget(self):
+        """Test Teil-Batches bleiben im Budget und behalten Reihenfolge"""
+        from unified_service import split_n8n_batch
+
+        batch = [self.make_coin(i, 900) for i in range(10)]
+        with patch('unified_service.N8N_MAX_PAYLOAD_BYTES', 3000), \
+             patch('unified_service.N8N_WEBHOOK_METHOD', "POST"), \
+             patch('unified_service.N8N_FIELDS', ""):
+            chunks = split_n8n_batch(batch)
+
+        assert len(chunks) > 1
+        assert [c["mint"] for chunk in chunks for c in chunk] == [c["mint"] for c in batch]
+        for chunk in chunks:
+            assert len(json.dumps(chunk)) <= 3000
+
+    def test_get_mode_uses_url_budget(self):
+        """Test im GET-Modus zählt die komplette URL (Webhook-URL, Envelope, Coins) gegen N8N_GET_MAX_URL_BYTES"""
+        from unified_service import split_n8n_batch
+
+        webhook_url = "http://n8n.local/webhook/" + "x" * 300
+        batch = [self.make_coin(i, 200) for i in range(20)]
+        with patch('unified_service.N8N_WEBHOOK_METHOD', "GET"), \
+             patch('unified_service.N8N_WEBHOOK_URL', webhook_url), \
+             patch('unified_service.N8N_GET_MAX_URL_BYTES', 2000), \
+             patch('unified_service.N8N_FIELDS', ""):
+            chunks = split_n8n_batch(batch)
+
+        assert [c["mint"] for chunk in chunks for c in chunk] == [c["mint"] for c in batch]
+        for chunk in chunks:
+            payload = {"source": "pump_find_backend", "count": len(chunk),
+                       "timestamp": "2026-01-01T00:00:00.000000", "data": chunk}
+            assert len(f"{webhook_url}?data={urllib.parse.quote(json.dumps(payload))}") <= 2000
+
+    def test_projection_keeps_mint(self):
+        """Test Feld-Projektion entfernt ungenutzte Felder, mint bleibt immer"""
+        from unified_service import split_n8n_batch
+
+        with patch('unified_service.N8N_FIELDS', "symbol, social_count"):
+            [chunk] = split_n8n_batch([self.make_coin(1)])
+
+        assert chunk == [{"symbol": "C1", "social_count": 1, "mint": "Coin1"}]
+
+    @pytest.mark.asyncio
+    async def test_gzip_body(self):
+        """Test POST-Body wird gzip-komprimiert und als Content-Encoding markiert"""
+        from unified_service import send_batch_to_n8n
+
+        seen = {}
+
+        def handler(request):
+            seen["encoding"] = request.headers.get("content-encoding")
+            seen["payload"] = json.loads(gzip.decompress(request.content))
+            return httpx.Response(200)
+
+        batch = [self.make_coin(i) for i in range(3)]
+        with patch('unified_service.N8N_WEBHOOK_URL', "http://n8n.local/webhook/test"), \
+             patch('unified_service.N8N_WEBHOOK_METHOD', "POST"), \
+             patch('unified_service.N8N_GZIP', True), \
+             patch('unified_service.coins_sent_n8n'), \
+             patch('unified_service.n8n_batches_sent'), \
+             patch('unified_service.n8n_payload_bytes_per_coin') as per_coin:
+            assert await send_batch_to_n8n(batch, mock_client(handler)) is True
+
+        assert seen["encoding"] == "gzip"
+        assert seen["payload"]["data"] == batch
+        per_coin.observe.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_flush_enqueues_split_batches(self):
+        """Test Flush legt mehrere Teil-Batches in die Queue"""
+        with patch('unified_service.n8n_buffer_size'), \
+             patch('unified_service.buffer_size') as gauge, \
+             patch('unified_service.BATCH_SIZE', 2), \
+             patch('unified_service.N8N_MAX_PAYLOAD_BYTES', 1500), \
+             patch('unified_service.N8N_WEBHOOK_METHOD', "POST"):
+            from unified_service import UnifiedService
+            service = UnifiedService()
+            service.discovery_buffer = [self.make_coin(i, 900) for i in range(4)]
+            await service.flush_discovery_buffer()
+
+        assert service.discovery_buffer == []
+        assert service.n8n_sender.queue.qsize() == 4
+        gauge.set.assert_called_once_with(0)
@@ -0,0 +1,190 @@
+"""
+Unit Tests für die Prozess-Trennung (Engine / API)
+Testet Shared-Memory-Snapshot, Snapshot-Aufbau in der Engine sowie Health und Steuerbefehle im API-Prozess
+"""
+
+import pytest
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import patch, AsyncMock
+
+
+def stream(phase_id=1):
+    now = datetime.now(timezone.utc)
+    return {"phase_id": phase_id, "created_at": now, "started_at": now, "creator_address": "Creator"}
+
+
+@pytest.fixture
+def segment():
+    from unified_service import StateSnapshotWriter
+
+    writer = StateSnapshotWriter(f"pf_test_{uuid.uuid4().hex[:8]}", 64 * 1024)
+    yield writer
+    writer.close()
+
+
+class TestStateSnapshot:
+    """Tests für StateSnapshotWriter und StateSnapshotReader"""
+
+    def test_roundtrip_decodes_only_new_versions(self, segment):
+        """Test Leser sieht jeden neuen Stand und dekodiert unveränderte nicht erneut"""
+        from unified_service import StateSnapshotReader
+
+        reader = StateSnapshotReader(segment.shm.name)
+        assert segment.publish(json.dumps({"n": 1}).encode(), now=100.0)
+        assert reader.read() == ({"n": 1}, 100.0)
+
+        with patch('unified_service.json.loads') as loads:
+            assert reader.read() == ({"n": 1}, 100.0)
+        loads.assert_not_called()
+
+        segment.publish(json.dumps({"n": 2}).encode(), now=101.0)
+        assert reader.read() == ({"n": 2}, 101.0)
+        reader.close()
+
+    def test_missing_segment_and_overflow(self, segment):
+        """Test ohne Engine kein Snapshot, zu große Snapshots werden verworfen"""
+        from unified_service import StateSnapshotReader
+
+        assert StateSnapshotReader("pf_test_missing").read() == (None, None)
+        assert segment.publish(b"x" * (64 * 1024)) is False
+        assert segment.published == 0
+
+    def test_write_in_progress_returns_last_consistent(self, segment):
+        """Test während die Engine schreibt (ungerade Sequenz) bleibt der letzte gültige Stand"""
+        from unified_service import StateSnapshotReader, SNAPSHOT_SEQ
+
+        reader = StateSnapshotReader(segment.shm.name)
+        segment.publish(b'{"n": 1}', now=100.0)
+        reader.read()
+
+        SNAPSHOT_SEQ.pack_into(segment.shm.buf, 0, segment.seq + 1)
+        assert reader.read() == ({"n": 1}, 100.0)
+        reader.close()
+
+    def test_stale_snapshot_is_ignored(self, segment):
+        """Test veralteter Snapshot (Engine hängt) gilt als nicht verfügbar"""
+        from unified_service import StateSnapshotReader, engine_snapshot
+
+        segment.publish(b'{"n": 1}', now=time.time() - 60)
+        with patch('unified_service._engine_state', StateSnapshotReader(segment.shm.name)), \
+             patch('unified_service.STATE_SNAPSHOT_MAX_AGE', 10):
+            assert engine_snapshot() is None
+
+
+class TestEngineSnapshot:
+    """Tests für den Snapshot-Aufbau und Steuerbefehle in der Engine"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from unified_service import UnifiedService
+        self.service = UnifiedService()
+        self.service.phases_config = {1: {"interval": 5, "max_age": 10, "name": "Baby Zone"}}
+        self.service.sorted_phase_ids = [1]
+
+    @pytest.mark.asyncio
+    async def test_snapshot_contains_live_coins(self):
+        """Test Watchlist- und Cache-Coins stehen mit Live-Daten im Snapshot, alles JSON-fähig"""
+        self.service.add_to_watchlist("Tracked", stream(), now_ts=1000.0)
+        self.service.coin_cache.add_coin("Cached", {"mint": "Cached"})
+
+        snapshot = json.loads(await self.service.build_state_snapshot(1002.0))
+
+        assert snapshot["coins"]["Tracked"]["next_flush_at"] == 1005.0
+        assert snapshot["coins"]["Tracked"]["price_high"] is None
+        assert snapshot["coins"]["Cached"]["status"] == "in_cache"
+        assert snapshot["live"]["active_coins"] == 1
+        assert snapshot["live"]["cache_stats"]["total_coins"] == 1
+        assert "unified_trades_processed_total" in snapshot["metrics"]
+
+    @pytest.mark.asyncio
+    async def test_snapshot_reencodes_only_changed_coins(self):
+        """Test unveränderte Coins werden aus dem Fragment-Cache übernommen, entfernte fallen heraus"""
+        self.service.add_to_watchlist("Quiet", stream(), now_ts=1000.0)
+        self.service.add_to_watchlist("Busy", stream(), now_ts=1000.0)
+        await self.service.build_state_snapshot(1001.0)
+
+        self.service.watchlist["Busy"]["buffer"]["buys"] += 1
+        self.service.watchlist.pop("Quiet")
+        changed, mints = self.service.snapshot_coin_changes(1002.0)
+        assert list(changed) == ["Busy"]
+
+        snapshot = json.loads(self.service.encode_state_snapshot('{"published_at": 1002.0}', changed, mints))
+        assert list(snapshot["coins"]) == ["Busy"]
+        assert snapshot["coins"]["Busy"]["num_buys"] == 1
+
+    @pytest.mark.asyncio
+    async def test_update_config_command(self):
+        """Test Config-Änderung aus dem API-Prozess wird in der Engine angewendet"""
+        with patch('unified_service.update_global_config') as update, \
+             patch('unified_service.engine_commands'):
+            await self.service.apply_engine_command({"command": "update_config", "updates": {"BATCH_SIZE": 20}})
+
+        update.assert_called_once_with({"BATCH_SIZE": 20})
+
+    @pytest.mark.asyncio
+    async def test_control_listener_without_stream_notify(self):
+        """Test die Engine lauscht auf Steuerbefehle auch mit STREAM_NOTIFY_ENABLED=false"""
+        from unified_service import ENGINE_CONTROL_CHANNEL, run_control_listener
+
+        conn = AsyncMock()
+        conn.fetchval.side_effect = asyncio.CancelledError
+        with patch('unified_service.STREAM_NOTIFY_ENABLED', False), \
+             patch('unified_service.asyncpg.connect', AsyncMock(return_value=conn)):
+            with pytest.raises(asyncio.CancelledError):
+                await run_control_listener(self.service.on_engine_command)
+
+        conn.add_listener.assert_awaited_once_with(ENGINE_CONTROL_CHANNEL, self.service.on_engine_command)
+        conn.close.assert_awaited_once()
+
+
+class TestApiProcess:
+    """Tests für Endpoints im API-Prozess (PROCESS_ROLE=api)"""
+
+    @pytest.mark.asyncio
+    async def test_health_reads_engine_snapshot(self, segment):
+        """Test /health liefert Zähler der Engine aus dem Snapshot"""
+        from unified_service import StateSnapshotReader, UnifiedService, health_check
+
+        service = UnifiedService()
+        service.coin_cache.add_coin("Cached", {"mint": "Cached"})
+        segment.publish(await service.build_state_snapshot(time.time()))
+
+        with patch('unified_service._unified_instance', None), \
+             patch('unified_service._engine_state', StateSnapshotReader(segment.shm.name)), \
+             patch.dict('unified_service.unified_status', {"last_message_time": time.time()}):
+            response = await health_check(None)
+
+        body = json.loads(response.body)
+        assert body["cache_stats"]["total_coins"] == 1
+        assert body["ws_connected"] is True
+        assert body["db_connected"] is False
+        assert body["status"] == "degraded"
+
+    @pytest.mark.asyncio
+    async def test_dsn_change_from_other_worker_rebuilds_pool(self):
+        """Test DSN-Änderung eines anderen API-Workers kommt per NOTIFY an und baut den eigenen Pool neu"""
+        from unified_service import on_api_command, run_api_state
+
+        old_pool, new_pool = AsyncMock(), AsyncMock()
+        payload = json.dumps({"command": "update_config", "updates": {"DB_DSN": "postgresql://new/db"}})
+        with patch('unified_service.DB_DSN', "postgresql://old/db"), \
+             patch('unified_service._force_db_reconnect', False), \
+             patch('unified_service._api_pool', old_pool), \
+             patch('unified_service._api_pool_dsn', "postgresql://old/db"), \
+             patch('unified_service._engine_state', None), \
+             patch('unified_service.asyncpg.create_pool', AsyncMock(return_value=new_pool)) as create_pool, \
+             patch('unified_service.asyncio.sleep', AsyncMock(side_effect=asyncio.CancelledError)):
+            on_api_command(None, 0, "pump_find_control", payload)
+            with pytest.raises(asyncio.CancelledError):
+                await run_api_state()
+
+            import unified_service
+            assert unified_service._force_db_reconnect is True
+            assert unified_service._api_pool is new_pool
+
+        old_pool.close.assert_awaited_once()
+        create_pool.assert_awaited_once_with("postgresql://new/db", min_size=1, max_size=5)
@@ -0,0 +1,244 @@
+"""
+Unit Tests für den Multi-Replika-Modus
+Testet Zuteilungsplan, Eigentums-Abgleich, Lease-Ablauf und die Behandlung fremder Coins im Service
+"""
+
+import pytest
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch, AsyncMock, MagicMock
+
+
+def stream(phase_id=1):
+    now = datetime.now(timezone.utc)
+    return {"phase_id": phase_id, "created_at": now, "started_at": now, "creator_address": "Creator"}
+
+
+class TestPlanReplicaAssignments:
+    """Tests für plan_replica_assignments"""
+
+    def test_new_streams_go_to_least_loaded(self):
+        """Test freie Streams füllen zuerst die am wenigsten ausgelastete Replika"""
+        from unified_service import plan_replica_assignments
+
+        assignments, moves = plan_replica_assignments({"a": 10, "b": 4, "c": 7}, [f"Coin{i}" for i in range(6)])
+
+        owners = list(assignments.values())
+        assert owners.count("b") == 5
+        assert owners.count("c") == 1
+        assert moves == []
+
+    def test_scale_out_moves_batch_limited(self):
+        """Test neue leere Replika bekommt Streams, höchstens batch je Runde"""
+        from unified_service import plan_replica_assignments
+
+        _, moves = plan_replica_assignments({"a": 100, "b": 100, "c": 0}, [], tolerance=0.2, batch=50)
+
+        assert sum(count for _, _, count in moves) == 50
+        assert all(target == "c" for _, target, _ in moves)
+
+        _, moves = plan_replica_assignments({"a": 34, "b": 33, "c": 33}, [], tolerance=0.2, batch=50)
+        assert moves == []
+
+    def test_without_live_replicas_nothing_assigned(self):
+        """Test ohne lebende Replika bleibt alles frei"""
+        from unified_service import plan_replica_assignments
+
+        assert plan_replica_assignments({}, ["CoinA"]) == ({}, [])
+
+
+class TestReplicaCoordinator:
+    """Tests für ReplicaCoordinator"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        with patch('unified_service.replica_coins_owned'), \
+             patch('unified_service.replica_ownership_changes'):
+            from unified_service import ReplicaCoordinator
+            self.replica = ReplicaCoordinator("replica-1", lease_seconds=10)
+            yield
+
+    @pytest.mark.asyncio
+    async def test_fetch_owned_records_changes(self, mock_db_pool):
+        """Test Abgleich merkt gewonnene und verlorene Coins vor, zusammengefasst bis zur Anwendung"""
+        mock_db_pool.fetch.return_value = [{"token_address": "CoinA", "handoff_to": None},
+                                           {"token_address": "CoinB", "handoff_to": None}]
+        await self.replica.fetch_owned(mock_db_pool)
+
+        mock_db_pool.fetch.return_value = [{"token_address": "CoinB", "handoff_to": "replica-2"},
+                                           {"token_address": "CoinC", "handoff_to": None}]
+        assert await self.replica.fetch_owned(mock_db_pool) == ({"CoinC"}, {"CoinA"})
+
+        assert mock_db_pool.fetch.await_args.args[1] == "replica-1"
+        assert self.replica.owned == {"CoinB", "CoinC"}
+        assert self.replica.pending == ({"CoinB", "CoinC"}, {"CoinA"})
+        assert self.replica.handoffs == {"CoinB"}
+
+    @pytest.mark.asyncio
+    async def test_lease_deadline_from_db_time(self, mock_db_pool):
+        """Test die Lease-Restlaufzeit kommt aus der DB und zählt ab dem Absenden des Heartbeats"""
+        mock_db_pool.fetchval.return_value = 9.5
+
+        with patch('unified_service.time.monotonic', return_value=500.0):
+            await self.replica.heartbeat(mock_db_pool)
+
+        assert self.replica.lease_deadline == 509.5
+        assert not self.replica.lease_expired(now=509.0)
+        assert self.replica.lease_expired(now=509.5)
+
+    def test_fence_after_lease_expiry(self):
+        """Test ohne erneuerten Lease gibt die Replika alle Coins ab"""
+        self.replica.owned = {"CoinA", "CoinB"}
+        self.replica.lease_deadline = 1010.0
+
+        assert not self.replica.lease_expired(now=1005.0)
+        assert self.replica.lease_expired(now=1011.0)
+
+        self.replica.fence()
+        assert self.replica.owned == set()
+        assert self.replica.pending == (set(), {"CoinA", "CoinB"})
+
+
+    @pytest.mark.asyncio
+    async def test_confirm_handoffs_writes_only_confirmed(self, mock_db_pool):
+        """Test die Quelle schreibt Teil-Buffer nur für Streams, deren Übergabe sie bestätigen konnte"""
+        from unified_service import COIN_METRICS_INSERT_SQL, REPLICA_HANDOFF_CONFIRM_SQL
+
+        conn = mock_db_pool.acquire.return_value.__aenter__.return_value
+        conn.transaction = MagicMock()
+        conn.transaction.return_value.__aenter__ = AsyncMock()
+        conn.transaction.return_value.__aexit__ = AsyncMock(return_value=None)
+        conn.executemany = AsyncMock()
+        mock_db_pool.fetch.return_value = [{"token_address": "CoinA"}]
+        self.replica.owned = {"CoinA", "CoinB"}
+        self.replica.handoffs = {"CoinA", "CoinB"}
+
+        confirmed = await self.replica.confirm_handoffs(mock_db_pool, {"CoinA", "CoinB"},
+                                                        [("CoinA", 1), ("CoinB", 2)])
+
+        assert confirmed == {"CoinA"}
+        assert mock_db_pool.fetch.await_args.args[0] == REPLICA_HANDOFF_CONFIRM_SQL
+        conn.executemany.assert_awaited_once_with(COIN_METRICS_INSERT_SQL, [("CoinA", 1)])
+        assert self.replica.owned == {"CoinB"}
+        assert self.replica.handoffs == set()
+
+
+class TestReplicaService:
+    """Tests für die Replika-Integration in UnifiedService"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        with patch('unified_service.coins_tracked'), \
+             patch('unified_service.trades_processed'), \
+             patch('unified_service.metrics_saved'):
+            from unified_service import UnifiedService, ReplicaCoordinator
+            self.service = UnifiedService()
+            self.service.phases_config = {1: {"interval": 5, "max_age": 10, "name": "Baby Zone"}}
+            self.service.sorted_phase_ids = [1]
+            self.service.replica = ReplicaCoordinator("replica-1")
+            self.service.replica.owned = {"Mine"}
+            yield
+
+    def test_only_owned_coins_are_tracked(self):
+        """Test fremde Coins landen nicht in der Watchlist, der Stream-Sync lädt sie nicht"""
+        self.service.add_to_watchlist("Mine", stream())
+        self.service.add_to_watchlist("Foreign", stream())
+
+        assert list(self.service.watchlist) == ["Mine"]
+        assert not self.service.wants_stream("Foreign")
+
+    @pytest.mark.asyncio
+    async def test_apply_changes_loads_gained_and_drops_lost(self):
+        """Test verlorene Coins werden abgemeldet, gewonnene geladen und abonniert"""
+        self.service.add_to_watchlist("Mine", stream())
+        self.service.websocket = AsyncMock()
+        self.service.replica.owned = {"New"}
+        self.service.replica.pending = ({"New"}, {"Mine"})
+        self.service.get_active_streams = AsyncMock(return_value={"New": stream()})
+
+        assert await self.service.apply_replica_changes() == (1, 1)
+
+        self.service.get_active_streams.assert_awaited_once_with(["New"])
+        assert list(self.service.watchlist) == ["New"]
+        assert "New" in self.service.pending_subscriptions
+        assert '"unsubscribeTokenTrade"' in self.service.websocket.send.await_args.args[0]
+        assert self.service.replica.pending is None
+
+    @pytest.mark.asyncio
+    async def test_handoff_flushes_partial_buffer_then_drops(self, mock_db_pool):
+        """Test ein umverteilter Coin wird erst nach Schreiben seines Teil-Buffers abgegeben"""
+        self.service.pool = mock_db_pool
+        self.service.websocket = AsyncMock()
+        self.service.add_to_watchlist("Mine", stream())
+        self.service.watchlist["Mine"]["buffer"]["buys"] = 3
+        self.service.replica.handoffs = {"Mine"}
+        self.service.replica.confirm_handoffs = AsyncMock(return_value={"Mine"})
+
+        with patch.dict('unified_service.unified_status', {"db_connected": True}):
+            assert await self.service.apply_replica_changes() == (0, 1)
+
+        mints, rows = self.service.replica.confirm_handoffs.await_args.args[1:]
+        assert mints == {"Mine"}
+        assert [row[0] for row in rows] == ["Mine"]
+        assert "Mine" not in self.service.watchlist
+
+    @pytest.mark.asyncio
+    async def test_flush_fenced_to_owned_streams(self, mock_db_pool):
+        """Test der Metric-Flush verwirft Zeilen für Coins, die der Replika nicht mehr gehören"""
+        from unified_service import COIN_METRICS_INSERT_SQL, REPLICA_FENCE_SQL
+
+        conn = mock_db_pool.acquire.return_value.__aenter__.return_value
+        conn.transaction = MagicMock()
+        conn.transaction.return_value.__aenter__ = AsyncMock()
+        conn.transaction.return_value.__aexit__ = AsyncMock(return_value=None)
+        conn.executemany = AsyncMock()
+        self.service.pool = mock_db_pool
+        self.service.replica.owned = {"Mine", "Moved"}
+        for mint in ("Mine", "Moved"):
+            self.service.add_to_watchlist(mint, stream())
+            entry = self.service.watchlist[mint]
+            entry["buffer"].update({"vol": 1.0, "buys": 1, "close": 1e-6, "v_sol": 30.0})
+            entry["next_flush"] = 0
+        mock_db_pool.fetch.return_value = [{"token_address": "Mine"}]
+
+        with patch.dict('unified_service.unified_status', {"db_connected": True, "total_metrics_saved": 0}), \
+             patch('unified_service.replica_fenced_writes') as fenced:
+            await self.service.check_lifecycle_and_flush(time.time())
+
+        assert mock_db_pool.fetch.await_args.args[0] == REPLICA_FENCE_SQL
+        query, rows = conn.executemany.await_args.args
+        assert query == COIN_METRICS_INSERT_SQL
+        assert [row[0] for row in rows] == ["Mine"]
+        fenced.inc.assert_called_once_with(1)
+
+    @pytest.mark.asyncio
+    async def test_foreign_cache_coin_saved_as_bucket(self, mock_db_pool):
+        """Test Cache-Trades eines fremden Coins werden als eigene coin_metrics-Zeile geschrieben"""
+        from unified_service import COIN_METRICS_INSERT_SQL
+
+        self.service.pool = mock_db_pool
+        self.service.coin_cache.add_coin("Foreign", {"mint": "Foreign", "traderPublicKey": "Creator"})
+        self.service.coin_cache.add_trade("Foreign", {"mint": "Foreign", "txType": "buy", "solAmount": 0.5,
+                                                     "tokenAmount": 1000, "vSolInBondingCurve": 30.0,
+                                                     "vTokensInBondingCurve": 1e9, "traderPublicKey": "Buyer"})
+
+        with patch.dict('unified_service.unified_status', {"db_connected": True}):
+            await self.service.activate_stream("Foreign", stream())
+
+        assert "Foreign" not in self.service.watchlist
+        args = mock_db_pool.execute.await_args.args
+        assert args[0] == COIN_METRICS_INSERT_SQL
+        assert len(args) == 31
+        assert (args[1], args[3], args[15]) == ("Foreign", 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_discovery_follows_leadership(self):
+        """Test nur der Leader abonniert neue Tokens"""
+        self.service.discovery_enabled = False
+        self.service.websocket = AsyncMock()
+
+        await self.service.set_discovery(True)
+        await self.service.set_discovery(True)
+
+        self.service.websocket.send.assert_awaited_once_with('{"method": "subscribeNewToken"}')
+        assert self.service.discovery_enabled is True
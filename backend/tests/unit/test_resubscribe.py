@@ -0,0 +1,114 @@
+"""
+Unit Tests für das Resubscribe nach einem WebSocket-Reconnect
+Testet die Priorisierung (Baby Zone und Cache-Coins zuerst), das Senden in Chunks und den Abbruch bei Fehlern
+"""
+
+import json
+import pytest
+from datetime import datetime, timezone, timedelta
+from unittest.mock import AsyncMock, patch
+
+
+@pytest.fixture
+def service():
+    from unified_service import UnifiedService
+
+    service = UnifiedService()
+    service.phases_config = {1: {"interval": 5, "max_age": 10, "name": "Baby Zone"},
+                             2: {"interval": 15, "max_age": 60, "name": "Survival Zone"}}
+    service.sorted_phase_ids = [1, 2]
+    return service
+
+
+def track(service, mint, phase_id, age_minutes):
+    created = datetime.now(timezone.utc) - timedelta(minutes=age_minutes)
+    service.add_to_watchlist(mint, {"phase_id": phase_id, "created_at": created, "started_at": created,
+                                    "creator_address": None})
+
+
+def sent_keys(ws):
+    return [json.loads(call.args[0])["keys"] for call in ws.send.await_args_list]
+
+
+class TestResubscriptionOrder:
+    """Tests für resubscription_order"""
+
+    def test_young_coins_first(self, service):
+        """Test Baby Zone und Cache-Coins vor späteren Phasen, jeweils jüngste zuerst, Unbekannte zuletzt"""
+        track(service, "Survivor", 2, 30)
+        track(service, "BabyOld", 1, 8)
+        track(service, "BabyYoung", 1, 3)
+        service.coin_cache.add_coin("Cached", {"mint": "Cached"})
+        service.subscribed_mints.update({"Cached", "Unknown"})
+
+        assert service.resubscription_order() == ["Cached", "BabyYoung", "BabyOld", "Survivor", "Unknown"]
+
+    def test_coordinator_includes_worker_subscriptions(self, service):
+        """Test Ring-Feed: Worker-Subscriptions folgen nach den eigenen Coins, zuletzt abonnierte zuerst"""
+        from unified_service import ShardCoordinator
+
+        service.shards = ShardCoordinator(2, ring_slots=4)
+        service.shards.feed_request(0, '{"method": "subscribeTokenTrade", "keys": ["WorkerOld", "Cached"]}')
+        service.shards.feed_request(1, '{"method": "subscribeTokenTrade", "keys": ["WorkerNew"]}')
+        service.coin_cache.add_coin("Cached", {"mint": "Cached"})
+        service.subscribed_mints.add("Cached")
+
+        assert service.resubscription_order() == ["Cached", "WorkerNew", "WorkerOld"]
+
+
+class TestResubscribe:
+    """Tests für resubscribe"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, service):
+        self.service = service
+        self.mints = [f"Coin{i}" for i in range(5)]
+        service.subscribed_mints.update(self.mints)
+        self.ws = AsyncMock()
+
+    @pytest.mark.asyncio
+    async def test_sends_bounded_chunks(self):
+        """Test Chunks mit max. RESUBSCRIBE_CHUNK_SIZE Keys, beendete Coins werden übersprungen"""
+        self.service.subscribed_mints.discard("Coin3")
+
+        with patch('unified_service.RESUBSCRIBE_CHUNK_SIZE', 2), \
+             patch('unified_service.RESUBSCRIBE_INTERVAL', 0), \
+             patch('unified_service.resubscribe_duration') as duration:
+            assert await self.service.resubscribe(self.ws, self.mints)
+
+        assert sent_keys(self.ws) == [["Coin0", "Coin1"], ["Coin2"], ["Coin4"]]
+        progress = self.service.resubscribe_progress
+        assert (progress["done"], progress["sent"], progress["chunks"], progress["result"]) == (5, 4, 3, "complete")
+        duration.observe.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_failure_hands_rest_to_batching(self):
+        """Test Sendefehler bricht ab, nicht gesendete Coins gehen an das Subscription-Batching"""
+        self.ws.send.side_effect = [None, ConnectionError("closed")]
+
+        with patch('unified_service.RESUBSCRIBE_CHUNK_SIZE', 2), \
+             patch('unified_service.RESUBSCRIBE_INTERVAL', 0):
+            assert await self.service.resubscribe(self.ws, self.mints) is False
+
+        assert self.service.pending_subscriptions == {"Coin2", "Coin3", "Coin4"}
+        assert self.service.resubscribe_progress["result"] == "failed"
+        assert self.service.resubscribe_progress["done"] == 2
+
+    @pytest.mark.asyncio
+    async def test_cancel_marks_cancelled_and_resets_gauge(self):
+        """Test Abbruch des Tasks setzt Ergebnis 'cancelled', Gauge auf 0 und zählt den Abbruch"""
+        import asyncio
+
+        with patch('unified_service.RESUBSCRIBE_CHUNK_SIZE', 2), \
+             patch('unified_service.RESUBSCRIBE_INTERVAL', 60), \
+             patch('unified_service.resubscribe_pending') as pending, \
+             patch('unified_service.resubscribe_runs') as runs:
+            self.service.resubscribe_task = asyncio.create_task(self.service.resubscribe(self.ws, self.mints))
+            await asyncio.sleep(0)
+            self.service.cancel_resubscribe()
+            with pytest.raises(asyncio.CancelledError):
+                await self.service.resubscribe_task
+
+        assert self.service.resubscribe_progress["result"] == "cancelled"
+        pending.set.assert_called_with(0)
+        runs.labels.assert_called_with(result="cancelled")
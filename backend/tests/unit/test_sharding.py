@@ -0,0 +1,300 @@
+"""
+Unit Tests für das Sharding
+Testet Hash-Ring, Buffer-Zusammenführung, Übergaben zwischen Koordinator und Workern sowie die Umverteilung
+"""
+
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+
+
+def stream(phase_id=1):
+    now = datetime.now(timezone.utc)
+    return {"phase_id": phase_id, "created_at": now, "started_at": now, "creator_address": "Creator"}
+
+
+def mints(count):
+    return [f"Mint{i:05d}pump" for i in range(count)]
+
+
+def buffer_with(*trades):
+    from unified_service import empty_trade_buffer, aggregate_trade
+
+    buf = empty_trade_buffer()
+    for sol, price, is_buy, trader in trades:
+        aggregate_trade(buf, sol, price, is_buy, trader, 30.0, "Creator")
+    return buf
+
+
+class TestHashRing:
+    """Tests für HashRing"""
+
+    def test_distribution_and_minimal_movement(self):
+        """Test Coins verteilen sich gleichmäßig, beim neuen Shard wandert nur dessen Anteil"""
+        from unified_service import HashRing
+
+        keys = mints(4000)
+        ring = HashRing([0, 1, 2], vnodes=64)
+        before = {key: ring.owner(key) for key in keys}
+
+        counts = [list(before.values()).count(shard) for shard in range(3)]
+        assert min(counts) > 4000 / 3 * 0.7
+
+        ring.add_node(3)
+        moved = [key for key in keys if ring.owner(key) != before[key]]
+        assert all(ring.owner(key) == 3 for key in moved)
+        assert len(moved) < 4000 / 4 * 1.4
+
+    def test_stable_across_instances(self):
+        """Test gleiche Zuordnung in jedem Prozess (kein gesalzenes hash())"""
+        from unified_service import HashRing
+
+        assert HashRing([0, 1], 16).owner("CoinA") == HashRing([1, 0], 16).owner("CoinA")
+        assert HashRing([], 16).owner("CoinA") is None
+
+
+class TestMergeTradeBuffers:
+    """Tests für merge_trade_buffers"""
+
+    def test_older_buffer_provides_open(self):
+        """Test älterer Buffer liefert Open, neuerer Close; Summen und Wallets addiert"""
+        from unified_service import merge_trade_buffers
+
+        older = buffer_with((1.0, 1e-8, True, "A"), (0.5, 2e-8, False, "B"))
+        newer = buffer_with((2.0, 3e-8, True, "C"))
+
+        merged = merge_trade_buffers(newer, older)
+
+        assert merged["open"] == 1e-8
+        assert merged["close"] == 3e-8
+        assert merged["high"] == 3e-8 and merged["low"] == 1e-8
+        assert (merged["buys"], merged["sells"]) == (2, 1)
+        assert merged["vol"] == pytest.approx(3.5)
+        assert merged["wallets"] == {"A", "B", "C"}
+
+    def test_into_empty_buffer(self):
+        """Test leerer Ziel-Buffer übernimmt den älteren komplett"""
+        from unified_service import merge_trade_buffers, empty_trade_buffer
+
+        older = buffer_with((1.0, 1e-8, True, "A"))
+        merged = merge_trade_buffers(empty_trade_buffer(), older)
+
+        assert merged["close"] == 1e-8
+        assert merged["v_sol"] == 30.0
+
+
+class TestShardWorker:
+    """Tests für den Worker-Modus des UnifiedService"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        with patch('unified_service.coins_tracked'):
+            from unified_service import UnifiedService, HashRing
+            self.service = UnifiedService()
+            self.service.phases_config = {1: {"interval": 5, "max_age": 10, "name": "Baby Zone"}}
+            self.service.sorted_phase_ids = [1]
+            self.link = MagicMock()
+            self.service.configure_shard(0, HashRing([0, 1], 16), self.link)
+            yield
+            self.service.shard_sender.close(1)
+
+    def sent(self):
+        """Vom PipeSender bisher geschriebene Nachrichten (wartet auf den Thread)"""
+        self.service.shard_sender.close(5)
+        return [call.args[0] for call in self.link.send.call_args_list]
+
+    def owned(self, shard_id, count=1):
+        return [m for m in mints(200) if self.service.shard_ring.owner(m) == shard_id][:count]
+
+    def test_worker_only_wants_own_streams(self):
+        """Test Worker übernimmt nur Streams seines Shards und macht keine Discovery"""
+        [own] = self.owned(0)
+        [other] = self.owned(1)
+
+        assert self.service.wants_stream(own)
+        assert not self.service.wants_stream(other)
+        assert self.service.discovery_enabled is False
+        assert self.service.maintenance.jobs["stream_repair"].enabled is False
+
+    @pytest.mark.asyncio
+    async def test_ring_change_hands_off_state(self):
+        """Test neuer Ring: fremde Coins gehen samt Buffer an den Koordinator, eigene bleiben"""
+        own, moving = self.owned(0, 2)
+        buf = buffer_with((1.0, 1e-8, True, "A"))
+        self.service.add_to_watchlist(own, stream())
+        self.service.add_to_watchlist(moving, stream(), buf)
+        self.service.ath_cache[moving] = 2e-8
+        self.service.dirty_aths.add(moving)
+
+        # Shard 0 fällt aus dem Ring
+        self.service.shard_inbox.append(("ring", [1]))
+        await self.service.apply_shard_messages()
+
+        assert self.service.watchlist == {}
+        [(kind, coins)] = self.sent()
+        assert kind == "handoff"
+        state = dict(coins)[moving]
+        assert state["buffer"] is buf
+        assert state["ath_dirty"] is True
+        assert moving not in self.service.dirty_aths
+        assert self.service.stream_resync_needed is True
+
+    @pytest.mark.asyncio
+    async def test_adopt_merges_into_existing_entry(self):
+        """Test Übernahme nach eigenem Stream-Sync rechnet den älteren Buffer ein"""
+        [mint] = self.owned(0)
+        self.service.add_to_watchlist(mint, stream(), buffer_with((2.0, 3e-8, True, "C")))
+
+        state = {"meta": stream(), "buffer": buffer_with((1.0, 4e-8, True, "A")), "ath": 0.0}
+        self.service.shard_inbox.extend([("adopt", [(mint, state)]), ("stop",)])
+        await self.service.apply_shard_messages()
+
+        entry = self.service.watchlist[mint]
+        assert entry["buffer"]["buys"] == 2
+        assert self.service.ath_cache[mint] == 4e-8
+        assert mint in self.service.dirty_aths
+        assert self.service.shard_stopped.is_set()
+
+    @pytest.mark.asyncio
+    async def test_adopt_new_coin_subscribes(self):
+        """Test übernommener Coin wird getrackt und auf dem eigenen WebSocket abonniert"""
+        [mint] = self.owned(0)
+        self.service.adopt_coin(mint, {"meta": stream(), "buffer": None, "ath": 1e-8}, 1000.0)
+
+        assert self.service.watchlist[mint]["next_flush"] == 1005.0
+        assert mint in self.service.pending_subscriptions
+
+    @pytest.mark.asyncio
+    async def test_mass_rebalance_over_real_pipe(self):
+        """Test tausende abgegebene Coins über eine echte Pipe: die Loop blockiert nicht, Übergaben gebündelt"""
+        import asyncio
+        import multiprocessing
+        from unified_service import PipeSender, SHARD_HANDOFF_BATCH
+
+        self.service.shard_sender.close(1)
+        parent, child = multiprocessing.Pipe()
+        self.service.shard_link = child
+        self.service.shard_sender = PipeSender(child, "test-link")
+        moving = [m for m in mints(6000) if self.service.shard_ring.owner(m) == 0]
+        for mint in moving:
+            self.service.add_to_watchlist(mint, stream(), buffer_with((1.0, 1e-8, True, "A" * 44)))
+        assert len(moving) > 2000
+
+        # Niemand liest die Pipe - apply_shard_ring darf trotzdem nicht blockieren
+        self.service.shard_inbox.append(("ring", [1]))
+        await asyncio.wait_for(self.service.apply_shard_messages(), timeout=5)
+        assert self.service.watchlist == {}
+
+        received = []
+        loop = asyncio.get_running_loop()
+        while len(received) < len(moving):
+            kind, coins = await loop.run_in_executor(None, parent.recv)
+            assert kind == "handoff" and len(coins) <= SHARD_HANDOFF_BATCH
+            received.extend(mint for mint, _ in coins)
+        assert received == moving
+        self.service.shard_sender.close(5)
+        parent.close()
+
+
+class TestShardCoordinator:
+    """Tests für ShardCoordinator ohne echte Prozesse"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        with patch('unified_service.shard_handoffs'), \
+             patch('unified_service.shard_rebalances'), \
+             patch('unified_service.shard_worker_restarts'), \
+             patch('unified_service.shard_coins_tracked'), \
+             patch('unified_service.shard_trades_processed'), \
+             patch('unified_service.shard_metrics_saved'), \
+             patch('unified_service.shard_ws_connected'):
+            from unified_service import ShardCoordinator
+            self.coordinator = ShardCoordinator(2, vnodes=16, restart_delay=5, stats_interval=5)
+            from unified_service import PipeSender
+            self.conns = {}
+            for shard_id in (0, 1):
+                process = MagicMock()
+                process.is_alive.return_value = True
+                conn = self.conns[shard_id] = MagicMock()
+                self.coordinator.workers[shard_id] = {"process": process, "conn": conn, "started_at": 0,
+                                                      "sender": PipeSender(conn, f"test-{shard_id}")}
+                self.coordinator.ring.add_node(shard_id)
+            self.senders = [worker["sender"] for worker in self.coordinator.workers.values()]
+            yield
+            for sender in self.senders:
+                sender.close(1)
+
+    def conn(self, shard_id):
+        """Pipe des Workers, nachdem alle eingereihten Nachrichten geschrieben sind"""
+        for sender in self.senders:
+            sender.close(5)
+        return self.conns[shard_id]
+
+    def test_coordinator_routes_activation_to_owner(self):
+        """Test Koordinator trackt nicht selbst, sondern übergibt an den zuständigen Worker"""
+        from unified_service import UnifiedService
+
+        service = UnifiedService()
+        service.shards = self.coordinator
+        service.coin_cache.add_coin("CoinA", {"mint": "CoinA"})
+        buf = buffer_with((1.0, 1e-8, True, "A"))
+
+        service.add_to_watchlist("CoinA", stream(), buf)
+
+        owner = self.coordinator.ring.owner("CoinA")
+        self.conn(owner).send.assert_called_once()
+        kind, [(mint, state)] = self.conn(owner).send.call_args.args[0]
+        assert (kind, mint, state["buffer"]) == ("adopt", "CoinA", buf)
+        assert service.watchlist == {}
+        assert service.wants_stream("CoinA") and not service.wants_stream("CoinB")
+
+    def test_handoff_from_worker_is_forwarded(self):
+        """Test abgegebener Coin geht an den neuen Eigentümer"""
+        state = {"meta": stream(), "buffer": None}
+        self.coordinator.handle(0, ("handoff", [("CoinA", state)]))
+
+        owner = self.coordinator.ring.owner("CoinA")
+        self.conn(owner).send.assert_called_once_with(("adopt", [("CoinA", state)]))
+
+    def test_crashed_worker_leaves_ring_and_restarts(self):
+        """Test abgestürzter Worker: Ring ohne ihn an die anderen, Neustart geplant"""
+        conn = self.conns[0]
+        with patch('unified_service.asyncio.get_running_loop'):
+            self.coordinator.on_worker_exit(0, 1000.0)
+
+        conn.close.assert_called_once()
+        assert self.coordinator.ring.nodes == {1}
+        self.conn(1).send.assert_called_once_with(("ring", [1]))
+        assert self.coordinator.restart_at == {0: 1005.0}
+
+    def test_stats_totals_and_health(self):
+        """Test Worker-Meldungen werden für /health summiert"""
+        for shard_id, coins in ((0, 10), (1, 15)):
+            self.coordinator.handle(shard_id, ("stats", {
+                "coins_tracked": coins, "trades_processed": 100, "metrics_saved": 5,
+                "ws_connected": True, "reported_at": 1000.0}))
+
+        assert self.coordinator.totals() == {"coins_tracked": 25, "trades_processed": 200, "metrics_saved": 10}
+        assert self.coordinator.healthy(now=1001.0)
+        assert not self.coordinator.healthy(now=1100.0)
+
+    def test_worker_counters_merged(self):
+        """Test Counter der Worker gehen als Zuwachs in die Counter des Koordinators, Neustart beginnt bei 0"""
+        trades = (("unified_trades_processed_total", ()), 0)
+        errors = (("unified_db_errors_total", (("type", "insert"),)), 0)
+
+        def report(shard_id, processed, insert_errors):
+            self.coordinator.handle(shard_id, ("stats", {
+                "coins_tracked": 1, "trades_processed": processed, "metrics_saved": 0, "ws_connected": True,
+                "reported_at": 1000.0, "counters": {trades[0]: processed, errors[0]: insert_errors}}))
+
+        with patch.dict(self.coordinator.merged_counters, {
+                "unified_trades_processed_total": MagicMock(), "unified_db_errors_total": MagicMock()}) as merged:
+            report(0, 100, 1)
+            report(1, 50, 0)
+            report(0, 130, 1)
+            report(0, 20, 0)  # Worker neu gestartet
+
+            incs = [call.args[0] for call in merged["unified_trades_processed_total"].inc.call_args_list]
+            assert incs == [100, 50, 30, 20]
+            merged["unified_db_errors_total"].labels.assert_called_once_with(type="insert")
@@ -0,0 +1,316 @@
+"""
+Unit Tests für den Stream-Sync per LISTEN/NOTIFY und Änderungs-Sequenz
+Testet das Anwenden von coin_streams-Events und -Deltas auf Watchlist und Cache sowie den Vollabgleich
+"""
+
+import pytest
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch, AsyncMock
+
+
+def event(mint, op="INSERT", phase_id=1, is_active=True):
+    return json.dumps({"op": op, "mint": mint, "phase_id": phase_id, "is_active": is_active})
+
+
+def stream(phase_id=1):
+    now = datetime.now(timezone.utc)
+    return {"phase_id": phase_id, "created_at": now, "started_at": now, "creator_address": "Creator"}
+
+
+class TestStreamSync:
+    """Tests für apply_stream_events und reconcile_watchlist"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        with patch('unified_service.coins_tracked'), \
+             patch('unified_service.stream_events'):
+            from unified_service import UnifiedService
+            self.service = UnifiedService()
+            self.service.phases_config = {
+                1: {"interval": 5, "max_age": 10, "name": "Baby Zone"},
+                2: {"interval": 30, "max_age": 60, "name": "Survival Zone"},
+            }
+            self.service.sorted_phase_ids = [1, 2]
+            yield
+
+    def notify(self, payload):
+        self.service.on_stream_notify(None, 1234, "coin_streams_changed", payload)
+
+    @pytest.mark.asyncio
+    async def test_insert_activates_cached_coin_immediately(self):
+        """Test neuer Stream für Cache-Coin wird sofort inkl. Cache-Trades aktiviert"""
+        self.service.coin_cache.add_coin("CoinA", {"mint": "CoinA", "traderPublicKey": "Creator"})
+        self.service.coin_cache.add_trade("CoinA", {"mint": "CoinA", "txType": "buy", "solAmount": 0.5,
+                                                   "tokenAmount": 1000, "vSolInBondingCurve": 30.0,
+                                                   "vTokensInBondingCurve": 1e9, "traderPublicKey": "Buyer"})
+        self.service.get_active_streams = AsyncMock(return_value={"CoinA": stream()})
+
+        self.notify(event("CoinA"))
+        assert await self.service.apply_stream_events() == 1
+
+        self.service.get_active_streams.assert_awaited_once_with(["CoinA"])
+        assert self.service.watchlist["CoinA"]["buffer"]["buys"] == 1
+        assert "CoinA" not in self.service.coin_cache.pending_expiry
+        # Selbst entdeckt - schon abonniert
+        assert "CoinA" not in self.service.pending_subscriptions
+
+    @pytest.mark.asyncio
+    async def test_insert_for_unknown_coin_subscribes(self):
+        """Test Stream eines nicht selbst entdeckten Coins wird getrackt und abonniert"""
+        self.service.get_active_streams = AsyncMock(return_value={"CoinB": stream()})
+
+        self.notify(event("CoinB"))
+        await self.service.apply_stream_events()
+
+        assert "CoinB" in self.service.watchlist
+        assert "CoinB" in self.service.pending_subscriptions
+
+    @pytest.mark.asyncio
+    async def test_deactivation_and_phase_change(self):
+        """Test Deaktivierung entfernt den Coin, externer Phasenwechsel setzt neues Intervall"""
+        self.service.add_to_watchlist("CoinA", stream())
+        self.service.add_to_watchlist("CoinB", stream())
+        self.service.get_active_streams = AsyncMock()
+
+        self.notify(event("CoinA", op="UPDATE", phase_id=99, is_active=False))
+        self.notify(event("CoinB", op="UPDATE", phase_id=2))
+        await self.service.apply_stream_events()
+
+        self.service.get_active_streams.assert_not_awaited()
+        assert "CoinA" not in self.service.watchlist
+        assert "CoinA" not in self.service.subscribed_mints
+        assert self.service.watchlist["CoinB"]["meta"]["phase_id"] == 2
+        assert self.service.watchlist["CoinB"]["interval"] == 30
+
+    @pytest.mark.asyncio
+    async def test_last_event_per_mint_wins(self):
+        """Test mehrere Events je Mint werden zusammengefasst (Insert + Delete = nichts laden)"""
+        self.service.get_active_streams = AsyncMock()
+
+        self.notify(event("CoinA"))
+        self.notify(event("CoinA", op="DELETE", is_active=False))
+        self.notify("kein json")
+        await self.service.apply_stream_events()
+
+        self.service.get_active_streams.assert_not_awaited()
+        assert self.service.watchlist == {}
+
+    @pytest.mark.asyncio
+    async def test_load_failure_requests_resync(self):
+        """Test schlägt das Nachladen fehl, wird beim nächsten Refresh voll abgeglichen"""
+        self.service.stream_resync_needed = False
+        self.service.get_active_streams = AsyncMock(side_effect=Exception("db down"))
+
+        self.notify(event("CoinA"))
+        await self.service.apply_stream_events()
+
+        assert self.service.stream_resync_needed is True
+
+    def test_reconcile_adds_and_removes(self):
+        """Test Vollabgleich entfernt beendete und ergänzt fehlende Streams"""
+        self.service.add_to_watchlist("Stale", stream())
+
+        added, removed = self.service.reconcile_watchlist({"Fresh": stream(2)}, 1000.0)
+
+        assert (added, removed) == (1, 1)
+        assert list(self.service.watchlist) == ["Fresh"]
+        assert self.service.watchlist["Fresh"]["next_flush"] == 1030.0
+
+    @pytest.mark.asyncio
+    async def test_cache_activation_without_full_query(self):
+        """Test mit übergebenen Streams fragt die Cache-Prüfung die DB nicht erneut ab"""
+        self.service.coin_cache.add_coin("CoinA", {"mint": "CoinA"}, current_time=0)
+        self.service.get_active_streams = AsyncMock()
+
+        activated, expired = await self.service.check_cache_activation({})
+
+        self.service.get_active_streams.assert_not_awaited()
+        assert (activated, expired) == (0, 1)
+        assert "CoinA" not in self.service.coin_cache.cache
+
+    @pytest.mark.asyncio
+    async def test_due_cache_coin_looked_up_without_event(self):
+        """Test ohne Vollabgleich werden fällige Cache-Coins nachgeschlagen statt verworfen (NOTIFY fehlt/verspätet)"""
+        self.service.stream_listener_connected = True
+        self.service.stream_resync_needed = False
+        self.service.last_stream_reconcile = 1000.0
+        self.service.coin_cache.add_coin("CoinA", {"mint": "CoinA"}, current_time=0)
+        self.service.coin_cache.add_coin("CoinB", {"mint": "CoinB"}, current_time=0)
+        self.service.get_active_streams = AsyncMock(return_value={"CoinA": stream()})
+
+        with patch('unified_service.STREAM_NOTIFY_ENABLED', True):
+            assert await self.service.sync_streams(1000.0)
+
+        self.service.get_active_streams.assert_awaited_once_with(["CoinA", "CoinB"])
+        assert "CoinA" in self.service.watchlist
+        assert "CoinB" not in self.service.coin_cache.cache
+
+    def test_listener_trusted_only_with_trigger(self):
+        """Test ohne NOTIFY-Trigger bleibt der Delta-Sync aktiv, erscheint er, folgt ein Vollabgleich"""
+        self.service.stream_resync_needed = False
+
+        with patch('unified_service.stream_listener_connected'):
+            self.service.set_stream_listener_trusted(False)
+            assert self.service.stream_listener_connected is False
+            assert self.service.stream_resync_needed is False
+
+            self.service.set_stream_listener_trusted(True)
+            assert self.service.stream_listener_connected is True
+            assert self.service.stream_resync_needed is True
+
+
+def change_row(mint, seq, phase_id=1, is_active=True, has_coin=True):
+    return {"token_address": mint, "current_phase_id": phase_id, "is_active": is_active, "change_seq": seq,
+            "token_created_at": datetime.now(timezone.utc), "started_at": None,
+            "trader_public_key": "Creator", "ath_price_sol": 0.5, "has_coin": has_coin}
+
+
+class TestStreamDeltaSync:
+    """Tests für apply_stream_changes (Delta über coin_streams.change_seq)"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mock_db_pool):
+        with patch('unified_service.coins_tracked'), \
+             patch('unified_service.stream_sync_rows'):
+            from unified_service import UnifiedService
+            self.service = UnifiedService()
+            self.service.phases_config = {
+                1: {"interval": 5, "max_age": 10, "name": "Baby Zone"},
+                2: {"interval": 30, "max_age": 60, "name": "Survival Zone"},
+            }
+            self.service.sorted_phase_ids = [1, 2]
+            self.service.pool = mock_db_pool
+            self.service.stream_sync_seq = 100
+            yield
+
+    @pytest.mark.asyncio
+    async def test_reads_only_since_cursor_and_advances(self):
+        """Test nur Zeilen nach dem Cursor, Cursor springt auf höchste gesehene Sequenz"""
+        self.service.add_to_watchlist("Old", stream())
+        self.service.add_to_watchlist("Moved", stream())
+        self.service.pool.fetch.return_value = [
+            change_row("New", 101),
+            change_row("Moved", 102, phase_id=2),
+            change_row("Old", 103, phase_id=99, is_active=False),
+        ]
+
+        assert await self.service.apply_stream_changes() == 3
+
+        assert self.service.pool.fetch.await_args.args[1] == 100
+        assert self.service.stream_sync_seq == 103
+        assert set(self.service.watchlist) == {"New", "Moved"}
+        assert self.service.watchlist["Moved"]["interval"] == 30
+        assert self.service.ath_cache["New"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_late_commit_below_cursor_is_read(self):
+        """Test Zeile einer beim letzten Abruf offenen Transaktion (change_seq unter dem Cursor) wird
+        über deren xid nachgelesen, der Cursor fällt dabei nicht zurück"""
+        self.service.stream_sync_xmin = "7000"
+        self.service.pool.fetchval.return_value = "7005"
+        self.service.pool.fetch.side_effect = [[change_row("New", 104)], [change_row("Late", 95)]]
+
+        assert await self.service.apply_stream_changes() == 2
+
+        changes, late = self.service.pool.fetch.await_args_list
+        assert changes.args[1:] == (100, 5000)
+        assert late.args[1:] == (0, 100, "7000", 1000)
+        assert self.service.stream_sync_xmin == "7005"
+        assert self.service.stream_sync_seq == 104
+        assert {"Late", "New"} <= set(self.service.watchlist)
+
+    @pytest.mark.asyncio
+    async def test_pinned_xmin_does_not_starve_new_changes(self):
+        """Test mehr Nachzügler als das Limit hinter einem alten xmin: neue Änderungen kommen trotzdem durch,
+        die Nachzügler werden seitenweise gelesen und das xmin rückt erst nach dem vollständigen Durchlauf vor"""
+        self.service.stream_sync_seq = 10000
+        self.service.stream_sync_xmin = "7000"
+        pinned = [change_row(f"Pinned{seq}", seq) for seq in range(1, 2501)]
+
+        async def fetch(sql, *args):
+            from unified_service import STREAM_LATE_CHANGES_SQL
+            if sql == STREAM_LATE_CHANGES_SQL:
+                after, cursor, xmin, limit = args
+                assert cursor >= 10000 and xmin == "7000"
+                return [row for row in pinned if row["change_seq"] > after][:limit]
+            after, limit = args
+            return [change_row(f"New{after}", after + 1)]
+
+        self.service.pool.fetch.side_effect = fetch
+        self.service.pool.fetchval.side_effect = ["7010", "7020", "7030"]
+        with patch('unified_service.STREAM_LATE_CHANGES_LIMIT', 1000):
+            seen = []
+            for _ in range(3):
+                await self.service.apply_stream_changes()
+                seen.append((self.service.stream_sync_seq, self.service.stream_late_seq, self.service.stream_sync_xmin))
+
+        # Cursor wandert mit jeder Abfrage, das xmin vom Beginn des Durchlaufs gilt erst nach der letzten Seite
+        assert seen == [(10001, 1000, "7000"), (10002, 2000, "7000"), (10003, 0, "7010")]
+        assert {f"Pinned{seq}" for seq in range(1, 2501)} <= set(self.service.watchlist)
+        assert {"New10000", "New10001", "New10002"} <= set(self.service.watchlist)
+
+    @pytest.mark.asyncio
+    async def test_stream_without_coin_row_is_retried(self):
+        """Test Stream ohne discovered_coins-Zeile wird erst getrackt, wenn die Zeile existiert"""
+        self.service.pool.fetch.return_value = [change_row("Early", 101, has_coin=False)]
+        await self.service.apply_stream_changes()
+
+        assert "Early" not in self.service.watchlist
+        assert self.service.stream_join_pending == {"Early"}
+
+        self.service.pool.fetch.return_value = []
+        self.service.get_active_streams = AsyncMock(return_value={"Early": stream()})
+        await self.service.apply_stream_changes()
+
+        self.service.get_active_streams.assert_awaited_once_with(["Early"])
+        assert "Early" in self.service.watchlist
+        assert self.service.stream_join_pending == set()
+
+    @pytest.mark.asyncio
+    async def test_missing_column_falls_back_to_full_sync(self):
+        """Test ohne change_seq-Spalte bleibt es beim Vollabgleich"""
+        import asyncpg
+
+        self.service.pool.fetchrow = AsyncMock(side_effect=asyncpg.exceptions.UndefinedColumnError("change_xid"))
+
+        assert await self.service.get_stream_change_cursor() is None
+        assert self.service.stream_delta_supported is False
+
+    @pytest.mark.asyncio
+    async def test_cursor_remembers_snapshot_xmin(self):
+        """Test der Cursor vor dem Vollabgleich merkt sich das xmin desselben Snapshots"""
+        self.service.pool.fetchrow.return_value = {"xmin": "812", "seq": 240, "has_xid": True}
+
+        assert await self.service.get_stream_change_cursor() == 240
+        assert self.service.stream_sync_xmin == "812"
+
+
+class TestStreamNotifyTrigger:
+    """Tests für die coin_streams-Trigger in migrations/"""
+
+    def migration_sql(self, name):
+        from db_migration import load_migrations
+        return next(m for m in load_migrations() if m.name == name).sql
+
+    def test_change_seq_ignores_ath_updates(self):
+        """Test Änderungs-Sequenz wird nur bei Insert und Phase/Status-Änderung vergeben"""
+        sql = self.migration_sql("stream_change_tracking")
+
+        assert "BEFORE INSERT OR UPDATE OF current_phase_id, is_active, is_graduated" in sql
+        assert "ADD COLUMN IF NOT EXISTS change_seq" in sql
+
+    def test_change_xid_assigned_before_seq(self):
+        """Test die Transaktions-ID wird vor der Sequenz vergeben (sonst wäre ein Nachzügler im Snapshot unsichtbar)"""
+        sql = self.migration_sql("stream_change_xid")
+
+        assert sql.index("pg_current_xact_id()") < sql.index("nextval('coin_streams_change_seq')")
+
+    def test_trigger_ignores_ath_updates(self):
+        """Test Trigger feuert nur bei Insert/Delete und Änderung von Phase oder Aktiv-Status"""
+        from db_migration import STREAM_NOTIFY_CHANNEL
+
+        sql = self.migration_sql("stream_notify")
+
+        assert "UPDATE OF current_phase_id, is_active" in sql
+        assert f"pg_notify('{STREAM_NOTIFY_CHANNEL}'" in sql
@@ -435,3 +435,31 @@ class TestTradeProcessing:
         # mcap = price * 1_000_000_000
         expected_price = float(sample_trade_data["vSolInBondingCurve"]) / float(sample_trade_data["vTokensInBondingCurve"])
         assert buf["mcap"] == expected_price * 1_000_000_000
+
+    def test_sample_trade_latency_every_nth_trade(self):
+        """Verify nur jeder LATENCY_SAMPLE_RATE-te Trade gesampelt wird"""
+        with patch('unified_service.LATENCY_SAMPLE_RATE', 3), \
+             patch('unified_service.ingest_stage_latency'):
+            recv_ts = time.time()
+            results = [self.service.sample_trade_latency(recv_ts) for _ in range(6)]
+
+        assert results == [None, None, recv_ts, None, None, recv_ts]
+
+    def test_sample_trade_latency_disabled(self):
+        """Verify LATENCY_SAMPLE_RATE=0 deaktiviert das Sampling"""
+        with patch('unified_service.LATENCY_SAMPLE_RATE', 0):
+            assert self.service.sample_trade_latency(time.time()) is None
+        assert self.service.latency_sample_counter == 0
+
+    def test_process_trade_records_latency_sample(self, sample_trade_data):
+        """Verify gesampelter Trade merkt Empfangszeit am Watchlist-Eintrag"""
+        mint = sample_trade_data["mint"]
+        self._create_watchlist_entry(mint)
+        recv_ts = time.time()
+
+        with patch('unified_service.ingest_stage_latency') as mock_latency:
+            self.service.process_trade(sample_trade_data, recv_ts=recv_ts)
+            self.service.process_trade(sample_trade_data)
+
+        assert self.service.watchlist[mint]["latency_samples"] == [recv_ts]
+        mock_latency.labels.assert_called_once_with(stage="aggregate")
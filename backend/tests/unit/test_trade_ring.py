@@ -0,0 +1,157 @@
+"""
+Unit Tests für den Ring-Feed (SHARD_FEED=ring)
+Testet TradeRing, das Routing dekodierter Trades im Koordinator, die Weiterleitung der Worker-Subscriptions
+und die Verarbeitung der Records im Worker
+"""
+
+import pytest
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+
+
+MINT = "So11111111111111111111111111111111111111112"
+
+
+def trade(mint=MINT, tx_type="buy", sol=0.5, trader="Buyer"):
+    return {"mint": mint, "txType": tx_type, "solAmount": sol, "tokenAmount": 1000,
+            "vSolInBondingCurve": 30.0, "vTokensInBondingCurve": 1e9, "traderPublicKey": trader}
+
+
+@pytest.fixture
+def ring():
+    from unified_service import TradeRing
+
+    ring = TradeRing.create(f"pf_test_{uuid.uuid4().hex[:8]}", 4)
+    yield ring
+    ring.close()
+
+
+class TestTradeRing:
+    """Tests für TradeRing"""
+
+    def test_roundtrip_across_wraparound(self, ring):
+        """Test Records kommen in Reihenfolge an, auch wenn die Positionen über das Ringende laufen"""
+        from unified_service import TradeRing, decode_trade_record
+
+        reader = TradeRing.attach(ring.shm.name)
+        for round_no in range(3):
+            for i in range(3):
+                assert ring.push(MINT.encode(), b"Trader", float(i), 1e-8, 30.0, 100.0 + i, i % 2 == 0)
+            records = reader.pop(10)
+            assert [decode_trade_record(r)[1][0] for r in records] == [0.0, 1.0, 2.0]
+
+        mint, parsed, recv_ts = decode_trade_record(records[-1])
+        assert (mint, parsed, recv_ts) == (MINT, (2.0, 1e-8, True, "Trader", 30.0), 102.0)
+        assert reader.read_pos == ring.write_pos == 9
+        reader.close()
+
+    def test_full_ring_rejects_until_consumed(self, ring):
+        """Test voller Ring verwirft statt zu überschreiben, Platz erst nach dem Lesen"""
+        from unified_service import TradeRing
+
+        reader = TradeRing.attach(ring.shm.name)
+        for i in range(4):
+            assert ring.push(MINT.encode(), b"", float(i), 1.0, 1.0, 0.0, True)
+        assert ring.push(MINT.encode(), b"", 9.0, 1.0, 1.0, 0.0, True) is False
+        assert ring.occupancy() == 1.0
+
+        assert len(reader.pop(2)) == 2
+        assert ring.push(MINT.encode(), b"", 4.0, 1.0, 1.0, 0.0, True)
+        assert [r[2] for r in reader.pop(10)] == [2.0, 3.0, 4.0]
+        assert ring.pending() == 0
+        reader.close()
+
+
+class TestRingFeedCoordinator:
+    """Tests für Routing und Subscription-Weiterleitung im ShardCoordinator"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, ring):
+        from unified_service import ShardCoordinator
+
+        self.shards = ShardCoordinator(2, ring_slots=4)
+        self.shards.ring.add_node(0)
+        self.shards.trade_rings[0] = ring
+        self.written, self.dropped = MagicMock(), MagicMock()
+        self.shards.ring_counters[0] = (self.written, self.dropped)
+        self.ring = ring
+
+    def test_route_trade_writes_decoded_record(self):
+        """Test Trade landet dekodiert im Ring des zuständigen Workers, ungültige Keys werden verworfen"""
+        from unified_service import TradeRing, decode_trade_record
+
+        assert self.shards.route_trade(MINT, trade(), 123.0)
+        assert not self.shards.route_trade("x" * 45, trade(mint="x" * 45), 123.0)
+        assert not self.shards.route_trade(MINT, {"mint": MINT}, 123.0)
+
+        reader = TradeRing.attach(self.ring.shm.name)
+        (record,) = reader.pop(10)
+        assert decode_trade_record(record) == (MINT, (0.5, 3e-08, True, "Buyer", 30.0), 123.0)
+        assert self.written.inc.call_count == 1
+        assert self.dropped.inc.call_count == 1
+        reader.close()
+
+    def test_subscriptions_counted_per_worker(self):
+        """Test Unsubscribe des alten Eigentümers beendet keine Subscription, die ein anderer Worker braucht"""
+        self.shards.feed_request(0, '{"method": "subscribeTokenTrade", "keys": ["CoinA", "CoinB"]}')
+        self.shards.feed_request(1, '{"method": "subscribeTokenTrade", "keys": ["CoinA"]}')
+        self.shards.feed_request(0, '{"method": "unsubscribeTokenTrade", "keys": ["CoinA"]}')
+
+        assert list(self.shards.feed_outbox) == [{"method": "subscribeTokenTrade", "keys": ["CoinA", "CoinB"]}]
+
+        self.shards.drop_feed_subscriptions(1)
+        assert self.shards.feed_outbox[-1] == {"method": "unsubscribeTokenTrade", "keys": ["CoinA"]}
+
+        # Nach Reconnect abonniert der Koordinator alles neu (UnifiedService.resubscribe)
+        self.shards.restore_feed()
+        assert not self.shards.feed_outbox
+        assert list(self.shards.feed_subscribers) == ["CoinB"]
+
+
+class TestRingFeedWorker:
+    """Tests für die Verarbeitung der Records im Worker"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, ring):
+        from unified_service import UnifiedService
+
+        self.service = UnifiedService()
+        self.service.phases_config = {1: {"interval": 5, "max_age": 10, "name": "Baby Zone"}}
+        self.service.sorted_phase_ids = [1]
+        self.service.trade_ring = ring
+        now = datetime.now(timezone.utc)
+        self.service.add_to_watchlist(MINT, {"phase_id": 1, "created_at": now, "started_at": now,
+                                             "creator_address": "Dev"})
+
+    def test_consume_aggregates_only_tracked_coins(self, ring):
+        """Test Records werden ohne JSON aggregiert, fremde Mints übersprungen"""
+        ring.push(MINT.encode(), b"Buyer", 0.5, 2e-8, 30.0, 100.0, True)
+        ring.push(MINT.encode(), b"Dev", 0.2, 1e-8, 29.0, 100.0, False)
+        ring.push(b"Unknown", b"Buyer", 1.0, 1e-8, 30.0, 100.0, True)
+
+        with patch('unified_service.trades_processed'), \
+             patch('unified_service.json.loads') as loads, \
+             patch.dict('unified_service.unified_status', {"total_trades": 0}):
+            assert self.service.consume_trade_ring() == 3
+            assert self.service.consume_trade_ring() == 0
+
+        loads.assert_not_called()
+        buf = self.service.watchlist[MINT]["buffer"]
+        assert (buf["buys"], buf["sells"], buf["dev_sold_amount"], buf["close"]) == (1, 1, 0.2, 1e-8)
+        assert buf["wallets"] == {"Buyer", "Dev"}
+
+    @pytest.mark.asyncio
+    async def test_subscriptions_go_to_coordinator(self):
+        """Test der WebSocket-Ersatz schickt Subscribes per Pipe an den Koordinator"""
+        from unified_service import ShardFeedLink
+
+        from unified_service import PipeSender
+
+        self.service.shard_link = MagicMock()
+        self.service.shard_sender = PipeSender(self.service.shard_link, "test-link")
+        await ShardFeedLink(self.service).send('{"method": "subscribeTokenTrade", "keys": ["CoinA"]}')
+        self.service.shard_sender.close(5)
+
+        self.service.shard_link.send.assert_called_once_with(
+            ("ws", '{"method": "subscribeTokenTrade", "keys": ["CoinA"]}'))
@@ -0,0 +1,184 @@
+"""
+Unit Tests für den Warm-Restart (WARM_RESTART_FILE)
+Testet WarmStateStore (Format, Frische, beschädigte Dateien) sowie Sichern und Übernehmen des
+In-Memory-Zustands im UnifiedService
+"""
+
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+
+MINT = "So11111111111111111111111111111111111111112"
+
+
+@pytest.fixture
+def service():
+    from unified_service import UnifiedService
+
+    service = UnifiedService()
+    service.phases_config = {1: {"interval": 5, "max_age": 10, "name": "Baby Zone"}}
+    service.sorted_phase_ids = [1]
+    return service
+
+
+class TestWarmStateStore:
+    """Tests für WarmStateStore"""
+
+    def test_roundtrip_and_freshness(self, tmp_path):
+        """Test Snapshot wird gelesen, solange er jünger als max_age ist"""
+        import pickle
+        from unified_service import WarmStateStore
+
+        store = WarmStateStore(tmp_path / "state" / "warm.bin", max_age=60)
+        assert store.load(now=1000.0) == (None, None)
+        assert store.restore_result == "missing"
+
+        store.write(pickle.dumps({"n": 0}), 990.0)
+        store.write(pickle.dumps({"n": 1}), 1000.0)
+        assert store.load(now=1030.0) == ({"n": 1}, 30.0)
+        assert store.restore_result == "restored"
+
+        assert store.load(now=1100.0) == (None, None)
+        assert store.restore_result == "stale"
+        assert list(tmp_path.joinpath("state").iterdir()) == [store.path]
+
+    def test_corrupt_or_foreign_file_is_ignored(self, tmp_path):
+        """Test abgeschnittene Datei, falsche Prüfsumme oder fremdes Format werden nicht geladen"""
+        import pickle
+        from unified_service import WarmStateStore
+
+        store = WarmStateStore(tmp_path / "warm.bin")
+        store.write(pickle.dumps({"n": 1}), 1000.0)
+        data = store.path.read_bytes()
+
+        store.path.write_bytes(data[:-3])
+        assert store.load(now=1000.0) == (None, None)
+        assert store.restore_result == "invalid"
+
+        store.path.write_bytes(data[:-1] + bytes([data[-1] ^ 0xFF]))
+        assert store.load(now=1000.0) == (None, None)
+
+        store.path.write_bytes(b"XXXX" + data[4:])
+        assert store.load(now=1000.0) == (None, None)
+        assert store.restore_result == "invalid"
+
+
+class TestWarmRestartService:
+    """Tests für Sichern und Übernehmen des Zustands im UnifiedService"""
+
+    @pytest.mark.asyncio
+    async def test_state_survives_restart(self, service, tmp_path, capsys):
+        """Test Buffer, Cache-Coins, ATHs und Watchdog-Zeitstempel kommen nach einem Neustart zurück"""
+        from unified_service import UnifiedService, WarmStateStore, aggregate_trade
+
+        now = datetime.now(timezone.utc)
+        service.warm_state = WarmStateStore(tmp_path / "warm.bin")
+        service.add_to_watchlist(MINT, {"phase_id": 1, "created_at": now, "started_at": now,
+                                        "creator_address": "Dev"}, now_ts=1000.0)
+        aggregate_trade(service.watchlist[MINT]["buffer"], 0.5, 2e-8, True, "Buyer", 30.0, "Dev")
+        service.coin_cache.add_coin("Older", {"mint": "Older"}, current_time=900.0)
+        service.coin_cache.add_coin("Cached", {"mint": "Cached"}, current_time=990.0)
+        service.coin_cache.activate_coin("Older")
+        service.ath_cache[MINT] = 3e-8
+        service.dirty_aths.add(MINT)
+        service.last_trade_timestamps[MINT] = 995.0
+        service.subscribed_mints.add("Cached")
+
+        assert await service.save_warm_state(now_ts=1000.0, clean=True) > 0
+
+        with patch('unified_service.WARM_RESTART_FILE', str(service.warm_state.path)):
+            restarted = UnifiedService()
+        restarted.coin_cache.add_coin("Fresh", {"mint": "Fresh"}, current_time=1010.0)
+        with patch('unified_service.time.time', return_value=1010.0):
+            assert restarted.load_warm_state() == 3
+
+        buf = restarted.watchlist[MINT]["buffer"]
+        assert (buf["buys"], buf["close"], buf["wallets"]) == (1, 2e-8, {"Buyer"})
+        assert restarted.watchlist[MINT]["next_flush"] == 1010.0
+        assert restarted.watchlist[MINT]["meta"]["created_at"] == now
+        assert list(restarted.coin_cache.cache) == ["Older", "Cached", "Fresh"]
+        assert list(restarted.coin_cache.pending_expiry) == ["Cached", "Fresh"]
+        assert restarted.coin_cache.activated_count == 1
+        assert restarted.ath_cache[MINT] == 3e-8 and MINT in restarted.dirty_aths
+        assert restarted.last_trade_timestamps[MINT] == 995.0
+        assert {MINT, "Cached"} <= restarted.subscribed_mints
+        assert "Warm-Restart: 1 Watchlist-Coins, 2 Cache-Coins" in capsys.readouterr().out
+
+    @pytest.mark.asyncio
+    async def test_crash_snapshot_drops_buffers(self, service, tmp_path):
+        """Test nach einem periodischen Snapshot (Absturz) kommen keine womöglich gespeicherten Buffer zurück,
+        ein regulärer Snapshot wird nur einmal mit Buffern übernommen"""
+        from unified_service import UnifiedService, WarmStateStore, aggregate_trade
+
+        now = datetime.now(timezone.utc)
+        service.warm_state = WarmStateStore(tmp_path / "warm.bin")
+        service.add_to_watchlist(MINT, {"phase_id": 1, "created_at": now, "started_at": now,
+                                        "creator_address": "Dev"}, now_ts=1000.0)
+        aggregate_trade(service.watchlist[MINT]["buffer"], 0.5, 2e-8, True, "Buyer", 30.0, "Dev")
+        await service.save_warm_state(now_ts=1000.0)
+
+        with patch('unified_service.WARM_RESTART_FILE', str(service.warm_state.path)):
+            restarted = UnifiedService()
+        with patch('unified_service.time.time', return_value=1010.0):
+            assert restarted.load_warm_state() == 1
+        assert restarted.watchlist[MINT]["buffer"]["buys"] == 0
+        assert restarted.watchlist[MINT]["next_flush"] == 1015.0
+
+        await service.save_warm_state(now_ts=1000.0, clean=True)
+        assert service.warm_state.load(now=1000.0)[0] is not None and service.warm_state.clean
+        assert service.warm_state.load(now=1000.0)[0] is not None and not service.warm_state.clean
+
+    @pytest.mark.asyncio
+    async def test_stop_engine_writes_snapshot(self, service, tmp_path):
+        """Test beim Beenden wird der Zustand gesichert"""
+        from unified_service import WarmStateStore, stop_engine
+
+        service.warm_state = WarmStateStore(tmp_path / "warm.bin")
+        service.dead_letter = None
+        service.coin_cache.add_coin("Cached", {"mint": "Cached"})
+
+        await stop_engine(service, [])
+
+        state, _ = service.warm_state.load()
+        assert list(state["coin_cache"]) == ["Cached"]
+        assert service.warm_state.clean
+
+    @pytest.mark.asyncio
+    async def test_cancelled_periodic_write_does_not_overwrite_clean_snapshot(self, service, tmp_path):
+        """Test ein abgebrochener, noch im Thread laufender periodischer Snapshot landet nicht nach dem vom
+        Beenden (os.replace des alten Schreibvorgangs würde sonst den sauberen Snapshot überschreiben)"""
+        import asyncio
+        import threading
+        from unified_service import WarmStateStore
+
+        store = service.warm_state = WarmStateStore(tmp_path / "warm.bin")
+        entered, release = threading.Event(), threading.Event()
+        original_write = store.write
+
+        def slow_write(payload, saved_at, clean=False):
+            if not clean:
+                entered.set()
+                release.wait(5)
+            return original_write(payload, saved_at, clean)
+
+        store.write = slow_write
+        periodic = asyncio.create_task(service.save_warm_state(now_ts=1000.0))
+        assert await asyncio.to_thread(entered.wait, 5)
+        periodic.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await periodic
+
+        clean_save = asyncio.create_task(service.save_warm_state(now_ts=1001.0, clean=True))
+        await asyncio.sleep(0.05)
+        assert not clean_save.done()
+        release.set()
+        assert await clean_save > 0
+
+        assert store.load(now=1001.0)[0] is not None and store.clean
+
+    def test_disabled_without_file(self, service):
+        """Test ohne WARM_RESTART_FILE kein Job und kein Laden"""
+        assert service.warm_state is None
+        assert "warm_state" not in service.maintenance.jobs
+        assert service.load_warm_state() == 0
@@ -6,14 +6,37 @@
 import asyncio
 import websockets
 import json
+import gzip
 import time
 import asyncpg
 import os
 import re
+import random
+import sys
+import secrets
+import threading
+import traceback
+import urllib.parse
+import tracemalloc
+import bisect
+import hashlib
+import heapq
+import itertools
+import multiprocessing
+import socket
+import signal
+import struct
+import pickle
+import zlib
+import shutil
+from multiprocessing import shared_memory
+from queue import SimpleQueue
+from decimal import Decimal
 from datetime import datetime, timezone, timedelta
 from dateutil import parser
 from zoneinfo import ZoneInfo
-from collections import Counter
+from abc import ABC, abstractmethod
+from collections import Counter, deque
 from contextlib import asynccontextmanager
 from pathlib import Path
 
@@ -25,7 +48,7 @@ if env_file.exists():
     print(f"✅ Lokale .env Datei geladen: {env_file}", flush=True)
 
 # FastAPI & Pydantic
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Response
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Response, Depends, Header
 from fastapi.responses import PlainTextResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -40,7 +63,7 @@ n8n_available.set(0)  # Standardmäßig als nicht verfügbar setzen
 import uvicorn
 
 # Datenbank
-from db_migration import check_and_create_schema
+from db_migration import apply_migrations, stream_notify_installed, STREAM_NOTIFY_CHANNEL
 
 # === KONFIGURATION ===
 # Kombiniert Discovery und Metric
@@ -49,6 +72,46 @@ from db_migration import check_and_create_schema
 DB_DSN = os.getenv("DB_DSN", "")  # Muss in .env gesetzt werden
 DB_REFRESH_INTERVAL = int(os.getenv("DB_REFRESH_INTERVAL", "10"))
 DB_RETRY_DELAY = int(os.getenv("DB_RETRY_DELAY", "5"))
+STREAM_NOTIFY_ENABLED = os.getenv("STREAM_NOTIFY_ENABLED", "true").lower() in ("1", "true", "yes")  # Stream-Sync per LISTEN/NOTIFY
+STREAM_RECONCILE_INTERVAL = int(os.getenv("STREAM_RECONCILE_INTERVAL", "300"))  # Vollabgleich als Sicherheitsnetz (s)
+
+# Wartungs-Jobs (laufen im Hintergrund, nicht auf dem Receive-Pfad)
+STREAM_REPAIR_INTERVAL = int(os.getenv("STREAM_REPAIR_INTERVAL", "60"))  # repair_missing_streams() (s, 0 = aus)
+ORPHAN_CHECK_INTERVAL = int(os.getenv("ORPHAN_CHECK_INTERVAL", "300"))  # Verwaiste Streams/Einträge suchen (s, 0 = aus)
+MAINTENANCE_JOB_TIMEOUT = int(os.getenv("MAINTENANCE_JOB_TIMEOUT", "30"))  # Max. Laufzeit eines Jobs (s)
+MAINTENANCE_JITTER = float(os.getenv("MAINTENANCE_JITTER", "0.1"))  # Zufällige Streuung der Intervalle (Anteil)
+
+# Sharding: getrackte Coins per konsistentem Hashing auf Worker-Prozesse verteilen (0 = alles in einem Prozess)
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "0"))
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", "64"))  # Virtuelle Knoten je Shard im Hash-Ring
+SHARD_STATS_INTERVAL = float(os.getenv("SHARD_STATS_INTERVAL", "5"))  # Stats-Meldung der Worker (s)
+SHARD_RESTART_DELAY = float(os.getenv("SHARD_RESTART_DELAY", "5"))  # Neustart abgestürzter Worker (s)
+SHARD_HANDOFF_BATCH = 200  # Übergebene Coins je Pipe-Nachricht
+# Trade-Feed der Worker: eigener WebSocket je Worker oder dekodierte Trades vom Koordinator über einen Shared-Memory-Ring
+SHARD_FEED = os.getenv("SHARD_FEED", "websocket").lower()  # websocket | ring
+TRADE_RING_SLOTS = int(os.getenv("TRADE_RING_SLOTS", "65536"))  # Records je Worker-Ring (128 Byte je Record)
+TRADE_RING_BATCH = int(os.getenv("TRADE_RING_BATCH", "512"))  # Max. gelesene Records je Durchlauf im Worker
+TRADE_RING_POLL_INTERVAL = float(os.getenv("TRADE_RING_POLL_INTERVAL", "0.005"))  # Wartezeit bei leerem Ring (s)
+
+# Multi-Replica: Eigentümerschaft der Streams über Postgres (Lease + Advisory-Lock)
+REPLICA_MODE = os.getenv("REPLICA_MODE", "false").lower() in ("1", "true", "yes")
+REPLICA_ID = os.getenv("REPLICA_ID", "") or f"{socket.gethostname()}-{os.getpid()}"
+REPLICA_HEARTBEAT_INTERVAL = float(os.getenv("REPLICA_HEARTBEAT_INTERVAL", "2"))  # Lease erneuern + Zuteilung (s)
+REPLICA_LEASE_SECONDS = int(os.getenv("REPLICA_LEASE_SECONDS", "10"))  # Danach gelten Replika und ihre Streams als verwaist
+REPLICA_REBALANCE_TOLERANCE = float(os.getenv("REPLICA_REBALANCE_TOLERANCE", "0.2"))  # Erlaubte Abweichung vom Durchschnitt
+REPLICA_REBALANCE_BATCH = int(os.getenv("REPLICA_REBALANCE_BATCH", "50"))  # Max. umverteilte Streams je Runde
+
+# Prozess-Trennung: combined = Ingestion + API in einem Prozess, engine = nur Ingestion, api = nur API (liest Snapshot)
+PROCESS_ROLE = os.getenv("PROCESS_ROLE", "combined").lower()
+STATE_SNAPSHOT_NAME = os.getenv("STATE_SNAPSHOT_NAME", "pump_find_state")  # Shared-Memory-Segment (/dev/shm)
+STATE_SNAPSHOT_INTERVAL = float(os.getenv("STATE_SNAPSHOT_INTERVAL", "1"))  # Veröffentlichung durch die Engine (s)
+STATE_SNAPSHOT_SIZE = int(os.getenv("STATE_SNAPSHOT_SIZE", str(16 * 1024 * 1024)))  # Max. Snapshot-Größe (Bytes)
+STATE_SNAPSHOT_MAX_AGE = float(os.getenv("STATE_SNAPSHOT_MAX_AGE", "10"))  # Älter = Engine gilt als ausgefallen (s)
+
+# Warm-Restart: In-Memory-Zustand beim Beenden und periodisch in eine Datei sichern, beim Start übernehmen (leer = aus)
+WARM_RESTART_FILE = os.getenv("WARM_RESTART_FILE", "")
+WARM_RESTART_INTERVAL = int(os.getenv("WARM_RESTART_INTERVAL", "30"))  # Periodischer Snapshot (s, 0 = nur beim Beenden)
+WARM_RESTART_MAX_AGE = int(os.getenv("WARM_RESTART_MAX_AGE", "300"))  # Älterer Snapshot wird beim Start ignoriert (s)
 
 # WebSocket (gemeinsam) - DEAKTIVIERT wegen API-Änderung
 WS_URI = os.getenv("WS_URI", "wss://pumpportal.fun/api/data")  # Temporär deaktiviert
@@ -57,17 +120,48 @@ WS_MAX_RETRY_DELAY = int(os.getenv("WS_MAX_RETRY_DELAY", "60"))
 WS_PING_INTERVAL = int(os.getenv("WS_PING_INTERVAL", "20"))
 WS_PING_TIMEOUT = int(os.getenv("WS_PING_TIMEOUT", "5"))   # Schnellere Ping-Erkennung
 WS_CONNECTION_TIMEOUT = int(os.getenv("WS_CONNECTION_TIMEOUT", "30"))  # 30s statt 300s - schneller erkennen
+RESUBSCRIBE_CHUNK_SIZE = int(os.getenv("RESUBSCRIBE_CHUNK_SIZE", "250"))  # Max. Keys je subscribeTokenTrade nach Reconnect
+RESUBSCRIBE_INTERVAL = float(os.getenv("RESUBSCRIBE_INTERVAL", "0.1"))  # Pause zwischen den Resubscribe-Chunks (s)
 HEALTH_PORT = int(os.getenv("HEALTH_PORT", "8000"))
 
 # Discovery
 N8N_WEBHOOK_URL = os.getenv("N8N_WEBHOOK_URL", "").strip()
 N8N_WEBHOOK_METHOD = os.getenv("N8N_WEBHOOK_METHOD", "POST").upper()
 N8N_RETRY_DELAY = int(os.getenv("N8N_RETRY_DELAY", "5"))
+N8N_RETRY_MAX_DELAY = int(os.getenv("N8N_RETRY_MAX_DELAY", "60"))  # Obergrenze für exponentiellen Backoff
+N8N_MAX_RETRIES = int(os.getenv("N8N_MAX_RETRIES", "3"))  # Versuche pro Batch
+N8N_MAX_IN_FLIGHT = int(os.getenv("N8N_MAX_IN_FLIGHT", "2"))  # Gleichzeitig laufende Batch-Sendungen
+N8N_QUEUE_SIZE = int(os.getenv("N8N_QUEUE_SIZE", "100"))  # Max. wartende Batches im Hintergrund-Sender
+N8N_DLQ_DIR = os.getenv("N8N_DLQ_DIR", "")  # Persistente Dead-Letter-Queue für fehlgeschlagene Batches (leer = aus)
+N8N_DLQ_MAX_AGE = int(os.getenv("N8N_DLQ_MAX_AGE", "86400"))  # Ältere Einträge werden verworfen (s)
+N8N_DLQ_DRAIN_RATE = float(os.getenv("N8N_DLQ_DRAIN_RATE", "5"))  # Max. Coins pro Sekunde beim Nachsenden
+N8N_DLQ_COMPACT_BYTES = int(os.getenv("N8N_DLQ_COMPACT_BYTES", "1048576"))  # Ausgelieferter Datei-Anfang, ab dem kompaktiert wird
+N8N_GZIP = os.getenv("N8N_GZIP", "false").lower() in ("1", "true", "yes")  # POST-Body gzip-komprimieren (Empfänger muss Content-Encoding unterstützen)
+N8N_MAX_PAYLOAD_BYTES = int(os.getenv("N8N_MAX_PAYLOAD_BYTES", "262144"))  # Byte-Budget pro POST-Request (unkomprimiert)
+N8N_GET_MAX_URL_BYTES = int(os.getenv("N8N_GET_MAX_URL_BYTES", "8000"))  # Byte-Budget der URL im GET-Modus
+N8N_FIELDS = os.getenv("N8N_FIELDS", "")  # Kommagetrennte Felder für n8n (leer = alle, mint immer enthalten)
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "10"))
 BATCH_TIMEOUT = int(os.getenv("BATCH_TIMEOUT", "30"))
 BAD_NAMES_PATTERN = os.getenv("BAD_NAMES_PATTERN", "test|bot|rug|scam|cant|honey|faucet")
 SPAM_BURST_WINDOW = int(os.getenv("SPAM_BURST_WINDOW", "30"))  # Sekunden für Spam-Burst-Erkennung
 
+# Zusätzliche Discovery-Filter (0 = Stufe aus)
+FILTER_MIN_INITIAL_BUY_SOL = float(os.getenv("FILTER_MIN_INITIAL_BUY_SOL", "0"))  # Mindest-Initial-Buy des Creators
+FILTER_MIN_SOCIAL_COUNT = int(os.getenv("FILTER_MIN_SOCIAL_COUNT", "0"))  # Mindestanzahl Social-Links
+FILTER_CREATOR_MAX_COINS = int(os.getenv("FILTER_CREATOR_MAX_COINS", "0"))  # Max. Coins pro Creator im History-Window
+FILTER_IMAGE_DUPLICATES = os.getenv("FILTER_IMAGE_DUPLICATES", "false").lower() in ("1", "true", "yes")
+FILTER_HISTORY_WINDOW = int(os.getenv("FILTER_HISTORY_WINDOW", "3600"))  # Sekunden für Creator-/Bild-Historie
+FILTER_AUTO_REORDER = os.getenv("FILTER_AUTO_REORDER", "true").lower() in ("1", "true", "yes")
+FILTER_REORDER_INTERVAL = int(os.getenv("FILTER_REORDER_INTERVAL", "500"))  # Coins zwischen Umsortierungen
+
+# Direkte Persistenz (Discovery -> DB ohne Umweg über n8n)
+DIRECT_PERSISTENCE = os.getenv("DIRECT_PERSISTENCE", "false").lower() in ("1", "true", "yes")
+PERSIST_FLUSH_INTERVAL = float(os.getenv("PERSIST_FLUSH_INTERVAL", "1.0"))  # Sekunden zwischen Persistenz-Batches
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "200"))  # Max. Coins pro COPY-Batch
+ACTIVATION_MIN_SOCIAL_COUNT = int(os.getenv("ACTIVATION_MIN_SOCIAL_COUNT", "0"))  # Lokale Aktivierungsregel: Social-Links
+ACTIVATION_MIN_INITIAL_BUY_SOL = float(os.getenv("ACTIVATION_MIN_INITIAL_BUY_SOL", "0"))  # Lokale Aktivierungsregel: Initial-Buy
+ACTIVATION_MIN_MARKET_CAP_SOL = float(os.getenv("ACTIVATION_MIN_MARKET_CAP_SOL", "0"))  # Lokale Aktivierungsregel: Market Cap
+
 # Cache-System (NEU - 120 Sekunden)
 COIN_CACHE_SECONDS = int(os.getenv("COIN_CACHE_SECONDS", "120"))  # 120s Cache für neue Coins
 
@@ -78,6 +172,23 @@ TRADE_BUFFER_SECONDS = int(os.getenv("TRADE_BUFFER_SECONDS", "180"))  # Für akt
 WHALE_THRESHOLD_SOL = float(os.getenv("WHALE_THRESHOLD_SOL", "1.0"))
 ATH_FLUSH_INTERVAL = int(os.getenv("ATH_FLUSH_INTERVAL", "5"))
 
+# Latenz-Instrumentierung
+LATENCY_SAMPLE_RATE = int(os.getenv("LATENCY_SAMPLE_RATE", "100"))  # Jeder N-te Trade wird gemessen (0 = aus)
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))  # Sekunden zwischen Loop-Lag-Messungen
+SLOW_CALLBACK_THRESHOLD_MS = int(os.getenv("SLOW_CALLBACK_THRESHOLD_MS", "100"))  # Ab wann ein Callback als blockierend gilt
+
+# Aufzeichnung roher WebSocket-Frames für Replay/Benchmarks (leer = aus)
+WS_CAPTURE_DIR = os.getenv("WS_CAPTURE_DIR", "")
+WS_CAPTURE_SEGMENT_SECONDS = int(os.getenv("WS_CAPTURE_SEGMENT_SECONDS", "300"))  # Neue Datei alle N Sekunden
+
+# Speicher-Abschätzung der In-Memory-Strukturen
+MEMORY_ACCOUNTING_INTERVAL = int(os.getenv("MEMORY_ACCOUNTING_INTERVAL", "60"))  # Sekunden (0 = aus)
+MEMORY_SAMPLE_SIZE = int(os.getenv("MEMORY_SAMPLE_SIZE", "200"))  # Stichprobe pro Struktur
+
+# Debug-/Profiling-Endpoints (nur mit Token, standardmäßig aus)
+DEBUG_ENDPOINTS_ENABLED = os.getenv("DEBUG_ENDPOINTS_ENABLED", "false").lower() in ("1", "true", "yes")
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+
 # === GLOBALE VARIABLEN ===
 # Lade Config aus Datei (falls vorhanden)
 def load_config_from_file():
@@ -85,7 +196,25 @@ def load_config_from_file():
     global DB_DSN, WS_URI, DB_REFRESH_INTERVAL, SOL_RESERVES_FULL, AGE_CALCULATION_OFFSET_MIN
     global TRADE_BUFFER_SECONDS, WHALE_THRESHOLD_SOL, ATH_FLUSH_INTERVAL, DB_RETRY_DELAY, WS_RETRY_DELAY
     global WS_MAX_RETRY_DELAY, WS_PING_INTERVAL, WS_PING_TIMEOUT, WS_CONNECTION_TIMEOUT
+    global RESUBSCRIBE_CHUNK_SIZE, RESUBSCRIBE_INTERVAL
     global N8N_WEBHOOK_URL, N8N_WEBHOOK_METHOD, BATCH_SIZE, BATCH_TIMEOUT, BAD_NAMES_PATTERN, COIN_CACHE_SECONDS, SPAM_BURST_WINDOW
+    global LATENCY_SAMPLE_RATE, LOOP_LAG_INTERVAL, SLOW_CALLBACK_THRESHOLD_MS, DEBUG_ENDPOINTS_ENABLED, DEBUG_TOKEN
+    global MEMORY_ACCOUNTING_INTERVAL, MEMORY_SAMPLE_SIZE, WS_CAPTURE_DIR, WS_CAPTURE_SEGMENT_SECONDS
+    global FILTER_MIN_INITIAL_BUY_SOL, FILTER_MIN_SOCIAL_COUNT, FILTER_CREATOR_MAX_COINS, FILTER_IMAGE_DUPLICATES
+    global FILTER_HISTORY_WINDOW, FILTER_AUTO_REORDER, FILTER_REORDER_INTERVAL
+    global N8N_RETRY_DELAY, N8N_RETRY_MAX_DELAY, N8N_MAX_RETRIES, N8N_MAX_IN_FLIGHT, N8N_QUEUE_SIZE
+    global N8N_DLQ_DIR, N8N_DLQ_MAX_AGE, N8N_DLQ_DRAIN_RATE, N8N_DLQ_COMPACT_BYTES
+    global N8N_GZIP, N8N_MAX_PAYLOAD_BYTES, N8N_GET_MAX_URL_BYTES, N8N_FIELDS
+    global DIRECT_PERSISTENCE, PERSIST_FLUSH_INTERVAL, PERSIST_BATCH_SIZE
+    global STREAM_NOTIFY_ENABLED, STREAM_RECONCILE_INTERVAL
+    global STREAM_REPAIR_INTERVAL, ORPHAN_CHECK_INTERVAL, MAINTENANCE_JOB_TIMEOUT, MAINTENANCE_JITTER
+    global SHARD_WORKERS, SHARD_VNODES, SHARD_STATS_INTERVAL, SHARD_RESTART_DELAY
+    global SHARD_FEED, TRADE_RING_SLOTS, TRADE_RING_BATCH, TRADE_RING_POLL_INTERVAL
+    global REPLICA_MODE, REPLICA_ID, REPLICA_HEARTBEAT_INTERVAL, REPLICA_LEASE_SECONDS
+    global REPLICA_REBALANCE_TOLERANCE, REPLICA_REBALANCE_BATCH
+    global PROCESS_ROLE, STATE_SNAPSHOT_NAME, STATE_SNAPSHOT_INTERVAL, STATE_SNAPSHOT_SIZE, STATE_SNAPSHOT_MAX_AGE
+    global ACTIVATION_MIN_SOCIAL_COUNT, ACTIVATION_MIN_INITIAL_BUY_SOL, ACTIVATION_MIN_MARKET_CAP_SOL
+    global WARM_RESTART_FILE, WARM_RESTART_INTERVAL, WARM_RESTART_MAX_AGE
 
     config_file = "/app/config/.env"
     if os.path.exists(config_file):
@@ -109,18 +238,83 @@ def load_config_from_file():
                             elif key == "WHALE_THRESHOLD_SOL": WHALE_THRESHOLD_SOL = float(value)
                             elif key == "ATH_FLUSH_INTERVAL" and value.isdigit(): ATH_FLUSH_INTERVAL = int(value)
                             elif key == "DB_RETRY_DELAY" and value.isdigit(): DB_RETRY_DELAY = int(value)
+                            elif key == "STREAM_NOTIFY_ENABLED": STREAM_NOTIFY_ENABLED = value.lower() in ("1", "true", "yes")
+                            elif key == "STREAM_RECONCILE_INTERVAL" and value.isdigit(): STREAM_RECONCILE_INTERVAL = int(value)
+                            elif key == "STREAM_REPAIR_INTERVAL" and value.isdigit(): STREAM_REPAIR_INTERVAL = int(value)
+                            elif key == "ORPHAN_CHECK_INTERVAL" and value.isdigit(): ORPHAN_CHECK_INTERVAL = int(value)
+                            elif key == "MAINTENANCE_JOB_TIMEOUT" and value.isdigit(): MAINTENANCE_JOB_TIMEOUT = int(value)
+                            elif key == "MAINTENANCE_JITTER": MAINTENANCE_JITTER = float(value)
+                            elif key == "SHARD_WORKERS" and value.isdigit(): SHARD_WORKERS = int(value)
+                            elif key == "SHARD_VNODES" and value.isdigit(): SHARD_VNODES = int(value)
+                            elif key == "SHARD_STATS_INTERVAL": SHARD_STATS_INTERVAL = float(value)
+                            elif key == "SHARD_RESTART_DELAY": SHARD_RESTART_DELAY = float(value)
+                            elif key == "SHARD_FEED" and value.lower() in ("websocket", "ring"): SHARD_FEED = value.lower()
+                            elif key == "TRADE_RING_SLOTS" and value.isdigit(): TRADE_RING_SLOTS = int(value)
+                            elif key == "TRADE_RING_BATCH" and value.isdigit(): TRADE_RING_BATCH = int(value)
+                            elif key == "TRADE_RING_POLL_INTERVAL": TRADE_RING_POLL_INTERVAL = float(value)
+                            elif key == "REPLICA_MODE": REPLICA_MODE = value.lower() in ("1", "true", "yes")
+                            elif key == "REPLICA_ID" and value: REPLICA_ID = value
+                            elif key == "REPLICA_HEARTBEAT_INTERVAL": REPLICA_HEARTBEAT_INTERVAL = float(value)
+                            elif key == "REPLICA_LEASE_SECONDS" and value.isdigit(): REPLICA_LEASE_SECONDS = int(value)
+                            elif key == "REPLICA_REBALANCE_TOLERANCE": REPLICA_REBALANCE_TOLERANCE = float(value)
+                            elif key == "REPLICA_REBALANCE_BATCH" and value.isdigit(): REPLICA_REBALANCE_BATCH = int(value)
+                            elif key == "PROCESS_ROLE": PROCESS_ROLE = value.lower()
+                            elif key == "STATE_SNAPSHOT_NAME": STATE_SNAPSHOT_NAME = value
+                            elif key == "STATE_SNAPSHOT_INTERVAL": STATE_SNAPSHOT_INTERVAL = float(value)
+                            elif key == "STATE_SNAPSHOT_SIZE" and value.isdigit(): STATE_SNAPSHOT_SIZE = int(value)
+                            elif key == "STATE_SNAPSHOT_MAX_AGE": STATE_SNAPSHOT_MAX_AGE = float(value)
+                            elif key == "WARM_RESTART_FILE": WARM_RESTART_FILE = value
+                            elif key == "WARM_RESTART_INTERVAL" and value.isdigit(): WARM_RESTART_INTERVAL = int(value)
+                            elif key == "WARM_RESTART_MAX_AGE" and value.isdigit(): WARM_RESTART_MAX_AGE = int(value)
                             elif key == "WS_RETRY_DELAY" and value.isdigit(): WS_RETRY_DELAY = int(value)
                             elif key == "WS_MAX_RETRY_DELAY" and value.isdigit(): WS_MAX_RETRY_DELAY = int(value)
                             elif key == "WS_PING_INTERVAL" and value.isdigit(): WS_PING_INTERVAL = int(value)
                             elif key == "WS_PING_TIMEOUT" and value.isdigit(): WS_PING_TIMEOUT = int(value)
                             elif key == "WS_CONNECTION_TIMEOUT" and value.isdigit(): WS_CONNECTION_TIMEOUT = int(value)
+                            elif key == "RESUBSCRIBE_CHUNK_SIZE" and value.isdigit(): RESUBSCRIBE_CHUNK_SIZE = int(value)
+                            elif key == "RESUBSCRIBE_INTERVAL": RESUBSCRIBE_INTERVAL = float(value)
                             elif key == "N8N_WEBHOOK_URL": N8N_WEBHOOK_URL = value
                             elif key == "N8N_WEBHOOK_METHOD": N8N_WEBHOOK_METHOD = value.upper()
+                            elif key == "N8N_RETRY_DELAY" and value.isdigit(): N8N_RETRY_DELAY = int(value)
+                            elif key == "N8N_RETRY_MAX_DELAY" and value.isdigit(): N8N_RETRY_MAX_DELAY = int(value)
+                            elif key == "N8N_MAX_RETRIES" and value.isdigit(): N8N_MAX_RETRIES = int(value)
+                            elif key == "N8N_MAX_IN_FLIGHT" and value.isdigit(): N8N_MAX_IN_FLIGHT = int(value)
+                            elif key == "N8N_QUEUE_SIZE" and value.isdigit(): N8N_QUEUE_SIZE = int(value)
+                            elif key == "N8N_DLQ_DIR": N8N_DLQ_DIR = value
+                            elif key == "N8N_DLQ_MAX_AGE" and value.isdigit(): N8N_DLQ_MAX_AGE = int(value)
+                            elif key == "N8N_DLQ_DRAIN_RATE": N8N_DLQ_DRAIN_RATE = float(value)
+                            elif key == "N8N_DLQ_COMPACT_BYTES" and value.isdigit(): N8N_DLQ_COMPACT_BYTES = int(value)
+                            elif key == "N8N_GZIP": N8N_GZIP = value.lower() in ("1", "true", "yes")
+                            elif key == "N8N_MAX_PAYLOAD_BYTES" and value.isdigit(): N8N_MAX_PAYLOAD_BYTES = int(value)
+                            elif key == "N8N_GET_MAX_URL_BYTES" and value.isdigit(): N8N_GET_MAX_URL_BYTES = int(value)
+                            elif key == "N8N_FIELDS": N8N_FIELDS = value
+                            elif key == "DIRECT_PERSISTENCE": DIRECT_PERSISTENCE = value.lower() in ("1", "true", "yes")
+                            elif key == "PERSIST_FLUSH_INTERVAL": PERSIST_FLUSH_INTERVAL = float(value)
+                            elif key == "PERSIST_BATCH_SIZE" and value.isdigit(): PERSIST_BATCH_SIZE = int(value)
+                            elif key == "ACTIVATION_MIN_SOCIAL_COUNT" and value.isdigit(): ACTIVATION_MIN_SOCIAL_COUNT = int(value)
+                            elif key == "ACTIVATION_MIN_INITIAL_BUY_SOL": ACTIVATION_MIN_INITIAL_BUY_SOL = float(value)
+                            elif key == "ACTIVATION_MIN_MARKET_CAP_SOL": ACTIVATION_MIN_MARKET_CAP_SOL = float(value)
                             elif key == "BATCH_SIZE" and value.isdigit(): BATCH_SIZE = int(value)
                             elif key == "BATCH_TIMEOUT" and value.isdigit(): BATCH_TIMEOUT = int(value)
                             elif key == "BAD_NAMES_PATTERN": BAD_NAMES_PATTERN = value
                             elif key == "COIN_CACHE_SECONDS" and value.isdigit(): COIN_CACHE_SECONDS = int(value)
                             elif key == "SPAM_BURST_WINDOW" and value.isdigit(): SPAM_BURST_WINDOW = int(value)
+                            elif key == "LATENCY_SAMPLE_RATE" and value.isdigit(): LATENCY_SAMPLE_RATE = int(value)
+                            elif key == "LOOP_LAG_INTERVAL": LOOP_LAG_INTERVAL = float(value)
+                            elif key == "SLOW_CALLBACK_THRESHOLD_MS" and value.isdigit(): SLOW_CALLBACK_THRESHOLD_MS = int(value)
+                            elif key == "DEBUG_ENDPOINTS_ENABLED": DEBUG_ENDPOINTS_ENABLED = value.lower() in ("1", "true", "yes")
+                            elif key == "DEBUG_TOKEN": DEBUG_TOKEN = value
+                            elif key == "MEMORY_ACCOUNTING_INTERVAL" and value.isdigit(): MEMORY_ACCOUNTING_INTERVAL = int(value)
+                            elif key == "MEMORY_SAMPLE_SIZE" and value.isdigit(): MEMORY_SAMPLE_SIZE = int(value)
+                            elif key == "WS_CAPTURE_DIR": WS_CAPTURE_DIR = value
+                            elif key == "WS_CAPTURE_SEGMENT_SECONDS" and value.isdigit(): WS_CAPTURE_SEGMENT_SECONDS = int(value)
+                            elif key == "FILTER_MIN_INITIAL_BUY_SOL": FILTER_MIN_INITIAL_BUY_SOL = float(value)
+                            elif key == "FILTER_MIN_SOCIAL_COUNT" and value.isdigit(): FILTER_MIN_SOCIAL_COUNT = int(value)
+                            elif key == "FILTER_CREATOR_MAX_COINS" and value.isdigit(): FILTER_CREATOR_MAX_COINS = int(value)
+                            elif key == "FILTER_IMAGE_DUPLICATES": FILTER_IMAGE_DUPLICATES = value.lower() in ("1", "true", "yes")
+                            elif key == "FILTER_HISTORY_WINDOW" and value.isdigit(): FILTER_HISTORY_WINDOW = int(value)
+                            elif key == "FILTER_AUTO_REORDER": FILTER_AUTO_REORDER = value.lower() in ("1", "true", "yes")
+                            elif key == "FILTER_REORDER_INTERVAL" and value.isdigit(): FILTER_REORDER_INTERVAL = int(value)
             print(f"✅ Konfiguration aus {config_file} geladen", flush=True)
         except Exception as e:
             print(f"⚠️ Fehler beim Laden der Config-Datei {config_file}: {e}", flush=True)
@@ -141,17 +335,91 @@ GERMAN_TZ = ZoneInfo("Europe/Berlin")
     # Discovery-Metriken
 coins_received = PromCounter("unified_coins_received_total", "Anzahl empfangener Coins")
 coins_filtered = PromCounter("unified_coins_filtered_total", "Anzahl gefilterter Coins", ["reason"])
+filter_stage_checks = PromCounter("unified_filter_stage_checks_total", "Anzahl Prüfungen je Filter-Stufe", ["stage"])
+filter_stage_seconds = PromCounter("unified_filter_stage_seconds_total", "Kumulierte Rechenzeit je Filter-Stufe", ["stage"])
+filter_stage_position = Gauge("unified_filter_stage_position", "Aktuelle Position der Filter-Stufe in der Pipeline (0 = zuerst)", ["stage"])
+filter_reorders = PromCounter("unified_filter_reorders_total", "Anzahl automatischer Umsortierungen der Filter-Pipeline")
 coins_sent_n8n = PromCounter("unified_coins_sent_n8n_total", "Anzahl an n8n gesendeter Coins")
 n8n_batches_sent = PromCounter("unified_n8n_batches_sent_total", "Anzahl gesendeter n8n Batches")
 n8n_buffer_size = Gauge("unified_n8n_buffer_size", "Anzahl Coins im n8n-Discovery-Buffer")
 n8n_errors = PromCounter("unified_n8n_errors_total", "n8n Fehler", ["type"])
 buffer_size = Gauge("unified_buffer_size", "Aktuelle Buffer-Größe")
+n8n_queue_size = Gauge("unified_n8n_queue_size", "Anzahl Batches in der Queue des n8n-Senders")
+n8n_in_flight = Gauge("unified_n8n_in_flight", "Gleichzeitig laufende n8n-Sendungen")
+n8n_send_duration = Histogram("unified_n8n_send_duration_seconds", "Dauer einer n8n-Batch-Auslieferung inkl. Retries",
+                              buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+n8n_payload_bytes = PromCounter("unified_n8n_payload_bytes_total", "Gesendete n8n-Payload-Bytes (nach Kompression)")
+n8n_payload_bytes_per_coin = Histogram("unified_n8n_payload_bytes_per_coin", "n8n-Payload-Bytes pro Coin (nach Kompression)",
+                                       buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384))
+n8n_dlq_size = Gauge("unified_n8n_dlq_size", "Anzahl Coins in der n8n-Dead-Letter-Queue")
+n8n_dlq_bytes = Gauge("unified_n8n_dlq_bytes", "Noch nicht ausgelieferte Bytes der n8n-Dead-Letter-Queue")
+n8n_dlq_oldest_age = Gauge("unified_n8n_dlq_oldest_age_seconds", "Alter des ältesten Eintrags der n8n-Dead-Letter-Queue")
+n8n_dlq_coins = PromCounter("unified_n8n_dlq_coins_total", "Coins der n8n-Dead-Letter-Queue nach Ereignis", ["event"])
 
 # Cache-Metriken (NEU)
 cache_size = Gauge("unified_cache_size", "Anzahl Coins im 120s Cache")
 cache_activations = PromCounter("unified_cache_activations_total", "Cache-Aktivierungen")
 cache_expirations = PromCounter("unified_cache_expirations_total", "Cache-Abläufe")
 
+# Persistenz-Metriken (direkte Persistenz)
+coins_persisted = PromCounter("unified_coins_persisted_total", "Direkt in discovered_coins geschriebene Coins")
+streams_created_direct = PromCounter("unified_streams_created_direct_total", "Lokal per Aktivierungsregel angelegte coin_streams")
+persist_duration = Histogram("unified_persist_duration_seconds", "Dauer eines Persistenz-Batches (COPY + Merge + Streams)")
+direct_activation_latency = Histogram("unified_direct_activation_latency_seconds",
+                                      "Zeit von Discovery bis Tracking-Start bei direkter Persistenz",
+                                      buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120))
+
+# Stream-Sync-Metriken (LISTEN/NOTIFY)
+stream_events = PromCounter("unified_stream_events_total", "Empfangene coin_streams-Änderungen", ["op"])
+stream_listener_connected = Gauge("unified_stream_listener_connected", "LISTEN-Verbindung für Stream-Änderungen (1=verbunden und NOTIFY-Trigger vorhanden)")
+stream_reconciliations = PromCounter("unified_stream_reconciliations_total", "Vollabgleiche der Watchlist mit coin_streams")
+stream_sync_rows = PromCounter("unified_stream_sync_rows_total", "Beim Stream-Sync gelesene coin_streams-Zeilen", ["mode"])
+stream_reconcile_drift = PromCounter("unified_stream_reconcile_drift_total",
+                                     "Vom Vollabgleich korrigierte Streams (bei inkrementellem Sync = verpasste Änderungen)", ["kind"])
+
+# Wartungs-Metriken
+maintenance_job_runs = PromCounter("unified_maintenance_job_runs_total", "Läufe der Wartungs-Jobs nach Ergebnis", ["job", "result"])
+maintenance_job_duration = Histogram("unified_maintenance_job_duration_seconds", "Dauer der Wartungs-Jobs", ["job"],
+                                     buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60))
+maintenance_job_last_success = Gauge("unified_maintenance_job_last_success_timestamp", "Zeitpunkt des letzten erfolgreichen Laufs", ["job"])
+orphan_streams = Gauge("unified_orphan_streams", "Aktive coin_streams ohne discovered_coins-Zeile (werden nicht getrackt)")
+orphan_entries_pruned = PromCounter("unified_orphan_entries_pruned_total", "Entfernte Per-Coin-Einträge ohne aktiven Coin", ["structure"])
+
+# Sharding-Metriken (Werte der Worker, gemeldet an den Koordinator)
+shard_workers_alive = Gauge("unified_shard_workers_alive", "Laufende Shard-Worker-Prozesse")
+shard_coins_tracked = Gauge("unified_shard_coins_tracked", "Getrackte Coins je Shard", ["shard"])
+shard_trades_processed = Gauge("unified_shard_trades_processed", "Verarbeitete Trades je Shard seit Worker-Start", ["shard"])
+shard_metrics_saved = Gauge("unified_shard_metrics_saved", "Gespeicherte Metriken je Shard seit Worker-Start", ["shard"])
+shard_ws_connected = Gauge("unified_shard_ws_connected", "WebSocket-Status je Shard", ["shard"])
+shard_handoffs = PromCounter("unified_shard_handoffs_total", "An Worker übergebene Coins", ["kind"])
+shard_rebalances = PromCounter("unified_shard_rebalances_total", "Änderungen des Hash-Rings")
+shard_worker_restarts = PromCounter("unified_shard_worker_restarts_total", "Neustarts abgestürzter Shard-Worker")
+trade_ring_records = PromCounter("unified_trade_ring_records_total", "Vom Koordinator in die Worker-Ringe geschriebene Trades", ["shard", "result"])
+trade_ring_occupancy = Gauge("unified_trade_ring_occupancy", "Füllstand des Trade-Rings je Shard (0-1)", ["shard"])
+trade_ring_consumed = Gauge("unified_trade_ring_consumed", "Von den Workern gelesene Records seit Anlage des Rings", ["shard"])
+
+# Multi-Replica-Metriken
+replica_is_leader = Gauge("unified_replica_is_leader", "Diese Replika hält den Leader-Lock (Discovery + Zuteilung)")
+replica_coins_owned = Gauge("unified_replica_coins_owned", "Streams im Eigentum dieser Replika")
+replica_live = Gauge("unified_replica_live", "Replikas mit gültigem Lease (Sicht des Leaders)")
+replica_assignments = PromCounter("unified_replica_assignments_total", "Vom Leader zugeteilte Streams", ["kind"])
+replica_ownership_changes = PromCounter("unified_replica_ownership_changes_total", "Gewonnene/verlorene/übergebene Streams dieser Replika", ["direction"])
+replica_fenced_writes = PromCounter("unified_replica_fenced_writes_total", "Verworfene coin_metrics-Zeilen für Streams, die dieser Replika nicht mehr gehören")
+
+# Prozess-Trennung (Engine veröffentlicht, API liest)
+state_snapshot_duration = Histogram("unified_state_snapshot_duration_seconds", "Aufbau + Veröffentlichung des Zustands-Snapshots",
+                                    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+state_snapshot_bytes = Gauge("unified_state_snapshot_bytes", "Größe des letzten Zustands-Snapshots")
+state_snapshot_overflows = PromCounter("unified_state_snapshot_overflows_total", "Snapshots größer als STATE_SNAPSHOT_SIZE (verworfen)")
+engine_commands = PromCounter("unified_engine_commands_total", "Vom API-Prozess empfangene Steuerbefehle", ["command"])
+
+# Warm-Restart-Metriken
+warm_state_saves = PromCounter("unified_warm_state_saves_total", "Geschriebene Warm-Restart-Snapshots", ["result"])
+warm_state_bytes = Gauge("unified_warm_state_bytes", "Größe des letzten Warm-Restart-Snapshots (komprimiert)")
+warm_state_save_duration = Histogram("unified_warm_state_save_duration_seconds", "Serialisieren + Schreiben des Warm-Restart-Snapshots",
+                                     buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+warm_state_restores = PromCounter("unified_warm_state_restores_total", "Warm-Restart beim Start nach Ergebnis", ["result"])
+
 # Metric-Metriken
 trades_received = PromCounter("unified_trades_received_total", "Anzahl empfangener Trades")
 trades_processed = PromCounter("unified_trades_processed_total", "Anzahl verarbeiteter Trades")
@@ -175,11 +443,47 @@ pending_subscriptions = Gauge("unified_pending_subscriptions", "Anzahl wartender
 batches_sent_total = PromCounter("unified_batches_sent_total", "Anzahl gesendeter Subscription-Batches")
 subscriptions_batched_total = PromCounter("unified_subscriptions_batched_total", "Anzahl über Batch abonnierter Coins")
 batch_size_histogram = Histogram("unified_batch_size", "Größe der Subscription-Batches", buckets=[1, 2, 5, 10, 25, 50])
+resubscribe_duration = Histogram("unified_resubscribe_duration_seconds", "Zeit vom WebSocket-Connect, bis alle Subscriptions wiederhergestellt sind",
+                                 buckets=[0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300])
+resubscribe_pending = Gauge("unified_resubscribe_pending", "Noch nicht wieder abonnierte Coins seit dem letzten Reconnect")
+resubscribe_chunks = PromCounter("unified_resubscribe_chunks_total", "Nach Reconnects gesendete Resubscribe-Chunks")
+resubscribe_runs = PromCounter("unified_resubscribe_runs_total", "Resubscribes nach Reconnect nach Ergebnis", ["result"])
 
 # ATH-Metriken
 ath_updates_total = PromCounter("unified_ath_updates_total", "Anzahl ATH-Updates in DB")
 ath_cache_size = Gauge("unified_ath_cache_size", "Anzahl Coins im ATH-Cache")
 
+# Latenz-Metriken (Ingestion-Pipeline, gesampelt)
+# Stufen: decode (JSON geparst), aggregate (im Buffer), enqueue (im DB-Batch), commit (in coin_metrics)
+ingest_stage_latency = Histogram(
+    "unified_ingest_stage_latency_seconds",
+    "Zeit seit WebSocket-Empfang eines Trades bis zur jeweiligen Pipeline-Stufe",
+    ["stage"],
+    buckets=[0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 15, 30, 60, 120, 300]
+)
+flush_lateness = Histogram(
+    "unified_flush_lateness_seconds",
+    "Verspätung des Metric-Flushes gegenüber dem geplanten next_flush",
+    ["phase"],
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60]
+)
+
+# Event-Loop-Metriken
+event_loop_lag = Histogram(
+    "unified_event_loop_lag_seconds",
+    "Verzögerung der Event-Loop (Sleep-Drift)",
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+)
+slow_callbacks_total = PromCounter("unified_slow_callbacks_total", "Anzahl erkannter blockierender Callbacks")
+
+# Capture-Metriken
+capture_frames_total = PromCounter("unified_capture_frames_total", "Anzahl aufgezeichneter WebSocket-Frames")
+
+# Speicher-Metriken (geschätzt per Stichprobe)
+structure_memory_bytes = Gauge("unified_structure_memory_bytes", "Geschätzter Speicherverbrauch je In-Memory-Struktur", ["structure"])
+structure_entries = Gauge("unified_structure_entries", "Anzahl Einträge je In-Memory-Struktur", ["structure"])
+structure_bytes_per_entry = Gauge("unified_structure_bytes_per_entry", "Geschätzte Bytes pro Eintrag (pro Coin) je Struktur", ["structure"])
+
 # === STATUS TRACKING ===
 unified_status = {
     "db_connected": False,
@@ -202,6 +506,18 @@ _unified_instance = None
 # Globales Flag für DB-Reconnect
 _force_db_reconnect = False
 
+# Globaler Event-Loop-Monitor
+_loop_monitor = None
+
+# API-Prozess (PROCESS_ROLE=api): Snapshot-Leser und eigener DB-Pool
+_engine_state = None
+_api_pool = None
+_api_pool_dsn = None  # DSN, mit der _api_pool aufgebaut wurde
+
+# Profiling-Zustand (nur ein CPU-Profil gleichzeitig, Baseline für Memory-Diffs)
+_profile_running = False
+_memory_baseline = None
+
 # === FASTAPI MODELLE ===
 class CacheStats(BaseModel):
     total_coins: int
@@ -231,6 +547,8 @@ class HealthResponse(BaseModel):
     cache_stats: CacheStats
     tracking_stats: TrackingStats
     discovery_stats: DiscoveryStats
+    shards: Optional[Dict[str, Any]] = None
+    replica: Optional[Dict[str, Any]] = None
 
 class ConfigReloadResponse(BaseModel):
     status: str
@@ -247,6 +565,23 @@ class ConfigUpdateRequest(BaseModel):
     batch_timeout: Optional[int] = None
     bad_names_pattern: Optional[str] = None
     spam_burst_window: Optional[int] = None
+    slow_callback_threshold_ms: Optional[int] = None
+    debug_endpoints_enabled: Optional[bool] = None
+    filter_min_initial_buy_sol: Optional[float] = None
+    filter_min_social_count: Optional[int] = None
+    filter_creator_max_coins: Optional[int] = None
+    filter_image_duplicates: Optional[bool] = None
+    filter_history_window: Optional[int] = None
+    filter_auto_reorder: Optional[bool] = None
+    n8n_gzip: Optional[bool] = None
+    n8n_max_payload_bytes: Optional[int] = None
+    n8n_fields: Optional[str] = None
+    direct_persistence: Optional[bool] = None
+    activation_min_social_count: Optional[int] = None
+    activation_min_initial_buy_sol: Optional[float] = None
+    activation_min_market_cap_sol: Optional[float] = None
+    stream_reconcile_interval: Optional[int] = None
+    shard_workers: Optional[int] = None
 
 class ConfigUpdateResponse(BaseModel):
     status: str
@@ -271,7 +606,7 @@ class PhaseUpdateResponse(BaseModel):
     status: str
     message: str
     phase: Dict[str, Any]
-    updated_streams: int
+    updated_streams: Optional[int] = None  # None: Engine läuft in eigenem Prozess (PROCESS_ROLE=api)
 
 class PhaseCreateResponse(BaseModel):
     status: str
@@ -326,10 +661,10 @@ def parse_time_windows(windows_str: str) -> dict:
 async def check_coin_active_status(mint: str) -> bool:
     """Prüfe ob Coin in aktiven Streams ist"""
     try:
-        if not _unified_instance or not _unified_instance.pool:
+        if not db_pool():
             return False
 
-        row = await _unified_instance.pool.fetchrow(
+        row = await db_pool().fetchrow(
             "SELECT is_active FROM coin_streams WHERE token_address = $1",
             mint
         )
@@ -340,11 +675,11 @@ async def check_coin_active_status(mint: str) -> bool:
 
 async def get_current_coin_data(mint: str) -> dict:
     """Hole neueste Daten für einen Coin"""
-    if not _unified_instance or not _unified_instance.pool:
+    if not db_pool():
         return None
 
     try:
-        row = await _unified_instance.pool.fetchrow(
+        row = await db_pool().fetchrow(
             "SELECT * FROM coin_metrics WHERE mint = $1 ORDER BY timestamp DESC LIMIT 1",
             mint
         )
@@ -355,12 +690,12 @@ async def get_current_coin_data(mint: str) -> dict:
 
 async def get_historical_data(mint: str, max_seconds: int) -> list:
     """Hole historische Daten für Zeitfenster-Analyse"""
-    if not _unified_instance or not _unified_instance.pool:
+    if not db_pool():
         return []
 
     try:
         # Hole alle verfügbaren Daten für diesen Coin (alle historischen Daten für Analytics)
-        rows = await _unified_instance.pool.fetch(
+        rows = await db_pool().fetch(
             "SELECT * FROM coin_metrics WHERE mint = $1 ORDER BY timestamp ASC",
             mint
         )
@@ -431,28 +766,763 @@ def calculate_window_analytics(current_data: dict, historical_data: list, target
         "data_age_seconds": int(best_diff)
     }
 
+# === EVENT-LOOP-MONITOR ===
+class LoopMonitor:
+    """
+    Misst den Lag der Event-Loop und erkennt blockierende Callbacks.
+    Ein Watchdog-Thread prüft den Heartbeat der Loop und hält bei Überschreitung
+    des Schwellwerts fest, welcher Task/Handler gerade blockiert (inkl. Stack).
+    """
+
+    def __init__(self, interval=0.5, slow_threshold_ms=100, max_offenders=50):
+        self.interval = interval
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.max_offenders = max_offenders
+        self.loop = None
+        self.loop_thread_id = None
+        self.heartbeat = time.monotonic()
+        self.recent_lags = deque(maxlen=1000)
+        self.max_lag = 0.0
+        self.samples = 0
+        self.offenders = {}  # {signatur: {count, total_blocked_seconds, max_blocked_seconds, ...}}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.watchdog_thread = None
+        self.episode = None  # (heartbeat, signatur) des aktuell blockierenden Callbacks
+
+    def set_threshold(self, slow_threshold_ms):
+        """Ändert den Slow-Callback-Schwellwert zur Laufzeit"""
+        self.slow_threshold = slow_threshold_ms / 1000
+
+    async def run(self):
+        """Sampler-Task: misst die Sleep-Drift und startet den Watchdog-Thread"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.stop_event.clear()
+        self.watchdog_thread = threading.Thread(target=self.watchdog, name="loop-watchdog", daemon=True)
+        self.watchdog_thread.start()
+
+        try:
+            while True:
+                started = time.monotonic()
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                self.heartbeat = now
+                self.record_lag(max(0.0, now - started - self.interval))
+        finally:
+            self.stop_event.set()
+
+    def record_lag(self, lag):
+        """Erfasst einen Lag-Messwert"""
+        event_loop_lag.observe(lag)
+        self.recent_lags.append(lag)
+        self.samples += 1
+        if lag > self.max_lag:
+            self.max_lag = lag
+
+    def watchdog(self):
+        """Watchdog-Thread: erkennt blockierte Loop anhand des veralteten Heartbeats"""
+        while not self.stop_event.wait(max(self.slow_threshold / 2, 0.005)):
+            heartbeat = self.heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.slow_threshold:
+                continue
+
+            if self.episode and self.episode[0] == heartbeat:
+                # Gleiche Blockade - nur Dauer aktualisieren
+                with self.lock:
+                    offender = self.offenders.get(self.episode[1])
+                    if offender:
+                        offender["total_blocked_seconds"] += blocked - self.episode[2]
+                        offender["max_blocked_seconds"] = max(offender["max_blocked_seconds"], blocked)
+                self.episode = (heartbeat, self.episode[1], blocked)
+                continue
+
+            signature = self.capture_offender(blocked)
+            self.episode = (heartbeat, signature, blocked)
+
+    def capture_offender(self, blocked):
+        """Hält Task und Stack des blockierenden Callbacks fest"""
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = traceback.format_stack(frame, limit=8) if frame else []
+        location = stack[-1].strip().splitlines()[0] if stack else "unknown"
+
+        task_name = None
+        try:
+            task = asyncio.current_task(self.loop)
+            if task:
+                coro = task.get_coro()
+                task_name = getattr(coro, "__qualname__", None) or task.get_name()
+        except Exception:
+            pass
+
+        signature = f"{task_name or 'callback'} @ {location}"
+        slow_callbacks_total.inc()
+
+        with self.lock:
+            offender = self.offenders.get(signature)
+            if offender is None:
+                if len(self.offenders) >= self.max_offenders:
+                    # Harmlosesten Eintrag verdrängen
+                    weakest = min(self.offenders, key=lambda k: self.offenders[k]["total_blocked_seconds"])
+                    del self.offenders[weakest]
+                offender = {
+                    "task": task_name,
+                    "location": location,
+                    "count": 0,
+                    "total_blocked_seconds": 0.0,
+                    "max_blocked_seconds": 0.0,
+                    "last_seen": None,
+                    "stack": "",
+                }
+                self.offenders[signature] = offender
+            offender["count"] += 1
+            offender["total_blocked_seconds"] += blocked
+            offender["max_blocked_seconds"] = max(offender["max_blocked_seconds"], blocked)
+            offender["last_seen"] = time.time()
+            offender["stack"] = "".join(stack)
+
+        print(f"🐢 Event-Loop blockiert ({blocked * 1000:.0f}ms): {signature}", flush=True)
+        return signature
+
+    def get_summary(self, limit=10):
+        """Zusammenfassung für /debug/loop"""
+        lags = sorted(self.recent_lags)
+
+        def percentile(p):
+            if not lags:
+                return 0.0
+            return lags[min(len(lags) - 1, int(len(lags) * p))]
+
+        with self.lock:
+            offenders = sorted(self.offenders.values(), key=lambda o: o["total_blocked_seconds"], reverse=True)
+            worst = [dict(o) for o in offenders[:limit]]
+
+        return {
+            "interval_seconds": self.interval,
+            "slow_callback_threshold_ms": int(self.slow_threshold * 1000),
+            "samples": self.samples,
+            "lag_seconds": {
+                "last": self.recent_lags[-1] if self.recent_lags else 0.0,
+                "p50": percentile(0.5),
+                "p99": percentile(0.99),
+                "max": self.max_lag,
+            },
+            "slow_callbacks_total": sum(o["count"] for o in offenders),
+            "worst_offenders": worst,
+        }
+
+# === SAMPLING-PROFILER ===
+class SamplingProfiler:
+    """
+    Sampling-CPU-Profiler für einen laufenden Thread (Standard: Event-Loop).
+    Ein Hilfs-Thread liest periodisch den Stack des Ziel-Threads und zählt
+    identische Stacks - kostet nur etwas, solange ein Profil läuft.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()  # {(frame, ...): samples} von Wurzel bis Blatt
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.sample_loop, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        self.duration = time.monotonic() - self.started_at
+
+    def sample_loop(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    def to_collapsed(self):
+        """Collapsed-Stack-Format (flamegraph.pl / speedscope kompatibel)"""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self):
+        """Speedscope-JSON mit einem 'sampled' Profil"""
+        frame_index = {}
+        frames = []
+        samples = []
+        weights = []
+        for stack, count in self.stacks.most_common():
+            indices = []
+            for name, filename, line in stack:
+                key = (name, filename, line)
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": name, "file": filename, "line": line})
+                indices.append(frame_index[key])
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": "pump-find event loop",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.duration,
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": "pump-find event loop",
+            "activeProfileIndex": 0,
+            "exporter": "pump-find-backend",
+        }
+
+# === SPEICHER-ABSCHÄTZUNG ===
+def deep_sizeof(obj, seen=None):
+    """Rekursive Größe eines Objekts inkl. enthaltener Container (Bytes)"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        for item in obj:
+            size += deep_sizeof(item, seen)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+def sample_entries(items, count, sample_size):
+    """Höchstens sample_size Einträge, ohne die Struktur zu kopieren: Listen per Zufallsindex,
+    dicts/Sets jeder n-te Eintrag (über die ganze Struktur verteilt).
+
+    Achtung: dicts/Sets haben keinen wahlfreien Zugriff - islice läuft dafür einmal über alle
+    Einträge (O(n), allerdings in C ohne Python-Arbeit je übersprungenem Eintrag). Ein rotierender
+    Iterator wäre O(sample_size), wird aber ungültig, sobald sich die Größe der Struktur ändert -
+    bei den Hot-Path-dicts also fast immer.
+    """
+    if count <= sample_size:
+        return list(items)
+    if isinstance(items, (list, deque)):
+        return [items[i] for i in random.sample(range(count), sample_size)]
+    step = count // sample_size
+    return list(itertools.islice(items, 0, step * sample_size, step))
+
+def measure_sample(sample, count, item_size, shallow_size):
+    """Rechnet eine Stichprobe auf die ganze Struktur hoch. Läuft auch im Thread: inzwischen
+    entfernte oder gerade geänderte Einträge werden übersprungen.
+
+    Returns:
+        (geschätzte Bytes, Bytes pro Eintrag, Stichprobengröße)
+    """
+    sizes = []
+    for item in sample:
+        try:
+            sizes.append(item_size(item))
+        except (KeyError, RuntimeError):
+            continue
+    if not sizes:
+        return shallow_size, 0.0, 0
+    per_entry = sum(sizes) / len(sizes)
+    return int(shallow_size + per_entry * count), per_entry, len(sizes)
+
+def estimate_structure(items, count, item_size, shallow_size, sample_size):
+    """Schätzt die Größe einer Struktur anhand einer Stichprobe ihrer Einträge.
+
+    Returns:
+        (geschätzte Bytes, Bytes pro Eintrag, Stichprobengröße)
+    """
+    if count == 0:
+        return shallow_size, 0.0, 0
+    return measure_sample(sample_entries(items, count, sample_size), count, item_size, shallow_size)
+
+# === FRAME-RECORDER ===
+class FrameRecorder:
+    """
+    Zeichnet rohe WebSocket-Frames mit Empfangszeit auf.
+    Format: gzip-Segmente, eine Zeile pro Frame: "<recv_ts>\t<frame>\n".
+    Geschrieben wird gebündelt in einem Thread, damit die Event-Loop nicht blockiert.
+    """
+
+    def __init__(self, directory, segment_seconds=300, flush_interval=1.0, flush_frames=1000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_seconds = segment_seconds
+        self.flush_interval = flush_interval
+        self.flush_frames = flush_frames
+        self.pending = []
+        self.last_flush = time.time()
+        self.segment_path = None
+        self.segment_started = 0.0
+        self.frames_written = 0
+
+    def record(self, recv_ts, msg):
+        """Merkt einen Frame vor (JSON-Whitespace-Zeilenumbrüche werden zu Leerzeichen)"""
+        if isinstance(msg, bytes):
+            msg = msg.decode("utf-8", "replace")
+        self.pending.append(f"{recv_ts:.6f}\t{msg.replace(chr(10), ' ')}\n")
+
+    async def flush(self, force=False):
+        """Schreibt vorgemerkte Frames, sobald genug gesammelt oder flush_interval erreicht ist"""
+        if not self.pending:
+            return
+        now = time.time()
+        if not force and len(self.pending) < self.flush_frames and now - self.last_flush < self.flush_interval:
+            return
+
+        chunk = "".join(self.pending)
+        count = len(self.pending)
+        self.pending = []
+        self.last_flush = now
+
+        try:
+            await asyncio.to_thread(self.write_chunk, self.current_segment(now), chunk)
+            self.frames_written += count
+            capture_frames_total.inc(count)
+        except Exception as e:
+            print(f"⚠️ Capture-Schreibfehler: {e}", flush=True)
+
+    def current_segment(self, now):
+        """Aktuelle Segment-Datei (rotiert nach segment_seconds)"""
+        if self.segment_path is None or now - self.segment_started >= self.segment_seconds:
+            self.segment_started = now
+            stamp = datetime.fromtimestamp(now, timezone.utc).strftime("%Y%m%dT%H%M%S")
+            self.segment_path = self.directory / f"frames-{stamp}.log.gz"
+            print(f"🎥 Neues Capture-Segment: {self.segment_path}", flush=True)
+        return self.segment_path
+
+    @staticmethod
+    def write_chunk(path, chunk):
+        with gzip.open(path, "at", encoding="utf-8", compresslevel=6) as f:
+            f.write(chunk)
+
+# === PROZESS-TRENNUNG (ENGINE / API) ===
+ENGINE_CONTROL_CHANNEL = "pump_find_control"  # NOTIFY vom API-Prozess an die Engine
+SNAPSHOT_SEQ = struct.Struct("<Q")  # Sequenz (ungerade = Schreiben läuft)
+SNAPSHOT_META = struct.Struct("<Qd")  # Länge, Zeitpunkt der Veröffentlichung
+SNAPSHOT_HEADER_SIZE = SNAPSHOT_SEQ.size + SNAPSHOT_META.size
+
+
+_created_segments = set()  # Von diesem Prozess angelegte Segmente (räumt der Writer selbst auf)
+
+
+def attach_shared_memory(name):
+    """Öffnet ein bestehendes Segment, ohne dass der resource_tracker es beim Prozessende löscht"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: Registrierung rückgängig machen (außer für eigene Segmente)
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        if name not in _created_segments:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class StateSnapshotWriter:
+    """
+    Veröffentlicht den Live-Zustand der Engine als JSON in einem Shared-Memory-Segment.
+    Seqlock: Sequenz ungerade setzen, Daten und Länge schreiben, Sequenz gerade setzen.
+    Leser prüfen die Sequenz vor und nach dem Kopieren und wiederholen bei Abweichung.
+    """
+
+    def __init__(self, name, size):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Rest einer abgestürzten Engine
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _created_segments.add(name)
+        self.seq = 0
+        self.published = 0
+
+    def publish(self, payload, now=None):
+        """Schreibt einen Snapshot (bytes).
+
+        Returns:
+            False, wenn der Snapshot nicht in das Segment passt
+        """
+        if SNAPSHOT_HEADER_SIZE + len(payload) > self.shm.size:
+            return False
+        buf = self.shm.buf
+        self.seq += 1
+        SNAPSHOT_SEQ.pack_into(buf, 0, self.seq)
+        buf[SNAPSHOT_HEADER_SIZE:SNAPSHOT_HEADER_SIZE + len(payload)] = payload
+        SNAPSHOT_META.pack_into(buf, SNAPSHOT_SEQ.size, len(payload), now or time.time())
+        self.seq += 1
+        SNAPSHOT_SEQ.pack_into(buf, 0, self.seq)
+        self.published += 1
+        return True
+
+    def close(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        _created_segments.discard(self.shm.name)
+
+
+class StateSnapshotReader:
+    """Liest den Engine-Snapshot; dekodiert nur, wenn die Engine einen neuen veröffentlicht hat"""
+
+    def __init__(self, name, retries=10):
+        self.name = name
+        self.retries = retries
+        self.shm = None
+        self.seq = None
+        self.snapshot = None
+        self.published_at = None
+
+    def read(self):
+        """
+        Returns:
+            (Snapshot-Dict, Zeitpunkt der Veröffentlichung) oder (None, None), solange keine Engine läuft
+        """
+        if self.shm is None:
+            try:
+                self.shm = attach_shared_memory(self.name)
+            except FileNotFoundError:
+                return None, None
+        buf = self.shm.buf
+        for _ in range(self.retries):
+            (seq,) = SNAPSHOT_SEQ.unpack_from(buf, 0)
+            if seq == self.seq:
+                return self.snapshot, self.published_at
+            if seq % 2 or seq == 0:
+                time.sleep(0)  # Engine schreibt gerade
+                continue
+            length, published_at = SNAPSHOT_META.unpack_from(buf, SNAPSHOT_SEQ.size)
+            payload = bytes(buf[SNAPSHOT_HEADER_SIZE:SNAPSHOT_HEADER_SIZE + length])
+            if SNAPSHOT_SEQ.unpack_from(buf, 0)[0] != seq:
+                continue
+            self.snapshot = json.loads(payload)
+            self.seq = seq
+            self.published_at = published_at
+            return self.snapshot, self.published_at
+        # Keinen konsistenten Stand bekommen - letzten gültigen liefern
+        return self.snapshot, self.published_at
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+
+def engine_snapshot():
+    """API-Prozess: aktueller Engine-Snapshot (None ohne Engine oder wenn veraltet)"""
+    if _engine_state is None:
+        return None
+    snapshot, published_at = _engine_state.read()
+    if snapshot is None or time.time() - published_at > STATE_SNAPSHOT_MAX_AGE:
+        return None
+    return snapshot
+
+
+def db_pool():
+    """DB-Pool für API-Handler: der des Service bzw. im API-Prozess ein eigener"""
+    if _unified_instance:
+        return _unified_instance.pool
+    return _api_pool
+
+
+async def notify_engine(command, **args):
+    """API-Prozess: Steuerbefehl per NOTIFY an die Engine (update_config, reload_config, reload_phases)"""
+    pool = db_pool()
+    if not pool:
+        return False
+    await pool.execute("SELECT pg_notify($1, $2)", ENGINE_CONTROL_CHANNEL, json.dumps({"command": command, **args}))
+    return True
+
+
+async def run_control_listener(callback, health_interval=15):
+    """Eigene LISTEN-Verbindung für Steuerbefehle (Engine und alle API-Worker), verbindet bei Abbruch neu"""
+    while True:
+        conn = None
+        dsn = DB_DSN
+        try:
+            conn = await asyncpg.connect(dsn)
+            await conn.add_listener(ENGINE_CONTROL_CHANNEL, callback)
+            print(f"👂 LISTEN {ENGINE_CONTROL_CHANNEL} aktiv", flush=True)
+
+            # Verbindung prüfen; neue DSN (update_config) erzwingt Neuverbindung
+            while dsn == DB_DSN:
+                await asyncio.wait_for(conn.fetchval("SELECT 1"), timeout=5)
+                await asyncio.sleep(health_interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            db_errors.labels(type="listener").inc()
+            print(f"⚠️ Steuer-Listener getrennt: {e} - Retry in {DB_RETRY_DELAY}s", flush=True)
+        finally:
+            if conn is not None:
+                try:
+                    await conn.close(timeout=5)
+                except Exception:
+                    conn.terminate()
+        if dsn == DB_DSN:
+            await asyncio.sleep(DB_RETRY_DELAY)
+
+
+def on_api_command(connection, pid, channel, payload):
+    """API-Worker: Config-Änderungen anderer Worker übernehmen (uvicorn --workers N)"""
+    try:
+        command = json.loads(payload)
+    except ValueError:
+        return
+    kind = command.get("command")
+    try:
+        if kind == "update_config":
+            update_global_config(command.get("updates") or {})
+        elif kind == "reload_config":
+            load_config_from_file()
+    except Exception as e:
+        print(f"⚠️ Steuerbefehl '{kind}' im API-Worker fehlgeschlagen: {e}", flush=True)
+
+
+async def reload_engine_phases():
+    """Phasen dort neu laden, wo getrackt wird.
+
+    Returns:
+        Anzahl aktualisierter Streams (None, wenn die Engine in einem anderen Prozess läuft)
+    """
+    if _unified_instance:
+        return await _unified_instance.reload_phases_config()
+    await notify_engine("reload_phases")
+    return None
+
+
+async def run_api_state(interval=None):
+    """API-Prozess: Status aus dem Engine-Snapshot übernehmen und eigenen DB-Pool bereithalten"""
+    global _api_pool, _api_pool_dsn
+    while True:
+        if _api_pool is not None and _api_pool_dsn != DB_DSN:
+            # DSN per PUT /config geändert (in diesem oder einem anderen Worker)
+            print("🔄 API-Prozess: DB-DSN geändert - baue DB-Pool neu auf", flush=True)
+            pool, _api_pool = _api_pool, None
+            try:
+                await asyncio.wait_for(pool.close(), timeout=5)
+            except Exception:
+                pool.terminate()
+        if _api_pool is None and DB_DSN:
+            try:
+                _api_pool = await asyncpg.create_pool(DB_DSN, min_size=1, max_size=5)
+                _api_pool_dsn = DB_DSN
+                print("✅ API-Prozess: DB-Pool bereit", flush=True)
+            except Exception as e:
+                print(f"⚠️ API-Prozess: DB nicht erreichbar: {e}", flush=True)
+
+        snapshot = engine_snapshot()
+        if snapshot:
+            unified_status.update(snapshot["status"])
+        else:
+            # Ohne Engine nichts Veraltetes melden
+            unified_status["ws_connected"] = False
+            unified_status["last_message_time"] = None
+            unified_status["last_error"] = "engine_unavailable"
+        await asyncio.sleep(interval or STATE_SNAPSHOT_INTERVAL)
+
+
+async def start_engine(service):
+    """Startet Ingestion und Hintergrund-Jobs des Service.
+
+    Returns:
+        Liste der gestarteten Tasks
+    """
+    if service.warm_state and (SHARD_WORKERS > 0 or REPLICA_MODE):
+        # Zustand liegt in den Workern bzw. wechselt mit den Leases den Eigentümer
+        print("⚠️ WARM_RESTART_FILE mit SHARD_WORKERS/REPLICA_MODE wird nicht unterstützt - Warm-Restart deaktiviert", flush=True)
+        service.maintenance.disable("warm_state", "SHARD_WORKERS/REPLICA_MODE")
+        service.warm_state = None
+
+    # Starte Service in Background-Task
+    tasks = [asyncio.create_task(service.run())]
+
+    # n8n-Auslieferung läuft unabhängig von der Receive-Loop
+    tasks.append(asyncio.create_task(service.n8n_sender.run()))
+    if service.dead_letter:
+        tasks.append(asyncio.create_task(service.dead_letter.run(service.n8n_sender, BATCH_SIZE, service.mark_n8n_sent)))
+    if STREAM_NOTIFY_ENABLED:
+        tasks.append(asyncio.create_task(service.run_stream_listener()))
+    tasks.append(asyncio.create_task(service.maintenance.run()))
+    if SHARD_WORKERS > 0:
+        # Koordinator: Tracking läuft in den Shard-Workern
+        service.shards = ShardCoordinator(SHARD_WORKERS, SHARD_VNODES, SHARD_RESTART_DELAY, SHARD_STATS_INTERVAL,
+                                          ring_slots=TRADE_RING_SLOTS if SHARD_FEED == "ring" else 0)
+        tasks.append(asyncio.create_task(service.shards.run()))
+        if REPLICA_MODE:
+            print("⚠️ REPLICA_MODE mit SHARD_WORKERS wird nicht unterstützt - Replika-Modus deaktiviert", flush=True)
+    elif REPLICA_MODE:
+        # Discovery erst, wenn diese Replika den Leader-Lock hält
+        service.replica = ReplicaCoordinator(REPLICA_ID, REPLICA_LEASE_SECONDS, REPLICA_REBALANCE_TOLERANCE, REPLICA_REBALANCE_BATCH)
+        service.discovery_enabled = False
+        tasks.append(asyncio.create_task(service.run_replica()))
+    return tasks
+
+
+async def stop_tasks(tasks):
+    for task in tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def stop_engine(service, tasks):
+    """Beendet die Tasks und sichert, was noch im Speicher liegt"""
+    await stop_tasks(tasks)
+
+    if service.shards:
+        await service.shards.stop()
+
+    # Angefangene Intervalle schreiben und eigene Streams sofort freigeben statt auf den Lease-Ablauf zu warten
+    if service.replica and service.pool:
+        try:
+            rows = service.partial_metric_rows(list(service.watchlist))
+            written = await asyncio.wait_for(service.replica.release(service.pool, rows), timeout=5)
+            if written:
+                print(f"💾 {written} angefangene Intervalle vor der Freigabe gespeichert", flush=True)
+        except Exception as e:
+            print(f"⚠️ Replika-Freigabe fehlgeschlagen: {e}", flush=True)
+
+    # Noch nicht gesendete Discovery-Coins überleben den Neustart
+    if service.dead_letter:
+        await service.spill_to_dead_letter()
+
+    # Letzten Persistenz-Batch schreiben
+    if service.persist_buffer:
+        try:
+            await asyncio.wait_for(service.flush_persist_buffer(force=True), timeout=5)
+        except asyncio.TimeoutError:
+            print(f"⚠️ {len(service.persist_buffer)} Coins nicht mehr direkt gespeichert", flush=True)
+
+    # In-Memory-Zustand für den nächsten Start sichern (Warm-Restart)
+    if service.warm_state:
+        size = await service.save_warm_state(clean=True)
+        if size:
+            print(f"♻️ Warm-Restart-Snapshot gespeichert ({len(service.watchlist)} Coins, {size // 1024} KB)", flush=True)
+
+    # Restliche aufgezeichnete Frames schreiben
+    if service.frame_recorder:
+        await service.frame_recorder.flush(force=True)
+
+
+async def engine_main():
+    """PROCESS_ROLE=engine: Ingestion ohne HTTP-Server, Zustand per Shared Memory für die API-Prozesse"""
+    global _unified_instance, _loop_monitor
+    service = UnifiedService()
+    _unified_instance = service
+    _loop_monitor = LoopMonitor(LOOP_LAG_INTERVAL, SLOW_CALLBACK_THRESHOLD_MS)
+    writer = StateSnapshotWriter(STATE_SNAPSHOT_NAME, STATE_SNAPSHOT_SIZE)
+    print(f"🧠 Engine veröffentlicht Zustand in Shared Memory '{STATE_SNAPSHOT_NAME}' "
+          f"({STATE_SNAPSHOT_SIZE // 1024 // 1024} MB, alle {STATE_SNAPSHOT_INTERVAL}s)", flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    tasks = await start_engine(service)
+    tasks.append(asyncio.create_task(_loop_monitor.run()))
+    # Steuerbefehle der API-Prozesse - unabhängig von STREAM_NOTIFY_ENABLED
+    tasks.append(asyncio.create_task(run_control_listener(service.on_engine_command)))
+    tasks.append(asyncio.create_task(service.run_state_publisher(writer, STATE_SNAPSHOT_INTERVAL)))
+    try:
+        await stop.wait()
+    finally:
+        print("👋 Engine wird beendet...", flush=True)
+        await stop_engine(service, tasks)
+        writer.close()
+
+
+async def standalone_main():
+    """Direkter Start (python unified_service.py): Ingestion und Hintergrund-Jobs ohne HTTP-Server"""
+    global _unified_instance
+    service = UnifiedService()
+    _unified_instance = service
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    tasks = await start_engine(service)
+    try:
+        await stop.wait()
+    finally:
+        print("👋 Pump Find Backend wird beendet...", flush=True)
+        await stop_engine(service, tasks)
+
+
 # === FASTAPI LIFESPAN ===
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """FastAPI Lifespan Manager für Startup/Shutdown"""
+    global _unified_instance, _loop_monitor, _engine_state, _api_pool
+
+    # Event-Loop-Monitor (misst den Loop dieses Prozesses)
+    _loop_monitor = LoopMonitor(LOOP_LAG_INTERVAL, SLOW_CALLBACK_THRESHOLD_MS)
+    tasks = [asyncio.create_task(_loop_monitor.run())]
+
+    if PROCESS_ROLE == "api":
+        # Nur API: Live-Zustand kommt aus dem Snapshot der Engine
+        print(f"🚀 Starting Pump Find API (PID {os.getpid()}, Snapshot '{STATE_SNAPSHOT_NAME}')...")
+        _engine_state = StateSnapshotReader(STATE_SNAPSHOT_NAME)
+        tasks.append(asyncio.create_task(run_api_state()))
+        tasks.append(asyncio.create_task(run_control_listener(on_api_command)))
+
+        yield
+
+        print("👋 Shutting down Pump Find API...")
+        await stop_tasks(tasks)
+        _engine_state.close()
+        if _api_pool:
+            await _api_pool.close()
+            _api_pool = None
+        return
+
     # Startup
     print("🚀 Starting Pump Find Backend...")
-    global _unified_instance
     service = UnifiedService()
     _unified_instance = service
-
-    # Starte Service in Background-Task
-    background_task = asyncio.create_task(service.run())
+    tasks.extend(await start_engine(service))
 
     yield
 
     # Shutdown
     print("👋 Shutting down Pump Find Backend...")
-    background_task.cancel()
-    try:
-        await background_task
-    except asyncio.CancelledError:
-        pass
+    await stop_engine(service, tasks)
 
 # === FASTAPI APP ===
 app = FastAPI(
@@ -502,29 +1572,137 @@ async def get_coin_analytics(mint: str, windows: str = "30s,1m,3m,5m,15m,30m,1h"
         }
     }
 
+# === TRADE-AGGREGATION ===
+def empty_trade_buffer():
+    """Leerer Aggregations-Buffer (ein Flush-Bucket) für einen Coin"""
+    return {
+        "open": None, "high": -1, "low": float("inf"), "close": 0,
+        "vol": 0, "vol_buy": 0, "vol_sell": 0, "buys": 0, "sells": 0,
+        "micro_trades": 0, "max_buy": 0, "max_sell": 0,
+        "wallets": set(), "v_sol": 0, "mcap": 0,
+        "whale_buy_vol": 0, "whale_sell_vol": 0, "whale_buys": 0, "whale_sells": 0,
+        "dev_sold_amount": 0
+    }
+
+
+def parse_trade(data):
+    """Liest die für die Aggregation nötigen Felder eines Trades.
+
+    Returns:
+        (sol, price, is_buy, trader_key, v_sol) oder None bei ungültigem Trade
+    """
+    try:
+        sol = float(data["solAmount"])
+        v_sol = float(data["vSolInBondingCurve"])
+        price = v_sol / float(data["vTokensInBondingCurve"])
+        is_buy = data["txType"] == "buy"
+        trader_key = data.get("traderPublicKey", "")
+    except:
+        return None
+    return sol, price, is_buy, trader_key, v_sol
+
+
+def aggregate_trade(buf, sol, price, is_buy, trader_key, v_sol, creator_address):
+    """Addiert einen Trade in den Buffer (OHLC, Volumen, Whales, Dev-Sells, Wallets)"""
+    if buf["open"] is None: buf["open"] = price
+    buf["close"] = price
+    buf["high"] = max(buf["high"], price)
+    buf["low"] = min(buf["low"], price)
+    buf["vol"] += sol
+
+    if is_buy:
+        buf["buys"] += 1
+        buf["vol_buy"] += sol
+        buf["max_buy"] = max(buf["max_buy"], sol)
+        if sol >= WHALE_THRESHOLD_SOL:
+            buf["whale_buy_vol"] += sol
+            buf["whale_buys"] += 1
+    else:
+        buf["sells"] += 1
+        buf["vol_sell"] += sol
+        buf["max_sell"] = max(buf["max_sell"], sol)
+        if sol >= WHALE_THRESHOLD_SOL:
+            buf["whale_sell_vol"] += sol
+            buf["whale_sells"] += 1
+        # Dev-Tracking
+        if creator_address and trader_key and trader_key == creator_address:
+            buf["dev_sold_amount"] += sol
+
+    if sol < 0.01: buf["micro_trades"] += 1
+    buf["wallets"].add(trader_key)
+    buf["v_sol"] = v_sol
+    buf["mcap"] = price * 1_000_000_000
+
+def merge_trade_buffers(buf, older):
+    """Führt einen älteren Buffer (Cache oder vorheriger Shard) in buf zusammen"""
+    if not older or older["buys"] + older["sells"] == 0:
+        return buf
+    has_trades = buf["buys"] + buf["sells"] > 0
+    if older["open"] is not None: buf["open"] = older["open"]
+    if not has_trades:
+        buf["close"] = older["close"]
+        buf["v_sol"] = older["v_sol"]
+        buf["mcap"] = older["mcap"]
+    buf["high"] = max(buf["high"], older["high"])
+    buf["low"] = min(buf["low"], older["low"])
+    buf["max_buy"] = max(buf["max_buy"], older["max_buy"])
+    buf["max_sell"] = max(buf["max_sell"], older["max_sell"])
+    for key in ("vol", "vol_buy", "vol_sell", "buys", "sells", "micro_trades", "whale_buy_vol",
+                "whale_sell_vol", "whale_buys", "whale_sells", "dev_sold_amount"):
+        buf[key] += older[key]
+    buf["wallets"] |= older["wallets"]
+    return buf
+
+
+# Zeilenaufbau: UnifiedService.metric_row
+COIN_METRICS_INSERT_SQL = """
+    INSERT INTO coin_metrics (
+        mint, timestamp, phase_id_at_time, price_open, price_high, price_low, price_close,
+        market_cap_close, bonding_curve_pct, virtual_sol_reserves, is_koth, volume_sol,
+        buy_volume_sol, sell_volume_sol, num_buys, num_sells, unique_wallets, num_micro_trades,
+        dev_sold_amount, max_single_buy_sol, max_single_sell_sol, net_volume_sol,
+        volatility_pct, avg_trade_size_sol, whale_buy_volume_sol, whale_sell_volume_sol,
+        num_whale_buys, num_whale_sells, buy_pressure_ratio, unique_signer_ratio
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, $20, $21, $22, $23, $24, $25, $26, $27, $28, $29, $30)
+"""
+
+
 # === CACHE-SYSTEM ===
 class CoinCache:
     """
     120-Sekunden Cache für neue Coins
     Sammelt neue Coins bis sie aktiviert werden oder ablaufen
+
+    Coins liegen in Discovery-Reihenfolge (= Ablauf-Reihenfolge) im Cache, Cleanup
+    arbeitet daher nur die abgelaufenen Coins von vorne ab; Zähler werden inkrementell gepflegt.
     """
 
     def __init__(self, cache_seconds=120):
         self.cache_seconds = cache_seconds
-        self.cache = {}  # {mint: coin_data}
+        self.cache = {}  # {mint: coin_data} in Discovery-Reihenfolge
+        self.pending_expiry = {}  # {mint: None} nicht aktivierte Coins in Discovery-Reihenfolge
+        self.activated_count = 0
         self.last_cleanup = time.time()
 
-    def add_coin(self, mint, coin_data):
+    def add_coin(self, mint, coin_data, current_time=None):
         """Fügt neuen Coin zum Cache hinzu"""
-        now = time.time()
+        now = current_time if current_time is not None else time.time()
+
+        # Erneut entdeckter Coin wandert ans Ende, damit die Reihenfolge dem discovered_at entspricht
+        previous = self.cache.pop(mint, None)
+        if previous and previous["activated"]:
+            self.activated_count -= 1
+        self.pending_expiry.pop(mint, None)
+
         self.cache[mint] = {
             "discovered_at": now,
             "metadata": coin_data.copy(),  # Vollständige Coin-Daten
-            "trades": [],  # [(timestamp, trade_data), ...]
+            "buffer": empty_trade_buffer(),  # Cache-Trades vorab aggregiert (konstante Größe statt Trade-Liste)
             "n8n_sent": False,  # Wurde an n8n gesendet?
             "activated": False,  # Wurde für Tracking aktiviert?
             "subscription_active": True  # Trade-Subscription aktiv?
         }
+        self.pending_expiry[mint] = None
 
         # Cache-Größe aktualisieren
         cache_size.set(len(self.cache))
@@ -532,31 +1710,53 @@ class CoinCache:
         print(f"🆕 Coin {mint[:8]}... in {self.cache_seconds}s Cache gelegt", flush=True)
 
     def add_trade(self, mint, trade_data):
-        """Fügt Trade zu Cache hinzu (falls Coin noch nicht aktiv)"""
-        if mint in self.cache and not self.cache[mint]["activated"]:
-            now = time.time()
-            self.cache[mint]["trades"].append((now, trade_data))
+        """Aggregiert Trade in den Cache-Buffer (falls Coin noch nicht aktiv)"""
+        entry = self.cache.get(mint)
+        if entry and not entry["activated"]:
+            parsed = parse_trade(trade_data)
+            if parsed:
+                aggregate_trade(entry["buffer"], *parsed, entry["metadata"].get("traderPublicKey"))
+
+    @staticmethod
+    def trade_count(entry):
+        """Anzahl der im Cache aggregierten Trades"""
+        buf = entry["buffer"]
+        return buf["buys"] + buf["sells"] if buf else 0
 
     def activate_coin(self, mint, stream_data=None):
-        """Aktiviert Coin für Tracking"""
+        """Aktiviert Coin für Tracking.
+
+        Returns:
+            Aggregierter Cache-Buffer (wird an die Watchlist übergeben) oder None
+        """
         if mint in self.cache:
-            self.cache[mint]["activated"] = True
-            trades = self.cache[mint]["trades"].copy()
+            entry = self.cache[mint]
+            if not entry["activated"]:
+                entry["activated"] = True
+                self.activated_count += 1
+                self.pending_expiry.pop(mint, None)
+            # Buffer wird übergeben, nicht kopiert - eine erneute Aktivierung liefert nichts doppelt
+            buffer = entry["buffer"]
+            entry["buffer"] = None
 
             # Cache-Größe aktualisieren
             cache_size.set(len(self.cache))
 
             cache_activations.inc()
-            print(f"✅ Coin {mint[:8]}... aktiviert - {len(trades)} Cache-Trades verfügbar", flush=True)
+            trade_count = buffer["buys"] + buffer["sells"] if buffer else 0
+            print(f"✅ Coin {mint[:8]}... aktiviert - {trade_count} Cache-Trades verfügbar", flush=True)
 
-            return trades
-        return []
+            return buffer
+        return None
 
     def remove_coin(self, mint):
         """Entfernt Coin aus Cache (bei Ablauf oder Fehler)"""
         if mint in self.cache:
             was_activated = self.cache[mint]["activated"]
             del self.cache[mint]
+            self.pending_expiry.pop(mint, None)
+            if was_activated:
+                self.activated_count -= 1
 
             # Cache-Größe aktualisieren
             cache_size.set(len(self.cache))
@@ -565,16 +1765,38 @@ class CoinCache:
                 cache_expirations.inc()
                 print(f"⏰ Coin {mint[:8]}... Cache abgelaufen - entfernt", flush=True)
 
+    def restore(self, cache):
+        """Übernimmt Einträge aus einem Warm-Restart-Snapshot (älter als alle vorhandenen, daher vorne einsortiert).
+
+        Returns:
+            Anzahl übernommener Coins
+        """
+        merged = {mint: entry for mint, entry in cache.items() if mint not in self.cache}
+        restored = len(merged)
+        merged.update(self.cache)
+        self.cache = merged
+        self.pending_expiry = {mint: None for mint, entry in merged.items() if not entry["activated"]}
+        self.activated_count = len(merged) - len(self.pending_expiry)
+        cache_size.set(len(self.cache))
+        return restored
+
+    def iter_due_coins(self, current_time, min_age):
+        """Liefert (mint, data) aller Coins mit Alter >= min_age - nur der fällige Anfang des Caches"""
+        for mint, data in self.cache.items():
+            if current_time - data["discovered_at"] < min_age:
+                break
+            yield mint, data
+
     def cleanup_expired_coins(self, current_time=None):
         """Entfernt abgelaufene Coins aus dem Cache"""
         if current_time is None:
             current_time = time.time()
 
         expired_mints = []
-        for mint, data in self.cache.items():
-            age = current_time - data["discovered_at"]
-            if age > self.cache_seconds and not data["activated"]:
-                expired_mints.append(mint)
+        for mint in self.pending_expiry:
+            if current_time - self.cache[mint]["discovered_at"] <= self.cache_seconds:
+                break  # Alle folgenden Coins sind jünger
+            expired_mints.append(mint)
 
         for mint in expired_mints:
             self.remove_coin(mint)
@@ -587,12 +1809,14 @@ class CoinCache:
     def get_cache_stats(self):
         """Gibt Cache-Statistiken zurück"""
         total_coins = len(self.cache)
-        activated_coins = sum(1 for data in self.cache.values() if data["activated"])
+        activated_coins = self.activated_count
         expired_coins = total_coins - activated_coins
 
         if self.cache:
-            oldest_age = min(time.time() - data["discovered_at"] for data in self.cache.values())
-            newest_age = max(time.time() - data["discovered_at"] for data in self.cache.values())
+            now = time.time()
+            # Jüngster Coin liegt am Ende, ältester am Anfang
+            oldest_age = now - next(reversed(self.cache.values()))["discovered_at"]
+            newest_age = now - next(iter(self.cache.values()))["discovered_at"]
         else:
             oldest_age = newest_age = 0
 
@@ -605,94 +1829,342 @@ class CoinCache:
         }
 
 # === FILTER-SYSTEM ===
-class CoinFilter:
-    """Filtert Coins basierend auf Bad Names und Spam-Burst"""
-
-    def __init__(self, spam_burst_window=30):
-        self.recent_coins = []  # [(timestamp, name, symbol), ...] für Spam-Burst-Erkennung
-        self.spam_burst_window = spam_burst_window  # Sekunden für Spam-Burst-Erkennung
+def count_socials(coin_data):
+    """Anzahl gesetzter Social-Links (Twitter, Telegram, Website, Discord)"""
+    social_count = 0
+    if coin_data.get("twitter_url") or coin_data.get("twitter"): social_count += 1
+    if coin_data.get("telegram_url") or coin_data.get("telegram"): social_count += 1
+    if coin_data.get("website_url") or coin_data.get("website"): social_count += 1
+    if coin_data.get("discord_url") or coin_data.get("discord"): social_count += 1
+    return social_count
+
+
+class WindowIndex:
+    """Zeitlich sortierte Einträge mit Hash-Index je Schlüssel (O(1) Lookup, Expiry von vorne)"""
+
+    def __init__(self, window, key_count=1):
+        self.window = window
+        self.entries = deque()  # [(timestamp, key1, key2, ...), ...]
+        self.indexes = [{} for _ in range(key_count)]  # {key: Anzahl im Window}
+
+    def expire(self, current_time):
+        cutoff = current_time - self.window
+        entries = self.entries
+        while entries and entries[0][0] <= cutoff:
+            entry = entries.popleft()
+            for index, key in zip(self.indexes, entry[1:]):
+                count = index.get(key, 0) - 1
+                if count > 0:
+                    index[key] = count
+                else:
+                    index.pop(key, None)
 
-    def should_filter_coin(self, coin_data):
-        """Prüft ob Coin gefiltert werden soll"""
-        name = coin_data.get("name", "").strip()
-        symbol = coin_data.get("symbol", "").strip()
+    def add(self, current_time, *keys):
+        self.entries.append((current_time, *keys))
+        for index, key in zip(self.indexes, keys):
+            index[key] = index.get(key, 0) + 1
 
-        # 1. Bad Names Filter
-        if BAD_NAMES.search(name):
-            coins_filtered.labels(reason="bad_name").inc()
-            return True, "bad_name"
 
-        # 2. Spam-Burst Filter (gleicher Name/Symbol in kurzer Zeit)
-        now = time.time()
-        recent_identical = [
-            ts for ts, n, s in self.recent_coins
-            if (n == name or s == symbol) and (now - ts) < self.spam_burst_window
-        ]
+class FilterStage(ABC):
+    """
+    Basis einer Filter-Stufe: check() liefert True wenn der Coin abgelehnt wird,
+    on_accept() merkt sich Coins, die die komplette Pipeline passiert haben.
+    Der Name ist gleichzeitig der Ablehnungsgrund (coins_filtered{reason}).
+    """
+    name = "stage"
 
-        if recent_identical:
-            coins_filtered.labels(reason="spam_burst").inc()
-            return True, "spam_burst"
+    def __init__(self):
+        self.checks = 0.0  # seit der letzten Umsortierung (mit Decay)
+        self.rejects = 0.0
+        self.seconds = 0.0
+        self.checks_metric = filter_stage_checks.labels(stage=self.name)
+        self.seconds_metric = filter_stage_seconds.labels(stage=self.name)
 
-        # Coin ist okay - zu Recent-Liste hinzufügen
-        self.recent_coins.append((now, name, symbol))
+    def enabled(self):
+        return True
 
-        # Recent-Liste aufräumen (älter als 2x Window)
-        cutoff = now - (self.spam_burst_window * 2)
-        self.recent_coins = [(ts, n, s) for ts, n, s in self.recent_coins if ts > cutoff]
+    @abstractmethod
+    def check(self, coin_data, name, symbol, now):
+        """True, wenn der Coin an dieser Stufe abgelehnt wird"""
 
-        return False, None
+    def on_accept(self, coin_data, name, symbol, now):
+        pass
 
-# === FASTAPI ROUTEN ===
+    def rank(self):
+        """Kosten pro Ablehnung - kleiner = früher in der Pipeline"""
+        if not self.checks:
+            return float("inf")
+        cost = self.seconds / self.checks
+        reject_rate = self.rejects / self.checks
+        return cost / reject_rate if reject_rate > 0 else float("inf")
 
-@app.options("/health")
-async def health_options():
-    """CORS Preflight für Health Endpoint"""
-    return Response(
-        status_code=200,
-        headers={
-            "Access-Control-Allow-Origin": "http://localhost:5173",
-            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-            "Access-Control-Allow-Headers": "*",
+    def get_stats(self):
+        return {
+            "stage": self.name,
+            "enabled": self.enabled(),
+            "checks": round(self.checks, 1),
+            "reject_rate": round(self.rejects / self.checks, 4) if self.checks else 0.0,
+            "avg_cost_us": round(self.seconds / self.checks * 1e6, 3) if self.checks else 0.0,
         }
-    )
 
-@app.get("/health", operation_id="get_health")
-async def health_check(response: Response):
-    """Health-Check Endpoint mit detaillierten Infos"""
-    try:
-        global _unified_instance
 
-        # === ECHTE VERBINDUNGSTESTS ===
+class BadNameStage(FilterStage):
+    name = "bad_name"
 
-        # 1. DB-Verbindung testen (echte Query)
-        db_status = False
-        try:
-            if _unified_instance and hasattr(_unified_instance, 'pool') and _unified_instance.pool:
-                async with _unified_instance.pool.acquire() as conn:
-                    await conn.fetchval('SELECT 1')
-                    db_status = True
-        except Exception as e:
-            print(f"❌ DB Health-Check fehlgeschlagen: {e}", flush=True)
-            db_status = False
+    def check(self, coin_data, name, symbol, now):
+        return BAD_NAMES.search(name) is not None
 
-        # 2. WebSocket-Verbindung testen (nur für Health-Check)
-        ws_status = False
-        last_msg = unified_status.get("last_message_time")
 
-        if last_msg:
-            # WebSocket gilt als verbunden, wenn letzte Nachricht < 5min alt ist
-            # (Realistisch für Token-Erstellungen - kommen nicht jede Sekunde)
-            time_since_last_msg = time.time() - last_msg
-            ws_status = time_since_last_msg < 300  # 5 Minuten Timeout
-            if not ws_status:
-                print(f"⚠️ WebSocket als offline markiert - letzte Nachricht vor {time_since_last_msg:.0f}s", flush=True)
-        else:
-            # Keine Nachrichten empfangen - als offline markieren
-            ws_status = False
-            print("⚠️ WebSocket als offline markiert - keine Nachrichten empfangen", flush=True)
+class SpamBurstStage(FilterStage):
+    """Gleicher Name oder gleiches Symbol innerhalb des Spam-Burst-Windows"""
+    name = "spam_burst"
 
-        # 3. n8n-Status-Management
-        n8n_status = unified_status.get("n8n_available", False)
+    def __init__(self, window):
+        super().__init__()
+        self.index = WindowIndex(window, key_count=2)
+
+    def check(self, coin_data, name, symbol, now):
+        self.index.expire(now)
+        name_index, symbol_index = self.index.indexes
+        return name in name_index or symbol in symbol_index
+
+    def on_accept(self, coin_data, name, symbol, now):
+        self.index.add(now, name, symbol)
+
+
+class CreatorReputationStage(FilterStage):
+    """Serien-Launcher: Creator mit zu vielen Coins im History-Window"""
+    name = "creator_reputation"
+
+    def __init__(self):
+        super().__init__()
+        self.index = WindowIndex(FILTER_HISTORY_WINDOW)
+
+    def enabled(self):
+        return FILTER_CREATOR_MAX_COINS > 0
+
+    def check(self, coin_data, name, symbol, now):
+        creator = coin_data.get("traderPublicKey")
+        if not creator:
+            return False
+        self.index.window = FILTER_HISTORY_WINDOW
+        self.index.expire(now)
+        return self.index.indexes[0].get(creator, 0) >= FILTER_CREATOR_MAX_COINS
+
+    def on_accept(self, coin_data, name, symbol, now):
+        creator = coin_data.get("traderPublicKey")
+        if creator and self.enabled():
+            self.index.add(now, creator)
+
+
+class ImageDuplicateStage(FilterStage):
+    """Wiederverwendete Metadaten samt Bild: create-Frames enthalten nur die Metadata-URI (uri), deren
+    IPFS-CID der Content-Hash des Metadaten-JSON ist. Copycats, die Bild und Texte übernehmen, teilen die CID;
+    wer Name oder Beschreibung ändert, bekommt eine neue und wird hier nicht erkannt."""
+    name = "image_duplicate"
+
+    def __init__(self):
+        super().__init__()
+        self.index = WindowIndex(FILTER_HISTORY_WINDOW)
+
+    @staticmethod
+    def image_hash(coin_data):
+        uri = coin_data.get("uri") or ""
+        if not isinstance(uri, str):
+            return None
+        return uri.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1] or None
+
+    def enabled(self):
+        return FILTER_IMAGE_DUPLICATES
+
+    def check(self, coin_data, name, symbol, now):
+        image_hash = self.image_hash(coin_data)
+        if not image_hash:
+            return False
+        self.index.window = FILTER_HISTORY_WINDOW
+        self.index.expire(now)
+        return image_hash in self.index.indexes[0]
+
+    def on_accept(self, coin_data, name, symbol, now):
+        image_hash = self.image_hash(coin_data)
+        if image_hash and self.enabled():
+            self.index.add(now, image_hash)
+
+
+class InitialBuyStage(FilterStage):
+    """Initial-Buy des Creators unter FILTER_MIN_INITIAL_BUY_SOL"""
+    name = "initial_buy"
+
+    def enabled(self):
+        return FILTER_MIN_INITIAL_BUY_SOL > 0
+
+    def check(self, coin_data, name, symbol, now):
+        try:
+            return float(coin_data.get("solAmount") or 0) < FILTER_MIN_INITIAL_BUY_SOL
+        except (TypeError, ValueError):
+            return True
+
+
+class SocialCountStage(FilterStage):
+    """Weniger Social-Links als FILTER_MIN_SOCIAL_COUNT"""
+    name = "social_count"
+
+    def enabled(self):
+        return FILTER_MIN_SOCIAL_COUNT > 0
+
+    def check(self, coin_data, name, symbol, now):
+        return count_socials(coin_data) < FILTER_MIN_SOCIAL_COUNT
+
+
+class CoinFilter:
+    """
+    Filter-Pipeline für neue Coins (Bad Names, Spam-Burst, Creator, Bild-Duplikate,
+    Initial-Buy, Socials). Misst Kosten und Ablehnungsrate je Stufe und sortiert
+    die Pipeline regelmäßig so, dass günstige Stufen mit hoher Ablehnungsrate zuerst laufen.
+    """
+
+    def __init__(self, spam_burst_window=30):
+        self.spam_stage = SpamBurstStage(spam_burst_window)
+        self.stages = [
+            BadNameStage(),
+            self.spam_stage,
+            InitialBuyStage(),
+            SocialCountStage(),
+            CreatorReputationStage(),
+            ImageDuplicateStage(),
+        ]
+        self.checked_since_reorder = 0
+        self.update_position_metrics()
+
+    # Spam-Burst-Zustand (für Speicher-Abschätzung und Tests direkt erreichbar)
+    @property
+    def spam_burst_window(self):
+        return self.spam_stage.index.window
+
+    @spam_burst_window.setter
+    def spam_burst_window(self, value):
+        self.spam_stage.index.window = value
+
+    @property
+    def recent_coins(self):
+        return self.spam_stage.index.entries
+
+    @property
+    def name_index(self):
+        return self.spam_stage.index.indexes[0]
+
+    @property
+    def symbol_index(self):
+        return self.spam_stage.index.indexes[1]
+
+    def should_filter_coin(self, coin_data, current_time=None):
+        """Prüft ob Coin gefiltert werden soll"""
+        name = coin_data.get("name", "").strip()
+        symbol = coin_data.get("symbol", "").strip()
+        now = current_time if current_time is not None else time.time()
+
+        self.checked_since_reorder += 1
+        if FILTER_AUTO_REORDER and self.checked_since_reorder >= FILTER_REORDER_INTERVAL:
+            self.reorder_stages()
+
+        for stage in self.stages:
+            if not stage.enabled():
+                continue
+            started = time.perf_counter()
+            rejected = stage.check(coin_data, name, symbol, now)
+            elapsed = time.perf_counter() - started
+
+            stage.checks += 1
+            stage.seconds += elapsed
+            stage.checks_metric.inc()
+            stage.seconds_metric.inc(elapsed)
+
+            if rejected:
+                stage.rejects += 1
+                coins_filtered.labels(reason=stage.name).inc()
+                return True, stage.name
+
+        # Coin ist okay - Stufen mit Historie merken ihn sich
+        for stage in self.stages:
+            stage.on_accept(coin_data, name, symbol, now)
+
+        return False, None
+
+    def reorder_stages(self):
+        """Sortiert nach Kosten pro Ablehnung und halbiert die Statistik (passt sich an Trends an)"""
+        old_order = [stage.name for stage in self.stages]
+        self.stages.sort(key=lambda stage: stage.rank())
+        for stage in self.stages:
+            stage.checks /= 2
+            stage.rejects /= 2
+            stage.seconds /= 2
+        self.checked_since_reorder = 0
+
+        new_order = [stage.name for stage in self.stages]
+        if new_order != old_order:
+            filter_reorders.inc()
+            self.update_position_metrics()
+            print(f"🔀 Filter-Pipeline umsortiert: {' → '.join(s.name for s in self.stages if s.enabled())}", flush=True)
+
+    def update_position_metrics(self):
+        for position, stage in enumerate(self.stages):
+            filter_stage_position.labels(stage=stage.name).set(position)
+
+    def get_pipeline_stats(self):
+        """Reihenfolge und Kennzahlen aller Stufen"""
+        return [stage.get_stats() for stage in self.stages]
+
+# === FASTAPI ROUTEN ===
+
+@app.options("/health")
+async def health_options():
+    """CORS Preflight für Health Endpoint"""
+    return Response(
+        status_code=200,
+        headers={
+            "Access-Control-Allow-Origin": "http://localhost:5173",
+            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+            "Access-Control-Allow-Headers": "*",
+        }
+    )
+
+@app.get("/health", operation_id="get_health")
+async def health_check(response: Response):
+    """Health-Check Endpoint mit detaillierten Infos"""
+    try:
+        global _unified_instance
+
+        # === ECHTE VERBINDUNGSTESTS ===
+
+        # 1. DB-Verbindung testen (echte Query)
+        db_status = False
+        try:
+            if db_pool():
+                async with db_pool().acquire() as conn:
+                    await conn.fetchval('SELECT 1')
+                    db_status = True
+        except Exception as e:
+            print(f"❌ DB Health-Check fehlgeschlagen: {e}", flush=True)
+            db_status = False
+
+        # 2. WebSocket-Verbindung testen (nur für Health-Check)
+        ws_status = False
+        last_msg = unified_status.get("last_message_time")
+
+        if last_msg:
+            # WebSocket gilt als verbunden, wenn letzte Nachricht < 5min alt ist
+            # (Realistisch für Token-Erstellungen - kommen nicht jede Sekunde)
+            time_since_last_msg = time.time() - last_msg
+            ws_status = time_since_last_msg < 300  # 5 Minuten Timeout
+            if not ws_status:
+                print(f"⚠️ WebSocket als offline markiert - letzte Nachricht vor {time_since_last_msg:.0f}s", flush=True)
+        else:
+            # Keine Nachrichten empfangen - als offline markieren
+            ws_status = False
+            print("⚠️ WebSocket als offline markiert - keine Nachrichten empfangen", flush=True)
+
+        # 3. n8n-Status-Management
+        n8n_status = unified_status.get("n8n_available", False)
         last_n8n_success = unified_status.get("last_n8n_success", 0)
         current_time = time.time()
 
@@ -716,40 +2188,42 @@ async def health_check(response: Response):
 
         uptime = time.time() - unified_status.get("start_time", time.time())
 
+        # Live-Zustand: eigener Service oder (PROCESS_ROLE=api) Snapshot der Engine
+        live = None
+        if _unified_instance:
+            live = _unified_instance.get_live_stats()
+        else:
+            snapshot = engine_snapshot()
+            live = snapshot["live"] if snapshot else None
+
         # Cache-Statistiken
-        cache_stats = CacheStats(
+        cache_stats = CacheStats(**live["cache_stats"]) if live else CacheStats(
             total_coins=0,
             activated_coins=0,
             expired_coins=0,
             oldest_age_seconds=0,
             newest_age_seconds=0
         )
-        if _unified_instance and hasattr(_unified_instance, 'coin_cache'):
-            cache_data = _unified_instance.coin_cache.get_cache_stats()
-            cache_stats = CacheStats(**cache_data)
 
-        # Tracking-Statistiken
+        # Tracking-Statistiken (mit Sharding die Summe der Worker)
         tracking_stats = TrackingStats(
-            active_coins=0,
-            total_trades=unified_status.get("total_trades", 0),
-            total_metrics_saved=unified_status.get("total_metrics_saved", 0)
+            active_coins=live["active_coins"] if live else 0,
+            total_trades=live["total_trades"] if live else unified_status.get("total_trades", 0),
+            total_metrics_saved=live["total_metrics_saved"] if live else unified_status.get("total_metrics_saved", 0)
         )
-        if _unified_instance and hasattr(_unified_instance, 'watchlist'):
-            tracking_stats.active_coins = len(_unified_instance.watchlist)
+        shard_stats = live["shards"] if live else None
+        replica_stats = live["replica"] if live else None
 
         # Discovery-Statistiken
-        n8n_buffer_size = 0
-        if _unified_instance and hasattr(_unified_instance, 'discovery_buffer'):
-            n8n_buffer_size = len(_unified_instance.discovery_buffer)
-
         discovery_stats = DiscoveryStats(
             total_coins_discovered=unified_status.get("total_coins_discovered", 0),
             n8n_available=unified_status.get("n8n_available", False),
-            n8n_buffer_size=n8n_buffer_size
+            n8n_buffer_size=live["n8n_buffer_size"] if live else 0
         )
 
         health_data = HealthResponse(
-            status="healthy" if (db_status and ws_status) else "degraded",
+            status="healthy" if (db_status and ws_status and (shard_stats is None or shard_stats["healthy"])
+                                 and (replica_stats is None or replica_stats["healthy"])) else "degraded",
             ws_connected=ws_status,
             db_connected=db_status,
             uptime_seconds=int(uptime),
@@ -758,7 +2232,9 @@ async def health_check(response: Response):
             last_error=unified_status.get("last_error"),
             cache_stats=cache_stats,
             tracking_stats=tracking_stats,
-            discovery_stats=discovery_stats
+            discovery_stats=discovery_stats,
+            shards=shard_stats,
+            replica=replica_stats
         )
 
         # CORS-Header für UI-Zugriff
@@ -798,6 +2274,12 @@ async def metrics_handler(response: Response):
 
     # CORS-Header für UI-Zugriff
     metrics_data = generate_latest()
+    if PROCESS_ROLE == "api":
+        # Die Ingestion-Metriken stehen in der Registry der Engine
+        snapshot = engine_snapshot()
+        if snapshot is None:
+            raise HTTPException(status_code=503, detail="Engine nicht verfügbar (kein aktueller Snapshot)")
+        metrics_data = snapshot["metrics"]
     return PlainTextResponse(
         content=metrics_data,
         headers={
@@ -807,14 +2289,164 @@ async def metrics_handler(response: Response):
         }
     )
 
+@app.get("/debug/loop", operation_id="get_loop_debug", tags=["debug"])
+async def debug_loop(limit: int = 10):
+    """Event-Loop-Lag und die schlimmsten blockierenden Callbacks seit dem Start"""
+    if not _loop_monitor:
+        raise HTTPException(status_code=503, detail="Loop monitor not running")
+
+    return JSONResponse(
+        content=_loop_monitor.get_summary(limit),
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+            "Access-Control-Allow-Headers": "*",
+        }
+    )
+
+async def require_debug_access(x_debug_token: Optional[str] = Header(None)):
+    """Zugriffsschutz für Profiling-Endpoints (Header X-Debug-Token)"""
+    if not DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Debug endpoints disabled")
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=403, detail="DEBUG_TOKEN not configured")
+    if not x_debug_token or not secrets.compare_digest(x_debug_token, DEBUG_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid debug token")
+
+@app.get("/debug/profile", operation_id="get_cpu_profile", tags=["debug"])
+async def debug_profile(seconds: int = 10, format: str = "speedscope", interval_ms: int = 5,
+                        _: None = Depends(require_debug_access)):
+    """Sampling-CPU-Profil der Event-Loop über N Sekunden (speedscope oder collapsed)"""
+    global _profile_running
+
+    if seconds < 1 or seconds > 120:
+        raise HTTPException(status_code=400, detail="seconds must be between 1 and 120")
+    if interval_ms < 1 or interval_ms > 100:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 100")
+    if format not in ("speedscope", "collapsed"):
+        raise HTTPException(status_code=400, detail="format must be 'speedscope' or 'collapsed'")
+    if _profile_running:
+        raise HTTPException(status_code=409, detail="Profile already running")
+
+    _profile_running = True
+    profiler = SamplingProfiler(threading.get_ident(), interval_ms / 1000)
+    try:
+        print(f"🔬 CPU-Profil gestartet ({seconds}s, {interval_ms}ms Intervall)", flush=True)
+        profiler.start()
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+        _profile_running = False
+
+    print(f"🔬 CPU-Profil beendet: {profiler.samples} Samples, {len(profiler.stacks)} Stacks", flush=True)
+    if format == "collapsed":
+        return PlainTextResponse(
+            content=profiler.to_collapsed(),
+            headers={"Content-Disposition": "attachment; filename=profile.collapsed.txt"}
+        )
+    return JSONResponse(
+        content=profiler.to_speedscope(),
+        headers={"Content-Disposition": "attachment; filename=profile.speedscope.json"}
+    )
+
+@app.post("/debug/memory/tracing", operation_id="set_memory_tracing", tags=["debug"])
+async def debug_memory_tracing(enabled: bool, frames: int = 1, _: None = Depends(require_debug_access)):
+    """Startet/stoppt tracemalloc zur Laufzeit (kostet nur solange aktiv)"""
+    global _memory_baseline
+
+    if frames < 1 or frames > 50:
+        raise HTTPException(status_code=400, detail="frames must be between 1 and 50")
+
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        print(f"🧠 tracemalloc gestartet ({frames} Frames)", flush=True)
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+        _memory_baseline = None
+        print("🧠 tracemalloc gestoppt", flush=True)
+
+    return {"tracing": tracemalloc.is_tracing(), "frames": tracemalloc.get_traceback_limit()}
+
+def build_memory_report(snapshot, baseline, group_by, limit):
+    """Top-Allokationen oder Diff gegen die letzte Baseline"""
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+    if baseline is not None:
+        stats = snapshot.compare_to(baseline, group_by)
+        entries = [{
+            "location": str(stat.traceback),
+            "size_bytes": stat.size,
+            "size_diff_bytes": stat.size_diff,
+            "count": stat.count,
+            "count_diff": stat.count_diff,
+        } for stat in stats[:limit]]
+    else:
+        stats = snapshot.statistics(group_by)
+        entries = [{
+            "location": str(stat.traceback),
+            "size_bytes": stat.size,
+            "count": stat.count,
+        } for stat in stats[:limit]]
+    return snapshot, entries
+
+@app.get("/debug/memory", operation_id="get_memory_profile", tags=["debug"])
+async def debug_memory(limit: int = 25, group_by: str = "lineno", diff: bool = False,
+                       _: None = Depends(require_debug_access)):
+    """tracemalloc Top-Allokationen nach Datei/Zeile, optional als Diff zur letzten Abfrage"""
+    global _memory_baseline
+
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be 'lineno', 'filename' or 'traceback'")
+    if not tracemalloc.is_tracing():
+        return {
+            "tracing": False,
+            "message": "tracemalloc ist aus - aktivieren mit POST /debug/memory/tracing?enabled=true"
+        }
+
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    baseline = _memory_baseline if diff else None
+    # Statistik-Berechnung kann dauern - außerhalb der Event-Loop
+    snapshot, entries = await asyncio.to_thread(build_memory_report, snapshot, baseline, group_by, limit)
+    _memory_baseline = snapshot
+
+    return {
+        "tracing": True,
+        "traced_current_bytes": current,
+        "traced_peak_bytes": peak,
+        "group_by": group_by,
+        "diff": baseline is not None,
+        "top": entries,
+    }
+
+@app.get("/debug/memory/structures", operation_id="get_memory_structures", tags=["debug"])
+async def debug_memory_structures(_: None = Depends(require_debug_access)):
+    """Geschätzter Speicherverbrauch je In-Memory-Struktur (inkl. Bytes pro Coin)"""
+    if not _unified_instance:
+        raise HTTPException(status_code=503, detail="Service not running")
+
+    return JSONResponse(
+        content=await _unified_instance.estimate_memory_structures(),
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+            "Access-Control-Allow-Headers": "*",
+        }
+    )
+
 @app.post("/reload-config", response_model=ConfigReloadResponse, operation_id="reload_config")
 async def reload_config():
     """Lädt die Konfiguration und Phasen neu"""
     try:
         load_config_from_file()
-        # Phasen-Konfiguration auch neu laden
+        # Phasen-Konfiguration auch neu laden (bzw. Engine im eigenen Prozess benachrichtigen)
         if _unified_instance:
-            await _unified_instance.reload_phases_config()
+            await reload_engine_phases()
+        elif PROCESS_ROLE == "api":
+            await notify_engine("reload_config")
         print("🔄 Konfiguration und Phasen neu geladen!", flush=True)
 
         response = ConfigReloadResponse(
@@ -835,6 +2467,7 @@ def update_global_config(updates: Dict[str, Any]):
     """Aktualisiert die globalen Konfigurationsvariablen"""
     global N8N_WEBHOOK_URL, N8N_WEBHOOK_METHOD, DB_DSN, COIN_CACHE_SECONDS
     global DB_REFRESH_INTERVAL, BATCH_SIZE, BATCH_TIMEOUT, BAD_NAMES_PATTERN, SPAM_BURST_WINDOW
+    global _force_db_reconnect
 
     # Aktualisiere globale Variablen
     if "N8N_WEBHOOK_URL" in updates:
@@ -843,6 +2476,9 @@ def update_global_config(updates: Dict[str, Any]):
         N8N_WEBHOOK_METHOD = updates["N8N_WEBHOOK_METHOD"]
     if "DB_DSN" in updates:
         DB_DSN = updates["DB_DSN"]
+        # Service-Pool beim nächsten Stream-Sync neu aufbauen (API-Prozess: run_api_state), Listener folgen der DSN
+        print("🔄 DB-DSN geändert - forciere DB-Reconnect beim nächsten Check...", flush=True)
+        _force_db_reconnect = True
     if "COIN_CACHE_SECONDS" in updates:
         COIN_CACHE_SECONDS = int(updates["COIN_CACHE_SECONDS"])
     if "DB_REFRESH_INTERVAL" in updates:
@@ -860,7 +2496,57 @@ def update_global_config(updates: Dict[str, Any]):
     if "SPAM_BURST_WINDOW" in updates:
         global SPAM_BURST_WINDOW
         SPAM_BURST_WINDOW = int(updates["SPAM_BURST_WINDOW"])
-        # Filter-Konfiguration wird bei Bedarf automatisch aktualisiert
+        if _unified_instance:
+            _unified_instance.coin_filter.spam_burst_window = SPAM_BURST_WINDOW
+    # Filter-Stufen lesen ihre Schwellwerte bei jeder Prüfung - keine weitere Aktualisierung nötig
+    global FILTER_MIN_INITIAL_BUY_SOL, FILTER_MIN_SOCIAL_COUNT, FILTER_CREATOR_MAX_COINS
+    global FILTER_IMAGE_DUPLICATES, FILTER_HISTORY_WINDOW, FILTER_AUTO_REORDER
+    if "FILTER_MIN_INITIAL_BUY_SOL" in updates:
+        FILTER_MIN_INITIAL_BUY_SOL = float(updates["FILTER_MIN_INITIAL_BUY_SOL"])
+    if "FILTER_MIN_SOCIAL_COUNT" in updates:
+        FILTER_MIN_SOCIAL_COUNT = int(updates["FILTER_MIN_SOCIAL_COUNT"])
+    if "FILTER_CREATOR_MAX_COINS" in updates:
+        FILTER_CREATOR_MAX_COINS = int(updates["FILTER_CREATOR_MAX_COINS"])
+    if "FILTER_IMAGE_DUPLICATES" in updates:
+        FILTER_IMAGE_DUPLICATES = str(updates["FILTER_IMAGE_DUPLICATES"]).lower() in ("1", "true", "yes")
+    if "FILTER_HISTORY_WINDOW" in updates:
+        FILTER_HISTORY_WINDOW = int(updates["FILTER_HISTORY_WINDOW"])
+    if "FILTER_AUTO_REORDER" in updates:
+        FILTER_AUTO_REORDER = str(updates["FILTER_AUTO_REORDER"]).lower() in ("1", "true", "yes")
+    global N8N_GZIP, N8N_MAX_PAYLOAD_BYTES, N8N_FIELDS
+    if "N8N_GZIP" in updates:
+        N8N_GZIP = str(updates["N8N_GZIP"]).lower() in ("1", "true", "yes")
+    if "N8N_MAX_PAYLOAD_BYTES" in updates:
+        N8N_MAX_PAYLOAD_BYTES = int(updates["N8N_MAX_PAYLOAD_BYTES"])
+    if "N8N_FIELDS" in updates:
+        N8N_FIELDS = updates["N8N_FIELDS"]
+    # Aktivierungsregeln werden bei jedem Persistenz-Batch gelesen
+    global DIRECT_PERSISTENCE, ACTIVATION_MIN_SOCIAL_COUNT, ACTIVATION_MIN_INITIAL_BUY_SOL, ACTIVATION_MIN_MARKET_CAP_SOL
+    if "DIRECT_PERSISTENCE" in updates:
+        DIRECT_PERSISTENCE = str(updates["DIRECT_PERSISTENCE"]).lower() in ("1", "true", "yes")
+    if "ACTIVATION_MIN_SOCIAL_COUNT" in updates:
+        ACTIVATION_MIN_SOCIAL_COUNT = int(updates["ACTIVATION_MIN_SOCIAL_COUNT"])
+    if "ACTIVATION_MIN_INITIAL_BUY_SOL" in updates:
+        ACTIVATION_MIN_INITIAL_BUY_SOL = float(updates["ACTIVATION_MIN_INITIAL_BUY_SOL"])
+    if "ACTIVATION_MIN_MARKET_CAP_SOL" in updates:
+        ACTIVATION_MIN_MARKET_CAP_SOL = float(updates["ACTIVATION_MIN_MARKET_CAP_SOL"])
+    if "STREAM_RECONCILE_INTERVAL" in updates:
+        global STREAM_RECONCILE_INTERVAL
+        STREAM_RECONCILE_INTERVAL = int(updates["STREAM_RECONCILE_INTERVAL"])
+    if "SHARD_WORKERS" in updates:
+        # Laufender Koordinator verteilt sofort um; Wechsel von/zu 0 erst nach Neustart
+        global SHARD_WORKERS
+        SHARD_WORKERS = int(updates["SHARD_WORKERS"])
+        if _unified_instance and _unified_instance.shards:
+            _unified_instance.shards.scale(SHARD_WORKERS)
+    if "SLOW_CALLBACK_THRESHOLD_MS" in updates:
+        global SLOW_CALLBACK_THRESHOLD_MS
+        SLOW_CALLBACK_THRESHOLD_MS = int(updates["SLOW_CALLBACK_THRESHOLD_MS"])
+        if _loop_monitor:
+            _loop_monitor.set_threshold(SLOW_CALLBACK_THRESHOLD_MS)
+    if "DEBUG_ENDPOINTS_ENABLED" in updates:
+        global DEBUG_ENDPOINTS_ENABLED
+        DEBUG_ENDPOINTS_ENABLED = str(updates["DEBUG_ENDPOINTS_ENABLED"]).lower() in ("1", "true", "yes")
 
 def save_config_to_env(updates: Dict[str, Any]) -> bool:
     """Speichert Konfigurationsänderungen in die .env Datei"""
@@ -971,6 +2657,102 @@ async def update_config(config_update: ConfigUpdateRequest, response: Response):
             updates["SPAM_BURST_WINDOW"] = str(config_update.spam_burst_window)
             updated_fields.append("spam_burst_window")
 
+        if config_update.slow_callback_threshold_ms is not None:
+            if config_update.slow_callback_threshold_ms < 10 or config_update.slow_callback_threshold_ms > 10000:
+                raise HTTPException(status_code=400, detail="slow_callback_threshold_ms must be between 10 and 10000")
+            updates["SLOW_CALLBACK_THRESHOLD_MS"] = str(config_update.slow_callback_threshold_ms)
+            updated_fields.append("slow_callback_threshold_ms")
+
+        if config_update.debug_endpoints_enabled is not None:
+            updates["DEBUG_ENDPOINTS_ENABLED"] = "true" if config_update.debug_endpoints_enabled else "false"
+            updated_fields.append("debug_endpoints_enabled")
+
+        # Filter-Pipeline (0 = Stufe aus)
+        if config_update.filter_min_initial_buy_sol is not None:
+            if config_update.filter_min_initial_buy_sol < 0 or config_update.filter_min_initial_buy_sol > 100:
+                raise HTTPException(status_code=400, detail="filter_min_initial_buy_sol must be between 0 and 100")
+            updates["FILTER_MIN_INITIAL_BUY_SOL"] = str(config_update.filter_min_initial_buy_sol)
+            updated_fields.append("filter_min_initial_buy_sol")
+
+        if config_update.filter_min_social_count is not None:
+            if config_update.filter_min_social_count < 0 or config_update.filter_min_social_count > 4:
+                raise HTTPException(status_code=400, detail="filter_min_social_count must be between 0 and 4")
+            updates["FILTER_MIN_SOCIAL_COUNT"] = str(config_update.filter_min_social_count)
+            updated_fields.append("filter_min_social_count")
+
+        if config_update.filter_creator_max_coins is not None:
+            if config_update.filter_creator_max_coins < 0 or config_update.filter_creator_max_coins > 1000:
+                raise HTTPException(status_code=400, detail="filter_creator_max_coins must be between 0 and 1000")
+            updates["FILTER_CREATOR_MAX_COINS"] = str(config_update.filter_creator_max_coins)
+            updated_fields.append("filter_creator_max_coins")
+
+        if config_update.filter_image_duplicates is not None:
+            updates["FILTER_IMAGE_DUPLICATES"] = "true" if config_update.filter_image_duplicates else "false"
+            updated_fields.append("filter_image_duplicates")
+
+        if config_update.filter_history_window is not None:
+            if config_update.filter_history_window < 60 or config_update.filter_history_window > 86400:
+                raise HTTPException(status_code=400, detail="filter_history_window must be between 60 and 86400 seconds")
+            updates["FILTER_HISTORY_WINDOW"] = str(config_update.filter_history_window)
+            updated_fields.append("filter_history_window")
+
+        if config_update.filter_auto_reorder is not None:
+            updates["FILTER_AUTO_REORDER"] = "true" if config_update.filter_auto_reorder else "false"
+            updated_fields.append("filter_auto_reorder")
+
+        # n8n-Payload
+        if config_update.n8n_gzip is not None:
+            updates["N8N_GZIP"] = "true" if config_update.n8n_gzip else "false"
+            updated_fields.append("n8n_gzip")
+
+        if config_update.n8n_max_payload_bytes is not None:
+            if config_update.n8n_max_payload_bytes < 4096 or config_update.n8n_max_payload_bytes > 10485760:
+                raise HTTPException(status_code=400, detail="n8n_max_payload_bytes must be between 4096 and 10485760")
+            updates["N8N_MAX_PAYLOAD_BYTES"] = str(config_update.n8n_max_payload_bytes)
+            updated_fields.append("n8n_max_payload_bytes")
+
+        if config_update.n8n_fields is not None:
+            # Leerer String = alle Felder senden
+            updates["N8N_FIELDS"] = ",".join(f.strip() for f in config_update.n8n_fields.split(",") if f.strip())
+            updated_fields.append("n8n_fields")
+
+        # Direkte Persistenz & lokale Aktivierungsregeln
+        if config_update.direct_persistence is not None:
+            updates["DIRECT_PERSISTENCE"] = "true" if config_update.direct_persistence else "false"
+            updated_fields.append("direct_persistence")
+
+        if config_update.activation_min_social_count is not None:
+            if config_update.activation_min_social_count < 0 or config_update.activation_min_social_count > 4:
+                raise HTTPException(status_code=400, detail="activation_min_social_count must be between 0 and 4")
+            updates["ACTIVATION_MIN_SOCIAL_COUNT"] = str(config_update.activation_min_social_count)
+            updated_fields.append("activation_min_social_count")
+
+        if config_update.activation_min_initial_buy_sol is not None:
+            if config_update.activation_min_initial_buy_sol < 0:
+                raise HTTPException(status_code=400, detail="activation_min_initial_buy_sol must be >= 0")
+            updates["ACTIVATION_MIN_INITIAL_BUY_SOL"] = str(config_update.activation_min_initial_buy_sol)
+            updated_fields.append("activation_min_initial_buy_sol")
+
+        if config_update.activation_min_market_cap_sol is not None:
+            if config_update.activation_min_market_cap_sol < 0:
+                raise HTTPException(status_code=400, detail="activation_min_market_cap_sol must be >= 0")
+            updates["ACTIVATION_MIN_MARKET_CAP_SOL"] = str(config_update.activation_min_market_cap_sol)
+            updated_fields.append("activation_min_market_cap_sol")
+
+        if config_update.stream_reconcile_interval is not None:
+            if config_update.stream_reconcile_interval < 10 or config_update.stream_reconcile_interval > 3600:
+                raise HTTPException(status_code=400, detail="stream_reconcile_interval must be between 10 and 3600 seconds")
+            updates["STREAM_RECONCILE_INTERVAL"] = str(config_update.stream_reconcile_interval)
+            updated_fields.append("stream_reconcile_interval")
+
+        if config_update.shard_workers is not None:
+            if config_update.shard_workers < 0 or config_update.shard_workers > 32:
+                raise HTTPException(status_code=400, detail="shard_workers must be between 0 and 32")
+            if _unified_instance and _unified_instance.shards and config_update.shard_workers < 1:
+                raise HTTPException(status_code=400, detail="shard_workers=0 requires a restart while sharding is running")
+            updates["SHARD_WORKERS"] = str(config_update.shard_workers)
+            updated_fields.append("shard_workers")
+
         if not updates:
             raise HTTPException(status_code=400, detail="No valid configuration fields provided")
 
@@ -981,14 +2763,12 @@ async def update_config(config_update: ConfigUpdateRequest, response: Response):
             print(f"⚠️ Config-Datei konnte nicht gespeichert werden: {e} - Setze nur Runtime-Konfiguration", flush=True)
 
         # Aktualisiere globale Variablen
+        if PROCESS_ROLE == "api":
+            # Engine und die übrigen API-Worker laufen in eigenen Prozessen - Änderungen dorthin weiterreichen
+            # (noch über den alten Pool, die Listener hängen an der alten DSN)
+            await notify_engine("update_config", updates=updates)
         update_global_config(updates)
 
-        # Spezielle Behandlung für DB-DSN Änderung
-        global _force_db_reconnect
-        if "DB_DSN" in updates:
-            print("🔄 DB-DSN geändert - forciere DB-Reconnect beim nächsten Check...")
-            _force_db_reconnect = True
-
         # Erstelle Response
         config_response = ConfigUpdateResponse(
             status="success",
@@ -1037,12 +2817,50 @@ async def get_current_config(response: Response):
     """Zeigt die aktuelle Konfiguration an"""
     try:
         global BATCH_TIMEOUT  # Sicherstellen, dass die Variable verfügbar ist
+        # Laufzeit-Zustand: eigener Service oder (PROCESS_ROLE=api) Snapshot der Engine
+        runtime = None
+        snapshot_age = None
+        if _unified_instance:
+            runtime = _unified_instance.get_runtime_stats()
+        elif _engine_state:
+            snapshot = engine_snapshot()
+            if snapshot:
+                runtime = snapshot["runtime"]
+                snapshot_age = round(time.time() - snapshot["published_at"], 2)
+        runtime = runtime or {"n8n_sender": {}, "n8n_dead_letter": None, "stream_listener_connected": False,
+                              "maintenance_jobs": {}, "shards": None, "replica": None, "persist_pending": 0,
+                              "filter_pipeline": [], "warm_state": None, "resubscribe": None}
         config = {
             "n8n_webhook_url": N8N_WEBHOOK_URL,
             "n8n_webhook_method": N8N_WEBHOOK_METHOD,
+            "n8n_max_retries": N8N_MAX_RETRIES,
+            "n8n_max_in_flight": N8N_MAX_IN_FLIGHT,
+            "n8n_queue_size": N8N_QUEUE_SIZE,
+            "n8n_gzip": N8N_GZIP,
+            "n8n_max_payload_bytes": N8N_MAX_PAYLOAD_BYTES,
+            "n8n_fields": N8N_FIELDS,
+            "n8n_sender": runtime["n8n_sender"],
+            "n8n_dead_letter": runtime["n8n_dead_letter"],
             "db_dsn": DB_DSN.replace(DB_DSN.split('@')[0].split(':')[-1], "***") if '@' in DB_DSN else "***",  # Passwort verstecken
             "coin_cache_seconds": COIN_CACHE_SECONDS,
             "db_refresh_interval": DB_REFRESH_INTERVAL,
+            "stream_notify_enabled": STREAM_NOTIFY_ENABLED,
+            "stream_reconcile_interval": STREAM_RECONCILE_INTERVAL,
+            "stream_listener_connected": runtime["stream_listener_connected"],
+            "maintenance_jobs": runtime["maintenance_jobs"],
+            "shard_workers": SHARD_WORKERS,
+            "shards": runtime["shards"],
+            "shard_feed": SHARD_FEED,
+            "replica_mode": REPLICA_MODE,
+            "replica": runtime["replica"],
+            "process_role": PROCESS_ROLE,
+            "state_snapshot_interval": STATE_SNAPSHOT_INTERVAL,
+            "state_snapshot_age": snapshot_age,
+            "warm_restart_file": WARM_RESTART_FILE,
+            "resubscribe_chunk_size": RESUBSCRIBE_CHUNK_SIZE,
+            "resubscribe_interval": RESUBSCRIBE_INTERVAL,
+            "resubscribe": runtime["resubscribe"],
+            "warm_state": runtime["warm_state"],
             "batch_size": BATCH_SIZE,
             "batch_timeout": BATCH_TIMEOUT,
             "bad_names_pattern": "test|bot|rug|scam|cant|honey|faucet",  # Standardwerte
@@ -1051,7 +2869,23 @@ async def get_current_config(response: Response):
             "whale_threshold_sol": WHALE_THRESHOLD_SOL,
             "age_calculation_offset_min": AGE_CALCULATION_OFFSET_MIN,
             "trade_buffer_seconds": TRADE_BUFFER_SECONDS,
-            "ath_flush_interval": ATH_FLUSH_INTERVAL
+            "ath_flush_interval": ATH_FLUSH_INTERVAL,
+            "slow_callback_threshold_ms": SLOW_CALLBACK_THRESHOLD_MS,
+            "debug_endpoints_enabled": DEBUG_ENDPOINTS_ENABLED,
+            "filter_min_initial_buy_sol": FILTER_MIN_INITIAL_BUY_SOL,
+            "filter_min_social_count": FILTER_MIN_SOCIAL_COUNT,
+            "filter_creator_max_coins": FILTER_CREATOR_MAX_COINS,
+            "filter_image_duplicates": FILTER_IMAGE_DUPLICATES,
+            "filter_history_window": FILTER_HISTORY_WINDOW,
+            "filter_auto_reorder": FILTER_AUTO_REORDER,
+            "direct_persistence": DIRECT_PERSISTENCE,
+            "persist_flush_interval": PERSIST_FLUSH_INTERVAL,
+            "persist_batch_size": PERSIST_BATCH_SIZE,
+            "persist_pending": runtime["persist_pending"],
+            "activation_min_social_count": ACTIVATION_MIN_SOCIAL_COUNT,
+            "activation_min_initial_buy_sol": ACTIVATION_MIN_INITIAL_BUY_SOL,
+            "activation_min_market_cap_sol": ACTIVATION_MIN_MARKET_CAP_SOL,
+            "filter_pipeline": runtime["filter_pipeline"]
         }
 
         # CORS-Header für UI-Zugriff
@@ -1071,10 +2905,10 @@ async def get_current_config(response: Response):
 async def get_phases():
     """Gibt alle Phasen aus der ref_coin_phases Tabelle zurück"""
     try:
-        if not _unified_instance or not _unified_instance.pool:
+        if not db_pool():
             raise HTTPException(status_code=503, detail="Database not connected")
 
-        rows = await _unified_instance.pool.fetch("SELECT * FROM ref_coin_phases ORDER BY id ASC")
+        rows = await db_pool().fetch("SELECT * FROM ref_coin_phases ORDER BY id ASC")
         phases = [dict(row) for row in rows]
 
         return {
@@ -1089,7 +2923,7 @@ async def get_phases():
 async def update_phase(phase_id: int, phase_data: PhaseUpdateRequest):
     """Aktualisiert eine Phase und lädt Konfiguration für aktive Streams neu"""
     try:
-        if not _unified_instance or not _unified_instance.pool:
+        if not db_pool():
             raise HTTPException(status_code=503, detail="Database not connected")
 
         # System-Phasen (99, 100) sind nicht editierbar
@@ -1101,7 +2935,7 @@ async def update_phase(phase_id: int, phase_data: PhaseUpdateRequest):
             raise HTTPException(status_code=400, detail="interval_seconds muss mindestens 1 sein")
 
         # Aktuelle Phase laden für Validierung
-        current = await _unified_instance.pool.fetchrow(
+        current = await db_pool().fetchrow(
             "SELECT * FROM ref_coin_phases WHERE id = $1", phase_id
         )
         if not current:
@@ -1118,17 +2952,17 @@ async def update_phase(phase_id: int, phase_data: PhaseUpdateRequest):
             raise HTTPException(status_code=400, detail="max_age_minutes muss größer als min_age_minutes sein")
 
         # Update in Datenbank
-        await _unified_instance.pool.execute("""
+        await db_pool().execute("""
             UPDATE ref_coin_phases
             SET name = $1, interval_seconds = $2, min_age_minutes = $3, max_age_minutes = $4
             WHERE id = $5
         """, new_name, new_interval, new_min_age, new_max_age, phase_id)
 
         # Phasen-Konfiguration im Service neu laden und aktive Streams aktualisieren
-        updated_streams = await _unified_instance.reload_phases_config()
+        updated_streams = await reload_engine_phases()
 
         # Aktualisierte Phase laden
-        updated = await _unified_instance.pool.fetchrow(
+        updated = await db_pool().fetchrow(
             "SELECT * FROM ref_coin_phases WHERE id = $1", phase_id
         )
 
@@ -1152,7 +2986,7 @@ async def update_phase(phase_id: int, phase_data: PhaseUpdateRequest):
 async def create_phase(phase_data: PhaseCreateRequest):
     """Erstellt eine neue Phase zwischen den bestehenden Phasen"""
     try:
-        if not _unified_instance or not _unified_instance.pool:
+        if not db_pool():
             raise HTTPException(status_code=503, detail="Database not connected")
 
         # Validierung
@@ -1166,7 +3000,7 @@ async def create_phase(phase_data: PhaseCreateRequest):
             raise HTTPException(status_code=400, detail="min_age_minutes darf nicht negativ sein")
 
         # Nächste freie ID finden (zwischen 1 und 98)
-        existing_ids = await _unified_instance.pool.fetch(
+        existing_ids = await db_pool().fetch(
             "SELECT id FROM ref_coin_phases WHERE id < 99 ORDER BY id"
         )
         used_ids = {row['id'] for row in existing_ids}
@@ -1182,16 +3016,16 @@ async def create_phase(phase_data: PhaseCreateRequest):
             raise HTTPException(status_code=400, detail="Maximale Anzahl an Phasen erreicht (98)")
 
         # Phase einfügen
-        await _unified_instance.pool.execute("""
+        await db_pool().execute("""
             INSERT INTO ref_coin_phases (id, name, interval_seconds, min_age_minutes, max_age_minutes)
             VALUES ($1, $2, $3, $4, $5)
         """, new_id, phase_data.name, phase_data.interval_seconds, phase_data.min_age_minutes, phase_data.max_age_minutes)
 
         # Phasen-Konfiguration im Service neu laden
-        await _unified_instance.reload_phases_config()
+        await reload_engine_phases()
 
         # Neue Phase laden
-        new_phase = await _unified_instance.pool.fetchrow(
+        new_phase = await db_pool().fetchrow(
             "SELECT * FROM ref_coin_phases WHERE id = $1", new_id
         )
 
@@ -1214,7 +3048,7 @@ async def create_phase(phase_data: PhaseCreateRequest):
 async def delete_phase(phase_id: int):
     """Löscht eine Phase und verschiebt betroffene Streams zur nächsten Phase"""
     try:
-        if not _unified_instance or not _unified_instance.pool:
+        if not db_pool():
             raise HTTPException(status_code=503, detail="Database not connected")
 
         # System-Phasen (99, 100) können nicht gelöscht werden
@@ -1222,14 +3056,14 @@ async def delete_phase(phase_id: int):
             raise HTTPException(status_code=400, detail="System-Phasen (99, 100) können nicht gelöscht werden")
 
         # Prüfen ob Phase existiert
-        phase = await _unified_instance.pool.fetchrow(
+        phase = await db_pool().fetchrow(
             "SELECT * FROM ref_coin_phases WHERE id = $1", phase_id
         )
         if not phase:
             raise HTTPException(status_code=404, detail=f"Phase {phase_id} nicht gefunden")
 
         # Zähle wie viele reguläre Phasen noch existieren würden
-        remaining_count = await _unified_instance.pool.fetchval(
+        remaining_count = await db_pool().fetchval(
             "SELECT COUNT(*) FROM ref_coin_phases WHERE id < 99 AND id != $1", phase_id
         )
         if remaining_count < 1:
@@ -1237,7 +3071,7 @@ async def delete_phase(phase_id: int):
 
         # Finde die nächste Phase für betroffene Streams
         # Bevorzuge die nächsthöhere Phase, sonst nimm Phase 99 (Finished)
-        next_phase = await _unified_instance.pool.fetchrow("""
+        next_phase = await db_pool().fetchrow("""
             SELECT id FROM ref_coin_phases
             WHERE id > $1 AND id < 99
             ORDER BY id ASC
@@ -1247,26 +3081,26 @@ async def delete_phase(phase_id: int):
         target_phase_id = next_phase['id'] if next_phase else 99
 
         # Zähle betroffene aktive Streams
-        affected_count = await _unified_instance.pool.fetchval(
+        affected_count = await db_pool().fetchval(
             "SELECT COUNT(*) FROM coin_streams WHERE current_phase_id = $1 AND is_active = true",
             phase_id
         )
 
         # Verschiebe betroffene Streams zur nächsten Phase
         if affected_count > 0:
-            await _unified_instance.pool.execute("""
+            await db_pool().execute("""
                 UPDATE coin_streams
                 SET current_phase_id = $1
                 WHERE current_phase_id = $2 AND is_active = true
             """, target_phase_id, phase_id)
 
         # Phase aus der Datenbank löschen
-        await _unified_instance.pool.execute(
+        await db_pool().execute(
             "DELETE FROM ref_coin_phases WHERE id = $1", phase_id
         )
 
         # Phasen-Konfiguration im Service neu laden und aktive Streams aktualisieren
-        await _unified_instance.reload_phases_config()
+        await reload_engine_phases()
 
         print(f"✅ Phase {phase_id} '{phase['name']}' gelöscht, {affected_count} Streams zu Phase {target_phase_id} verschoben", flush=True)
 
@@ -1288,10 +3122,10 @@ async def delete_phase(phase_id: int):
 async def get_streams(limit: int = 50):
     """Gibt Streams aus der coin_streams Tabelle zurück"""
     try:
-        if not _unified_instance or not _unified_instance.pool:
+        if not db_pool():
             raise HTTPException(status_code=503, detail="Database not connected")
 
-        rows = await _unified_instance.pool.fetch("""
+        rows = await db_pool().fetch("""
             SELECT * FROM coin_streams
             ORDER BY id DESC
             LIMIT $1
@@ -1312,11 +3146,11 @@ async def get_streams(limit: int = 50):
 async def get_streams_stats():
     """Gibt Statistiken über Streams und Phasen zurück"""
     try:
-        if not _unified_instance or not _unified_instance.pool:
+        if not db_pool():
             raise HTTPException(status_code=503, detail="Database not connected")
 
         # Anzahl Streams pro Phase
-        phase_counts = await _unified_instance.pool.fetch("""
+        phase_counts = await db_pool().fetch("""
             SELECT current_phase_id, COUNT(*) as count
             FROM coin_streams
             GROUP BY current_phase_id
@@ -1324,10 +3158,10 @@ async def get_streams_stats():
         """)
 
         # Gesamtanzahl Streams
-        total_count = await _unified_instance.pool.fetchval("SELECT COUNT(*) FROM coin_streams")
+        total_count = await db_pool().fetchval("SELECT COUNT(*) FROM coin_streams")
 
         # Aktive Streams (nicht beendet)
-        active_count = await _unified_instance.pool.fetchval("""
+        active_count = await db_pool().fetchval("""
             SELECT COUNT(*) FROM coin_streams
             WHERE is_active = TRUE
         """)
@@ -1353,7 +3187,7 @@ async def get_recent_metrics(limit: int = 100, mint: Optional[str] = None):
     - mint: Optional - Filter nach spezifischem Token-Mint (z.B. für historische Daten eines Coins)
     """
     try:
-        if not _unified_instance or not _unified_instance.pool:
+        if not db_pool():
             raise HTTPException(status_code=503, detail="Database not connected")
 
         # Baue die Query dynamisch auf
@@ -1373,7 +3207,7 @@ async def get_recent_metrics(limit: int = 100, mint: Optional[str] = None):
             query += " ORDER BY timestamp DESC LIMIT $1"
             params.append(limit)
 
-        rows = await _unified_instance.pool.fetch(query, *params)
+        rows = await db_pool().fetch(query, *params)
 
         metrics = [dict(row) for row in rows]
 
@@ -1391,18 +3225,18 @@ async def get_recent_metrics(limit: int = 100, mint: Optional[str] = None):
 async def get_coin_detail(mint: str):
     """Gibt vollständige Coin-Daten zurück: Stammdaten, Stream, letzte Metriken und Live-Tracking"""
     try:
-        if not _unified_instance or not _unified_instance.pool:
+        if not db_pool():
             raise HTTPException(status_code=503, detail="Database not connected")
 
         # 1. Stammdaten aus discovered_coins
-        coin_row = await _unified_instance.pool.fetchrow(
+        coin_row = await db_pool().fetchrow(
             "SELECT * FROM discovered_coins WHERE token_address = $1", mint
         )
         if not coin_row:
             raise HTTPException(status_code=404, detail=f"Coin {mint} nicht gefunden")
 
         # 2. Stream-Daten mit Phase-Name
-        stream_row = await _unified_instance.pool.fetchrow("""
+        stream_row = await db_pool().fetchrow("""
             SELECT cs.*, rcp.name as phase_name
             FROM coin_streams cs
             LEFT JOIN ref_coin_phases rcp ON cs.current_phase_id = rcp.id
@@ -1410,41 +3244,20 @@ async def get_coin_detail(mint: str):
         """, mint)
 
         # 3. Letzte Metriken
-        metrics_row = await _unified_instance.pool.fetchrow(
+        metrics_row = await db_pool().fetchrow(
             "SELECT * FROM coin_metrics WHERE mint = $1 ORDER BY timestamp DESC LIMIT 1", mint
         )
 
-        # 4. Live-Tracking aus In-Memory-Daten
+        # 4. Live-Tracking aus In-Memory-Daten (im API-Prozess aus dem Engine-Snapshot)
         live_tracking = None
-        if mint in _unified_instance.watchlist:
-            entry = _unified_instance.watchlist[mint]
-            buf = entry["buffer"]
-            now_ts = time.time()
-
-            live_tracking = {
-                "price_open": buf["open"],
-                "price_high": buf["high"] if buf["high"] != -1 else None,
-                "price_low": buf["low"] if buf["low"] != float("inf") else None,
-                "price_close": buf["close"],
-                "volume_sol": buf["vol"],
-                "buy_volume_sol": buf["vol_buy"],
-                "sell_volume_sol": buf["vol_sell"],
-                "num_buys": buf["buys"],
-                "num_sells": buf["sells"],
-                "unique_wallets": len(buf["wallets"]),
-                "market_cap_sol": buf["mcap"],
-                "interval_seconds": entry["interval"],
-                "next_flush_seconds": round(entry["next_flush"] - now_ts, 1),
-            }
-        elif mint in _unified_instance.coin_cache.cache:
-            cache_entry = _unified_instance.coin_cache.cache[mint]
-            live_tracking = {
-                "status": "in_cache",
-                "discovered_at": cache_entry["discovered_at"],
-                "n8n_sent": cache_entry["n8n_sent"],
-                "activated": cache_entry["activated"],
-                "cached_trades": len(cache_entry["trades"]),
-            }
+        if _unified_instance:
+            live_tracking = _unified_instance.live_tracking(mint, time.time())
+        else:
+            snapshot = engine_snapshot()
+            if snapshot and mint in snapshot["coins"]:
+                live_tracking = dict(snapshot["coins"][mint])
+                if "next_flush_at" in live_tracking:
+                    live_tracking["next_flush_seconds"] = round(live_tracking.pop("next_flush_at") - time.time(), 1)
 
         return {
             "coin": dict(coin_row),
@@ -1488,13 +3301,68 @@ async def test_n8n_availability():
         n8n_available.set(0)
         print(f"⚠️ n8n Service nicht erreichbar: {str(e)[:50]}", flush=True)
 
-async def send_batch_to_n8n(batch):
-    """Sendet Batch an n8n (FastAPI-Version mit httpx)"""
+def n8n_backoff(attempt):
+    """Exponentieller Backoff mit Jitter für n8n-Retries (attempt ab 1)"""
+    delay = min(N8N_RETRY_DELAY * 2 ** (attempt - 1), N8N_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+N8N_ENVELOPE_BYTES = 200  # Reserve für source/count/timestamp im Payload
+
+def project_coin(coin, fields):
+    """Schlanke Projektion eines Coins für n8n (mint bleibt immer erhalten)"""
+    if not fields:
+        return coin
+    projected = {key: coin[key] for key in fields if key in coin}
+    projected["mint"] = coin.get("mint")
+    return projected
+
+def split_n8n_batch(batch):
+    """Projiziert Coins auf N8N_FIELDS und teilt den Batch nach Byte-Budget.
+
+    Das Budget gilt für den unkomprimierten JSON-Body (POST) bzw. die komplette URL (GET):
+    im GET-Modus zählen Webhook-URL, "?data=" und die kodierten Trennzeichen mit.
+    Ein einzelner Coin über dem Budget wird allein gesendet.
+    """
+    fields = [f.strip() for f in N8N_FIELDS.split(",") if f.strip()]
+    get_mode = N8N_WEBHOOK_METHOD == "GET"
+    if get_mode:
+        envelope = json.dumps({"source": "pump_find_backend", "count": len(batch),
+                               "timestamp": datetime.utcnow().isoformat(), "data": []})
+        budget = N8N_GET_MAX_URL_BYTES - len(f"{N8N_WEBHOOK_URL}?data=") - len(urllib.parse.quote(envelope))
+        separator = len(urllib.parse.quote(", "))
+    else:
+        budget = N8N_MAX_PAYLOAD_BYTES - N8N_ENVELOPE_BYTES
+        separator = 2
+
+    chunks, current, size = [], [], 0
+    for coin in batch:
+        coin = project_coin(coin, fields)
+        encoded = json.dumps(coin, default=str)
+        coin_size = (len(urllib.parse.quote(encoded)) if get_mode else len(encoded.encode("utf-8"))) + separator
+        if current and size + coin_size > budget:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(coin)
+        size += coin_size
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def send_batch_to_n8n(batch, client=None):
+    """Sendet Batch an n8n (FastAPI-Version mit httpx).
+
+    Mit client wird eine bestehende Verbindung (Keep-Alive) wiederverwendet,
+    ohne client wird ein temporärer Client erstellt.
+    """
     if not N8N_WEBHOOK_URL:
         print("❌ FEHLER: N8N_WEBHOOK_URL ist nicht gesetzt!", flush=True)
         return False
 
-    max_retries = 3
+    if client is None:
+        async with httpx.AsyncClient(timeout=15.0) as temp_client:
+            return await send_batch_to_n8n(batch, temp_client)
+
+    max_retries = max(1, N8N_MAX_RETRIES)
     retry_count = 0
 
     payload = {
@@ -1504,20 +3372,29 @@ async def send_batch_to_n8n(batch):
         "data": batch
     }
 
+    # Payload einmal serialisieren - Retries senden dieselben Bytes
+    json_data = json.dumps(payload, default=str)
+    headers = {"Content-Type": "application/json"}
+    if N8N_WEBHOOK_METHOD == "GET":
+        url_with_params = f"{N8N_WEBHOOK_URL}?data={urllib.parse.quote(json_data)}"
+        payload_size = len(url_with_params)
+    else:
+        body = json_data.encode("utf-8")
+        if N8N_GZIP:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        payload_size = len(body)
+    n8n_payload_bytes_per_coin.observe(payload_size / max(len(batch), 1))
+
     while retry_count < max_retries:
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                if N8N_WEBHOOK_METHOD == "GET":
-                    import urllib.parse
-                    json_data = json.dumps(payload)
-                    encoded_data = urllib.parse.quote(json_data)
-                    url_with_params = f"{N8N_WEBHOOK_URL}?data={encoded_data}"
-
-                    resp = await client.get(url_with_params)
-                else:
-                    resp = await client.post(N8N_WEBHOOK_URL, json=payload)
+            if N8N_WEBHOOK_METHOD == "GET":
+                resp = await client.get(url_with_params)
+            else:
+                resp = await client.post(N8N_WEBHOOK_URL, content=body, headers=headers)
+            n8n_payload_bytes.inc(payload_size)
 
-                status = resp.status_code
+            status = resp.status_code
 
             if status == 200:
                 print(f"📦 Paket ({len(batch)} Coins) an n8n übergeben! ✅", flush=True)
@@ -1560,85 +3437,1763 @@ async def send_batch_to_n8n(batch):
             return False
 
         if retry_count < max_retries:
-            await asyncio.sleep(N8N_RETRY_DELAY * retry_count)
+            await asyncio.sleep(n8n_backoff(retry_count))
 
         unified_status["n8n_available"] = False
         n8n_available.set(0)
     print("❌ n8n nicht erreichbar nach allen Versuchen", flush=True)
     return False
 
-# === UNIFIED SERVICE KLASSE ===
-class UnifiedService:
+class N8nSender:
     """
-    Vereinter Service für Pump-Discovery und Metric-Tracking
-    Verwendet nur 1 WebSocket-Verbindung
+    Hintergrund-Sender für n8n-Batches.
+    Die Receive-Loop legt Batches nur in eine begrenzte Queue; ein eigener Task liefert
+    sie über einen langlebigen httpx-Client (Keep-Alive) mit begrenzter Parallelität aus.
+    Retries und Backoff laufen ausschließlich hier und blockieren die Loop nie.
     """
 
-    def __init__(self):
-        # Datenbank
-        self.pool = None
-        self.phases_config = {}
-        self.sorted_phase_ids = []
+    def __init__(self, queue_size=100, max_in_flight=2, on_delivered=None, on_failed=None):
+        self.queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.max_in_flight = max(1, max_in_flight)
+        self.on_delivered = on_delivered  # Callback(batch) nach erfolgreicher Auslieferung
+        self.on_failed = on_failed  # Callback(batch) wenn alle Versuche fehlgeschlagen sind
+        self.client = None
+        self.in_flight = set()
+        self.slot_free = asyncio.Event()
+        self.consecutive_failures = 0
+        self.paused_until = 0.0
+        self.batches_delivered = 0
+        self.batches_failed = 0
+        self.cancelled_batches = []  # Beim Shutdown abgebrochene Auslieferungen
+
+    def ready(self, now=None):
+        """True wenn ein neuer Batch angenommen wird (Queue nicht voll, kein Backoff nach Fehlschlag)"""
+        now = now if now is not None else time.time()
+        return not self.queue.full() and now >= self.paused_until
+
+    def enqueue(self, batch):
+        """Legt Batch in die Queue ohne zu warten. False wenn die Queue voll ist."""
+        try:
+            self.queue.put_nowait(batch)
+        except asyncio.QueueFull:
+            n8n_errors.labels(type="queue_full").inc()
+            return False
+        n8n_queue_size.set(self.queue.qsize())
+        return True
 
-        # Cache-System (NEU)
-        self.coin_cache = CoinCache(COIN_CACHE_SECONDS)
-        self.coin_filter = CoinFilter(SPAM_BURST_WINDOW)
+    def get_client(self):
+        """Langlebiger Client - Verbindungen bleiben zwischen Batches offen"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=15.0,
+                limits=httpx.Limits(max_connections=self.max_in_flight,
+                                    max_keepalive_connections=self.max_in_flight)
+            )
+        return self.client
 
-        # Watchlist für aktive Coins
-        self.watchlist = {}  # {mint: entry}
-        self.subscribed_mints = set()
+    async def run(self):
+        """Sender-Task: nimmt Batches aus der Queue und startet bis zu max_in_flight Auslieferungen"""
+        try:
+            while True:
+                batch = await self.queue.get()
+                n8n_queue_size.set(self.queue.qsize())
+                while len(self.in_flight) >= self.max_in_flight:
+                    self.slot_free.clear()
+                    await self.slot_free.wait()
+                task = asyncio.create_task(self.deliver(batch))
+                self.in_flight.add(task)
+                task.add_done_callback(self.delivery_done)
+                n8n_in_flight.set(len(self.in_flight))
+        finally:
+            for task in list(self.in_flight):
+                task.cancel()
+            await self.close()
+
+    def delivery_done(self, task):
+        self.in_flight.discard(task)
+        n8n_in_flight.set(len(self.in_flight))
+        self.slot_free.set()
+
+    async def deliver(self, batch):
+        """Liefert einen Batch aus (Retries/Backoff in send_batch_to_n8n)"""
+        started = time.monotonic()
+        try:
+            success = await send_batch_to_n8n(batch, self.get_client())
+        except asyncio.CancelledError:
+            self.cancelled_batches.append(batch)
+            raise
+        n8n_send_duration.observe(time.monotonic() - started)
+
+        if success:
+            self.consecutive_failures = 0
+            self.paused_until = 0.0
+            self.batches_delivered += 1
+            if self.on_delivered:
+                self.on_delivered(batch)
+        else:
+            # Neue Batches erst nach Backoff annehmen, damit ein ausgefallenes n8n nicht gehämmert wird
+            self.consecutive_failures += 1
+            self.batches_failed += 1
+            self.paused_until = time.time() + n8n_backoff(self.consecutive_failures)
+            if self.on_failed:
+                result = self.on_failed(batch)
+                if asyncio.iscoroutine(result):
+                    await result
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def get_stats(self):
+        return {
+            "queued_batches": self.queue.qsize(),
+            "in_flight": len(self.in_flight),
+            "max_in_flight": self.max_in_flight,
+            "batches_delivered": self.batches_delivered,
+            "batches_failed": self.batches_failed,
+            "consecutive_failures": self.consecutive_failures,
+            "backoff_remaining_seconds": round(max(0.0, self.paused_until - time.time()), 1)
+        }
 
-        # Trade-Buffer für aktive Coins
-        self.trade_buffer = {}  # {mint: [(timestamp, trade_data), ...]}
-        self.last_buffer_cleanup = time.time()
+class DeadLetterQueue:
+    """
+    Persistente Dead-Letter-Queue für n8n-Batches.
+    Append-only JSONL-Datei (ein Coin pro Zeile) plus Cursor-Datei mit dem Byte-Offset
+    des ersten noch nicht ausgelieferten Eintrags. Mints sind in der Queue eindeutig.
+    Sobald der ausgelieferte Datei-Anfang compact_bytes erreicht, wird der offene Rest an den
+    Dateianfang kopiert - auch wenn die Queue unter Dauerlast nie ganz leer wird.
+    Dateizugriffe laufen in einem Thread, damit die Event-Loop nicht blockiert.
+    """
 
-        # ATH-Tracking
-        self.ath_cache = {}  # {mint: ath_price}
-        self.dirty_aths = set()
-        self.last_ath_flush = time.time()
+    def __init__(self, directory, max_age_seconds=86400, compact_bytes=1048576):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.queue_path = self.directory / "queue.jsonl"
+        self.cursor_path = self.directory / "cursor"
+        self.max_age = max_age_seconds
+        self.compact_bytes = compact_bytes
+        self.entries = deque()  # (enqueued_ts, mint) in Dateireihenfolge ab Cursor
+        self.pending_mints = set()
+        self.cursor = 0
+        self.file_size = 0
+        self.lock = asyncio.Lock()
+        self.load()
+
+    def load(self):
+        """Liest offene Einträge nach einem Neustart (unvollständige letzte Zeile wird abgeschnitten)"""
+        if self.cursor_path.exists():
+            try:
+                self.cursor = int(self.cursor_path.read_text().strip() or 0)
+            except ValueError:
+                self.cursor = 0
+        if not self.queue_path.exists():
+            self.cursor = 0
+            return
 
-        # Zombie-Coin Detection & Watchdog
-        self.last_trade_timestamps = {}  # {mint: timestamp}
-        self.subscription_watchdog = {}  # {mint: last_heartbeat}
-        self.stale_data_warnings = {}  # {mint: warning_count}
-        self.last_saved_signatures = {}  # {mint: last_saved_data_signature}
+        with open(self.queue_path, "rb+") as f:
+            f.seek(self.cursor)
+            position = self.cursor
+            for line in f:
+                if not line.endswith(b"\n"):
+                    f.truncate(position)
+                    break
+                position += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                mint = record["coin"].get("mint")
+                self.entries.append((record["ts"], mint))
+                self.pending_mints.add(mint)
+            self.file_size = position
 
-        # WebSocket Batching
-        self.pending_subscriptions = set()
-        self.batching_task = None
-        self.last_batch_flush = time.time()
+        if self.entries:
+            print(f"📮 Dead-Letter-Queue: {len(self.entries)} Coins aus {self.queue_path} geladen", flush=True)
+        self.update_metrics()
 
-        # Discovery-Buffer
-        self.discovery_buffer = []
-        self.last_discovery_flush = time.time()
+    async def append(self, coins):
+        """Hängt Coins an (bereits enthaltene Mints werden übersprungen). Returns: Anzahl neuer Coins"""
+        now = time.time()
+        lines = []
+        async with self.lock:
+            for coin in coins:
+                mint = coin.get("mint")
+                if mint in self.pending_mints:
+                    n8n_dlq_coins.labels(event="duplicate").inc()
+                    continue
+                self.pending_mints.add(mint)
+                self.entries.append((now, mint))
+                lines.append(json.dumps({"ts": now, "coin": coin}, default=str) + "\n")
+
+            if lines:
+                data = "".join(lines).encode("utf-8")
+                await asyncio.to_thread(self.write_data, self.queue_path, data)
+                self.file_size += len(data)
+                n8n_dlq_coins.labels(event="enqueued").inc(len(lines))
+                print(f"📮 {len(lines)} Coins in Dead-Letter-Queue verschoben ({len(self.entries)} gesamt)", flush=True)
+        self.update_metrics(now)
+        return len(lines)
+
+    async def read_batch(self, max_coins):
+        """Liest die nächsten Einträge ab Cursor.
 
-    # === DATENBANK METHODEN ===
-    async def init_db_connection(self):
-        """Datenbank-Verbindung aufbauen"""
-        while True:
-            try:
-                if self.pool:
-                    await self.pool.close()
+        Returns:
+            (coins, offset, count) - noch gültige Coins, Offset hinter dem letzten
+            gelesenen Eintrag und Anzahl gelesener Einträge (inkl. abgelaufener)
+        """
+        records, offset = await asyncio.to_thread(self.read_lines, self.queue_path, self.cursor, max_coins)
+        cutoff = time.time() - self.max_age
+        coins = [record["coin"] for record in records if record["ts"] >= cutoff]
+        expired = len(records) - len(coins)
+        if expired:
+            n8n_dlq_coins.labels(event="expired").inc(expired)
+            print(f"🗑️ {expired} abgelaufene Coins aus Dead-Letter-Queue verworfen", flush=True)
+        return coins, offset, len(records)
+
+    async def commit(self, offset, count):
+        """Bestätigt gelesene Einträge; leere Queue oder großer ausgelieferter Anfang wird kompaktiert"""
+        async with self.lock:
+            self.cursor = offset
+            for _ in range(min(count, len(self.entries))):
+                _, mint = self.entries.popleft()
+                self.pending_mints.discard(mint)
+
+            if self.cursor >= self.file_size:
+                await asyncio.to_thread(self.compact, self.queue_path, self.cursor_path)
+                self.cursor = 0
+                self.file_size = 0
+            elif self.cursor >= self.compact_bytes:
+                await asyncio.to_thread(self.compact_tail, self.queue_path, self.cursor_path, self.cursor)
+                self.file_size -= self.cursor
+                self.cursor = 0
+            else:
+                await asyncio.to_thread(self.write_cursor, self.cursor_path, self.cursor)
+        self.update_metrics()
 
-                self.pool = await asyncpg.create_pool(DB_DSN, min_size=1, max_size=10)
-                await check_and_create_schema(self.pool)
+    async def run(self, sender, batch_size, on_delivered=None):
+        """Hintergrund-Task: sendet die Queue rate-limitiert nach, sobald n8n wieder erreichbar ist"""
+        failures = 0
+        while True:
+            if not self.entries or not N8N_WEBHOOK_URL or not sender.ready():
+                self.update_metrics()
+                await asyncio.sleep(max(N8N_RETRY_DELAY, 1))
+                continue
 
-                # Phasen-Konfiguration laden
-                rows = await self.pool.fetch("SELECT * FROM ref_coin_phases ORDER BY id ASC")
-                self.phases_config = {}
-                for row in rows:
-                    self.phases_config[row["id"]] = {
-                        "interval": row["interval_seconds"],
-                        "max_age": row["max_age_minutes"],
-                        "name": row["name"]
-                    }
-                self.sorted_phase_ids = sorted(self.phases_config.keys())
+            coins, offset, count = await self.read_batch(max(1, batch_size))
+            delivered = True
+            for chunk in split_n8n_batch(coins):
+                if not await send_batch_to_n8n(chunk, sender.get_client()):
+                    delivered = False
+                    break
+            if not delivered:
+                # Bereits gesendete Teil-Batches werden erneut gesendet (at-least-once)
+                failures += 1
+                await asyncio.sleep(n8n_backoff(failures))
+                continue
 
-                print(f"✅ DB verbunden. Geladene Phasen: {self.sorted_phase_ids}", flush=True)
-                unified_status["db_connected"] = True
-                unified_status["last_error"] = None
-                db_connected.set(1)
-                return
+            failures = 0
+            await self.commit(offset, count)
+            if coins:
+                n8n_dlq_coins.labels(event="drained").inc(len(coins))
+                print(f"📮 {len(coins)} Coins aus Dead-Letter-Queue nachgesendet ({len(self.entries)} verbleibend)", flush=True)
+                if on_delivered:
+                    on_delivered(coins)
+                if N8N_DLQ_DRAIN_RATE > 0:
+                    await asyncio.sleep(len(coins) / N8N_DLQ_DRAIN_RATE)
+
+    def update_metrics(self, now=None):
+        now = now if now is not None else time.time()
+        n8n_dlq_size.set(len(self.entries))
+        n8n_dlq_bytes.set(self.file_size - self.cursor)
+        n8n_dlq_oldest_age.set(now - self.entries[0][0] if self.entries else 0)
+
+    def get_stats(self):
+        return {
+            "coins": len(self.entries),
+            "bytes": self.file_size - self.cursor,
+            "oldest_age_seconds": int(time.time() - self.entries[0][0]) if self.entries else 0,
+            "path": str(self.queue_path)
+        }
+
+    @staticmethod
+    def write_data(path, data):
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def read_lines(path, offset, max_lines):
+        records = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while len(records) < max_lines:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records, offset
+
+    @staticmethod
+    def write_cursor(path, cursor):
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(str(cursor))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def compact(cls, queue_path, cursor_path):
+        with open(queue_path, "wb"):
+            pass
+        cls.write_cursor(cursor_path, 0)
+
+    @classmethod
+    def compact_tail(cls, queue_path, cursor_path, cursor):
+        # Cursor zuerst auf 0: ein Absturz vor dem Austausch liefert nur erneut aus (at-least-once)
+        tmp_path = queue_path.with_suffix(".tmp")
+        with open(queue_path, "rb") as src, open(tmp_path, "wb") as dst:
+            src.seek(cursor)
+            shutil.copyfileobj(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        cls.write_cursor(cursor_path, 0)
+        os.replace(tmp_path, queue_path)
+
+# === WARM-RESTART ===
+WARM_STATE_MAGIC = b"PFWS"
+WARM_STATE_VERSION = 2  # Erhöhen, wenn sich der Aufbau des Zustands ändert (alte Snapshots werden ignoriert)
+WARM_STATE_HEADER = struct.Struct("<4sHBdIQ")  # Magic, Version, Flags, Zeitpunkt, CRC32 und Länge der Daten
+WARM_STATE_FLAGS_OFFSET = 6
+WARM_STATE_CLEAN = 0x01  # Beim regulären Beenden geschrieben - Trade-Buffer sind noch nicht gespeichert
+
+
+class WarmStateStore:
+    """
+    Snapshot-Datei für den Warm-Restart: Header plus zlib-komprimiertes Pickle des In-Memory-Zustands
+    (UnifiedService.export_warm_state). Geschrieben wird in eine temporäre Datei, die per os.replace
+    übernommen wird - ein Absturz beim Schreiben lässt den letzten vollständigen Snapshot stehen.
+    Die Datei schreibt und liest nur der Service selbst (Pickle - keine fremden Dateien einspielen).
+    Nur ein Snapshot vom regulären Beenden (WARM_STATE_CLEAN) liefert übernehmbare Trade-Buffer; das Flag
+    wird beim Laden gelöscht, damit ein Absturz danach dieselben Buffer nicht ein zweites Mal einspielt.
+    """
+
+    def __init__(self, path, max_age=300):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.saves = 0
+        self.last_saved = None
+        self.last_bytes = 0
+        self.restore_result = None
+        self.restored_coins = 0
+        self.clean = False  # Zuletzt geladener Snapshot stammt vom regulären Beenden
+
+    def write(self, payload, saved_at, clean=False):
+        """Komprimiert und schreibt einen Snapshot (läuft im Thread).
+
+        Returns:
+            Dateigröße in Bytes
+        """
+        data = zlib.compress(payload, 1)
+        flags = WARM_STATE_CLEAN if clean else 0
+        header = WARM_STATE_HEADER.pack(WARM_STATE_MAGIC, WARM_STATE_VERSION, flags, saved_at, zlib.crc32(data), len(data))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.saves += 1
+        self.last_saved = saved_at
+        self.last_bytes = len(header) + len(data)
+        return self.last_bytes
+
+    def load(self, now=None):
+        """Liest den Snapshot, wenn er vollständig und jünger als max_age ist.
+
+        Returns:
+            (Zustand, Alter in Sekunden) oder (None, None) - Grund steht in restore_result
+        """
+        now = now if now is not None else time.time()
+        state, age = None, None
+        self.clean = False
+        try:
+            with open(self.path, "rb") as f:
+                header = f.read(WARM_STATE_HEADER.size)
+                data = f.read()
+        except FileNotFoundError:
+            self.restore_result = "missing"
+        else:
+            if len(header) < WARM_STATE_HEADER.size:
+                self.restore_result = "invalid"
+            else:
+                magic, version, flags, saved_at, crc, length = WARM_STATE_HEADER.unpack(header)
+                age = max(now - saved_at, 0.0)
+                if magic != WARM_STATE_MAGIC or version != WARM_STATE_VERSION:
+                    self.restore_result = "invalid"
+                elif len(data) != length or zlib.crc32(data) != crc:
+                    self.restore_result = "invalid"
+                elif age > self.max_age:
+                    self.restore_result = "stale"
+                else:
+                    try:
+                        state = pickle.loads(zlib.decompress(data))
+                        self.restore_result = "restored"
+                    except Exception as e:
+                        print(f"⚠️ Warm-Restart-Snapshot nicht lesbar: {e}", flush=True)
+                        self.restore_result = "invalid"
+                    if state is not None and flags & WARM_STATE_CLEAN:
+                        self.clean = True
+                        self.consume_clean_flag()
+        warm_state_restores.labels(result=self.restore_result).inc()
+        return (state, age) if state is not None else (None, None)
+
+    def consume_clean_flag(self):
+        """Flag im Header löschen (die Prüfsumme deckt nur die Daten ab)"""
+        try:
+            with open(self.path, "r+b") as f:
+                f.seek(WARM_STATE_FLAGS_OFFSET)
+                f.write(bytes([0]))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"⚠️ Warm-Restart-Snapshot nicht als verbraucht markiert: {e}", flush=True)
+
+    def get_stats(self):
+        """Status für /config"""
+        return {
+            "path": str(self.path),
+            "saves": self.saves,
+            "last_saved_age_seconds": round(time.time() - self.last_saved, 1) if self.last_saved else None,
+            "last_bytes": self.last_bytes,
+            "restore_result": self.restore_result,
+            "restored_clean": self.clean,
+            "restored_coins": self.restored_coins,
+        }
+
+# === WARTUNGS-JOBS ===
+class MaintenanceJob:
+    """Wartungs-Job mit eigener Kadenz"""
+
+    def __init__(self, name, func, interval, timeout):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.timeout = timeout
+        self.next_run = 0.0
+        self.running = False
+        self.enabled = True
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.backoff_streak = 0  # Aufeinanderfolgende back_off-Läufe (Intervall wird je Lauf verdoppelt)
+        self.last_duration = None
+        self.last_error = None
+        self.last_result = None
+
+
+class MaintenanceScheduler:
+    """
+    Führt Wartungs-Jobs (Stream-Repair, Buffer-Cleanup, Orphan-Suche ...) unabhängig von der
+    Receive-Loop aus: Intervalle mit Jitter, nie zwei Läufe desselben Jobs gleichzeitig, Timeout pro Lauf.
+    Laufende Jobs werden beim Beenden des Schedulers abgebrochen.
+    """
+
+    def __init__(self, tick=1.0, jitter=0.1, max_backoff=32):
+        self.tick = tick
+        self.jitter = jitter
+        self.max_backoff = max_backoff  # Höchstens so viele Intervalle Pause nach back_off
+        self.jobs = {}
+        self.tasks = set()  # Laufende Job-Tasks (Referenz hält sie am Leben, Abbruch beim Beenden)
+
+    def add_job(self, name, func, interval, timeout=30, initial_delay=None):
+        """Registriert einen Job; func darf sync oder async sein.
+
+        Der Timeout gilt nur für async-Jobs. Sync-Jobs laufen direkt auf der Event-Loop (sie ändern
+        deren Zustand, ein Thread wäre nicht sicher und nicht abbrechbar) und müssen kurz bleiben -
+        eine Überschreitung wird nur gemeldet.
+        """
+        job = MaintenanceJob(name, func, interval, timeout)
+        now = time.time()
+        job.next_run = now + initial_delay if initial_delay is not None else self.next_time(job, now)
+        self.jobs[name] = job
+        return job
+
+    def disable(self, name, reason):
+        """Deaktiviert einen Job dauerhaft (z.B. fehlende DB-Funktion)"""
+        job = self.jobs.get(name)
+        if job and job.enabled:
+            job.enabled = False
+            job.last_error = reason
+            print(f"⏸️ Wartungs-Job {name} deaktiviert: {reason}", flush=True)
+
+    def back_off(self, name, reason):
+        """Aus einem Job-Lauf heraus: Voraussetzung fehlt noch (z.B. DB-Funktion vor der Migration).
+        Der Job bleibt aktiv, sein Intervall verdoppelt sich bis max_backoff und gilt wieder normal,
+        sobald ein Lauf ohne back_off endet."""
+        job = self.jobs.get(name)
+        if not job:
+            return
+        job.backoff_streak += 1
+        job.last_error = reason
+        delay = job.interval * self.backoff_factor(job)
+        print(f"⚠️ Wartungs-Job {name}: {reason} - nächster Versuch in ~{delay:.0f}s", flush=True)
+
+    def backoff_factor(self, job):
+        return min(2 ** job.backoff_streak, self.max_backoff) if job.backoff_streak else 1
+
+    def next_time(self, job, now):
+        """Nächster Lauf mit Jitter, damit Jobs (und Replikas) nicht im Gleichschritt laufen"""
+        return now + job.interval * self.backoff_factor(job) * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def run(self):
+        """Scheduler-Schleife: startet fällige Jobs als eigene Tasks"""
+        try:
+            while True:
+                now = time.time()
+                for job in self.jobs.values():
+                    if not job.enabled or job.interval <= 0 or now < job.next_run:
+                        continue
+                    if job.running:
+                        # Single-Flight: vorheriger Lauf noch aktiv
+                        job.skipped += 1
+                        maintenance_job_runs.labels(job=job.name, result="skipped").inc()
+                        job.next_run = self.next_time(job, now)
+                        continue
+                    job.running = True
+                    task = asyncio.create_task(self.run_job(job))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+                await asyncio.sleep(self.tick)
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """Bricht laufende Jobs ab und wartet auf ihr Ende"""
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run_job(self, job):
+        """Einzelner Job-Lauf mit Timeout und Metriken"""
+        start = time.perf_counter()
+        result = "ok"
+        streak = job.backoff_streak
+        try:
+            outcome = job.func()
+            if asyncio.iscoroutine(outcome):
+                outcome = await asyncio.wait_for(outcome, timeout=job.timeout)
+            elif time.perf_counter() - start > job.timeout:
+                print(f"⏱️ Sync-Wartungs-Job {job.name} lief länger als {job.timeout}s (ohne Abbruch)", flush=True)
+            job.last_result = outcome
+            if job.backoff_streak != streak:
+                result = "backoff"
+            else:
+                if job.backoff_streak:
+                    print(f"✅ Wartungs-Job {job.name} läuft wieder", flush=True)
+                job.backoff_streak = 0
+                job.last_error = None
+                maintenance_job_last_success.labels(job=job.name).set(time.time())
+        except asyncio.TimeoutError:
+            result = "timeout"
+            job.failures += 1
+            job.last_error = f"timeout after {job.timeout}s"
+            print(f"⏱️ Wartungs-Job {job.name} nach {job.timeout}s abgebrochen", flush=True)
+        except asyncio.CancelledError:
+            result = "cancelled"
+            raise
+        except Exception as e:
+            result = "error"
+            job.failures += 1
+            job.last_error = str(e)[:200]
+            print(f"⚠️ Wartungs-Job {job.name} fehlgeschlagen: {e}", flush=True)
+        finally:
+            duration = time.perf_counter() - start
+            job.runs += 1
+            job.last_duration = duration
+            job.running = False
+            job.next_run = self.next_time(job, time.time())
+            maintenance_job_duration.labels(job=job.name).observe(duration)
+            maintenance_job_runs.labels(job=job.name, result=result).inc()
+
+    def get_stats(self):
+        """Status aller Jobs für /config"""
+        now = time.time()
+        return {
+            name: {
+                "enabled": job.enabled,
+                "interval": job.interval,
+                "running": job.running,
+                "runs": job.runs,
+                "failures": job.failures,
+                "skipped": job.skipped,
+                "backoff_factor": self.backoff_factor(job),
+                "last_duration_ms": round(job.last_duration * 1000, 2) if job.last_duration is not None else None,
+                "last_error": job.last_error,
+                "next_run_in": round(max(0.0, job.next_run - now), 1),
+            }
+            for name, job in self.jobs.items()
+        }
+
+# === TRADE-RING (DECODER -> AGGREGATOREN) ===
+TRADE_RECORD = struct.Struct("<44s44sdddd?7x")  # mint, trader, sol, price, v_sol, recv_ts, is_buy (128 Byte)
+RING_POS = struct.Struct("<Q")
+RING_WRITE_OFFSET = 0  # Schreibposition (nur Decoder)
+RING_SLOTS_OFFSET = 8  # Anzahl Slots (einmalig beim Anlegen)
+RING_READ_OFFSET = 64  # Leseposition (nur Aggregator), eigene Cache-Line
+TRADE_RING_HEADER_SIZE = 128
+
+
+class TradeRing:
+    """
+    Single-Producer/Single-Consumer-Ring fester Trade-Records in Shared Memory.
+    Der Decoder schreibt nur die Schreibposition, der Aggregator nur die Leseposition; beide zählen
+    monoton hoch, Slot = Position % Slots. Ein Record wird zuerst geschrieben, danach die Position
+    veröffentlicht. Ist der Ring voll, verwirft der Decoder den Trade, statt zu blockieren.
+    """
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.buf = shm.buf
+        self.owner = owner
+        self.slots = RING_POS.unpack_from(self.buf, RING_SLOTS_OFFSET)[0]
+        # Lokale Kopien der eigenen Position (die Gegenseite schreibt sie nie)
+        self.write_pos = RING_POS.unpack_from(self.buf, RING_WRITE_OFFSET)[0]
+        self.read_pos = RING_POS.unpack_from(self.buf, RING_READ_OFFSET)[0]
+
+    @classmethod
+    def create(cls, name, slots):
+        """Legt den Ring an (Decoder-Seite, räumt ihn in close() auch wieder ab)"""
+        size = TRADE_RING_HEADER_SIZE + slots * TRADE_RECORD.size
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Rest eines abgestürzten Koordinators
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _created_segments.add(name)
+        RING_POS.pack_into(shm.buf, RING_SLOTS_OFFSET, slots)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Öffnet einen bestehenden Ring (Aggregator-Seite).
+        Die Worker sind per spawn gestartete Kinder des Koordinators und teilen dessen resource_tracker -
+        die erneute Registrierung ist dort ein No-op, Abmelden würde die des Koordinators entfernen."""
+        return cls(shared_memory.SharedMemory(name=name))
+
+    def push(self, mint, trader, sol, price, v_sol, recv_ts, is_buy):
+        """Schreibt einen Record (mint/trader als ASCII-bytes, max. 44).
+
+        Returns:
+            False, wenn der Ring voll ist
+        """
+        pos = self.write_pos
+        if pos - RING_POS.unpack_from(self.buf, RING_READ_OFFSET)[0] >= self.slots:
+            return False
+        TRADE_RECORD.pack_into(self.buf, TRADE_RING_HEADER_SIZE + (pos % self.slots) * TRADE_RECORD.size,
+                               mint, trader, sol, price, v_sol, recv_ts, is_buy)
+        self.write_pos = pos + 1
+        RING_POS.pack_into(self.buf, RING_WRITE_OFFSET, self.write_pos)
+        return True
+
+    def pop(self, limit):
+        """Liest bis zu limit Records direkt aus dem Segment (ohne Zwischenkopie des Slots).
+
+        Returns:
+            Liste von (mint, trader, sol, price, v_sol, recv_ts, is_buy) - mint/trader mit Null-Padding
+        """
+        pos = self.read_pos
+        end = min(RING_POS.unpack_from(self.buf, RING_WRITE_OFFSET)[0], pos + limit)
+        if end <= pos:
+            return []
+        unpack, buf, slots, size = TRADE_RECORD.unpack_from, self.buf, self.slots, TRADE_RECORD.size
+        records = [unpack(buf, TRADE_RING_HEADER_SIZE + (i % slots) * size) for i in range(pos, end)]
+        # Erst nach dem Auspacken freigeben - danach darf der Decoder die Slots überschreiben
+        self.read_pos = end
+        RING_POS.pack_into(buf, RING_READ_OFFSET, end)
+        return records
+
+    def pending(self):
+        """Geschriebene, noch nicht gelesene Records"""
+        return (RING_POS.unpack_from(self.buf, RING_WRITE_OFFSET)[0]
+                - RING_POS.unpack_from(self.buf, RING_READ_OFFSET)[0])
+
+    def consumed(self):
+        return RING_POS.unpack_from(self.buf, RING_READ_OFFSET)[0]
+
+    def occupancy(self):
+        return self.pending() / self.slots
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+            _created_segments.discard(self.shm.name)
+
+
+def decode_trade_record(record):
+    """Record aus dem Ring als (mint, (sol, price, is_buy, trader_key, v_sol), recv_ts)"""
+    mint, trader, sol, price, v_sol, recv_ts, is_buy = record
+    return mint.rstrip(b"\0").decode(), (sol, price, is_buy, trader.rstrip(b"\0").decode(), v_sol), recv_ts
+
+
+class PipeSender:
+    """
+    Schreibt Nachrichten einer multiprocessing-Pipe aus einem eigenen Thread, in Reihenfolge.
+    Connection.send blockiert, sobald der Puffer der Pipe voll ist - auf der Event-Loop würden sich
+    Koordinator und Worker bei vielen Übergaben gegenseitig blockieren. So liest jede Seite weiter,
+    während der Thread schreibt.
+    """
+
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.queue = SimpleQueue()
+        self.failed = False
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def send(self, msg):
+        """Reiht eine Nachricht ein. Returns: False, wenn die Pipe geschlossen oder kaputt ist"""
+        if self.failed or self.closed:
+            return False
+        self.queue.put(msg)
+        return True
+
+    def run(self):
+        while (msg := self.queue.get()) is not None:
+            try:
+                self.conn.send(msg)
+            except (OSError, ValueError) as e:
+                self.failed = True
+                print(f"⚠️ Pipe-Nachricht nicht zustellbar ({self.thread.name}): {e}", flush=True)
+                return
+
+    def stop(self):
+        """Beendet den Thread nach den bereits eingereihten Nachrichten (ohne zu warten)"""
+        if not self.closed:
+            self.closed = True
+            self.queue.put(None)
+
+    def close(self, timeout=None):
+        """Sendet wartende Nachrichten und wartet auf das Ende des Threads (blockierend)"""
+        self.stop()
+        self.thread.join(timeout)
+
+
+# Worker-Counter, die der Koordinator in seine eigenen Prometheus-Counter übernimmt (sonst fehlen sie in /metrics)
+SHARD_MERGED_COUNTERS = (trades_received, trades_processed, metrics_saved, coins_graduated, coins_finished,
+                         phase_switches, ath_updates_total, ws_reconnects, db_errors)
+
+
+def counter_totals(counters=SHARD_MERGED_COUNTERS):
+    """Aktuelle Counter-Werte als {(sample_name, labels): value} für die Stats-Meldung eines Workers"""
+    totals = {}
+    for counter in counters:
+        for metric in counter.collect():
+            for sample in metric.samples:
+                if sample.name.endswith("_total"):
+                    totals[(sample.name, tuple(sorted(sample.labels.items())))] = sample.value
+    return totals
+
+
+class ShardFeedLink:
+    """Ring-Feed im Worker: ersetzt den WebSocket und reicht (Un-)Subscribes an den Koordinator weiter"""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def send(self, message):
+        self.service.send_to_coordinator(("ws", message))
+
+
+# === SHARDING ===
+class HashRing:
+    """
+    Konsistentes Hashing der Mints auf Shards
+    Virtuelle Knoten glätten die Verteilung; kommt ein Shard hinzu oder fällt weg,
+    wandert nur dessen Anteil der Coins.
+    """
+
+    def __init__(self, nodes=(), vnodes=64):
+        self.vnodes = vnodes
+        self.nodes = set(nodes)
+        self.points = []  # Sortierte Hashes der virtuellen Knoten
+        self.owners = []  # Shard je Punkt
+        self.rebuild()
+
+    @staticmethod
+    def hash_key(key):
+        """Stabiler 64-Bit-Hash (hash() ist pro Prozess gesalzen)"""
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    def rebuild(self):
+        ring = sorted((self.hash_key(f"shard-{node}#{i}"), node) for node in self.nodes for i in range(self.vnodes))
+        self.points = [point for point, _ in ring]
+        self.owners = [node for _, node in ring]
+
+    def add_node(self, node):
+        self.nodes.add(node)
+        self.rebuild()
+
+    def remove_node(self, node):
+        self.nodes.discard(node)
+        self.rebuild()
+
+    def owner(self, key):
+        """Zuständiger Shard für einen Mint (None ohne Shards)"""
+        if not self.points:
+            return None
+        return self.owners[bisect.bisect(self.points, self.hash_key(key)) % len(self.points)]
+
+
+class ShardCoordinator:
+    """
+    Startet und überwacht die Shard-Worker (eigene Prozesse) und verteilt Coins per HashRing.
+    Discovery, Cache und Stream-Sync bleiben im Koordinator; jeder Worker hat eigene
+    Trade-Subscriptions, Aggregations-Buffer und DB-Writer. Nachrichten laufen über je eine Pipe
+    (geschrieben von einem PipeSender-Thread, Übergaben gebündelt als Liste von (mint, state)):
+    ("adopt", coins) / ("ring", shards) / ("stop",) zum Worker,
+    ("handoff", coins) / ("stats", dict) / ("ws", message) zurück.
+    Die Counter der Worker (SHARD_MERGED_COUNTERS) übernimmt der Koordinator aus den Stats-Meldungen.
+
+    Mit ring_slots > 0 (SHARD_FEED=ring) dekodiert nur der Koordinator JSON: er abonniert die Trades
+    aller Worker auf seinem WebSocket und schreibt jeden Trade als festen Record in den TradeRing
+    des zuständigen Workers. Die Worker schicken ihre (Un-)Subscribes dann als ("ws", message).
+    """
+
+    def __init__(self, worker_count, vnodes=64, restart_delay=5, stats_interval=5, ring_slots=0):
+        self.ctx = multiprocessing.get_context("spawn")
+        self.worker_count = worker_count
+        self.restart_delay = restart_delay
+        self.stats_interval = stats_interval
+        self.ring = HashRing(vnodes=vnodes)
+        self.workers = {}  # {shard_id: {"process", "conn", "started_at"}}
+        self.stats = {}  # {shard_id: letzte Stats-Meldung}
+        self.counters_seen = {}  # {shard_id: zuletzt übernommene counter_totals des Workers}
+        self.merged_counters = {metric.name + "_total": counter
+                                for counter in SHARD_MERGED_COUNTERS for metric in counter.collect()}
+        self.restart_at = {}  # {shard_id: Zeitpunkt des geplanten Neustarts}
+        self.retiring = set()  # Shards, die nach Abgabe ihrer Coins beendet werden
+        # Ring-Feed
+        self.ring_slots = ring_slots
+        self.trade_rings = {}  # {shard_id: TradeRing} - überlebt Worker-Neustarts
+        self.ring_counters = {}  # {shard_id: (written, dropped)} - Prometheus-Kinder für den Hot Path
+        self.feed_subscribers = {}  # {mint: {shard_id}} - abonniert, solange ein Worker den Mint braucht
+        self.feed_outbox = deque()  # Noch über den WebSocket zu sendende (Un-)Subscribes
+
+    def spawn(self, shard_id):
+        """Startet einen Worker-Prozess und nimmt ihn in den Ring auf"""
+        parent, child = self.ctx.Pipe()
+        nodes = sorted(self.ring.nodes | {shard_id})
+        ring_name = None
+        if self.ring_slots:
+            if shard_id not in self.trade_rings:
+                self.trade_rings[shard_id] = TradeRing.create(f"pump_find_trades_{os.getpid()}_{shard_id}", self.ring_slots)
+                label = str(shard_id)
+                self.ring_counters[shard_id] = (trade_ring_records.labels(shard=label, result="written"),
+                                                trade_ring_records.labels(shard=label, result="dropped"))
+            ring_name = self.trade_rings[shard_id].shm.name
+        process = self.ctx.Process(target=run_shard_worker, args=(shard_id, nodes, self.ring.vnodes, child, ring_name),
+                                   name=f"pump-shard-{shard_id}", daemon=True)
+        process.start()
+        child.close()
+        self.workers[shard_id] = {"process": process, "conn": parent, "started_at": time.time(),
+                                  "sender": PipeSender(parent, f"shard-{shard_id}-send")}
+        asyncio.get_running_loop().add_reader(parent.fileno(), self.on_readable, shard_id)
+        self.ring.add_node(shard_id)
+        print(f"🧩 Shard-Worker {shard_id} gestartet (PID {process.pid})", flush=True)
+
+    def send(self, shard_id, msg):
+        """Reiht eine Nachricht an den Worker ein (blockiert nie)"""
+        worker = self.workers.get(shard_id)
+        if not worker:
+            return False
+        if not worker["sender"].send(msg):
+            print(f"⚠️ Shard {shard_id} nicht erreichbar", flush=True)
+            return False
+        return True
+
+    def handoff(self, coins, kind="cache"):
+        """Übergibt Coins [(mint, state)] an die zuständigen Worker - eine Nachricht je Worker"""
+        by_shard = {}
+        for mint, state in coins:
+            shard_id = self.ring.owner(mint)
+            if shard_id is not None:
+                by_shard.setdefault(shard_id, []).append((mint, state))
+        for shard_id, batch in by_shard.items():
+            if self.send(shard_id, ("adopt", batch)):
+                shard_handoffs.labels(kind=kind).inc(len(batch))
+
+    def broadcast_ring(self):
+        """Neuer Ring an alle Worker - nicht mehr zuständige Worker geben ihre Coins ab"""
+        nodes = sorted(self.ring.nodes)
+        for shard_id in list(self.workers):
+            self.send(shard_id, ("ring", nodes))
+        shard_rebalances.inc()
+
+    def on_readable(self, shard_id):
+        worker = self.workers.get(shard_id)
+        if not worker:
+            return
+        try:
+            while worker["conn"].poll():
+                self.handle(shard_id, worker["conn"].recv())
+        except (EOFError, OSError):
+            # Prozess beendet - Aufräumen übernimmt der Supervisor
+            asyncio.get_running_loop().remove_reader(worker["conn"].fileno())
+
+    def handle(self, shard_id, msg):
+        kind = msg[0]
+        if kind == "stats":
+            stats = msg[1]
+            self.stats[shard_id] = stats
+            label = str(shard_id)
+            shard_coins_tracked.labels(shard=label).set(stats["coins_tracked"])
+            shard_trades_processed.labels(shard=label).set(stats["trades_processed"])
+            shard_metrics_saved.labels(shard=label).set(stats["metrics_saved"])
+            shard_ws_connected.labels(shard=label).set(1 if stats["ws_connected"] else 0)
+            self.merge_counters(shard_id, stats.get("counters") or {})
+        elif kind == "handoff":
+            self.handoff(msg[1], kind="rebalance")
+        elif kind == "ws":
+            self.feed_request(shard_id, msg[1])
+
+    def merge_counters(self, shard_id, totals):
+        """Zählt den Zuwachs der Worker-Counter seit der letzten Meldung auf die eigenen Counter
+        (ein neu gestarteter Worker beginnt wieder bei 0)"""
+        seen = self.counters_seen.get(shard_id, {})
+        for (name, labels), value in totals.items():
+            counter = self.merged_counters.get(name)
+            if counter is None:
+                continue
+            delta = value - seen.get((name, labels), 0.0)
+            if delta < 0:
+                delta = value
+            if delta > 0:
+                (counter.labels(**dict(labels)) if labels else counter).inc(delta)
+        self.counters_seen[shard_id] = totals
+
+    # === RING-FEED ===
+    def route_trade(self, mint, data, recv_ts):
+        """Schreibt einen Trade als Record in den Ring des zuständigen Workers.
+
+        Returns:
+            True, wenn der Trade im Ring liegt
+        """
+        shard_id = self.ring.owner(mint)
+        ring = self.trade_rings.get(shard_id)
+        if ring is None:
+            return False
+        parsed = parse_trade(data)
+        if parsed is None:
+            return False
+        sol, price, is_buy, trader_key, v_sol = parsed
+        written, dropped = self.ring_counters[shard_id]
+        try:
+            mint_key = mint.encode("ascii")
+            trader = (trader_key or "").encode("ascii")
+        except UnicodeEncodeError:
+            dropped.inc()
+            return False
+        # Base58-Keys haben höchstens 44 Zeichen - längere würden still abgeschnitten
+        if len(mint_key) > 44 or len(trader) > 44 or not ring.push(mint_key, trader, sol, price, v_sol, recv_ts, is_buy):
+            dropped.inc()
+            return False
+        written.inc()
+        return True
+
+    def feed_request(self, shard_id, message):
+        """(Un-)Subscribe eines Workers: gesendet wird nur, wenn der erste Worker einen Mint braucht
+        bzw. der letzte ihn abgibt (Umverteilung: Unsubscribe des alten Eigentümers nach Subscribe des neuen)"""
+        try:
+            request = json.loads(message)
+        except ValueError:
+            return
+        method, keys = request.get("method"), request.get("keys") or []
+        changed = []
+        for mint in keys:
+            if method == "subscribeTokenTrade":
+                shards = self.feed_subscribers.setdefault(mint, set())
+                if not shards:
+                    changed.append(mint)
+                shards.add(shard_id)
+            elif method == "unsubscribeTokenTrade":
+                shards = self.feed_subscribers.get(mint)
+                if shards is None:
+                    continue
+                shards.discard(shard_id)
+                if not shards:
+                    del self.feed_subscribers[mint]
+                    changed.append(mint)
+        if changed:
+            self.feed_outbox.append({"method": method, "keys": changed})
+
+    def drop_feed_subscriptions(self, shard_id):
+        """Subscriptions eines beendeten Workers abgeben (neue Eigentümer abonnieren selbst)"""
+        gone = []
+        for mint, shards in list(self.feed_subscribers.items()):
+            shards.discard(shard_id)
+            if not shards:
+                del self.feed_subscribers[mint]
+                gone.append(mint)
+        if gone:
+            self.feed_outbox.append({"method": "unsubscribeTokenTrade", "keys": gone})
+
+    def restore_feed(self):
+        """Nach WebSocket-Reconnect: ausstehende Änderungen verwerfen - alle Worker-Subscriptions
+        gehen mit dem Resubscribe des Koordinators neu raus (UnifiedService.resubscribe)"""
+        self.feed_outbox.clear()
+
+    def report_rings(self):
+        for shard_id, ring in self.trade_rings.items():
+            trade_ring_occupancy.labels(shard=str(shard_id)).set(ring.occupancy())
+            trade_ring_consumed.labels(shard=str(shard_id)).set(ring.consumed())
+
+    def close_ring(self, shard_id):
+        ring = self.trade_rings.pop(shard_id, None)
+        if ring:
+            ring.close()
+        self.ring_counters.pop(shard_id, None)
+        for gauge in (trade_ring_occupancy, trade_ring_consumed):
+            try:
+                gauge.remove(str(shard_id))
+            except KeyError:
+                pass
+
+    async def run(self):
+        """Startet die Worker und startet abgestürzte nach SHARD_RESTART_DELAY neu"""
+        # Alle Shards vorab in den Ring, damit jeder Worker mit der vollständigen Verteilung startet
+        for shard_id in range(self.worker_count):
+            self.ring.add_node(shard_id)
+        for shard_id in range(self.worker_count):
+            self.spawn(shard_id)
+        while True:
+            now = time.time()
+            for shard_id, worker in list(self.workers.items()):
+                if not worker["process"].is_alive():
+                    self.on_worker_exit(shard_id, now)
+            for shard_id, due in list(self.restart_at.items()):
+                if now >= due:
+                    del self.restart_at[shard_id]
+                    self.spawn(shard_id)
+                    self.broadcast_ring()
+            shard_workers_alive.set(len(self.workers))
+            self.report_rings()
+            await asyncio.sleep(1.0)
+
+    def on_worker_exit(self, shard_id, now):
+        """Entfernt einen beendeten Worker; seine Coins übernehmen die anderen per Vollabgleich"""
+        worker = self.workers.pop(shard_id)
+        try:
+            asyncio.get_running_loop().remove_reader(worker["conn"].fileno())
+        except (OSError, ValueError):
+            pass
+        worker["sender"].stop()
+        worker["conn"].close()
+        self.stats.pop(shard_id, None)
+        self.counters_seen.pop(shard_id, None)
+        for gauge in (shard_coins_tracked, shard_trades_processed, shard_metrics_saved, shard_ws_connected):
+            try:
+                gauge.remove(str(shard_id))
+            except KeyError:
+                pass
+
+        self.drop_feed_subscriptions(shard_id)
+
+        if shard_id in self.retiring:
+            self.retiring.discard(shard_id)
+            self.close_ring(shard_id)
+            print(f"🧩 Shard-Worker {shard_id} beendet", flush=True)
+            return
+        print(f"❌ Shard-Worker {shard_id} abgestürzt (Exit {worker['process'].exitcode}) - Neustart in {self.restart_delay}s", flush=True)
+        shard_worker_restarts.inc()
+        self.ring.remove_node(shard_id)
+        self.broadcast_ring()
+        if shard_id < self.worker_count:
+            self.restart_at[shard_id] = now + self.restart_delay
+
+    def scale(self, worker_count):
+        """Ändert die Anzahl der Worker zur Laufzeit (Coins werden umverteilt)"""
+        self.worker_count = worker_count
+        for shard_id in range(worker_count):
+            if shard_id not in self.workers and shard_id not in self.restart_at:
+                self.spawn(shard_id)
+        for shard_id in [s for s in self.workers if s >= worker_count and s not in self.retiring]:
+            self.retiring.add(shard_id)
+            self.ring.remove_node(shard_id)
+        for shard_id in [s for s in self.restart_at if s >= worker_count]:
+            del self.restart_at[shard_id]
+        self.broadcast_ring()
+        # Erst nach dem neuen Ring beenden - der Worker gibt vorher alle Coins ab
+        for shard_id in self.retiring:
+            self.send(shard_id, ("stop",))
+
+    async def stop(self, timeout=10):
+        """Beendet alle Worker (beim Shutdown)"""
+        for shard_id in list(self.workers):
+            self.send(shard_id, ("stop",))
+        loop = asyncio.get_running_loop()
+        for worker in self.workers.values():
+            await loop.run_in_executor(None, worker["sender"].close, timeout)
+            await loop.run_in_executor(None, worker["process"].join, timeout)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+        for shard_id in list(self.trade_rings):
+            self.close_ring(shard_id)
+
+    def totals(self):
+        """Über alle Shards summierte Werte für /health"""
+        return {
+            key: sum(stats[key] for stats in self.stats.values())
+            for key in ("coins_tracked", "trades_processed", "metrics_saved")
+        }
+
+    def healthy(self, now=None):
+        """Alle Worker laufen, melden sich regelmäßig und sind mit dem WebSocket verbunden"""
+        now = now or time.time()
+        if len(self.stats) < self.worker_count:
+            return False
+        return all(stats["ws_connected"] and now - stats["reported_at"] < 3 * self.stats_interval
+                   for shard_id, stats in self.stats.items() if shard_id < self.worker_count)
+
+    def get_stats(self):
+        return {
+            "workers": self.worker_count,
+            "alive": len(self.workers),
+            "ring": sorted(self.ring.nodes),
+            "shards": {str(shard_id): stats for shard_id, stats in sorted(self.stats.items())},
+            "feed": "ring" if self.ring_slots else "websocket",
+            "trade_rings": {
+                str(shard_id): {"slots": ring.slots, "pending": ring.pending(), "consumed": ring.consumed()}
+                for shard_id, ring in sorted(self.trade_rings.items())
+            },
+        }
+
+
+def run_shard_worker(shard_id, nodes, vnodes, conn, ring_name=None):
+    """Einstiegspunkt eines Shard-Worker-Prozesses"""
+    try:
+        asyncio.run(shard_worker_main(shard_id, nodes, vnodes, conn, ring_name))
+    except KeyboardInterrupt:
+        pass
+
+
+async def shard_worker_main(shard_id, nodes, vnodes, conn, ring_name=None):
+    """Worker: trackt nur die Coins des eigenen Shards mit eigenem WebSocket (oder Trade-Ring) und DB-Pool"""
+    service = UnifiedService()
+    service.configure_shard(shard_id, HashRing(nodes, vnodes), conn)
+    feed = f"Trade-Ring '{ring_name}'" if ring_name else "eigener WebSocket"
+    print(f"🧩 Shard {shard_id} läuft (PID {os.getpid()}, Ring: {nodes}, Feed: {feed})", flush=True)
+
+    tasks = [
+        asyncio.create_task(service.run_trade_ring(TradeRing.attach(ring_name)) if ring_name else service.run()),
+        asyncio.create_task(service.maintenance.run()),
+        asyncio.create_task(service.run_shard_link()),
+    ]
+    if STREAM_NOTIFY_ENABLED:
+        tasks.append(asyncio.create_task(service.run_stream_listener()))
+
+    await service.shard_stopped.wait()
+    for task in tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await service.flush_ath_updates()
+    if service.trade_ring:
+        service.trade_ring.close()
+    # Abgegebene Coins und letzte Meldungen noch zustellen
+    await asyncio.to_thread(service.shard_sender.close, 10)
+    conn.close()
+
+# === MULTI-REPLICA ===
+REPLICA_LEADER_LOCK = 0x70756D70  # Advisory-Lock der Leader-Replika ("pump")
+
+REPLICA_HEARTBEAT_SQL = """
+    INSERT INTO service_replicas (replica_id, hostname, heartbeat_at, lease_until, coins_owned)
+    VALUES ($1, $2, NOW(), NOW() + make_interval(secs => $3), $4)
+    ON CONFLICT (replica_id) DO UPDATE
+    SET heartbeat_at = NOW(), lease_until = EXCLUDED.lease_until, coins_owned = EXCLUDED.coins_owned
+    RETURNING EXTRACT(EPOCH FROM lease_until - NOW())::float8
+"""
+
+# Streams toter Replikas (Lease abgelaufen) freigeben
+REPLICA_RELEASE_DEAD_SQL = """
+    UPDATE coin_streams SET owner_replica = NULL, handoff_to = NULL
+    WHERE is_active = TRUE AND owner_replica IS NOT NULL
+      AND owner_replica NOT IN (SELECT replica_id FROM service_replicas WHERE lease_until > NOW())
+"""
+
+# Übergaben an tote Ziel-Replikas abbrechen (die Quelle trackt weiter)
+REPLICA_CANCEL_HANDOFF_SQL = """
+    UPDATE coin_streams SET handoff_to = NULL
+    WHERE handoff_to IS NOT NULL
+      AND handoff_to NOT IN (SELECT replica_id FROM service_replicas WHERE lease_until > NOW())
+"""
+
+REPLICA_LOADS_SQL = """
+    SELECT r.replica_id, COUNT(cs.token_address) AS owned
+    FROM service_replicas r
+    LEFT JOIN coin_streams cs ON COALESCE(cs.handoff_to, cs.owner_replica) = r.replica_id AND cs.is_active = TRUE
+    WHERE r.lease_until > NOW()
+    GROUP BY r.replica_id
+"""
+
+REPLICA_UNOWNED_SQL = """
+    SELECT token_address FROM coin_streams
+    WHERE is_active = TRUE AND owner_replica IS NULL
+    ORDER BY id
+    LIMIT $1
+"""
+
+REPLICA_ASSIGN_SQL = """
+    UPDATE coin_streams cs SET owner_replica = a.owner
+    FROM unnest($1::varchar[], $2::varchar[]) AS a(mint, owner)
+    WHERE cs.token_address = a.mint AND cs.owner_replica IS NULL AND cs.is_active = TRUE
+"""
+
+# Umverteilung nur vormerken - owner_replica setzt die Quelle nach dem Schreiben ihres Teil-Buffers
+REPLICA_MOVE_SQL = """
+    UPDATE coin_streams SET handoff_to = $2
+    WHERE token_address IN (
+        SELECT token_address FROM coin_streams
+        WHERE owner_replica = $1 AND is_active = TRUE AND handoff_to IS NULL
+        LIMIT $3
+    )
+"""
+
+# Quelle bestätigt die Übergabe - erst danach lädt das Ziel den Stream
+REPLICA_HANDOFF_CONFIRM_SQL = """
+    UPDATE coin_streams SET owner_replica = handoff_to, handoff_to = NULL
+    WHERE token_address = ANY($1::varchar[]) AND owner_replica = $2 AND handoff_to IS NOT NULL
+    RETURNING token_address
+"""
+
+# Schreib-Fencing: Metriken nur für Streams, die dieser Replika (noch) gehören
+REPLICA_FENCE_SQL = """
+    SELECT token_address FROM coin_streams
+    WHERE token_address = ANY($1::varchar[]) AND owner_replica = $2
+    FOR SHARE
+"""
+
+
+def plan_replica_assignments(loads, unowned, tolerance=0.2, batch=50):
+    """Teilt freie Streams den am wenigsten ausgelasteten Replikas zu und plant Umverteilungen.
+
+    Args:
+        loads: {replica_id: Anzahl eigener aktiver Streams} aller lebenden Replikas
+        unowned: Mints ohne Eigentümer
+        tolerance: Erlaubte Überlast gegenüber dem Durchschnitt, bevor umverteilt wird
+        batch: Maximal umverteilte Streams je Runde
+
+    Returns:
+        ({mint: replica_id}, [(von, nach, anzahl), ...])
+    """
+    if not loads:
+        return {}, []
+    loads = dict(loads)
+    heap = [(count, replica_id) for replica_id, count in loads.items()]
+    heapq.heapify(heap)
+    assignments = {}
+    for mint in unowned:
+        count, replica_id = heapq.heappop(heap)
+        assignments[mint] = replica_id
+        loads[replica_id] = count + 1
+        heapq.heappush(heap, (count + 1, replica_id))
+
+    # Scale-out: überlastete Replikas geben schrittweise ab
+    moves = []
+    fair = sum(loads.values()) / len(loads)
+    remaining = batch
+    while remaining > 0:
+        source = max(loads, key=loads.get)
+        target = min(loads, key=loads.get)
+        if loads[source] <= fair * (1 + tolerance) or loads[source] - loads[target] <= 1:
+            break
+        count = min(int(loads[source] - fair), int(fair - loads[target]), remaining)
+        if count < 1:
+            break
+        moves.append((source, target, count))
+        loads[source] -= count
+        loads[target] += count
+        remaining -= count
+    return assignments, moves
+
+
+class ReplicaCoordinator:
+    """
+    Koordiniert mehrere Service-Replikas über Postgres.
+    Jede Replika erneuert ihren Lease in service_replicas, jeder aktive Stream hat genau einen
+    Eigentümer (coin_streams.owner_replica). Die Replika mit dem Advisory-Lock ist Leader:
+    sie macht Discovery und teilt Streams zu - neue an die am wenigsten ausgelastete Replika,
+    Streams toter Replikas nach Ablauf des Leases neu. Umverteilte Streams übergibt die Quelle
+    selbst (handoff_to), nachdem sie ihren angefangenen Buffer geschrieben hat.
+    """
+
+    def __init__(self, replica_id, lease_seconds=10, tolerance=0.2, batch=50, max_unowned=5000):
+        self.replica_id = replica_id
+        self.hostname = socket.gethostname()
+        self.lease_seconds = lease_seconds
+        self.tolerance = tolerance
+        self.batch = batch
+        self.max_unowned = max_unowned
+        self.owned = set()
+        self.pending = None  # (gewonnen, verloren) - Anwendung in der Receive-Loop
+        self.handoffs = set()  # Vom Leader zur Übergabe markierte eigene Streams
+        self.is_leader = False
+        self.lock_conn = None
+        self.loads = {}
+        self.last_heartbeat = None
+        self.lease_deadline = None  # time.monotonic(), ab dem der Lease laut DB abgelaufen ist
+
+    async def heartbeat(self, pool):
+        """Lease erneuern. Die Restlaufzeit kommt aus der DB-Uhr (NOW()) - lokal zählt sie ab dem
+        Absenden, damit die Replika nie später abgibt, als andere sie für tot halten."""
+        sent = time.monotonic()
+        remaining = await pool.fetchval(REPLICA_HEARTBEAT_SQL, self.replica_id, self.hostname,
+                                        float(self.lease_seconds), len(self.owned))
+        self.lease_deadline = sent + (remaining if remaining is not None else self.lease_seconds)
+        self.last_heartbeat = time.time()
+
+    async def try_lead(self, dsn):
+        """Hält bzw. versucht den Leader-Lock (Session-Lock auf eigener Verbindung).
+
+        Returns:
+            True, wenn diese Replika Leader ist
+        """
+        if self.lock_conn is not None:
+            try:
+                await asyncio.wait_for(self.lock_conn.fetchval("SELECT 1"), timeout=5)
+                return True
+            except Exception as e:
+                # Mit der Verbindung ist auch der Lock weg
+                print(f"⚠️ Leader-Verbindung verloren: {e}", flush=True)
+                await self.drop_lock()
+        conn = await asyncpg.connect(dsn)
+        if await conn.fetchval("SELECT pg_try_advisory_lock($1)", REPLICA_LEADER_LOCK):
+            self.lock_conn = conn
+            self.is_leader = True
+            replica_is_leader.set(1)
+            print(f"👑 Replika {self.replica_id} ist Leader (Discovery + Zuteilung)", flush=True)
+            return True
+        await conn.close()
+        return False
+
+    async def drop_lock(self):
+        conn, self.lock_conn = self.lock_conn, None
+        self.is_leader = False
+        replica_is_leader.set(0)
+        if conn is not None:
+            try:
+                await conn.close(timeout=5)
+            except Exception:
+                conn.terminate()
+
+    async def balance(self, pool):
+        """Leader: verwaiste Streams freigeben, freie zuteilen, Überlast umverteilen"""
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                released = await conn.execute(REPLICA_RELEASE_DEAD_SQL)
+                rows = await conn.fetch(REPLICA_LOADS_SQL)
+                self.loads = {row["replica_id"]: row["owned"] for row in rows}
+                unowned = [row["token_address"] for row in await conn.fetch(REPLICA_UNOWNED_SQL, self.max_unowned)]
+
+                assignments, moves = plan_replica_assignments(self.loads, unowned, self.tolerance, self.batch)
+                if assignments:
+                    await conn.execute(REPLICA_ASSIGN_SQL, list(assignments), list(assignments.values()))
+                await conn.execute(REPLICA_CANCEL_HANDOFF_SQL)
+                for source, target, count in moves:
+                    await conn.execute(REPLICA_MOVE_SQL, source, target, count)
+                # Längst abgelaufene Replikas aus der Übersicht entfernen
+                await conn.execute("DELETE FROM service_replicas WHERE lease_until < NOW() - INTERVAL '1 hour'")
+
+        failed_over = int(released.split()[-1]) if released else 0
+        replica_live.set(len(self.loads))
+        replica_assignments.labels(kind="new").inc(len(assignments))
+        replica_assignments.labels(kind="rebalance").inc(sum(count for _, _, count in moves))
+        if failed_over:
+            replica_assignments.labels(kind="failover").inc(failed_over)
+            print(f"♻️ {failed_over} Streams toter Replikas freigegeben", flush=True)
+        return len(assignments), moves
+
+    async def fetch_owned(self, pool):
+        """Eigene aktive Streams laden und Änderungen für die Receive-Loop vormerken"""
+        rows = await pool.fetch("SELECT token_address, handoff_to FROM coin_streams WHERE is_active = TRUE AND owner_replica = $1",
+                                self.replica_id)
+        owned = {row["token_address"] for row in rows}
+        self.handoffs = {row["token_address"] for row in rows if row["handoff_to"]}
+        gained, lost = owned - self.owned, self.owned - owned
+        self.owned = owned
+        replica_coins_owned.set(len(owned))
+        if gained or lost:
+            previous_gained, previous_lost = self.pending or (set(), set())
+            self.pending = ((previous_gained - lost) | gained, (previous_lost - gained) | lost)
+            replica_ownership_changes.labels(direction="gained").inc(len(gained))
+            replica_ownership_changes.labels(direction="lost").inc(len(lost))
+        return gained, lost
+
+    def lease_expired(self, now=None):
+        """Lease laut DB-Restlaufzeit des letzten erfolgreichen Heartbeats abgelaufen? (now: time.monotonic())"""
+        if self.lease_deadline is None:
+            return False
+        return (now or time.monotonic()) >= self.lease_deadline
+
+    def fence(self):
+        """Alle Coins abgeben - nach Lease-Ablauf gehören sie bereits anderen Replikas"""
+        if not self.owned:
+            return
+        print(f"⛔ Lease von {self.replica_id} abgelaufen - gebe {len(self.owned)} Coins ab", flush=True)
+        replica_ownership_changes.labels(direction="lost").inc(len(self.owned))
+        previous_lost = self.pending[1] if self.pending else set()
+        self.pending = (set(), previous_lost | self.owned)
+        self.owned = set()
+        self.handoffs = set()
+        replica_coins_owned.set(0)
+
+    async def fenced_rows(self, conn, rows):
+        """Filtert coin_metrics-Zeilen auf eigene Streams. Die Zeilensperre (FOR SHARE) hält bis
+        zum Commit - solange kann der Leader den Eigentümer nicht wechseln."""
+        owned = {row["token_address"] for row in await conn.fetch(
+            REPLICA_FENCE_SQL, list({row[0] for row in rows}), self.replica_id)}
+        allowed = [row for row in rows if row[0] in owned]
+        if len(allowed) < len(rows):
+            replica_fenced_writes.inc(len(rows) - len(allowed))
+        return allowed
+
+    async def confirm_handoffs(self, pool, mints, rows):
+        """Quelle: Teil-Buffer schreiben und die Streams an das Ziel übergeben (eine Transaktion).
+
+        Returns:
+            Übergebene Mints (Übergaben an inzwischen tote Ziele bleiben bei dieser Replika)
+        """
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                confirmed = {row["token_address"] for row in await conn.fetch(
+                    REPLICA_HANDOFF_CONFIRM_SQL, list(mints), self.replica_id)}
+                rows = [row for row in rows if row[0] in confirmed]
+                if rows:
+                    await conn.executemany(COIN_METRICS_INSERT_SQL, rows)
+        self.owned -= confirmed
+        self.handoffs -= set(mints)
+        replica_coins_owned.set(len(self.owned))
+        replica_ownership_changes.labels(direction="handed_off").inc(len(confirmed))
+        return confirmed
+
+    async def release(self, pool, rows=()):
+        """Beim Shutdown: Teil-Buffer schreiben und eigene Streams sofort freigeben (Rolling Restart
+        ohne Lease-Wartezeit).
+
+        Returns:
+            Anzahl geschriebener coin_metrics-Zeilen
+        """
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                released = {row["token_address"] for row in await conn.fetch(
+                    "UPDATE coin_streams SET owner_replica = NULL, handoff_to = NULL WHERE owner_replica = $1 RETURNING token_address",
+                    self.replica_id)}
+                rows = [row for row in rows if row[0] in released]
+                if rows:
+                    await conn.executemany(COIN_METRICS_INSERT_SQL, rows)
+                await conn.execute("DELETE FROM service_replicas WHERE replica_id = $1", self.replica_id)
+        self.owned = set()
+        self.handoffs = set()
+        await self.drop_lock()
+        return len(rows)
+
+    def get_stats(self):
+        return {
+            "replica_id": self.replica_id,
+            "is_leader": self.is_leader,
+            "coins_owned": len(self.owned),
+            "live_replicas": self.loads if self.is_leader else None,
+            "last_heartbeat_ago": round(time.time() - self.last_heartbeat, 1) if self.last_heartbeat else None,
+        }
+
+
+# === DIREKTE PERSISTENZ ===
+# Spalten für COPY in die Staging-Tabelle (Reihenfolge = discovered_coin_record)
+DISCOVERED_COIN_COLUMNS = (
+    "token_address", "symbol", "name", "signature", "trader_public_key", "bonding_curve_key",
+    "pool_address", "pool_type", "v_tokens_in_bonding_curve", "v_sol_in_bonding_curve",
+    "initial_buy_sol", "initial_buy_tokens", "discovered_at", "token_created_at",
+    "price_sol", "market_cap_sol", "liquidity_sol", "has_socials", "social_count",
+    "metadata_uri", "image_url", "twitter_url", "telegram_url", "website_url", "discord_url",
+)
+PERSIST_MAX_PENDING = 10000  # Obergrenze des Persistenz-Buffers bei DB-Ausfall
+
+
+def _text(value, max_len=None):
+    if value is None or value == "":
+        return None
+    value = str(value)
+    return value[:max_len] if max_len else value
+
+
+def _numeric(value):
+    if value is None or value == "":
+        return None
+    try:
+        return Decimal(str(value))
+    except Exception:
+        return None
+
+
+def discovered_coin_record(coin_data, now_dt):
+    """Baut die COPY-Zeile für discovered_coins aus einer WebSocket-Create-Nachricht.
+
+    Texte werden auf die VARCHAR-Längen der Tabelle gekürzt, Zahlen als Decimal übergeben.
+    """
+    social_count = coin_data.get("social_count", count_socials(coin_data))
+    return (
+        _text(coin_data.get("mint"), 64),
+        _text(coin_data.get("symbol"), 30),
+        _text(coin_data.get("name"), 255),
+        _text(coin_data.get("signature"), 88),
+        _text(coin_data.get("traderPublicKey"), 44),
+        _text(coin_data.get("bondingCurveKey"), 44),
+        _text(coin_data.get("pool_address") or coin_data.get("bondingCurveKey"), 64),
+        _text(coin_data.get("pool") or "pump", 20),
+        _numeric(coin_data.get("vTokensInBondingCurve")),
+        _numeric(coin_data.get("vSolInBondingCurve")),
+        _numeric(coin_data.get("solAmount")),
+        _numeric(coin_data.get("initialBuy")),
+        now_dt,
+        now_dt,
+        _numeric(coin_data.get("price_sol")),
+        _numeric(coin_data.get("marketCapSol")),
+        _numeric(coin_data.get("vSolInBondingCurve")),
+        social_count > 0,
+        social_count,
+        _text(coin_data.get("uri")),
+        _text(coin_data.get("image_uri")),
+        _text(coin_data.get("twitter_url") or coin_data.get("twitter")),
+        _text(coin_data.get("telegram_url") or coin_data.get("telegram")),
+        _text(coin_data.get("website_url") or coin_data.get("website")),
+        _text(coin_data.get("discord_url") or coin_data.get("discord")),
+    )
+
+
+def passes_activation_rules(coin_data):
+    """Lokale Aktivierungsregeln: Coin bekommt ohne n8n sofort einen coin_stream.
+    Nicht lesbare Werte im Payload (z.B. "n/a") gelten als nicht erfüllt."""
+    try:
+        social_count = int(coin_data.get("social_count") or 0)
+        initial_buy = float(coin_data.get("solAmount") or 0)
+        market_cap = float(coin_data.get("marketCapSol") or 0)
+    except (TypeError, ValueError):
+        return False
+    if social_count < ACTIVATION_MIN_SOCIAL_COUNT:
+        return False
+    if initial_buy < ACTIVATION_MIN_INITIAL_BUY_SOL:
+        return False
+    if market_cap < ACTIVATION_MIN_MARKET_CAP_SOL:
+        return False
+    return True
+
+
+# Bestehende Zeilen (z.B. schon von n8n angereichert) werden nur ergänzt, nie überschrieben
+_MERGE_COLUMNS = [c for c in DISCOVERED_COIN_COLUMNS if c not in ("token_address", "discovered_at")]
+PERSIST_MERGE_SQL = f"""
+    INSERT INTO discovered_coins ({", ".join(DISCOVERED_COIN_COLUMNS)})
+    SELECT DISTINCT ON (token_address) {", ".join(DISCOVERED_COIN_COLUMNS)}
+    FROM discovered_coins_staging
+    ORDER BY token_address, discovered_at
+    ON CONFLICT (token_address) DO UPDATE SET
+        {", ".join(f"{c} = COALESCE(discovered_coins.{c}, EXCLUDED.{c})" for c in _MERGE_COLUMNS)}
+"""
+PERSIST_STREAMS_SQL = """
+    INSERT INTO coin_streams (token_address, current_phase_id, is_active, started_at)
+    SELECT m, $2, TRUE, NOW() FROM unnest($1::varchar[]) AS m
+    ON CONFLICT (token_address) DO NOTHING
+    RETURNING token_address, current_phase_id, started_at
+"""
+
+# === STREAM-SYNC ===
+# Seit dem letzten Sync geänderte Streams (auch deaktivierte); has_coin = discovered_coins-Zeile vorhanden.
+_STREAM_CHANGE_COLUMNS = """
+    SELECT cs.token_address, cs.current_phase_id, cs.is_active, cs.change_seq, dc.token_created_at,
+           cs.started_at, dc.trader_public_key, cs.ath_price_sol, dc.token_address IS NOT NULL AS has_coin
+    FROM coin_streams cs
+    LEFT JOIN discovered_coins dc ON cs.token_address = dc.token_address
+"""
+STREAM_CHANGES_SQL = _STREAM_CHANGE_COLUMNS + """
+    WHERE cs.change_seq > $1
+    ORDER BY cs.change_seq
+    LIMIT $2
+"""
+# Nachzügler: Zeilen von Transaktionen, die beim letzten Abruf noch offen waren ($3 = damaliges Snapshot-xmin).
+# Deren change_seq kann unter dem Cursor ($2) liegen, weil Transaktionen nicht in Sequenz-Reihenfolge committen.
+# Eigene Abfrage mit eigenem Limit, seitenweise ab $1 - hält eine lange Transaktion das xmin fest, verdrängen
+# die Nachzügler sonst die neuen Änderungen.
+STREAM_LATE_CHANGES_SQL = _STREAM_CHANGE_COLUMNS + """
+    WHERE cs.change_seq > $1 AND cs.change_seq <= $2 AND cs.change_xid >= $3::text::xid8
+    ORDER BY cs.change_seq
+    LIMIT $4
+"""
+STREAM_SNAPSHOT_XMIN_SQL = "SELECT pg_snapshot_xmin(pg_current_snapshot())::text"
+# Cursor und Snapshot-xmin aus demselben Snapshot; der LIMIT-0-Zugriff prüft nur, dass change_xid existiert
+STREAM_CURSOR_SQL = """
+    SELECT pg_snapshot_xmin(pg_current_snapshot())::text AS xmin,
+           (SELECT COALESCE(MAX(change_seq), 0) FROM coin_streams) AS seq,
+           (SELECT change_xid FROM coin_streams LIMIT 0) IS NULL AS has_xid
+"""
+STREAM_CHANGES_LIMIT = 5000  # Rest folgt im nächsten Refresh
+STREAM_LATE_CHANGES_LIMIT = 1000  # Nachzügler je Refresh, Rest folgt im nächsten
+
+# === UNIFIED SERVICE KLASSE ===
+class UnifiedService:
+    """
+    Vereinter Service für Pump-Discovery und Metric-Tracking
+    Verwendet nur 1 WebSocket-Verbindung
+    """
+
+    def __init__(self):
+        # Datenbank
+        self.pool = None
+        self.phases_config = {}
+        self.sorted_phase_ids = []
+
+        # Cache-System (NEU)
+        self.coin_cache = CoinCache(COIN_CACHE_SECONDS)
+        self.coin_filter = CoinFilter(SPAM_BURST_WINDOW)
+
+        # Watchlist für aktive Coins
+        self.watchlist = {}  # {mint: entry}
+        self.subscribed_mints = set()
+
+        # Trade-Buffer für aktive Coins
+        self.trade_buffer = {}  # {mint: [(timestamp, trade_data), ...]}
+
+        # ATH-Tracking
+        self.ath_cache = {}  # {mint: ath_price}
+        self.dirty_aths = set()
+        self.last_ath_flush = time.time()
+
+        # Zombie-Coin Detection & Watchdog
+        self.last_trade_timestamps = {}  # {mint: timestamp}
+        self.subscription_watchdog = {}  # {mint: last_heartbeat}
+        self.stale_data_warnings = {}  # {mint: warning_count}
+        self.last_saved_signatures = {}  # {mint: last_saved_data_signature}
+
+        # WebSocket Batching
+        self.pending_subscriptions = set()
+        self.batching_task = None
+        self.last_batch_flush = time.time()
+
+        # Resubscribe nach Reconnect (in Chunks, junge Coins zuerst)
+        self.resubscribe_task = None
+        self.resubscribe_progress = None
+
+        # Engine-Snapshot: nur geänderte Coins neu serialisieren
+        self.snapshot_signatures = {}  # {mint: Änderungsmerkmal} (Event-Loop)
+        self.snapshot_fragments = {}  # {mint: JSON-Fragment} (Publisher-Thread)
+
+        # Discovery-Buffer
+        self.discovery_buffer = []
+        self.last_discovery_flush = time.time()
+        self.n8n_sender = N8nSender(N8N_QUEUE_SIZE, N8N_MAX_IN_FLIGHT,
+                                    on_delivered=self.mark_n8n_sent, on_failed=self.handle_failed_batch)
+        self.dead_letter = DeadLetterQueue(N8N_DLQ_DIR, N8N_DLQ_MAX_AGE, N8N_DLQ_COMPACT_BYTES) if N8N_DLQ_DIR else None
+
+        # Direkte Persistenz (DIRECT_PERSISTENCE)
+        self.persist_buffer = []
+        self.last_persist_flush = time.time()
+
+        # Stream-Sync per LISTEN/NOTIFY (Vollabgleich nur noch als Sicherheitsnetz)
+        self.stream_events = deque()
+        self.stream_listener_connected = False  # LISTEN aktiv und NOTIFY-Trigger vorhanden
+        self.stream_notify_missing = None
+        self.stream_resync_needed = True
+        self.last_stream_reconcile = 0
+
+        # Delta-Sync über coin_streams.change_seq (ohne LISTEN)
+        self.stream_sync_seq = None
+        self.stream_sync_xmin = None  # Älteste beim letzten Abruf offene Transaktion (xid8 als Text)
+        self.stream_late_seq = 0  # Position im laufenden Durchlauf der Nachzügler (0 = Durchlauf beginnt)
+        self.stream_late_xmin = None  # xmin zu Beginn des laufenden Durchlaufs
+        self.stream_delta_supported = True
+        self.stream_join_pending = set()
+
+        # Latenz-Sampling (jeder LATENCY_SAMPLE_RATE-te Trade)
+        self.latency_sample_counter = 0
+
+        # Wartungs-Jobs (eigene Kadenz, nicht auf dem Receive-Pfad)
+        self.maintenance = MaintenanceScheduler(jitter=MAINTENANCE_JITTER)
+        self.maintenance.add_job("stream_repair", self.repair_missing_streams, STREAM_REPAIR_INTERVAL, MAINTENANCE_JOB_TIMEOUT)
+        self.maintenance.add_job("buffer_cleanup", self.run_buffer_cleanup, 10, MAINTENANCE_JOB_TIMEOUT)
+        self.maintenance.add_job("orphan_detection", self.detect_orphans, ORPHAN_CHECK_INTERVAL, MAINTENANCE_JOB_TIMEOUT)
+        self.maintenance.add_job("memory_accounting", self.run_memory_accounting, MEMORY_ACCOUNTING_INTERVAL, MAINTENANCE_JOB_TIMEOUT)
+
+        # Capture-Modus: rohe Frames für Replay aufzeichnen
+        self.frame_recorder = FrameRecorder(WS_CAPTURE_DIR, WS_CAPTURE_SEGMENT_SECONDS) if WS_CAPTURE_DIR else None
+
+        # Sharding: Koordinator (self.shards) oder Worker (self.shard_ring)
+        self.shards = None
+        self.shard_id = None
+        self.shard_ring = None
+        self.shard_link = None
+        self.shard_inbox = deque()
+        self.shard_stopped = asyncio.Event()
+        self.trade_ring = None  # Worker mit SHARD_FEED=ring
+        self.discovery_enabled = True
+        self.manage_schema = True
+
+        # Multi-Replika: Stream-Eigentum über Postgres-Leases (ReplicaCoordinator)
+        self.replica = None
+
+        # PROCESS_ROLE=engine: laufende Steuerbefehle des API-Prozesses
+        self.engine_command_tasks = set()
+
+        # Warm-Restart: In-Memory-Zustand periodisch und beim Beenden sichern (WARM_RESTART_FILE)
+        self.warm_state = WarmStateStore(WARM_RESTART_FILE, WARM_RESTART_MAX_AGE) if WARM_RESTART_FILE else None
+        self.warm_state_write = None  # Laufender Schreibvorgang im Thread
+        if self.warm_state:
+            self.maintenance.add_job("warm_state", self.save_warm_state, WARM_RESTART_INTERVAL, MAINTENANCE_JOB_TIMEOUT)
+
+    # === DATENBANK METHODEN ===
+    async def init_db_connection(self):
+        """Datenbank-Verbindung aufbauen"""
+        while True:
+            try:
+                if self.pool:
+                    await self.pool.close()
+
+                self.pool = await asyncpg.create_pool(DB_DSN, min_size=1, max_size=10)
+                if self.manage_schema:
+                    await apply_migrations(self.pool)
+
+                # Phasen-Konfiguration laden
+                rows = await self.pool.fetch("SELECT * FROM ref_coin_phases ORDER BY id ASC")
+                self.phases_config = {}
+                for row in rows:
+                    self.phases_config[row["id"]] = {
+                        "interval": row["interval_seconds"],
+                        "max_age": row["max_age_minutes"],
+                        "name": row["name"]
+                    }
+                self.sorted_phase_ids = sorted(self.phases_config.keys())
+
+                print(f"✅ DB verbunden. Geladene Phasen: {self.sorted_phase_ids}", flush=True)
+                unified_status["db_connected"] = True
+                unified_status["last_error"] = None
+                db_connected.set(1)
+                return
 
             except Exception as e:
                 unified_status["db_connected"] = False
@@ -1659,7 +5214,8 @@ class UnifiedService:
 
             # Neue Verbindung mit aktueller DSN aufbauen
             self.pool = await asyncpg.create_pool(DB_DSN, min_size=1, max_size=10)
-            await check_and_create_schema(self.pool)
+            if self.manage_schema:
+                await apply_migrations(self.pool)
 
             # Phasen neu laden
             rows = await self.pool.fetch("SELECT * FROM ref_coin_phases ORDER BY id ASC")
@@ -1722,130 +5278,1017 @@ class UnifiedService:
             print(f"🔄 Phasen-Konfiguration neu geladen: {len(self.phases_config)} Phasen, {updated_count} Streams aktualisiert", flush=True)
             return updated_count
 
-        except Exception as e:
-            print(f"❌ Fehler beim Neuladen der Phasen: {e}", flush=True)
-            raise
+        except Exception as e:
+            print(f"❌ Fehler beim Neuladen der Phasen: {e}", flush=True)
+            raise
+
+    async def get_active_streams(self, mints=None):
+        """Lädt aktive Coin-Streams (alle oder nur die angegebenen Mints)"""
+        try:
+            with db_query_duration.time():
+                # Aktive Streams laden
+                sql = """
+                    SELECT cs.token_address, cs.current_phase_id, dc.token_created_at,
+                           cs.started_at, dc.trader_public_key, cs.ath_price_sol
+                    FROM coin_streams cs
+                    JOIN discovered_coins dc ON cs.token_address = dc.token_address
+                    WHERE cs.is_active = TRUE
+                """
+                if mints is not None:
+                    rows = await self.pool.fetch(sql + " AND cs.token_address = ANY($1::varchar[])", list(mints))
+                else:
+                    rows = await self.pool.fetch(sql)
+                stream_sync_rows.labels(mode="full" if mints is None else "lookup").inc(len(rows))
+                results = {row["token_address"]: self.stream_from_row(row) for row in rows
+                           if self.wants_stream(row["token_address"])}
+
+                ath_cache_size.set(len(self.ath_cache))
+                return results
+
+        except Exception as e:
+            print(f"⚠️ DB Query Error: {e}", flush=True)
+            unified_status["db_connected"] = False
+            db_connected.set(0)
+            db_errors.labels(type="query").inc()
+            raise
+
+    def stream_from_row(self, row):
+        """Normalisiert eine coin_streams-Zeile zu stream_data und übernimmt das ATH aus der DB"""
+        mint = row["token_address"]
+        created_at = row["token_created_at"]
+        started_at = row["started_at"]
+
+        if not created_at: created_at = datetime.now(timezone.utc)
+        if created_at.tzinfo is None: created_at = created_at.replace(tzinfo=timezone.utc)
+        if started_at and started_at.tzinfo is None: started_at = started_at.replace(tzinfo=timezone.utc)
+
+        # ATH aus DB laden
+        db_ath = row.get("ath_price_sol")
+        if db_ath is None: db_ath = 0.0
+        else: db_ath = float(db_ath)
+
+        if mint not in self.ath_cache:
+            self.ath_cache[mint] = db_ath
+        elif self.ath_cache[mint] < db_ath:
+            self.ath_cache[mint] = db_ath
+
+        return {
+            "phase_id": row["current_phase_id"],
+            "created_at": created_at,
+            "started_at": started_at or created_at,
+            "creator_address": row.get("trader_public_key")
+        }
+
+    async def get_stream_change_cursor(self):
+        """Aktueller Stand der Änderungs-Sequenz (vor einem Vollabgleich lesen). Merkt sich das
+        Snapshot-xmin, damit der nächste Delta-Sync Nachzügler offener Transaktionen mitliest.
+
+        Returns:
+            Höchste change_seq oder None, wenn die Spalten fehlen (dann nur Vollabgleich)
+        """
+        try:
+            row = await self.pool.fetchrow(STREAM_CURSOR_SQL)
+        except asyncpg.exceptions.UndefinedColumnError:
+            # Nur bis die Migrationen angewendet sind (Prozesse ohne manage_schema, z.B. Shard-Worker)
+            if self.stream_delta_supported:
+                print("⚠️ coin_streams.change_seq/change_xid fehlt (Migrationen noch nicht angewendet) - "
+                      "Stream-Sync fragt weiter alle aktiven Streams ab", flush=True)
+            self.stream_delta_supported = False
+            return None
+        self.stream_delta_supported = True
+        self.stream_sync_xmin = row["xmin"]
+        self.stream_late_seq = 0
+        return row["seq"]
+
+    async def apply_stream_changes(self):
+        """Liest nur seit dem letzten Sync geänderte coin_streams und wendet sie an.
+
+        Returns:
+            Anzahl gelesener Zeilen
+        """
+        with db_query_duration.time():
+            # xmin vor den Zeilen lesen: was dann noch offen ist, liest der nächste Durchlauf nach
+            xmin = await self.pool.fetchval(STREAM_SNAPSHOT_XMIN_SQL)
+            if self.stream_late_seq == 0:
+                self.stream_late_xmin = xmin
+            rows = await self.pool.fetch(STREAM_CHANGES_SQL, self.stream_sync_seq, STREAM_CHANGES_LIMIT)
+            late = []
+            if self.stream_sync_xmin is not None:
+                late = await self.pool.fetch(STREAM_LATE_CHANGES_SQL, self.stream_late_seq, self.stream_sync_seq,
+                                             self.stream_sync_xmin, STREAM_LATE_CHANGES_LIMIT)
+            if len(late) < STREAM_LATE_CHANGES_LIMIT:
+                # Durchlauf komplett: ab jetzt zählt das xmin von seinem Beginn
+                self.stream_late_seq = 0
+                self.stream_sync_xmin = self.stream_late_xmin
+            else:
+                # Volle Seite - das alte xmin gilt weiter, bis alle Nachzügler gelesen sind
+                self.stream_late_seq = late[-1]["change_seq"]
+            rows = [*late, *rows]
+            # Streams, deren discovered_coins-Zeile beim letzten Mal noch fehlte
+            retry = {}
+            if self.stream_join_pending:
+                retry = await self.get_active_streams(list(self.stream_join_pending))
+        stream_sync_rows.labels(mode="delta").inc(len(rows))
+
+        now_ts = time.time()
+        for mint, stream_data in retry.items():
+            self.stream_join_pending.discard(mint)
+            if mint not in self.watchlist:
+                await self.activate_stream(mint, stream_data, now_ts)
+
+        for row in rows:
+            mint = row["token_address"]
+            self.stream_sync_seq = max(self.stream_sync_seq, row["change_seq"])
+            if not self.wants_stream(mint):
+                continue
+            if not row["is_active"]:
+                self.stream_join_pending.discard(mint)
+                self.remove_from_watchlist(mint)
+            elif mint in self.watchlist:
+                self.update_stream_phase(mint, row["current_phase_id"], now_ts)
+            elif not row["has_coin"]:
+                # Wie beim Vollabgleich: ohne discovered_coins-Zeile noch nicht tracken
+                self.stream_join_pending.add(mint)
+            else:
+                await self.activate_stream(mint, self.stream_from_row(row), now_ts)
+
+        ath_cache_size.set(len(self.ath_cache))
+        coins_tracked.set(len(self.watchlist))
+        return len(rows)
+
+    # === CACHE-MANAGEMENT ===
+    async def check_cache_activation(self, active_streams=None, current_time=None):
+        """Prüft Cache auf zu aktivierende Coins.
+
+        Args:
+            active_streams: Bereits geladene aktive Streams (None = aus der DB laden)
+        """
+        if current_time is None:
+            current_time = time.time()
+        if active_streams is None:
+            active_streams = await self.get_active_streams()
+        active_mints = set(active_streams.keys())
+
+        activated_count = 0
+        expired_count = 0
+
+        # Nur der fällige Anfang des Caches (Discovery-Reihenfolge)
+        for mint, _ in list(self.coin_cache.iter_due_coins(current_time, COIN_CACHE_SECONDS)):
+            if mint in active_mints:
+                # Coin wurde aktiviert - Cache-Trades verarbeiten
+                trades = self.coin_cache.activate_coin(mint, active_streams[mint])
+                if trades and trades["buys"] + trades["sells"]:
+                    await self.process_cached_trades(mint, trades, active_streams[mint])
+                elif mint not in self.watchlist:
+                    # Ohne Cache-Trades sofort tracken statt erst beim nächsten Vollabgleich
+                    self.add_to_watchlist(mint, active_streams[mint], now_ts=current_time)
+                activated_count += 1
+            else:
+                # Cache abgelaufen - entfernen
+                self.coin_cache.remove_coin(mint)
+                expired_count += 1
+
+        # Cache-Cleanup
+        cleaned = self.coin_cache.cleanup_expired_coins(current_time)
+
+        if activated_count > 0 or expired_count > 0 or cleaned > 0:
+            print(f"🔄 Cache-Management: {activated_count} aktiviert, {expired_count + cleaned} entfernt", flush=True)
+
+        return activated_count, expired_count + cleaned
+
+    async def get_due_cache_streams(self, current_time):
+        """Streams der fälligen Cache-Coins - ein verspätetes oder fehlendes NOTIFY verwirft so keine Cache-Trades"""
+        due = [mint for mint, data in self.coin_cache.iter_due_coins(current_time, COIN_CACHE_SECONDS)
+               if not data["activated"]]
+        return await self.get_active_streams(due) if due else {}
+
+    async def process_cached_trades(self, mint, cached_buffer, stream_data):
+        """Übernimmt den aggregierten Cache-Buffer für neu aktivierte Coins"""
+        trade_count = cached_buffer["buys"] + cached_buffer["sells"] if cached_buffer else 0
+        if not trade_count:
+            return
+
+        if self.replica and mint not in self.replica.owned:
+            # Coin gehört einer anderen Replika - Cache-Trades als eigenen Bucket speichern
+            await self.save_cache_bucket(mint, stream_data, cached_buffer)
+            return
+
+        # Watchlist-Eintrag erstellen - Cache-Buffer wird direkt der erste Flush-Bucket
+        self.add_to_watchlist(mint, stream_data, cached_buffer)
+
+        # ATH und Zombie-Detection wie bei live verarbeiteten Trades
+        now_ts = time.time()
+        self.last_trade_timestamps[mint] = now_ts
+        self.subscription_watchdog[mint] = now_ts
+        if cached_buffer["high"] > self.ath_cache.get(mint, 0.0):
+            self.ath_cache[mint] = cached_buffer["high"]
+            self.dirty_aths.add(mint)
+        trades_processed.inc(trade_count)
+
+        print(f"🔄 {trade_count} Cache-Trades für {mint[:8]}... übernommen", flush=True)
+
+    async def save_cache_bucket(self, mint, stream_data, cached_buffer):
+        """Schreibt die Cache-Trades eines fremden Coins direkt als coin_metrics-Zeile"""
+        if cached_buffer["high"] > self.ath_cache.get(mint, 0.0):
+            self.ath_cache[mint] = cached_buffer["high"]
+            self.dirty_aths.add(mint)
+        if not self.pool or not unified_status["db_connected"]:
+            return
+        row = self.metric_row(mint, stream_data["phase_id"], cached_buffer, datetime.now(GERMAN_TZ))
+        try:
+            await self.pool.execute(COIN_METRICS_INSERT_SQL, *row)
+            metrics_saved.inc()
+            unified_status["total_metrics_saved"] += 1
+        except Exception as e:
+            print(f"⚠️ Cache-Bucket für {mint[:8]}... nicht gespeichert: {e}", flush=True)
+            db_errors.labels(type="insert").inc()
+
+    async def activate_stream(self, mint, stream_data, now_ts=None):
+        """Übernimmt einen (neu) aktiven Stream in die Watchlist, inkl. aggregierter Cache-Trades"""
+        if mint in self.coin_cache.cache:
+            cached_buffer = self.coin_cache.activate_coin(mint, stream_data)
+            if cached_buffer and cached_buffer["buys"] + cached_buffer["sells"]:
+                await self.process_cached_trades(mint, cached_buffer, stream_data)
+                return
+        else:
+            # Nicht selbst entdeckt (z.B. vor dem Start angelegt) - Trades noch nicht abonniert
+            self.pending_subscriptions.add(mint)
+        self.add_to_watchlist(mint, stream_data, now_ts=now_ts)
+
+    def add_to_watchlist(self, mint, stream_data, buffer=None, now_ts=None):
+        """Legt den Watchlist-Eintrag für einen aktiven Stream an"""
+        if self.shards:
+            # Koordinator trackt nicht selbst - der zuständige Worker übernimmt Stream und Cache-Buffer
+            self.shards.handoff([(mint, {"meta": stream_data, "buffer": buffer, "ath": self.ath_cache.get(mint, 0.0)})])
+            return
+        if self.replica and mint not in self.replica.owned:
+            # Gehört einer anderen Replika - die übernimmt ihn über coin_streams.owner_replica
+            return
+        p_id = stream_data["phase_id"]
+        if p_id not in self.phases_config:
+            p_id = self.sorted_phase_ids[0] if self.sorted_phase_ids else 1
+
+        interval = self.phases_config[p_id]["interval"]
+        self.watchlist[mint] = {
+            "meta": stream_data,
+            "buffer": buffer if buffer is not None else self.get_empty_buffer(),
+            "next_flush": (now_ts if now_ts is not None else time.time()) + interval,
+            "interval": interval
+        }
+        self.subscribed_mints.add(mint)
+
+    # === STREAM-SYNC (LISTEN/NOTIFY) ===
+    def on_stream_notify(self, connection, pid, channel, payload):
+        """asyncpg-Listener: merkt coin_streams-Änderungen vor (Anwendung in der Receive-Loop)"""
+        try:
+            self.stream_events.append(json.loads(payload))
+        except ValueError:
+            print(f"⚠️ Ungültige Stream-Notification: {payload[:100]}", flush=True)
+
+    async def run_stream_listener(self, health_interval=15):
+        """Hält eine eigene LISTEN-Verbindung (außerhalb des Pools) und verbindet bei Abbruch neu"""
+        while True:
+            conn = None
+            dsn = DB_DSN
+            try:
+                conn = await asyncpg.connect(dsn)
+                await conn.add_listener(STREAM_NOTIFY_CHANNEL, self.on_stream_notify)
+                print(f"👂 LISTEN {STREAM_NOTIFY_CHANNEL} aktiv", flush=True)
+
+                # Verbindung und Trigger prüfen; neue DSN (PUT /config) erzwingt Neuverbindung
+                while dsn == DB_DSN:
+                    self.set_stream_listener_trusted(await asyncio.wait_for(stream_notify_installed(conn), timeout=5))
+                    await asyncio.sleep(health_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                db_errors.labels(type="listener").inc()
+                print(f"⚠️ Stream-Listener getrennt: {e} - Retry in {DB_RETRY_DELAY}s", flush=True)
+            finally:
+                self.stream_listener_connected = False
+                stream_listener_connected.set(0)
+                if conn is not None:
+                    try:
+                        await conn.close(timeout=5)
+                    except Exception:
+                        conn.terminate()
+            if dsn == DB_DSN:
+                await asyncio.sleep(DB_RETRY_DELAY)
+
+    def set_stream_listener_trusted(self, trusted):
+        """LISTEN ersetzt den Delta-Sync erst, wenn der NOTIFY-Trigger existiert"""
+        if trusted and not self.stream_listener_connected:
+            # Während der Verbindungslücke verpasste Events -> einmal voll abgleichen
+            self.stream_resync_needed = True
+        if not trusted and self.stream_notify_missing is not True:
+            print("⚠️ NOTIFY-Trigger auf coin_streams fehlt - Stream-Sync bleibt beim Delta-/Vollabgleich", flush=True)
+        self.stream_notify_missing = not trusted
+        self.stream_listener_connected = trusted
+        stream_listener_connected.set(1 if trusted else 0)
+
+    async def apply_stream_events(self):
+        """Wendet vorgemerkte coin_streams-Änderungen auf Watchlist und Cache an.
+
+        Returns:
+            Anzahl der betroffenen Mints
+        """
+        if not self.stream_events:
+            return 0
+
+        # Nur der letzte Stand je Mint zählt
+        latest = {}
+        while self.stream_events:
+            event = self.stream_events.popleft()
+            mint = event.get("mint")
+            if mint and self.wants_stream(mint):
+                latest[mint] = event
+                stream_events.labels(op=str(event.get("op", "unknown")).lower()).inc()
+
+        now_ts = time.time()
+        to_load = []
+        for mint, event in latest.items():
+            if not event.get("is_active"):
+                self.remove_from_watchlist(mint)
+            elif mint in self.watchlist:
+                self.update_stream_phase(mint, event.get("phase_id"), now_ts)
+            else:
+                to_load.append(mint)
+
+        if to_load:
+            try:
+                streams = await self.get_active_streams(to_load)
+            except Exception:
+                # Events sind verbraucht - beim nächsten Refresh voll abgleichen
+                self.stream_resync_needed = True
+                return len(latest)
+            for mint, stream_data in streams.items():
+                if mint not in self.watchlist:
+                    await self.activate_stream(mint, stream_data, now_ts)
+
+        coins_tracked.set(len(self.watchlist))
+        return len(latest)
+
+    def remove_from_watchlist(self, mint):
+        """Entfernt einen nicht mehr aktiven Stream aus Watchlist und Subscriptions"""
+        self.watchlist.pop(mint, None)
+        self.subscribed_mints.discard(mint)
+
+    def update_stream_phase(self, mint, phase_id, now_ts):
+        """Übernimmt einen extern gesetzten Phasenwechsel (eigene Wechsel sind schon angewendet)"""
+        entry = self.watchlist[mint]
+        if phase_id is None or phase_id == entry["meta"]["phase_id"] or phase_id >= 99:
+            return
+        if phase_id not in self.phases_config:
+            return
+        entry["meta"]["phase_id"] = phase_id
+        entry["interval"] = self.phases_config[phase_id]["interval"]
+        entry["next_flush"] = now_ts + entry["interval"]
+
+    def reconcile_watchlist(self, db_streams, now_ts):
+        """Vollabgleich der Watchlist mit den aktiven Streams aus der DB.
+
+        Returns:
+            (hinzugefügt, entfernt)
+        """
+        current_set = set(db_streams.keys())
+
+        # Entferne beendete Coins
+        to_remove = self.subscribed_mints - current_set
+        for mint in to_remove:
+            self.remove_from_watchlist(mint)
+
+        # Neue aktive Coins hinzufügen
+        to_add = current_set - self.subscribed_mints
+        for mint in to_add:
+            if mint not in self.coin_cache.cache:
+                self.pending_subscriptions.add(mint)
+            self.add_to_watchlist(mint, db_streams[mint], now_ts=now_ts)
+
+        return len(to_add), len(to_remove)
+
+    # === SHARDING ===
+    def owns(self, mint):
+        """Trackt dieser Prozess den Coin? (ohne Sharding immer, der Koordinator nie)"""
+        if self.shards:
+            return False
+        if self.replica:
+            return mint in self.replica.owned
+        return self.shard_ring is None or self.shard_ring.owner(mint) == self.shard_id
+
+    def wants_stream(self, mint):
+        """Stream-Sync nur für eigene Coins - der Koordinator braucht nur die Streams seiner Cache-Coins"""
+        return self.owns(mint) or mint in self.coin_cache.cache
+
+    def configure_shard(self, shard_id, ring, link):
+        """Worker-Modus: nur Coins des eigenen Shards tracken, keine Discovery"""
+        self.shard_id = shard_id
+        self.shard_ring = ring
+        self.shard_link = link
+        self.shard_sender = PipeSender(link, f"shard-{shard_id}-link")
+        self.discovery_enabled = False
+        self.manage_schema = False  # Schema pflegt der Koordinator
+        self.maintenance.disable("stream_repair", "läuft im Koordinator")
+        # Coins übergibt der Koordinator - kein eigener Warm-Restart
+        self.maintenance.disable("warm_state", "Shard-Worker")
+        self.warm_state = None
+
+    async def run_shard_link(self):
+        """Worker: Nachrichten des Koordinators annehmen und regelmäßig Stats melden"""
+        loop = asyncio.get_running_loop()
+        fd = self.shard_link.fileno()
+        wakeup = asyncio.Event()
+
+        def on_readable():
+            try:
+                while self.shard_link.poll():
+                    self.shard_inbox.append(self.shard_link.recv())
+            except (EOFError, OSError):
+                # Koordinator beendet - Worker folgt
+                loop.remove_reader(fd)
+                self.shard_stopped.set()
+            wakeup.set()
+
+        loop.add_reader(fd, on_readable)
+        last_report = 0
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=SHARD_STATS_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+
+                # Normalerweise wendet die Receive-Loop die Nachrichten an - ohne WebSocket läuft sie nicht
+                if not unified_status["ws_connected"]:
+                    await self.apply_shard_messages()
+
+                if time.time() - last_report >= SHARD_STATS_INTERVAL:
+                    self.send_to_coordinator(("stats", self.get_shard_stats()))
+                    last_report = time.time()
+        finally:
+            loop.remove_reader(fd)
+
+    def send_to_coordinator(self, msg):
+        """Reiht eine Nachricht an den Koordinator ein (blockiert nie, siehe PipeSender)"""
+        if not self.shard_sender.send(msg):
+            self.shard_stopped.set()
+
+    async def apply_shard_messages(self):
+        """Worker: wendet vorgemerkte Koordinator-Nachrichten an (Übernahmen, neuer Ring, Stop).
+
+        Returns:
+            Anzahl angewendeter Nachrichten
+        """
+        count = 0
+        moved = []
+        now_ts = time.time()
+        while self.shard_inbox:
+            kind, *args = self.shard_inbox.popleft()
+            if kind == "adopt":
+                for mint, state in args[0]:
+                    self.adopt_coin(mint, state, now_ts)
+            elif kind == "ring":
+                moved.extend(self.apply_shard_ring(args[0]))
+            elif kind == "stop":
+                self.shard_stopped.set()
+            count += 1
+
+        if moved:
+            await self.unsubscribe_trades(moved)
+        coins_tracked.set(len(self.watchlist))
+        return count
+
+    def apply_shard_ring(self, nodes):
+        """Übernimmt einen neuen Ring: nicht mehr eigene Coins samt Zustand an den Koordinator abgeben.
+
+        Returns:
+            Abgegebene Mints
+        """
+        self.shard_ring = HashRing(nodes, self.shard_ring.vnodes)
+        moved = [mint for mint in self.watchlist if not self.owns(mint)]
+        for offset in range(0, len(moved), SHARD_HANDOFF_BATCH):
+            batch = moved[offset:offset + SHARD_HANDOFF_BATCH]
+            self.send_to_coordinator(("handoff", [(mint, self.export_coin(mint)) for mint in batch]))
+            for mint in batch:
+                self.remove_from_watchlist(mint)
+                self.pending_subscriptions.discard(mint)
+
+        # Neu zugeteilte Coins kommen per Übernahme oder spätestens beim Vollabgleich
+        self.stream_resync_needed = True
+        print(f"🧩 Shard {self.shard_id}: neuer Ring {nodes} - {len(moved)} Coins abgegeben", flush=True)
+        return moved
+
+    def export_coin(self, mint):
+        """Zustand eines Coins für die Übergabe an einen anderen Shard"""
+        entry = self.watchlist[mint]
+        ath_dirty = mint in self.dirty_aths
+        self.dirty_aths.discard(mint)
+        return {
+            "meta": entry["meta"],
+            "buffer": entry["buffer"],
+            "next_flush": entry["next_flush"],
+            "ath": self.ath_cache.get(mint, 0.0),
+            "ath_dirty": ath_dirty,
+            "last_trade": self.last_trade_timestamps.get(mint),
+        }
+
+    def adopt_coin(self, mint, state, now_ts):
+        """Übernimmt einen Coin (Cache-Aktivierung im Koordinator oder Umverteilung)"""
+        buffer = state.get("buffer")
+        entry = self.watchlist.get(mint)
+        if entry is None:
+            self.add_to_watchlist(mint, state["meta"], buffer, now_ts)
+            if state.get("next_flush"):
+                self.watchlist[mint]["next_flush"] = state["next_flush"]
+            self.pending_subscriptions.add(mint)
+        elif buffer:
+            # Stream kam schon per eigenem Sync - älteren Buffer einrechnen
+            merge_trade_buffers(entry["buffer"], buffer)
+
+        ath = max(state.get("ath") or 0.0, buffer["high"] if buffer else 0.0)
+        if ath > self.ath_cache.get(mint, 0.0):
+            self.ath_cache[mint] = ath
+            self.dirty_aths.add(mint)
+        elif state.get("ath_dirty"):
+            self.dirty_aths.add(mint)
+        self.last_trade_timestamps[mint] = max(self.last_trade_timestamps.get(mint, 0), state.get("last_trade") or now_ts)
+        self.subscription_watchdog[mint] = now_ts
 
-    async def get_active_streams(self):
-        """Lädt aktive Coin-Streams"""
+    async def unsubscribe_trades(self, mints):
+        """Trade-Subscriptions abgegebener Coins beenden"""
+        if not getattr(self, "websocket", None):
+            return
         try:
-            with db_query_duration.time():
-                # Repair fehlende Streams
-                try:
-                    await self.pool.execute("SELECT repair_missing_streams()")
-                except:
-                    pass  # Funktion existiert vielleicht noch nicht
+            await self.websocket.send(json.dumps({"method": "unsubscribeTokenTrade", "keys": mints}))
+        except Exception as e:
+            print(f"⚠️ Unsubscribe für {len(mints)} Coins fehlgeschlagen: {e}", flush=True)
 
-                # Aktive Streams laden
-                sql = """
-                    SELECT cs.token_address, cs.current_phase_id, dc.token_created_at,
-                           cs.started_at, dc.trader_public_key, cs.ath_price_sol
-                    FROM coin_streams cs
-                    JOIN discovered_coins dc ON cs.token_address = dc.token_address
-                    WHERE cs.is_active = TRUE
-                """
-                rows = await self.pool.fetch(sql)
-                results = {}
+    def get_shard_stats(self):
+        """Stats-Meldung eines Workers an den Koordinator"""
+        return {
+            "shard": self.shard_id,
+            "pid": os.getpid(),
+            "coins_tracked": len(self.watchlist),
+            "pending_subscriptions": len(self.pending_subscriptions),
+            "trades_processed": unified_status["total_trades"],
+            "metrics_saved": unified_status["total_metrics_saved"],
+            "ws_connected": unified_status["ws_connected"],
+            "db_connected": unified_status["db_connected"],
+            "last_message_time": unified_status["last_message_time"],
+            "reported_at": time.time(),
+            "counters": counter_totals(),
+        }
 
-                for row in rows:
-                    mint = row["token_address"]
-                    created_at = row["token_created_at"]
-                    started_at = row["started_at"]
-
-                    if not created_at: created_at = datetime.now(timezone.utc)
-                    if created_at.tzinfo is None: created_at = created_at.replace(tzinfo=timezone.utc)
-                    if started_at and started_at.tzinfo is None: started_at = started_at.replace(tzinfo=timezone.utc)
-
-                    # ATH aus DB laden
-                    db_ath = row.get("ath_price_sol")
-                    if db_ath is None: db_ath = 0.0
-                    else: db_ath = float(db_ath)
-
-                    if mint not in self.ath_cache:
-                        self.ath_cache[mint] = db_ath
-                    elif self.ath_cache[mint] < db_ath:
-                        self.ath_cache[mint] = db_ath
-
-                    results[mint] = {
-                        "phase_id": row["current_phase_id"],
-                        "created_at": created_at,
-                        "started_at": started_at or created_at,
-                        "creator_address": row.get("trader_public_key")
-                    }
+    # === RING-FEED ===
+    async def run_trade_ring(self, ring):
+        """Worker mit SHARD_FEED=ring: Trades kommen dekodiert aus dem Ring des Koordinators statt
+        über einen eigenen WebSocket; (Un-)Subscribes gehen per ShardFeedLink an den Koordinator"""
+        await self.init_db_connection()
+        self.trade_ring = ring
+        self.websocket = ShardFeedLink(self)
+        unified_status["ws_connected"] = True
+        unified_status["connection_start"] = time.time()
+        ws_connected.set(1)
+        self.batching_task = asyncio.create_task(self.run_subscription_batching_task(self.websocket))
+
+        last_refresh = 0
+        last_housekeeping = 0
+        try:
+            while True:
+                now_ts = time.time()
+                if now_ts - last_refresh > DB_REFRESH_INTERVAL and await self.sync_streams(now_ts):
+                    last_refresh = now_ts
+
+                consumed = self.consume_trade_ring()
+                # Wie die Receive-Loop: nach neuen Trades, sonst spätestens jede Sekunde
+                if consumed or now_ts - last_housekeeping >= 1.0:
+                    await self.run_housekeeping(now_ts)
+                    last_housekeeping = now_ts
+                if not consumed:
+                    await asyncio.sleep(TRADE_RING_POLL_INTERVAL)
+        finally:
+            self.batching_task.cancel()
+            unified_status["ws_connected"] = False
+            ws_connected.set(0)
 
-                ath_cache_size.set(len(self.ath_cache))
-                return results
+    def consume_trade_ring(self):
+        """Verarbeitet bis zu TRADE_RING_BATCH Records aus dem Ring (kein JSON im Worker).
 
-        except Exception as e:
-            print(f"⚠️ DB Query Error: {e}", flush=True)
-            unified_status["db_connected"] = False
-            db_connected.set(0)
-            db_errors.labels(type="query").inc()
-            raise
+        Returns:
+            Anzahl gelesener Records
+        """
+        records = self.trade_ring.pop(TRADE_RING_BATCH)
+        if not records:
+            return 0
+        for record in records:
+            mint, parsed, recv_ts = decode_trade_record(record)
+            if mint in self.watchlist:
+                self.apply_trade(mint, parsed, self.sample_trade_latency(recv_ts))
+                trades_processed.inc()
+                unified_status["total_trades"] += 1
+        now = time.time()
+        unified_status["last_message_time"] = now
+        last_trade_timestamp.set(now)
+        return len(records)
+
+    async def forward_feed_requests(self):
+        """Koordinator: (Un-)Subscribes der Worker über den eigenen WebSocket senden"""
+        outbox = self.shards.feed_outbox
+        while outbox and self.websocket:
+            try:
+                await self.websocket.send(json.dumps(outbox[0]))
+            except Exception as e:
+                # Nach dem Reconnect stellt restore_feed den vollständigen Stand wieder her
+                print(f"⚠️ Weiterleiten der Worker-Subscriptions fehlgeschlagen: {e}", flush=True)
+                return
+            outbox.popleft()
 
-    # === CACHE-MANAGEMENT ===
-    async def check_cache_activation(self):
-        """Prüft Cache auf zu aktivierende Coins"""
-        current_time = time.time()
-        active_streams = await self.get_active_streams()
-        active_mints = set(active_streams.keys())
+    # === MULTI-REPLICA ===
+    async def run_replica(self):
+        """Replika-Modus: Lease erneuern, Leader-Lock halten, als Leader zuteilen, eigene Streams abgleichen"""
+        while True:
+            try:
+                if self.pool and unified_status["db_connected"]:
+                    await self.replica.heartbeat(self.pool)
+                    is_leader = await self.replica.try_lead(DB_DSN)
+                    await self.set_discovery(is_leader)
+                    if is_leader:
+                        await self.replica.balance(self.pool)
+                    await self.replica.fetch_owned(self.pool)
+            except Exception as e:
+                print(f"⚠️ Replika-Abgleich fehlgeschlagen: {e}", flush=True)
 
-        activated_count = 0
-        expired_count = 0
+            # Ohne erneuerten Lease übernehmen andere Replikas - selbst sofort abgeben
+            if self.replica.lease_expired():
+                await self.replica.drop_lock()
+                await self.set_discovery(False)
+                self.replica.fence()
 
-        for mint in list(self.coin_cache.cache.keys()):
-            cache_data = self.coin_cache.cache[mint]
-            age = current_time - cache_data["discovered_at"]
+            # Normalerweise wendet die Receive-Loop die Änderungen an - ohne WebSocket läuft sie nicht
+            if not unified_status["ws_connected"]:
+                await self.apply_replica_changes()
+            await asyncio.sleep(REPLICA_HEARTBEAT_INTERVAL)
 
-            if age >= COIN_CACHE_SECONDS:
-                if mint in active_mints:
-                    # Coin wurde aktiviert - Cache-Trades verarbeiten
-                    trades = self.coin_cache.activate_coin(mint, active_streams[mint])
-                    await self.process_cached_trades(mint, trades, active_streams[mint])
-                    activated_count += 1
-                else:
-                    # Cache abgelaufen - entfernen
-                    self.coin_cache.remove_coin(mint)
-                    expired_count += 1
+    async def apply_replica_changes(self):
+        """Wendet vorgemerkte Eigentumswechsel an: zur Übergabe markierte Coins mit ihrem Teil-Buffer
+        übergeben, verlorene Coins abgeben, gewonnene laden.
 
-        # Cache-Cleanup
-        cleaned = self.coin_cache.cleanup_expired_coins(current_time)
+        Returns:
+            (gewonnen, verloren)
+        """
+        if not self.replica:
+            return 0, 0
+        handed_off = await self.hand_over_streams()
+        if not self.replica.pending and not handed_off:
+            return 0, 0
+        gained, lost = self.replica.pending or (set(), set())
+        self.replica.pending = None
+
+        lost = [mint for mint in lost | handed_off if mint in self.watchlist]
+        for mint in lost:
+            self.remove_from_watchlist(mint)
+            self.pending_subscriptions.discard(mint)
+        if lost:
+            await self.unsubscribe_trades(lost)
+
+        gained = [mint for mint in gained if mint not in self.watchlist]
+        if gained:
+            try:
+                streams = await self.get_active_streams(gained)
+            except Exception as e:
+                print(f"⚠️ Übernommene Streams nicht geladen: {e}", flush=True)
+                self.stream_resync_needed = True
+                streams = {}
+            now_ts = time.time()
+            for mint, stream_data in streams.items():
+                await self.activate_stream(mint, stream_data, now_ts)
 
-        if activated_count > 0 or expired_count > 0 or cleaned > 0:
-            print(f"🔄 Cache-Management: {activated_count} aktiviert, {expired_count + cleaned} entfernt", flush=True)
+        if gained or lost:
+            coins_tracked.set(len(self.watchlist))
+            print(f"🤝 Replika {self.replica.replica_id}: {len(gained)} Coins übernommen, {len(lost)} abgegeben", flush=True)
+        return len(gained), len(lost)
 
-        return activated_count, expired_count + cleaned
+    async def hand_over_streams(self):
+        """Vom Leader umverteilte Streams übergeben: angefangene Buffer schreiben, dann owner_replica
+        auf das Ziel setzen. Das Ziel lädt den Stream erst danach - kein paralleles Tracken.
+
+        Returns:
+            Übergebene Mints
+        """
+        mints = set(self.replica.handoffs)
+        if not mints or not self.pool or not unified_status["db_connected"]:
+            return set()
+        try:
+            return await self.replica.confirm_handoffs(self.pool, mints, self.partial_metric_rows(mints))
+        except Exception as e:
+            # Bleibt markiert - der nächste Abgleich versucht es erneut
+            print(f"⚠️ Übergabe von {len(mints)} Streams fehlgeschlagen: {e}", flush=True)
+            db_errors.labels(type="insert").inc()
+            return set()
 
-    async def process_cached_trades(self, mint, cached_trades, stream_data):
-        """Verarbeitet Cache-Trades für neu aktivierte Coins"""
-        if not cached_trades:
+    def partial_metric_rows(self, mints):
+        """coin_metrics-Zeilen der angefangenen Intervalle (Übergabe/Shutdown im Replika-Modus)"""
+        now_berlin = datetime.now(GERMAN_TZ)
+        rows = []
+        for mint in mints:
+            entry = self.watchlist.get(mint)
+            if entry and entry["buffer"]["buys"] + entry["buffer"]["sells"] > 0:
+                rows.append(self.metric_row(mint, entry["meta"]["phase_id"], entry["buffer"], now_berlin))
+        return rows
+
+    async def set_discovery(self, enabled):
+        """Discovery (subscribeNewToken) nur auf der Leader-Replika"""
+        if enabled == self.discovery_enabled:
             return
+        self.discovery_enabled = enabled
+        if not getattr(self, "websocket", None):
+            return
+        method = "subscribeNewToken" if enabled else "unsubscribeNewToken"
+        try:
+            await self.websocket.send(json.dumps({"method": method}))
+            print(f"📡 {method} (Leader-Wechsel)", flush=True)
+        except Exception as e:
+            print(f"⚠️ {method} fehlgeschlagen: {e}", flush=True)
 
-        # Watchlist-Eintrag erstellen
-        p_id = stream_data["phase_id"]
-        if p_id not in self.phases_config:
-            p_id = self.sorted_phase_ids[0] if self.sorted_phase_ids else 1
+    # === PROZESS-TRENNUNG ===
+    def live_tracking(self, mint, now_ts):
+        """Live-Daten eines Coins aus Watchlist oder Cache (None, wenn nicht im Speicher)"""
+        entry = self.watchlist.get(mint)
+        if entry is not None:
+            buf = entry["buffer"]
+            return {
+                "price_open": buf["open"],
+                "price_high": buf["high"] if buf["high"] != -1 else None,
+                "price_low": buf["low"] if buf["low"] != float("inf") else None,
+                "price_close": buf["close"],
+                "volume_sol": buf["vol"],
+                "buy_volume_sol": buf["vol_buy"],
+                "sell_volume_sol": buf["vol_sell"],
+                "num_buys": buf["buys"],
+                "num_sells": buf["sells"],
+                "unique_wallets": len(buf["wallets"]),
+                "market_cap_sol": buf["mcap"],
+                "interval_seconds": entry["interval"],
+                "next_flush_seconds": round(entry["next_flush"] - now_ts, 1),
+            }
+        cache_entry = self.coin_cache.cache.get(mint)
+        if cache_entry is not None:
+            return {
+                "status": "in_cache",
+                "discovered_at": cache_entry["discovered_at"],
+                "n8n_sent": cache_entry["n8n_sent"],
+                "activated": cache_entry["activated"],
+                "cached_trades": CoinCache.trade_count(cache_entry),
+            }
+        return None
 
-        interval = self.phases_config[p_id]["interval"]
-        self.watchlist[mint] = {
-            "meta": stream_data,
-            "buffer": self.get_empty_buffer(),
-            "next_flush": time.time() + interval,
-            "interval": interval
+    def get_live_stats(self):
+        """Zähler für /health (mit Sharding die Summe der Worker-Meldungen)"""
+        stats = {
+            "cache_stats": self.coin_cache.get_cache_stats(),
+            "active_coins": len(self.watchlist),
+            "total_trades": unified_status["total_trades"],
+            "total_metrics_saved": unified_status["total_metrics_saved"],
+            "n8n_buffer_size": len(self.discovery_buffer),
+            "shards": None,
+            "replica": None,
+        }
+        if self.shards:
+            totals = self.shards.totals()
+            stats["active_coins"] = totals["coins_tracked"]
+            stats["total_trades"] = totals["trades_processed"]
+            stats["total_metrics_saved"] = totals["metrics_saved"]
+            stats["shards"] = self.shards.get_stats()
+            stats["shards"]["healthy"] = self.shards.healthy()
+        if self.replica:
+            # Ohne gültigen Lease trackt diese Replika nichts
+            stats["replica"] = self.replica.get_stats()
+            stats["replica"]["healthy"] = not self.replica.lease_expired()
+        return stats
+
+    def get_runtime_stats(self):
+        """Laufzeit-Zustand für GET /config"""
+        return {
+            "n8n_sender": self.n8n_sender.get_stats(),
+            "n8n_dead_letter": self.dead_letter.get_stats() if self.dead_letter else None,
+            "stream_listener_connected": self.stream_listener_connected,
+            "maintenance_jobs": self.maintenance.get_stats(),
+            "shards": self.shards.get_stats() if self.shards else None,
+            "replica": self.replica.get_stats() if self.replica else None,
+            "persist_pending": len(self.persist_buffer),
+            "filter_pipeline": self.coin_filter.get_pipeline_stats(),
+            "warm_state": self.warm_state.get_stats() if self.warm_state else None,
+            "resubscribe": self.resubscribe_progress,
         }
-        self.subscribed_mints.add(mint)
 
-        # Cache-Trades verarbeiten (chronologisch)
-        cached_trades.sort(key=lambda x: x[0])  # Nach Timestamp sortieren
-        processed_count = 0
+    def snapshot_coin_changes(self, now_ts):
+        """Event-Loop: Live-Daten nur der Coins, die sich seit dem letzten Snapshot geändert haben.
 
-        for trade_ts, trade_data in cached_trades:
-            if mint in self.watchlist:
-                self.process_trade(trade_data)
-                processed_count += 1
-                trades_processed.inc()
+        Returns:
+            ({mint: Live-Daten} der geänderten Coins, Liste aller Mints im Snapshot)
+        """
+        signatures = {}
+        changed = {}
+        for mint, entry in self.watchlist.items():
+            buf = entry["buffer"]
+            # Jeder Trade zählt buys/sells hoch, Flush und Phasenwechsel setzen next_flush neu
+            signatures[mint] = (buf["buys"] + buf["sells"], entry["next_flush"], entry["interval"])
+        for mint, cache_entry in self.coin_cache.cache.items():
+            if mint not in signatures:
+                signatures[mint] = (cache_entry["n8n_sent"], cache_entry["activated"], CoinCache.trade_count(cache_entry))
+        for mint, signature in signatures.items():
+            if self.snapshot_signatures.get(mint) != signature:
+                data = self.live_tracking(mint, now_ts)
+                if "next_flush_seconds" in data:
+                    # Absolut, damit das Fragment bis zur nächsten Änderung gültig bleibt
+                    del data["next_flush_seconds"]
+                    data["next_flush_at"] = self.watchlist[mint]["next_flush"]
+                changed[mint] = data
+        self.snapshot_signatures = signatures
+        return changed, list(signatures)
+
+    def encode_state_snapshot(self, head, changed, mints):
+        """Publisher-Thread: Snapshot-JSON aus Kopfteil, zwischengespeicherten Coin-Fragmenten und Metriken"""
+        fragments = self.snapshot_fragments
+        for mint, data in changed.items():
+            fragments[mint] = json.dumps(data, default=str)
+        if len(fragments) > len(mints):
+            current = set(mints)
+            for mint in [mint for mint in fragments if mint not in current]:
+                del fragments[mint]
+        coins = ",".join(f"{json.dumps(mint)}:{fragments[mint]}" for mint in mints)
+        metrics = json.dumps(generate_latest().decode())
+        return f'{head[:-1]}, "coins": {{{coins}}}, "metrics": {metrics}}}'.encode()
+
+    async def build_state_snapshot(self, now_ts):
+        """Alles, was die API-Prozesse lesen: Status, Zähler, Live-Daten je Coin und die Prometheus-Metriken.
+        Auf der Event-Loop nur der kleine Kopfteil und geänderte Coins, Serialisierung im Thread.
+
+        Returns:
+            Snapshot als JSON-Bytes
+        """
+        head = json.dumps({
+            "published_at": now_ts,
+            "pid": os.getpid(),
+            "status": dict(unified_status),
+            "live": self.get_live_stats(),
+            "runtime": self.get_runtime_stats(),
+        }, default=str)
+        changed, mints = self.snapshot_coin_changes(now_ts)
+        return await asyncio.to_thread(self.encode_state_snapshot, head, changed, mints)
+
+    async def run_state_publisher(self, writer, interval):
+        """Engine: veröffentlicht den Zustand regelmäßig im Shared Memory"""
+        overflowing = False
+        while True:
+            started = time.perf_counter()
+            try:
+                payload = await self.build_state_snapshot(time.time())
+                if await asyncio.to_thread(writer.publish, payload):
+                    state_snapshot_bytes.set(len(payload))
+                    overflowing = False
+                else:
+                    state_snapshot_overflows.inc()
+                    if not overflowing:
+                        print(f"⚠️ Snapshot ({len(payload)} Bytes) größer als STATE_SNAPSHOT_SIZE - API sieht alten Stand", flush=True)
+                    overflowing = True
+            except Exception as e:
+                print(f"⚠️ Snapshot fehlgeschlagen: {e}", flush=True)
+            state_snapshot_duration.observe(time.perf_counter() - started)
+            await asyncio.sleep(interval)
+
+    # === WARM-RESTART ===
+    def export_warm_state(self):
+        """In-Memory-Zustand für den Warm-Restart (wird in der Event-Loop serialisiert und ist damit konsistent)"""
+        return {
+            "watchlist": self.watchlist,
+            "subscribed_mints": self.subscribed_mints,
+            "pending_subscriptions": self.pending_subscriptions,
+            "coin_cache": self.coin_cache.cache,
+            "ath_cache": self.ath_cache,
+            "dirty_aths": self.dirty_aths,
+            "last_trade_timestamps": self.last_trade_timestamps,
+            "subscription_watchdog": self.subscription_watchdog,
+            "stale_data_warnings": self.stale_data_warnings,
+            "last_saved_signatures": self.last_saved_signatures,
+        }
+
+    async def save_warm_state(self, now_ts=None, clean=False):
+        """Schreibt den Warm-Restart-Snapshot (Wartungs-Job und mit clean=True beim Beenden).
+
+        Returns:
+            Größe in Bytes oder None
+        """
+        if not self.warm_state:
+            return None
+        # Ein abgebrochener Job (stop_tasks) lässt seinen Schreib-Thread weiterlaufen - dessen os.replace
+        # darf nicht nach diesem Snapshot landen (sonst überschreibt ein älterer den vom Beenden)
+        if self.warm_state_write is not None:
+            await asyncio.wait([self.warm_state_write])
+        started = time.perf_counter()
+        try:
+            payload = pickle.dumps(self.export_warm_state(), pickle.HIGHEST_PROTOCOL)
+            # Komprimieren und fsync im Thread; shield, damit der Abbruch des Jobs den Schreibvorgang nicht verwaist
+            self.warm_state_write = asyncio.ensure_future(
+                asyncio.to_thread(self.warm_state.write, payload, now_ts or time.time(), clean))
+            size = await asyncio.shield(self.warm_state_write)
+        except Exception as e:
+            warm_state_saves.labels(result="error").inc()
+            print(f"⚠️ Warm-Restart-Snapshot fehlgeschlagen: {e}", flush=True)
+            return None
+        warm_state_saves.labels(result="ok").inc()
+        warm_state_bytes.set(size)
+        warm_state_save_duration.observe(time.perf_counter() - started)
+        return size
+
+    def restore_warm_state(self, state, clean=False, now_ts=None):
+        """Übernimmt einen Warm-Restart-Snapshot; Abweichungen zur DB korrigiert der erste Stream-Abgleich.
+        Trade-Buffer nur aus einem Snapshot vom regulären Beenden - nach einem Absturz können sie schon
+        gespeichert sein. Flush-Zeitpunkte beginnen neu.
+
+        Returns:
+            Anzahl übernommener Coins (Watchlist + Cache)
+        """
+        now_ts = now_ts if now_ts is not None else time.time()
+        restored = 0
+        for mint, entry in state["watchlist"].items():
+            if mint not in self.watchlist:
+                entry.pop("latency_samples", None)
+                buf = entry["buffer"]
+                if clean and buf["buys"] + buf["sells"] > 0:
+                    # Angefangenes Intervall vor dem Beenden - beim nächsten Lifecycle-Check schreiben
+                    entry["next_flush"] = now_ts
+                else:
+                    if not clean:
+                        entry["buffer"] = self.get_empty_buffer()
+                    entry["next_flush"] = now_ts + entry["interval"]
+                self.watchlist[mint] = entry
+                restored += 1
+        restored += self.coin_cache.restore(state["coin_cache"])
+        self.subscribed_mints |= state["subscribed_mints"]
+        self.pending_subscriptions |= state["pending_subscriptions"]
+        for mint, ath in state["ath_cache"].items():
+            if ath > self.ath_cache.get(mint, 0.0):
+                self.ath_cache[mint] = ath
+        self.dirty_aths |= state["dirty_aths"]
+        for name in ("last_trade_timestamps", "subscription_watchdog", "stale_data_warnings", "last_saved_signatures"):
+            current = getattr(self, name)
+            for mint, value in state[name].items():
+                current.setdefault(mint, value)
+
+        coins_tracked.set(len(self.watchlist))
+        ath_cache_size.set(len(self.ath_cache))
+        return restored
+
+    def load_warm_state(self):
+        """Start: Warm-Restart-Snapshot übernehmen, falls vorhanden und frisch genug.
 
-        print(f"🔄 {processed_count} Cache-Trades für {mint[:8]}... verarbeitet", flush=True)
+        Returns:
+            Anzahl übernommener Coins
+        """
+        if not self.warm_state:
+            return 0
+        state, age = self.warm_state.load()
+        if state is None:
+            print(f"ℹ️ Kein Warm-Restart ({self.warm_state.restore_result}) - Zustand wird aus der DB aufgebaut", flush=True)
+            return 0
+        clean = self.warm_state.clean
+        restored = self.restore_warm_state(state, clean)
+        self.warm_state.restored_coins = restored
+        print(f"♻️ Warm-Restart: {len(state['watchlist'])} Watchlist-Coins, {len(state['coin_cache'])} Cache-Coins, "
+              f"{len(state['ath_cache'])} ATHs übernommen (Snapshot {age:.0f}s alt, "
+              f"{'Buffer übernommen' if clean else 'nach Absturz - Buffer verworfen'})", flush=True)
+        return restored
+
+    def on_engine_command(self, connection, pid, channel, payload):
+        """asyncpg-Listener: Steuerbefehl eines API-Prozesses"""
+        try:
+            command = json.loads(payload)
+        except ValueError:
+            print(f"⚠️ Ungültiger Steuerbefehl: {payload[:100]}", flush=True)
+            return
+        task = asyncio.get_running_loop().create_task(self.apply_engine_command(command))
+        self.engine_command_tasks.add(task)
+        task.add_done_callback(self.engine_command_tasks.discard)
+
+    async def apply_engine_command(self, command):
+        """Wendet Config- und Phasen-Änderungen aus dem API-Prozess an"""
+        kind = command.get("command")
+        engine_commands.labels(command=str(kind)).inc()
+        try:
+            if kind == "update_config":
+                update_global_config(command.get("updates") or {})
+            elif kind == "reload_config":
+                load_config_from_file()
+                await self.reload_phases_config()
+            elif kind == "reload_phases":
+                await self.reload_phases_config()
+            else:
+                print(f"⚠️ Unbekannter Steuerbefehl: {kind}", flush=True)
+                return
+            print(f"🎛️ Steuerbefehl '{kind}' aus dem API-Prozess angewendet", flush=True)
+        except Exception as e:
+            print(f"⚠️ Steuerbefehl '{kind}' fehlgeschlagen: {e}", flush=True)
 
     # === DISCOVERY-METHODEN ===
     async def process_new_coin(self, coin_data):
@@ -1869,11 +6312,7 @@ class UnifiedService:
         else:
             price_sol = 0
 
-        social_count = 0
-        if coin_data.get("twitter_url") or coin_data.get("twitter"): social_count += 1
-        if coin_data.get("telegram_url") or coin_data.get("telegram"): social_count += 1
-        if coin_data.get("website_url") or coin_data.get("website"): social_count += 1
-        if coin_data.get("discord_url") or coin_data.get("discord"): social_count += 1
+        social_count = count_socials(coin_data)
 
         coin_data["price_sol"] = price_sol
         coin_data["pool_address"] = coin_data.get("bondingCurveKey", "")
@@ -1885,17 +6324,21 @@ class UnifiedService:
         # 4. Sofort für Trades abonnieren
         self.pending_subscriptions.add(mint)
 
-        # 5. An Discovery-Buffer für n8n hinzufügen
+        # 5. An Discovery-Buffer für n8n hinzufügen (Anreicherung läuft weiter asynchron)
         self.discovery_buffer.append(coin_data)
         n8n_buffer_size.set(len(self.discovery_buffer))
 
+        # 6. Direkte Persistenz: Coin und ggf. Stream ohne Umweg über n8n anlegen
+        if DIRECT_PERSISTENCE:
+            self.persist_buffer.append(coin_data)
+
         unified_status["total_coins_discovered"] += 1
         coins_received.inc()
 
         print(f"➕ Neuer Coin: {coin_data.get('symbol', '???')} (Cache: {len(self.coin_cache.cache)})", flush=True)
 
     async def flush_discovery_buffer(self):
-        """Sendet Discovery-Buffer an n8n"""
+        """Übergibt den Discovery-Buffer an den n8n-Sender (wartet nie auf n8n)"""
         if not self.discovery_buffer:
             return
 
@@ -1903,50 +6346,168 @@ class UnifiedService:
         is_timeout = (time.time() - self.last_discovery_flush) > BATCH_TIMEOUT
 
         if is_full or is_timeout:
-            print(f"🚚 Sende {len(self.discovery_buffer)} Coins an n8n...", flush=True)
-            success = await send_batch_to_n8n(self.discovery_buffer)
-
-            if success:
-                # Markiere Coins als an n8n gesendet
-                for coin in self.discovery_buffer:
-                    mint = coin.get("mint")
-                    if mint in self.coin_cache.cache:
-                        self.coin_cache.cache[mint]["n8n_sent"] = True
-
-                self.discovery_buffer = []
-                n8n_buffer_size.set(0)
-                buffer_size.set(0)
+            # Sender ausgelastet oder im Backoff - Coins bleiben im Buffer (voller Buffer geht in die DLQ)
+            if not self.n8n_sender.ready():
+                if self.dead_letter and is_full:
+                    await self.spill_to_dead_letter()
+                return
+
+            # Teil-Batches nach Byte-Budget; was nicht mehr in die Queue passt, bleibt im Buffer
+            batch = self.discovery_buffer
+            queued = 0
+            for chunk in split_n8n_batch(batch):
+                if not self.n8n_sender.enqueue(chunk):
+                    break
+                queued += len(chunk)
+            if queued:
+                print(f"🚚 Sende {queued} Coins an n8n...", flush=True)
+                self.discovery_buffer = batch[queued:]
+                n8n_buffer_size.set(len(self.discovery_buffer))
+                buffer_size.set(len(self.discovery_buffer))
             self.last_discovery_flush = time.time()
 
+    async def flush_persist_buffer(self, force=False):
+        """Schreibt entdeckte Coins per COPY + Merge in discovered_coins und legt coin_streams an.
+
+        Coins, die die lokalen Aktivierungsregeln erfüllen, werden direkt in die Watchlist
+        übernommen - ohne auf n8n und den nächsten DB-Refresh zu warten.
+
+        Returns:
+            Anzahl der neu angelegten Streams
+        """
+        if not self.persist_buffer or not self.pool or not unified_status["db_connected"]:
+            return 0
+        if not force and len(self.persist_buffer) < PERSIST_BATCH_SIZE \
+                and time.time() - self.last_persist_flush < PERSIST_FLUSH_INTERVAL:
+            return 0
+
+        batch = self.persist_buffer[:PERSIST_BATCH_SIZE]
+        self.persist_buffer = self.persist_buffer[PERSIST_BATCH_SIZE:]
+        self.last_persist_flush = time.time()
+
+        now_dt = datetime.now(timezone.utc)
+        records = [discovered_coin_record(coin, now_dt) for coin in batch]
+        to_activate = [coin["mint"] for coin in batch if passes_activation_rules(coin)]
+        first_phase = self.sorted_phase_ids[0] if self.sorted_phase_ids else 1
+
+        try:
+            with persist_duration.time():
+                async with self.pool.acquire() as conn:
+                    async with conn.transaction():
+                        await conn.execute("""
+                            CREATE TEMP TABLE IF NOT EXISTS discovered_coins_staging
+                            (LIKE discovered_coins INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+                        """)
+                        await conn.copy_records_to_table(
+                            "discovered_coins_staging", records=records, columns=DISCOVERED_COIN_COLUMNS
+                        )
+                        await conn.execute(PERSIST_MERGE_SQL)
+                        rows = await conn.fetch(PERSIST_STREAMS_SQL, to_activate, first_phase) if to_activate else []
+        except Exception as e:
+            # Batch bleibt vorne im Buffer, bei langem DB-Ausfall begrenzt
+            self.persist_buffer[:0] = batch
+            del self.persist_buffer[PERSIST_MAX_PENDING:]
+            db_errors.labels(type="persist").inc()
+            print(f"⚠️ Direkte Persistenz fehlgeschlagen ({len(batch)} Coins): {e}", flush=True)
+            return 0
+
+        coins_persisted.inc(len(batch))
+        if not rows:
+            return 0
+
+        coins = {coin["mint"]: coin for coin in batch}
+        now_ts = time.time()
+        for row in rows:
+            mint = row["token_address"]
+            coin = coins.get(mint, {})
+            started_at = row["started_at"]
+            if started_at is not None and started_at.tzinfo is None:
+                started_at = started_at.replace(tzinfo=timezone.utc)
+            stream_data = {
+                "phase_id": row["current_phase_id"],
+                "created_at": now_dt,
+                "started_at": started_at or now_dt,
+                "creator_address": coin.get("traderPublicKey")
+            }
+
+            entry = self.coin_cache.cache.get(mint)
+            if entry:
+                direct_activation_latency.observe(now_ts - entry["discovered_at"])
+            await self.activate_stream(mint, stream_data, now_ts)
+
+        streams_created_direct.inc(len(rows))
+        coins_tracked.set(len(self.watchlist))
+        print(f"💾 {len(batch)} Coins direkt gespeichert, {len(rows)} Streams aktiviert", flush=True)
+        return len(rows)
+
+    def mark_n8n_sent(self, batch):
+        """Markiert Coins eines ausgelieferten Batches als an n8n gesendet"""
+        for coin in batch:
+            mint = coin.get("mint")
+            if mint in self.coin_cache.cache:
+                self.coin_cache.cache[mint]["n8n_sent"] = True
+
+    async def handle_failed_batch(self, batch):
+        """Fehlgeschlagener Batch: persistent in die Dead-Letter-Queue, ohne DLQ zurück in den Buffer"""
+        if self.dead_letter:
+            await self.dead_letter.append(batch)
+        else:
+            self.requeue_discovery_batch(batch)
+
+    async def spill_to_dead_letter(self):
+        """Verschiebt Discovery-Buffer und wartende Sender-Batches in die Dead-Letter-Queue"""
+        coins = self.discovery_buffer
+        self.discovery_buffer = []
+        while not self.n8n_sender.queue.empty():
+            coins.extend(self.n8n_sender.queue.get_nowait())
+        for batch in self.n8n_sender.cancelled_batches:
+            coins.extend(batch)
+        self.n8n_sender.cancelled_batches = []
+        n8n_queue_size.set(0)
+        n8n_buffer_size.set(0)
+        if coins:
+            await self.dead_letter.append(coins)
+
+    def requeue_discovery_batch(self, batch):
+        """Fehlgeschlagener Batch kommt vorne zurück in den Discovery-Buffer"""
+        self.discovery_buffer[:0] = batch
+        n8n_buffer_size.set(len(self.discovery_buffer))
+
     # === METRIC-METHODEN ===
     def get_empty_buffer(self):
         """Leerer Buffer für neue Coins"""
-        return {
-            "open": None, "high": -1, "low": float("inf"), "close": 0,
-            "vol": 0, "vol_buy": 0, "vol_sell": 0, "buys": 0, "sells": 0,
-            "micro_trades": 0, "max_buy": 0, "max_sell": 0,
-            "wallets": set(), "v_sol": 0, "mcap": 0,
-            "whale_buy_vol": 0, "whale_sell_vol": 0, "whale_buys": 0, "whale_sells": 0,
-            "dev_sold_amount": 0
-        }
+        return empty_trade_buffer()
+
+    def sample_trade_latency(self, recv_ts):
+        """Entscheidet ob ein Trade für die Latenz-Messung gesampelt wird.
 
-    def process_trade(self, data):
-        """Verarbeitet einzelnen Trade"""
+        Returns:
+            recv_ts wenn gesampelt (decode-Stufe wird direkt erfasst), sonst None
+        """
+        if LATENCY_SAMPLE_RATE <= 0:
+            return None
+        self.latency_sample_counter += 1
+        if self.latency_sample_counter % LATENCY_SAMPLE_RATE:
+            return None
+        ingest_stage_latency.labels(stage="decode").observe(time.time() - recv_ts)
+        return recv_ts
+
+    def process_trade(self, data, recv_ts=None):
+        """Verarbeitet einzelnen Trade (recv_ts nur für gesampelte Trades gesetzt)"""
         mint = data["mint"]
         if mint not in self.watchlist:
             return
 
+        parsed = parse_trade(data)
+        if parsed is None:
+            return
+        self.apply_trade(mint, parsed, recv_ts)
+
+    def apply_trade(self, mint, parsed, recv_ts=None):
+        """Rechnet einen geparsten Trade (siehe parse_trade) in den Watchlist-Eintrag ein"""
         entry = self.watchlist[mint]
-        buf = entry["buffer"]
         now_ts = time.time()
-
-        try:
-            sol = float(data["solAmount"])
-            price = float(data["vSolInBondingCurve"]) / float(data["vTokensInBondingCurve"])
-            is_buy = data["txType"] == "buy"
-            trader_key = data.get("traderPublicKey", "")
-        except:
-            return
+        sol, price, is_buy, trader_key, v_sol = parsed
 
         # === ZOMBIE DETECTION: Trade-Timestamp tracken ===
         self.last_trade_timestamps[mint] = now_ts
@@ -1961,35 +6522,14 @@ class UnifiedService:
             self.dirty_aths.add(mint)
 
         # Trade-Daten sammeln
-        if buf["open"] is None: buf["open"] = price
-        buf["close"] = price
-        buf["high"] = max(buf["high"], price)
-        buf["low"] = min(buf["low"], price)
-        buf["vol"] += sol
-
-        if is_buy:
-            buf["buys"] += 1
-            buf["vol_buy"] += sol
-            buf["max_buy"] = max(buf["max_buy"], sol)
-            if sol >= WHALE_THRESHOLD_SOL:
-                buf["whale_buy_vol"] += sol
-                buf["whale_buys"] += 1
-        else:
-            buf["sells"] += 1
-            buf["vol_sell"] += sol
-            buf["max_sell"] = max(buf["max_sell"], sol)
-            if sol >= WHALE_THRESHOLD_SOL:
-                buf["whale_sell_vol"] += sol
-                buf["whale_sells"] += 1
-            # Dev-Tracking
-            creator_address = entry["meta"].get("creator_address")
-            if creator_address and trader_key and trader_key == creator_address:
-                buf["dev_sold_amount"] += sol
-
-        if sol < 0.01: buf["micro_trades"] += 1
-        buf["wallets"].add(trader_key)
-        buf["v_sol"] = float(data["vSolInBondingCurve"])
-        buf["mcap"] = price * 1_000_000_000
+        aggregate_trade(entry["buffer"], sol, price, is_buy, trader_key, v_sol, entry["meta"].get("creator_address"))
+
+        # Latenz-Sampling: Empfangszeit bis zum Flush am Watchlist-Eintrag merken
+        if recv_ts is not None:
+            ingest_stage_latency.labels(stage="aggregate").observe(time.time() - recv_ts)
+            samples = entry.setdefault("latency_samples", [])
+            if len(samples) < 16:
+                samples.append(recv_ts)
 
     async def check_subscription_watchdog(self, now_ts):
         """Watchdog: Prüfe alle aktiven Coins auf zu lange Inaktivität"""
@@ -2121,6 +6661,91 @@ class UnifiedService:
                 print(f"⚠️ Batch-Task Fehler: {e}", flush=True)
                 await asyncio.sleep(1.0)
 
+    def resubscription_order(self):
+        """Reihenfolge für das Resubscribe nach einem Reconnect: Baby Zone und Cache-Coins zuerst, dann die
+        weiteren Phasen, innerhalb einer Stufe die jüngsten Coins zuerst. Worker-Subscriptions des Koordinators
+        (Ring-Feed, Phase unbekannt) folgen zuletzt, zuletzt abonnierte zuerst."""
+        phase_rank = {phase_id: rank for rank, phase_id in enumerate(self.sorted_phase_ids)}
+        ranked = []
+        for mint in self.subscribed_mints:
+            entry = self.watchlist.get(mint)
+            if entry is not None:
+                meta = entry["meta"]
+                ranked.append((phase_rank.get(meta["phase_id"], len(phase_rank)), -meta["created_at"].timestamp(), mint))
+            elif mint in self.coin_cache.cache:
+                ranked.append((0, -self.coin_cache.cache[mint]["discovered_at"], mint))
+            else:
+                ranked.append((len(phase_rank) + 1, 0, mint))
+        ranked.sort()
+        order = [mint for _, _, mint in ranked]
+        if self.shards:
+            order.extend(mint for mint in reversed(self.shards.feed_subscribers) if mint not in self.subscribed_mints)
+        return order
+
+    def cancel_resubscribe(self):
+        """Laufenden Resubscribe-Task abbrechen (Ergebnis und Gauge setzt resubscribe selbst zurück)"""
+        if self.resubscribe_task and not self.resubscribe_task.done():
+            self.resubscribe_task.cancel()
+
+    def wants_trades(self, mint):
+        """Trade-Subscription noch nötig (eigener Coin oder, als Koordinator mit Ring-Feed, von einem Worker)"""
+        return mint in self.subscribed_mints or bool(self.shards and mint in self.shards.feed_subscribers)
+
+    async def resubscribe(self, ws, mints, connected_at=None):
+        """Nach Reconnect: Subscriptions in Chunks von RESUBSCRIBE_CHUNK_SIZE Keys im Abstand von
+        RESUBSCRIBE_INTERVAL senden, damit kein riesiger Frame entsteht und Trades parallel weiterlaufen.
+        Zwischenzeitlich beendete Coins werden übersprungen.
+
+        Returns:
+            True, wenn alle Chunks gesendet wurden
+        """
+        try:
+            return await self._resubscribe(ws, mints, connected_at)
+        except asyncio.CancelledError:
+            # Abgebrochen (Reconnect/Verbindungsfehler) - der nächste Connect beginnt von vorn
+            if self.resubscribe_progress and self.resubscribe_progress["result"] == "running":
+                self.resubscribe_progress["result"] = "cancelled"
+            resubscribe_pending.set(0)
+            resubscribe_runs.labels(result="cancelled").inc()
+            raise
+
+    async def _resubscribe(self, ws, mints, connected_at):
+        connected_at = connected_at or time.time()
+        size = max(RESUBSCRIBE_CHUNK_SIZE, 1)
+        progress = self.resubscribe_progress = {
+            "total": len(mints), "done": 0, "sent": 0, "chunks": 0,
+            "started_at": connected_at, "duration_seconds": None, "result": "running",
+        }
+        resubscribe_pending.set(len(mints))
+        for offset in range(0, len(mints), size):
+            chunk = [mint for mint in mints[offset:offset + size] if self.wants_trades(mint)]
+            if chunk:
+                try:
+                    await ws.send(json.dumps({"method": "subscribeTokenTrade", "keys": chunk}))
+                except Exception as e:
+                    print(f"⚠️ Resubscribe nach {progress['done']}/{len(mints)} Coins abgebrochen: {e}", flush=True)
+                    # Rest über das Batching nachholen
+                    self.pending_subscriptions.update(mint for mint in mints[offset:] if mint in self.subscribed_mints)
+                    progress["result"] = "failed"
+                    resubscribe_runs.labels(result="failed").inc()
+                    return False
+                progress["sent"] += len(chunk)
+                progress["chunks"] += 1
+                resubscribe_chunks.inc()
+                subscriptions_batched_total.inc(len(chunk))
+            progress["done"] = min(offset + size, len(mints))
+            resubscribe_pending.set(len(mints) - progress["done"])
+            if progress["done"] < len(mints):
+                await asyncio.sleep(RESUBSCRIBE_INTERVAL)
+
+        duration = time.time() - connected_at
+        progress["duration_seconds"] = round(duration, 3)
+        progress["result"] = "complete"
+        resubscribe_duration.observe(duration)
+        resubscribe_runs.labels(result="complete").inc()
+        print(f"✅ {progress['sent']} Subscriptions in {progress['chunks']} Chunks wiederhergestellt ({duration:.1f}s nach Connect)", flush=True)
+        return True
+
     # === LIFECYCLE-MANAGEMENT ===
     async def switch_phase(self, mint, old_phase, new_phase):
         """Phase wechseln"""
@@ -2166,6 +6791,7 @@ class UnifiedService:
         """Lifecycle-Prüfung und Metric-Flush"""
         batch_data = []
         phases_in_batch = []
+        latency_samples = []
         now_utc = datetime.now(timezone.utc)
         now_berlin = datetime.now(GERMAN_TZ)
 
@@ -2211,6 +6837,9 @@ class UnifiedService:
 
             # === ZOMBIE DETECTION: Metric-Flush mit Stale Data Check ===
             if now_ts >= entry["next_flush"]:
+                flush_lateness.labels(phase=str(entry["meta"]["phase_id"])).observe(time.time() - entry["next_flush"])
+                samples = entry.pop("latency_samples", None)
+
                 # Watchdog-Check: Wann kam der letzte Trade?
                 last_trade = self.last_trade_timestamps.get(mint, 0)
                 time_since_last_trade = now_ts - last_trade
@@ -2240,26 +6869,15 @@ class UnifiedService:
                             await self.force_resubscribe(mint)
 
                 if should_save:
-                    is_koth = buf["mcap"] > 30000
-
-                    # Erweiterte Metriken berechnen
-                    advanced_metrics = self.calculate_advanced_metrics(buf)
-
-                    batch_data.append((
-                        mint, now_berlin, entry["meta"]["phase_id"],
-                        buf["open"], buf["high"], buf["low"], buf["close"], buf["mcap"],
-                        current_bonding_pct, buf["v_sol"], is_koth,
-                        buf["vol"], buf["vol_buy"], buf["vol_sell"],
-                        buf["buys"], buf["sells"], len(buf["wallets"]), buf["micro_trades"],
-                        buf["dev_sold_amount"], buf["max_buy"], buf["max_sell"],
-                        advanced_metrics["net_volume_sol"], advanced_metrics["volatility_pct"],
-                        advanced_metrics["avg_trade_size_sol"], advanced_metrics["whale_buy_volume_sol"],
-                        advanced_metrics["whale_sell_volume_sol"], advanced_metrics["num_whale_buys"],
-                        advanced_metrics["num_whale_sells"], advanced_metrics["buy_pressure_ratio"],
-                        advanced_metrics["unique_signer_ratio"]
-                    ))
+                    batch_data.append(self.metric_row(mint, entry["meta"]["phase_id"], buf, now_berlin))
                     phases_in_batch.append(entry["meta"]["phase_id"])
 
+                    if samples:
+                        enqueue_ts = time.time()
+                        for recv_ts in samples:
+                            ingest_stage_latency.labels(stage="enqueue").observe(enqueue_ts - recv_ts)
+                        latency_samples.extend(samples)
+
                     print(f"[Metrics] {mint[:8]}... - Speichere {buf['buys'] + buf['sells']} Trades, Vol: {buf['vol']:.1f} SOL", flush=True)
 
                     # Reset warning counter bei erfolgreichem Save
@@ -2272,24 +6890,26 @@ class UnifiedService:
 
         # Batch in DB speichern
         if batch_data and unified_status["db_connected"]:
-            sql = """
-                INSERT INTO coin_metrics (
-                    mint, timestamp, phase_id_at_time, price_open, price_high, price_low, price_close,
-                    market_cap_close, bonding_curve_pct, virtual_sol_reserves, is_koth, volume_sol,
-                    buy_volume_sol, sell_volume_sol, num_buys, num_sells, unique_wallets, num_micro_trades,
-                    dev_sold_amount, max_single_buy_sol, max_single_sell_sol, net_volume_sol,
-                    volatility_pct, avg_trade_size_sol, whale_buy_volume_sol, whale_sell_volume_sol,
-                    num_whale_buys, num_whale_sells, buy_pressure_ratio, unique_signer_ratio
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, $20, $21, $22, $23, $24, $25, $26, $27, $28, $29, $30)
-            """
             try:
                 with flush_duration.time():
                     async with self.pool.acquire() as conn:
-                        await conn.executemany(sql, batch_data)
+                        if self.replica:
+                            # Ownership-Fencing: nichts für Streams schreiben, die inzwischen anderen gehören
+                            async with conn.transaction():
+                                batch_data = await self.replica.fenced_rows(conn, batch_data)
+                                if batch_data:
+                                    await conn.executemany(COIN_METRICS_INSERT_SQL, batch_data)
+                        else:
+                            await conn.executemany(COIN_METRICS_INSERT_SQL, batch_data)
 
                 metrics_saved.inc(len(batch_data))
                 unified_status["total_metrics_saved"] += len(batch_data)
 
+                if latency_samples:
+                    commit_ts = time.time()
+                    for recv_ts in latency_samples:
+                        ingest_stage_latency.labels(stage="commit").observe(commit_ts - recv_ts)
+
                 # Logging wie in pump-metric
                 counts = Counter(phases_in_batch)
                 details = ", ".join([f"Phase {k}: {v}" for k,v in sorted(counts.items())])
@@ -2301,6 +6921,23 @@ class UnifiedService:
                 db_connected.set(0)
                 db_errors.labels(type="insert").inc()
 
+    def metric_row(self, mint, phase_id, buf, now_berlin):
+        """coin_metrics-Zeile (Reihenfolge wie COIN_METRICS_INSERT_SQL) aus einem Trade-Buffer"""
+        advanced_metrics = self.calculate_advanced_metrics(buf)
+        return (
+            mint, now_berlin, phase_id,
+            buf["open"], buf["high"], buf["low"], buf["close"], buf["mcap"],
+            (buf["v_sol"] / SOL_RESERVES_FULL) * 100, buf["v_sol"], buf["mcap"] > 30000,
+            buf["vol"], buf["vol_buy"], buf["vol_sell"],
+            buf["buys"], buf["sells"], len(buf["wallets"]), buf["micro_trades"],
+            buf["dev_sold_amount"], buf["max_buy"], buf["max_sell"],
+            advanced_metrics["net_volume_sol"], advanced_metrics["volatility_pct"],
+            advanced_metrics["avg_trade_size_sol"], advanced_metrics["whale_buy_volume_sol"],
+            advanced_metrics["whale_sell_volume_sol"], advanced_metrics["num_whale_buys"],
+            advanced_metrics["num_whale_sells"], advanced_metrics["buy_pressure_ratio"],
+            advanced_metrics["unique_signer_ratio"]
+        )
+
     def calculate_advanced_metrics(self, buf):
         """Erweiterte Metriken berechnen"""
         net_volume = buf["vol_buy"] - buf["vol_sell"]
@@ -2330,10 +6967,109 @@ class UnifiedService:
             "unique_signer_ratio": unique_signer_ratio
         }
 
+    async def sync_streams(self, now_ts):
+        """Cache-Management und Stream-Abgleich mit der DB (Receive-Loop, alle DB_REFRESH_INTERVAL Sekunden).
+
+        Returns:
+            True bei Erfolg
+        """
+        try:
+            # Prüfe ob DB-Reconnect erzwungen werden soll
+            global _force_db_reconnect
+            if _force_db_reconnect:
+                print("🔄 Führe erzwungenen DB-Reconnect durch...")
+                await self.force_db_reconnect()
+                _force_db_reconnect = False
+
+            # Änderungen kommen per LISTEN oder als Delta über change_seq -
+            # der Vollabgleich läuft nur noch als Sicherheitsnetz
+            await self.apply_stream_events()
+            listener_active = STREAM_NOTIFY_ENABLED and self.stream_listener_connected
+            incremental = listener_active or self.stream_delta_supported
+            needs_cursor = not listener_active and self.stream_sync_seq is None
+            reconcile = (not incremental or self.stream_resync_needed or needs_cursor
+                         or now_ts - self.last_stream_reconcile > STREAM_RECONCILE_INTERVAL)
+            db_streams = None
+            if reconcile:
+                sync_trusted = incremental and not self.stream_resync_needed and not needs_cursor
+                self.stream_resync_needed = False
+                # Cursor vor dem Vollabgleich lesen - spätere Änderungen kommen im nächsten Delta
+                self.stream_sync_seq = await self.get_stream_change_cursor()
+                self.stream_join_pending.clear()
+                db_streams = await self.get_active_streams()
+            elif not listener_active:
+                await self.apply_stream_changes()
+
+            # Fällige Cache-Coins: ohne Vollabgleich nur deren Streams nachschlagen
+            cache_streams = db_streams if db_streams is not None else await self.get_due_cache_streams(now_ts)
+            activated, expired = await self.check_cache_activation(cache_streams, now_ts)
+
+            if db_streams is not None:
+                added, removed = self.reconcile_watchlist(db_streams, now_ts)
+                self.last_stream_reconcile = now_ts
+                stream_reconciliations.inc()
+                if sync_trusted and (added or removed):
+                    stream_reconcile_drift.labels(kind="added").inc(added)
+                    stream_reconcile_drift.labels(kind="removed").inc(removed)
+                    print(f"⚠️ Stream-Abgleich: {added} fehlende, {removed} veraltete Streams korrigiert", flush=True)
+
+            unified_status["db_connected"] = True
+            db_connected.set(1)
+            coins_tracked.set(len(self.watchlist))
+            return True
+
+        except Exception as e:
+            print(f"⚠️ DB Sync Error: {e}", flush=True)
+            unified_status["db_connected"] = False
+            db_connected.set(0)
+            return False
+
+    async def run_housekeeping(self, now_ts):
+        """Regelmäßige Arbeit nach jeder Nachricht: Buffer-Flushes, vorgemerkte Änderungen, Lifecycle, Watchdog"""
+        # Discovery-Buffer flushen (regelmäßig)
+        await self.flush_discovery_buffer()
+
+        # Direkte Persistenz (COPY + Merge, Streams per lokaler Aktivierungsregel)
+        await self.flush_persist_buffer()
+
+        # coin_streams-Änderungen aus LISTEN sofort anwenden
+        await self.apply_stream_events()
+
+        # Shard-Worker: Übernahmen und Ring-Änderungen des Koordinators
+        if self.shard_inbox:
+            await self.apply_shard_messages()
+
+        # Replika-Modus: Eigentumswechsel aus dem Lease-Abgleich
+        if self.replica and (self.replica.pending or self.replica.handoffs):
+            await self.apply_replica_changes()
+
+        # Koordinator mit Ring-Feed: (Un-)Subscribes der Worker weiterleiten
+        if self.shards and self.shards.feed_outbox:
+            await self.forward_feed_requests()
+
+        # Lifecycle-Checks und Metric-Flush
+        await self.check_lifecycle_and_flush(now_ts)
+
+        # === ZOMBIE WATCHDOG: Regelmäßige Subscription-Checks ===
+        if int(now_ts) % 60 == 0:  # Alle 60 Sekunden
+            await self.check_subscription_watchdog(now_ts)
+
+        # ATH-Updates
+        if now_ts - self.last_ath_flush > ATH_FLUSH_INTERVAL:
+            await self.flush_ath_updates()
+
+        # Batching-Metriken
+        pending_subscriptions.set(len(self.pending_subscriptions))
+
+        # Aufgezeichnete Frames gebündelt schreiben
+        if self.frame_recorder:
+            await self.frame_recorder.flush()
+
     # === HAUPT-RUN-METHODE ===
     async def run(self):
         """Hauptmethode des vereinten Services (FastAPI-Version)"""
         await self.init_db_connection()
+        self.load_warm_state()
 
         reconnect_count = 0
 
@@ -2354,7 +7090,7 @@ class UnifiedService:
                     close_timeout=10,
                     max_size=2**23,
                     compression=None,
-                    ssl=ssl_context  # Benutzerdefinierter SSL-Kontext
+                    ssl=ssl_context if WS_URI.startswith("wss://") else None  # ws:// z.B. für lokalen Replay-Server
                 ) as ws:
 
                     # WebSocket-Referenz für Re-Subscribe setzen
@@ -2369,22 +7105,22 @@ class UnifiedService:
 
                     print("✅ WebSocket verbunden! Vereinter Service läuft...", flush=True)
 
-                    # subscribeNewToken für Discovery
-                    await ws.send(json.dumps({"method": "subscribeNewToken"}))
-                    print("📡 subscribeNewToken aktiv - warte auf neue Coins...", flush=True)
-
-                    # BEREITS AKTUELLE SUBSCRIPTIONS WIEDERHERSTELLEN
-                    if self.subscribed_mints:
-                        print(f"🔄 Stelle {len(self.subscribed_mints)} bestehende Subscriptions wieder her...", flush=True)
-                        try:
-                            await ws.send(json.dumps({"method": "subscribeTokenTrade", "keys": list(self.subscribed_mints)}))
-                            print(f"✅ {len(self.subscribed_mints)} aktive Coin-Subscriptions wiederhergestellt", flush=True)
-                            # Metrik aktualisieren
-                            subscriptions_batched_total.inc(len(self.subscribed_mints))
-                        except Exception as e:
-                            print(f"⚠️ Fehler beim Wiederherstellen der Subscriptions: {e}", flush=True)
-                            # Bei Fehler alle Subscriptions als pending markieren
-                            self.pending_subscriptions.update(self.subscribed_mints)
+                    # subscribeNewToken für Discovery (Shard-Worker tracken nur)
+                    if self.discovery_enabled:
+                        await ws.send(json.dumps({"method": "subscribeNewToken"}))
+                        print("📡 subscribeNewToken aktiv - warte auf neue Coins...", flush=True)
+
+                    # BEREITS AKTUELLE SUBSCRIPTIONS WIEDERHERSTELLEN (in Chunks, junge Coins zuerst)
+                    # Ring-Feed: Trade-Subscriptions der Worker hängen am WebSocket des Koordinators
+                    if self.shards and self.shards.ring_slots:
+                        self.shards.restore_feed()
+                    self.cancel_resubscribe()
+                    resubscribe_mints = self.resubscription_order()
+                    if resubscribe_mints:
+                        print(f"🔄 Stelle {len(resubscribe_mints)} bestehende Subscriptions wieder her "
+                              f"({RESUBSCRIBE_CHUNK_SIZE} je Chunk, alle {RESUBSCRIBE_INTERVAL}s)...", flush=True)
+                        self.resubscribe_task = asyncio.create_task(
+                            self.resubscribe(ws, resubscribe_mints, unified_status["connection_start"]))
 
                     # AKTIVE STREAMS AUS DB LADEN FÜR WATCHLIST-SYNC
                     try:
@@ -2414,54 +7150,8 @@ class UnifiedService:
                         now_ts = time.time()
 
                         # Cache-Management (alle 10 Sekunden)
-                        if now_ts - last_refresh > DB_REFRESH_INTERVAL:
-                            try:
-                                # Prüfe ob DB-Reconnect erzwungen werden soll
-                                global _force_db_reconnect
-                                if _force_db_reconnect:
-                                    print("🔄 Führe erzwungenen DB-Reconnect durch...")
-                                    await self.force_db_reconnect()
-                                    _force_db_reconnect = False
-
-                                activated, expired = await self.check_cache_activation()
-
-                                # Aktive Streams neu laden für Watchlist-Management
-                                db_streams = await self.get_active_streams()
-                                current_set = set(db_streams.keys())
-                                to_remove = self.subscribed_mints - current_set
-
-                                # Entferne beendete Coins
-                                for mint in to_remove:
-                                    if mint in self.watchlist:
-                                        del self.watchlist[mint]
-                                    self.subscribed_mints.remove(mint)
-
-                                # Neue aktive Coins hinzufügen
-                                to_add = current_set - self.subscribed_mints
-                                for mint in to_add:
-                                    if mint in db_streams:
-                                        p_id = db_streams[mint]["phase_id"]
-                                        if p_id not in self.phases_config:
-                                            p_id = self.sorted_phase_ids[0] if self.sorted_phase_ids else 1
-
-                                        interval = self.phases_config[p_id]["interval"]
-                                        self.watchlist[mint] = {
-                                            "meta": db_streams[mint],
-                                            "buffer": self.get_empty_buffer(),
-                                            "next_flush": now_ts + interval,
-                                            "interval": interval
-                                        }
-                                        self.subscribed_mints.add(mint)
-
-                                unified_status["db_connected"] = True
-                                db_connected.set(1)
-                                coins_tracked.set(len(self.watchlist))
-                                last_refresh = now_ts
-
-                            except Exception as e:
-                                print(f"⚠️ DB Sync Error: {e}", flush=True)
-                                unified_status["db_connected"] = False
-                                db_connected.set(0)
+                        if now_ts - last_refresh > DB_REFRESH_INTERVAL and await self.sync_streams(now_ts):
+                            last_refresh = now_ts
 
                         # WebSocket-Nachricht empfangen
                         try:
@@ -2469,6 +7159,9 @@ class UnifiedService:
                             last_message_time = time.time()
                             unified_status["last_message_time"] = last_message_time
 
+                            if self.frame_recorder:
+                                self.frame_recorder.record(last_message_time, msg)
+
                             data = json.loads(msg)
 
                             if data.get("txType") == "create" and "mint" in data:
@@ -2483,13 +7176,16 @@ class UnifiedService:
 
                                     if mint in self.watchlist:
                                         # Coin ist aktiv - sofort verarbeiten
-                                        self.process_trade(data)
+                                        self.process_trade(data, self.sample_trade_latency(last_message_time))
                                         trades_processed.inc()
                                         unified_status["total_trades"] += 1
                                         last_trade_timestamp.set(time.time())
                                     elif mint in self.coin_cache.cache:
                                         # Coin ist im Cache - Trade sammeln
                                         self.coin_cache.add_trade(mint, data)
+                                    elif self.shards and self.shards.ring_slots:
+                                        # Ring-Feed: dekodiert an den zuständigen Worker
+                                        self.shards.route_trade(mint, data, last_message_time)
 
                         except asyncio.TimeoutError:
                             # Prüfe nur alle 30 Sekunden auf Timeout (nicht bei jedem recv timeout)
@@ -2510,6 +7206,8 @@ class UnifiedService:
                                     await self.batching_task
                                 except asyncio.CancelledError:
                                     pass
+                            # Laufendes Resubscribe abbrechen - der nächste Connect beginnt von vorn
+                            self.cancel_resubscribe()
                             break
 
                         except json.JSONDecodeError as e:
@@ -2519,31 +7217,10 @@ class UnifiedService:
                         except Exception as e:
                             print(f"⚠️ WS Receive Error: {e}", flush=True)
                             unified_status["last_error"] = f"ws_error: {str(e)[:100]}"
+                            self.cancel_resubscribe()
                             break
 
-                        # Buffer-Cleanup
-                        if now_ts - self.last_buffer_cleanup > 10:
-                            removed = self.cleanup_old_trades_from_buffer(now_ts)
-                            if removed > 0:
-                                print(f"🧹 Buffer-Cleanup: {removed} alte Trades entfernt", flush=True)
-                            self.last_buffer_cleanup = now_ts
-
-                        # Discovery-Buffer flushen (regelmäßig)
-                        await self.flush_discovery_buffer()
-
-                        # Lifecycle-Checks und Metric-Flush
-                        await self.check_lifecycle_and_flush(now_ts)
-
-                        # === ZOMBIE WATCHDOG: Regelmäßige Subscription-Checks ===
-                        if int(now_ts) % 60 == 0:  # Alle 60 Sekunden
-                            await self.check_subscription_watchdog(now_ts)
-
-                        # ATH-Updates
-                        if now_ts - self.last_ath_flush > ATH_FLUSH_INTERVAL:
-                            await self.flush_ath_updates()
-
-                        # Batching-Metriken
-                        pending_subscriptions.set(len(self.pending_subscriptions))
+                        await self.run_housekeeping(now_ts)
 
             except websockets.exceptions.WebSocketException as e:
                 unified_status["ws_connected"] = False
@@ -2577,6 +7254,161 @@ class UnifiedService:
                 print("🔄 DB auch getrennt, versuche Reconnect...", flush=True)
                 await self.init_db_connection()
 
+    def get_memory_structures(self):
+        """In-Memory-Strukturen für die Speicher-Abschätzung.
+
+        Returns:
+            {name: (container, item_size)} - item_size erhält einen Eintrag (Key bei dicts)
+        """
+        def buffer_without_wallets(mint):
+            buf = self.watchlist[mint]["buffer"]
+            seen = set()
+            return sys.getsizeof(buf) + sum(
+                deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in buf.items() if k != "wallets"
+            )
+
+        def dict_entry(container):
+            return lambda key: deep_sizeof(key) + deep_sizeof(container[key])
+
+        return {
+            "watchlist_buffers": (self.watchlist, buffer_without_wallets),
+            "watchlist_wallets": (self.watchlist, lambda mint: deep_sizeof(self.watchlist[mint]["buffer"]["wallets"])),
+            "coin_cache_trades": (self.coin_cache.cache, lambda mint: deep_sizeof(self.coin_cache.cache[mint]["buffer"])),
+            "coin_cache_metadata": (self.coin_cache.cache, lambda mint: deep_sizeof(self.coin_cache.cache[mint]["metadata"])),
+            "ath_cache": (self.ath_cache, dict_entry(self.ath_cache)),
+            "last_saved_signatures": (self.last_saved_signatures, dict_entry(self.last_saved_signatures)),
+            "last_trade_timestamps": (self.last_trade_timestamps, dict_entry(self.last_trade_timestamps)),
+            "subscription_watchdog": (self.subscription_watchdog, dict_entry(self.subscription_watchdog)),
+            "stale_data_warnings": (self.stale_data_warnings, dict_entry(self.stale_data_warnings)),
+            "trade_buffer": (self.trade_buffer, dict_entry(self.trade_buffer)),
+            "discovery_buffer": (self.discovery_buffer, deep_sizeof),
+            "coin_filter_recent_coins": (self.coin_filter.recent_coins, deep_sizeof),
+        }
+
+    def collect_memory_samples(self):
+        """Event-Loop: Stichproben aller Strukturen ziehen (ohne Kopie der Strukturen; bei dicts ein
+        linearer Durchlauf je Struktur, siehe sample_entries).
+
+        Returns:
+            {name: (Stichprobe, Anzahl, item_size, Größe der Hülle)}
+        """
+        samples = {}
+        for name, (container, item_size) in self.get_memory_structures().items():
+            count = len(container)
+            # Bei dicts wird nur die Hülle einmal gezählt, Einträge per Stichprobe
+            sample = sample_entries(container, count, MEMORY_SAMPLE_SIZE) if count else []
+            samples[name] = (sample, count, item_size, sys.getsizeof(container))
+        return samples
+
+    def measure_memory_structures(self, samples, started):
+        """Vermisst die Stichproben (deep_sizeof - im Thread) und aktualisiert die Gauges"""
+        structures = {}
+        total_bytes = 0
+
+        for name, (sample, count, item_size, shallow_size) in samples.items():
+            est_bytes, per_entry, sampled = measure_sample(sample, count, item_size, shallow_size)
+            structures[name] = {
+                "entries": count,
+                "bytes": est_bytes,
+                "bytes_per_entry": round(per_entry, 1),
+                "sampled": sampled,
+            }
+            total_bytes += est_bytes
+
+            structure_memory_bytes.labels(structure=name).set(est_bytes)
+            structure_entries.labels(structure=name).set(count)
+            structure_bytes_per_entry.labels(structure=name).set(per_entry)
+
+        return {
+            "structures": structures,
+            "total_bytes": total_bytes,
+            "tracked_coins": len(self.watchlist),
+            "cached_coins": len(self.coin_cache.cache),
+            "generated_at": time.time(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def report_memory_structures(self):
+        """Schätzt den Speicher aller In-Memory-Strukturen (synchron, z.B. für Tests)"""
+        started = time.perf_counter()
+        return self.measure_memory_structures(self.collect_memory_samples(), started)
+
+    async def estimate_memory_structures(self):
+        """Wie report_memory_structures, aber nur die Stichprobe auf der Event-Loop, deep_sizeof im Thread"""
+        started = time.perf_counter()
+        samples = self.collect_memory_samples()
+        return await asyncio.to_thread(self.measure_memory_structures, samples, started)
+
+    # === WARTUNGS-JOBS ===
+    async def repair_missing_streams(self):
+        """Legt fehlende coin_streams über die DB-Funktion repair_missing_streams() an"""
+        if not self.pool or not unified_status["db_connected"]:
+            return None
+        try:
+            return await self.pool.fetchval("SELECT repair_missing_streams()")
+        except asyncpg.exceptions.UndefinedFunctionError:
+            # Nicht dauerhaft abschalten: die Migration kann die Funktion zur Laufzeit nachliefern
+            self.maintenance.back_off("stream_repair", "repair_missing_streams() existiert nicht (Migrationen angewendet?)")
+            return None
+
+    def run_buffer_cleanup(self):
+        """Entfernt abgelaufene Trades aus dem Trade-Buffer"""
+        removed = self.cleanup_old_trades_from_buffer(time.time())
+        if removed > 0:
+            print(f"🧹 Buffer-Cleanup: {removed} alte Trades entfernt", flush=True)
+        return removed
+
+    async def run_memory_accounting(self):
+        """Speicher-Abschätzung der In-Memory-Strukturen"""
+        report = await self.estimate_memory_structures()
+        print(f"🧮 Speicher-Abschätzung: {report['total_bytes'] / 1024 / 1024:.1f} MB in {len(report['structures'])} Strukturen ({report['duration_ms']}ms)", flush=True)
+        return report["total_bytes"]
+
+    def prune_orphan_entries(self):
+        """Entfernt Per-Coin-Einträge von Coins, die weder getrackt werden noch im Cache liegen.
+
+        Returns:
+            Anzahl entfernter Einträge
+        """
+        live = self.watchlist.keys() | self.coin_cache.cache.keys()
+        structures = {
+            "last_trade_timestamps": self.last_trade_timestamps,
+            "subscription_watchdog": self.subscription_watchdog,
+            "stale_data_warnings": self.stale_data_warnings,
+            "last_saved_signatures": self.last_saved_signatures,
+            "ath_cache": self.ath_cache,
+        }
+        total = 0
+        for name, structure in structures.items():
+            # Noch nicht geschriebene ATHs bleiben erhalten
+            keep = self.dirty_aths if structure is self.ath_cache else ()
+            orphans = [m for m in structure if m not in live and m not in keep]
+            for mint in orphans:
+                del structure[mint]
+            if orphans:
+                orphan_entries_pruned.labels(structure=name).inc(len(orphans))
+                total += len(orphans)
+        ath_cache_size.set(len(self.ath_cache))
+        return total
+
+    async def detect_orphans(self):
+        """Verwaiste Per-Coin-Einträge entfernen und aktive Streams ohne discovered_coins zählen"""
+        pruned = self.prune_orphan_entries()
+        if pruned:
+            print(f"🧹 Orphan-Cleanup: {pruned} Einträge ohne aktiven Coin entfernt", flush=True)
+
+        if not self.pool or not unified_status["db_connected"]:
+            return pruned
+        count = await self.pool.fetchval("""
+            SELECT COUNT(*) FROM coin_streams cs
+            LEFT JOIN discovered_coins dc ON cs.token_address = dc.token_address
+            WHERE cs.is_active = TRUE AND dc.token_address IS NULL
+        """)
+        orphan_streams.set(count or 0)
+        if count:
+            print(f"⚠️ {count} aktive Streams ohne discovered_coins-Zeile", flush=True)
+        return pruned
+
     def cleanup_old_trades_from_buffer(self, now_ts):
         """Buffer-Cleanup für aktive Coins"""
         cutoff_time = now_ts - TRADE_BUFFER_SECONDS
@@ -2604,6 +7436,7 @@ mcp = FastApiMCP(
     app,
     name="Pump Finder MCP",
     description="MCP Server für den Pump Finder Crypto-Token Monitoring Service.",
+    exclude_tags=["debug"],  # Profiling-/Debug-Endpoints nicht als MCP-Tools anbieten
 )
 mcp.mount_http(mount_path="/mcp")
 
@@ -2612,6 +7445,12 @@ if __name__ == "__main__":
     # Konfiguration laden
     load_config_from_file()
 
+    if PROCESS_ROLE == "engine":
+        # Nur Ingestion - die API läuft separat (PROCESS_ROLE=api uvicorn unified_service:app --workers N)
+        print("🧠 Starte Ingestion-Engine (ohne HTTP-API)...", flush=True)
+        asyncio.run(engine_main())
+        sys.exit(0)
+
     # n8n beim Start testen
     print("🔍 Teste n8n Verfügbarkeit...", flush=True)
     asyncio.run(test_n8n_availability())
@@ -2636,9 +7475,6 @@ if __name__ == "__main__":
     # Starte WebSocket-Service
     print("🚀 Starte Pump Find Backend (WebSocket)...", flush=True)
 
-    # Erstelle Service-Instanz
-    service = UnifiedService()
-
-    # Starte WebSocket-Service in der Haupt-Event-Loop
+    # Wie im FastAPI-Lifespan über start_engine/stop_engine (n8n-Sender, DLQ, Wartungs-Jobs)
     print("🔌 Starte WebSocket-Service...", flush=True)
-    asyncio.run(service.run())
+    asyncio.run(standalone_main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Gemeinsame Bausteine für lokale pumpportal-kompatible WebSocket-Server
+(Replay von Aufzeichnungen und synthetischer Lastgenerator).
+
+Unterstützte Methoden wie bei wss://pumpportal.fun/api/data:
+  - subscribeNewToken / unsubscribeNewToken
+  - subscribeTokenTrade / unsubscribeTokenTrade (mit "keys")
+"""
+import asyncio
+import json
+
+import websockets
+
+
+class PumpPortalSession:
+    """Subscription-Zustand einer Client-Verbindung"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.new_tokens = False
+        self.trade_keys = set()
+        self.frames_sent = 0
+        self.subscribe_messages = 0
+        self.subscribed = asyncio.Event()  # gesetzt nach der ersten Subscribe-Nachricht
+
+    def wants(self, data):
+        """Prüft ob ein Event für diesen Client abonniert ist"""
+        tx_type = data.get("txType")
+        if tx_type == "create":
+            return self.new_tokens
+        if tx_type in ("buy", "sell"):
+            return data.get("mint") in self.trade_keys
+        return True
+
+    async def send(self, frame):
+        await self.ws.send(frame)
+        self.frames_sent += 1
+
+    async def read_messages(self):
+        """Verarbeitet Subscribe/Unsubscribe-Nachrichten des Clients"""
+        async for raw in self.ws:
+            try:
+                msg = json.loads(raw)
+            except json.JSONDecodeError:
+                await self.ws.send(json.dumps({"errors": "Invalid message"}))
+                continue
+
+            method = msg.get("method")
+            keys = msg.get("keys") or []
+            self.subscribe_messages += 1
+
+            if method == "subscribeNewToken":
+                self.new_tokens = True
+                reply = "Successfully subscribed to token creation events."
+            elif method == "unsubscribeNewToken":
+                self.new_tokens = False
+                reply = "Unsubscribed from token creation events."
+            elif method == "subscribeTokenTrade":
+                self.trade_keys.update(keys)
+                reply = "Successfully subscribed to keys."
+            elif method == "unsubscribeTokenTrade":
+                self.trade_keys.difference_update(keys)
+                reply = "Unsubscribed from keys."
+            else:
+                await self.ws.send(json.dumps({"errors": f"Unknown method: {method}"}))
+                continue
+
+            await self.ws.send(json.dumps({"message": reply}))
+            self.subscribed.set()
+
+
+async def serve_forever(handler, host, port):
+    """Startet den WebSocket-Server und läuft bis zum Abbruch"""
+    async with websockets.serve(handler, host, port, max_size=2**23, compression=None):
+        print(f"🛰️  pumpportal-kompatibler Server läuft auf ws://{host}:{port}/api/data", flush=True)
+        print(f"   Backend starten mit: WS_URI=ws://{host}:{port}/api/data", flush=True)
+        await asyncio.Future()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Synthetischer pumpportal-Lastgenerator
+
+Simuliert einen Markt mit Coin-Churn über einen lokalen WebSocket-Server:
+  - Create-Events mit einstellbarer Rate (inkl. Spam-Bursts und Bad Names)
+  - Trades mit Zipf-verteilter Popularität über die lebenden Coins
+  - Whale-/Micro-Mix, Creator-Sells und Graduation-Kurven (Bonding Curve bis 85 SOL)
+  - Subscribe/Unsubscribe wie bei pumpportal (Trades nur für abonnierte Mints)
+
+Verwendung:
+    python scripts/ws_loadgen.py --scale 10
+    WS_URI=ws://localhost:8765/api/data uvicorn unified_service:app
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import string
+import time
+from bisect import bisect_right
+from collections import deque
+
+from pumpportal_server import PumpPortalSession, serve_forever
+
+SOL_RESERVES_FULL = 85.0
+INITIAL_V_SOL = 30.0
+INITIAL_V_TOKENS = 1_073_000_000.0
+
+NAME_WORDS = ["Moon", "Pepe", "Doge", "Cat", "Frog", "Rocket", "Based", "Giga", "Chad", "Sol",
+              "Wif", "Hat", "Bonk", "Mega", "Tiny", "Alpha", "Cope", "Degen", "Lambo", "Pump"]
+BAD_WORDS = ["test", "bot", "rug", "scam", "honey", "faucet"]
+
+
+def random_key(rng, length=44):
+    return "".join(rng.choices(string.ascii_letters + string.digits, k=length))
+
+
+class SyntheticCoin:
+    """Ein lebender Coin mit eigener Bonding Curve"""
+
+    __slots__ = ("mint", "creator", "curve_key", "v_sol", "v_tokens", "weight", "buy_bias", "dies_at")
+
+    def __init__(self, rng, now, zipf_s, max_rank, lifetime, graduating):
+        self.mint = random_key(rng) + "pump"
+        self.creator = random_key(rng)
+        self.curve_key = random_key(rng)
+        self.v_sol = INITIAL_V_SOL
+        self.v_tokens = INITIAL_V_TOKENS
+        # Zipf-Gewicht über einen zufälligen Rang -> wenige sehr populäre Coins
+        self.weight = 1.0 / (rng.randint(1, max_rank) ** zipf_s)
+        self.buy_bias = 0.8 if graduating else 0.5
+        self.dies_at = now + rng.expovariate(1.0 / lifetime)
+
+    @property
+    def market_cap(self):
+        return self.v_sol / self.v_tokens * 1_000_000_000
+
+    def apply(self, sol, is_buy):
+        """Constant-Product-Kurve: liefert die gehandelte Token-Menge"""
+        k = self.v_sol * self.v_tokens
+        if is_buy:
+            self.v_sol += sol
+        else:
+            sol = min(sol, self.v_sol - 1.0)
+            self.v_sol -= sol
+        new_tokens = k / self.v_sol
+        token_amount = abs(self.v_tokens - new_tokens)
+        self.v_tokens = new_tokens
+        return sol, token_amount
+
+
+class Market:
+    """Erzeugt Create- und Trade-Events"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.coins = []
+        self.cum_weights = []
+        self.dirty = True
+        self.wallets = [random_key(self.rng) for _ in range(args.wallets)]
+        self.recent_names = deque(maxlen=50)
+        self.stats = {"created": 0, "trades": 0, "graduated": 0, "died": 0}
+
+    def create_coin(self, now):
+        args = self.args
+        rng = self.rng
+        coin = SyntheticCoin(rng, now, args.zipf, args.max_live_coins, args.coin_lifetime,
+                             rng.random() < args.graduation_ratio)
+
+        roll = rng.random()
+        if self.recent_names and roll < args.spam_ratio:
+            name, symbol = rng.choice(self.recent_names)  # Spam-Burst: gleicher Name kurz hintereinander
+        elif roll < args.spam_ratio * 2:
+            name = f"{rng.choice(NAME_WORDS)} {rng.choice(BAD_WORDS).title()}"
+            symbol = name[:4].upper()
+        else:
+            name = f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {rng.randint(1, 999)}"
+            symbol = "".join(w[0] for w in name.split()[:2]).upper() + str(rng.randint(1, 99))
+        self.recent_names.append((name, symbol))
+
+        initial_buy = rng.uniform(0, 2.0)
+        _, tokens = coin.apply(initial_buy, True) if initial_buy > 0 else (0, 0)
+
+        self.coins.append(coin)
+        if len(self.coins) > args.max_live_coins:
+            self.coins.pop(0)
+            self.stats["died"] += 1
+        self.dirty = True
+        self.stats["created"] += 1
+
+        return {
+            "signature": random_key(rng, 88),
+            "mint": coin.mint,
+            "traderPublicKey": coin.creator,
+            "txType": "create",
+            "initialBuy": tokens,
+            "solAmount": initial_buy,
+            "bondingCurveKey": coin.curve_key,
+            "vTokensInBondingCurve": coin.v_tokens,
+            "vSolInBondingCurve": coin.v_sol,
+            "marketCapSol": coin.market_cap,
+            "name": name,
+            "symbol": symbol,
+            "uri": f"https://ipfs.io/ipfs/{random_key(rng, 46)}",
+            "pool": "pump",
+        }
+
+    def expire(self, now):
+        """Entfernt abgelaufene Coins (Churn), auch wenn sie selten gehandelt werden"""
+        alive = [c for c in self.coins if c.dies_at > now]
+        if len(alive) != len(self.coins):
+            self.stats["died"] += len(self.coins) - len(alive)
+            self.coins = alive
+            self.dirty = True
+
+    def pick_coin(self):
+        if self.dirty:
+            self.cum_weights = list(itertools.accumulate(c.weight for c in self.coins))
+            self.dirty = False
+        total = self.cum_weights[-1]
+        return self.coins[bisect_right(self.cum_weights, self.rng.random() * total)]
+
+    def trade(self, now):
+        args = self.args
+        rng = self.rng
+        coin = self.pick_coin()
+
+        if now >= coin.dies_at:
+            self.coins.remove(coin)
+            self.dirty = True
+            self.stats["died"] += 1
+            return None
+
+        is_creator_sell = rng.random() < args.creator_sell_ratio
+        is_buy = not is_creator_sell and rng.random() < coin.buy_bias
+
+        roll = rng.random()
+        if roll < args.whale_ratio:
+            sol = rng.uniform(1.0, 10.0)
+        elif roll < args.whale_ratio + args.micro_ratio:
+            sol = rng.uniform(0.0005, 0.0099)
+        else:
+            sol = min(rng.lognormvariate(math.log(0.2), 1.0), 0.99)
+
+        sol, tokens = coin.apply(sol, is_buy)
+        trader = coin.creator if is_creator_sell else rng.choice(self.wallets)
+
+        if coin.v_sol >= SOL_RESERVES_FULL:
+            # Graduation: Coin verlässt die Bonding Curve, keine weiteren Trades
+            self.coins.remove(coin)
+            self.dirty = True
+            self.stats["graduated"] += 1
+        self.stats["trades"] += 1
+
+        return {
+            "signature": random_key(rng, 88),
+            "mint": coin.mint,
+            "traderPublicKey": trader,
+            "txType": "buy" if is_buy else "sell",
+            "tokenAmount": tokens,
+            "solAmount": sol,
+            "newTokenBalance": tokens if is_buy else 0,
+            "bondingCurveKey": coin.curve_key,
+            "vTokensInBondingCurve": coin.v_tokens,
+            "vSolInBondingCurve": coin.v_sol,
+            "marketCapSol": coin.market_cap,
+            "pool": "pump",
+        }
+
+
+async def broadcast(sessions, event):
+    frame = json.dumps(event)
+    for session in list(sessions):
+        if session.wants(event):
+            try:
+                await session.send(frame)
+            except Exception:
+                sessions.discard(session)
+
+
+async def run_market(market, sessions, args):
+    """Tick-basierte Erzeugung mit den konfigurierten Raten"""
+    coins_per_sec = args.coins_per_sec * args.scale
+    trades_per_sec = args.trades_per_sec * args.scale
+    tick = 0.01
+    coin_credit = trade_credit = 0.0
+    started = last_report = last_tick = time.monotonic()
+    last_trades = 0
+
+    while args.duration <= 0 or time.monotonic() - started < args.duration:
+        tick_start = time.monotonic()
+        now = time.time()
+        dt = tick_start - last_tick  # reale Tick-Dauer, damit die Raten exakt bleiben
+        last_tick = tick_start
+
+        coin_credit += coins_per_sec * dt
+        while coin_credit >= 1:
+            coin_credit -= 1
+            await broadcast(sessions, market.create_coin(now))
+
+        trade_credit += trades_per_sec * dt
+        while trade_credit >= 1:
+            trade_credit -= 1
+            if not market.coins:
+                trade_credit = 0
+                break
+            event = market.trade(now)
+            if event:
+                await broadcast(sessions, event)
+
+        if tick_start - last_report >= 5:
+            market.expire(now)
+            stats = market.stats
+            rate = (stats["trades"] - last_trades) / (tick_start - last_report)
+            sent = sum(s.frames_sent for s in sessions)
+            print(f"📈 live={len(market.coins)} created={stats['created']} trades={stats['trades']} "
+                  f"({rate:.0f}/s) graduated={stats['graduated']} died={stats['died']} "
+                  f"clients={len(sessions)} frames_sent={sent}", flush=True)
+            last_report = tick_start
+            last_trades = stats["trades"]
+
+        elapsed = time.monotonic() - tick_start
+        await asyncio.sleep(max(0.0, tick - elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetischer pumpportal-Lastgenerator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--coins-per-sec", type=float, default=1.0, help="Neue Coins pro Sekunde")
+    parser.add_argument("--trades-per-sec", type=float, default=200.0, help="Trades pro Sekunde (alle Coins)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplikator für beide Raten (z.B. 10)")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf-Exponent der Coin-Popularität")
+    parser.add_argument("--max-live-coins", type=int, default=5000, help="Max. gleichzeitig gehandelte Coins")
+    parser.add_argument("--coin-lifetime", type=float, default=900.0, help="Mittlere Lebensdauer eines Coins (s)")
+    parser.add_argument("--whale-ratio", type=float, default=0.02, help="Anteil Whale-Trades (>= 1 SOL)")
+    parser.add_argument("--micro-ratio", type=float, default=0.25, help="Anteil Micro-Trades (< 0.01 SOL)")
+    parser.add_argument("--creator-sell-ratio", type=float, default=0.01, help="Anteil Creator-Sells")
+    parser.add_argument("--graduation-ratio", type=float, default=0.02, help="Anteil Coins mit Graduation-Kurve")
+    parser.add_argument("--spam-ratio", type=float, default=0.05, help="Anteil Spam-Burst- bzw. Bad-Name-Coins")
+    parser.add_argument("--wallets", type=int, default=20000, help="Größe des Trader-Wallet-Pools")
+    parser.add_argument("--duration", type=float, default=0, help="Laufzeit in Sekunden (0 = endlos)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    market = Market(args)
+    sessions = set()
+
+    async def handler(ws):
+        session = PumpPortalSession(ws)
+        sessions.add(session)
+        print("🔌 Client verbunden", flush=True)
+        try:
+            await session.read_messages()
+        except Exception as e:
+            print(f"🔌 Client getrennt: {e}", flush=True)
+        finally:
+            sessions.discard(session)
+
+    async def run():
+        server = asyncio.create_task(serve_forever(handler, args.host, args.port))
+        await run_market(market, sessions, args)
+        server.cancel()
+        print(f"✅ Lastgenerator beendet: {market.stats}", flush=True)
+
+    print(f"⚙️  {args.coins_per_sec * args.scale:g} Coins/s, {args.trades_per_sec * args.scale:g} Trades/s, "
+          f"Zipf s={args.zipf}, max {args.max_live_coins} lebende Coins", flush=True)
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\n👋 Beendet")
+
+
+if __name__ == "__main__":
+    main()
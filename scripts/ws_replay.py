@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Replay-Server für aufgezeichnete pumpportal-Frames
+
+Spielt Capture-Segmente (WS_CAPTURE_DIR des Backends, frames-*.log.gz) über einen
+lokalen WebSocket-Server ab - in Echtzeit (1x), beschleunigt (Nx) oder so schnell
+wie möglich (max). Create-Events gehen nur an Clients mit subscribeNewToken,
+Trades nur für abonnierte Mints (abschaltbar mit --all).
+
+Verwendung:
+    python scripts/ws_replay.py /pfad/zu/captures --speed 10
+    WS_URI=ws://localhost:8765/api/data uvicorn unified_service:app
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import time
+from pathlib import Path
+
+from pumpportal_server import PumpPortalSession, serve_forever
+
+
+def capture_files(paths):
+    """Sortierte Liste aller Capture-Segmente (Dateien oder Verzeichnisse)"""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(path.glob("frames-*.log.gz")))
+        else:
+            files.append(path)
+    return files
+
+
+def iter_frames(files):
+    """Liefert (recv_ts, frame) aus den Capture-Segmenten"""
+    for path in files:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                ts, _, frame = line.rstrip("\n").partition("\t")
+                if frame:
+                    yield float(ts), frame
+
+
+async def replay(session, files, speed, filter_subscriptions):
+    """Sendet alle Frames mit der gewünschten Geschwindigkeit (speed=None = max)"""
+    start_wall = time.monotonic()
+    first_ts = None
+    skipped = 0
+
+    for index, (recv_ts, frame) in enumerate(iter_frames(files)):
+        if first_ts is None:
+            first_ts = recv_ts
+
+        if speed is not None:
+            delay = start_wall + (recv_ts - first_ts) / speed - time.monotonic()
+            if delay > 0.001:
+                await asyncio.sleep(delay)
+        elif index % 1000 == 0:
+            # Nach gelesenen (nicht gesendeten) Frames: solange alles gefiltert wird, bleibt frames_sent
+            # stehen - der Client käme sonst nie zum Abonnieren
+            await asyncio.sleep(0)  # Subscribe-Nachrichten des Clients verarbeiten
+
+        if filter_subscriptions:
+            try:
+                data = json.loads(frame)
+            except json.JSONDecodeError:
+                data = {}
+            if not session.wants(data):
+                skipped += 1
+                continue
+
+        await session.send(frame)
+
+    elapsed = time.monotonic() - start_wall
+    rate = session.frames_sent / elapsed if elapsed > 0 else 0
+    print(f"✅ Replay beendet: {session.frames_sent} Frames gesendet, {skipped} nicht abonniert, "
+          f"{elapsed:.1f}s ({rate:.0f} Frames/s)", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pumpportal Replay-Server für Capture-Segmente")
+    parser.add_argument("paths", nargs="+", help="Capture-Verzeichnisse oder frames-*.log.gz Dateien")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--speed", default="1", help="Faktor (1, 10, ...) oder 'max'")
+    parser.add_argument("--loop", action="store_true", help="Aufzeichnung endlos wiederholen")
+    parser.add_argument("--all", action="store_true", help="Alle Frames senden, Subscriptions ignorieren")
+    parser.add_argument("--close", action="store_true", help="Verbindung nach dem Replay schließen")
+    parser.add_argument("--warmup", type=float, default=0.5,
+                        help="Sekunden nach der ersten Subscribe-Nachricht bis zum Start")
+    args = parser.parse_args()
+
+    files = capture_files(args.paths)
+    if not files:
+        parser.error("Keine Capture-Segmente gefunden")
+    speed = None if args.speed == "max" else float(args.speed)
+    print(f"🎬 {len(files)} Segmente, Geschwindigkeit: {args.speed if speed is None else f'{speed:g}x'}", flush=True)
+
+    async def handler(ws):
+        session = PumpPortalSession(ws)
+        reader = asyncio.create_task(session.read_messages())
+        print("🔌 Client verbunden", flush=True)
+        try:
+            # Erst abspielen, wenn der Client seine Subscriptions gesendet hat
+            await session.subscribed.wait()
+            await asyncio.sleep(args.warmup)
+            while True:
+                await replay(session, files, speed, not args.all)
+                if not args.loop:
+                    break
+            if args.close:
+                await ws.close()
+            else:
+                await reader
+        except Exception as e:
+            print(f"🔌 Client getrennt: {e}", flush=True)
+        finally:
+            reader.cancel()
+
+    try:
+        asyncio.run(serve_forever(handler, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Beendet")
+
+
+if __name__ == "__main__":
+    main()
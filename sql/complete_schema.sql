@@ -1,3 +1,12 @@
+-- ============================================================================
+-- VERALTET - NICHT MEHR AUSFÜHREN
+-- ============================================================================
+-- Das Schema wird ausschließlich über die versionierten Migrationen in
+-- backend/migrations/ (NNNN_name.sql) verwaltet; der Service wendet sie beim
+-- Start selbst an. Diese Datei bleibt nur als Referenz erhalten und löscht
+-- bestehende Tabellen (DROP TABLE ... CASCADE) - alle Daten gehen verloren.
+-- ============================================================================
+
 -- ============================================================================
 -- PUMP DISCOVER - VOLLSTÄNDIGES DATENBANKSCHEMA
 -- ============================================================================
@@ -178,6 +187,9 @@ CREATE TABLE coin_streams (
     is_active BOOLEAN DEFAULT true,
     is_graduated BOOLEAN DEFAULT false,
     started_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    change_seq BIGINT,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    owner_replica VARCHAR(64),
     CONSTRAINT coin_streams_pkey PRIMARY KEY (id),
     CONSTRAINT unique_active_stream UNIQUE (token_address)
 );
@@ -202,6 +214,9 @@ COMMENT ON COLUMN coin_streams.current_phase_id IS 'Aktuelle Phase ID (Referenz
 COMMENT ON COLUMN coin_streams.is_active IS 'Ob der Stream noch aktiv ist';
 COMMENT ON COLUMN coin_streams.is_graduated IS 'Ob der Token bereits graduiert ist';
 COMMENT ON COLUMN coin_streams.started_at IS 'Wann der Stream gestartet wurde';
+COMMENT ON COLUMN coin_streams.change_seq IS 'Wird bei Insert und Änderung von Phase/Status per Trigger hochgezählt (inkrementeller Sync)';
+COMMENT ON COLUMN coin_streams.updated_at IS 'Zeitpunkt der letzten Änderung von Phase/Status';
+COMMENT ON COLUMN coin_streams.owner_replica IS 'Replika, die den Stream trackt (NULL = noch nicht zugeteilt)';
 
 -- ============================================================================
 -- 3. REF_COIN_PHASES - Referenztabelle für Coin-Phasen
@@ -1,3 +1,12 @@
+-- ============================================================================
+-- VERALTET - NICHT MEHR AUSFÜHREN
+-- ============================================================================
+-- Das Schema wird ausschließlich über die versionierten Migrationen in
+-- backend/migrations/ (NNNN_name.sql) verwaltet; der Service wendet sie beim
+-- Start selbst an. Diese Datei bleibt nur als Referenz erhalten und löscht
+-- bestehende Tabellen (DROP TABLE ... CASCADE) - alle Daten gehen verloren.
+-- ============================================================================
+
 -- ============================================================================
 -- PUMP DISCOVER - Datenbankschema für entdeckte Pump.fun Tokens
 -- ============================================================================
@@ -170,6 +179,9 @@ CREATE TABLE IF NOT EXISTS coin_streams (
     is_active BOOLEAN DEFAULT true,
     is_graduated BOOLEAN DEFAULT false,
     started_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    change_seq BIGINT,                              -- Änderungs-Sequenz (Trigger, siehe db_migration.py)
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    owner_replica VARCHAR(64),                      -- Zuständige Replika (REPLICA_MODE)
     CONSTRAINT unique_active_stream UNIQUE (token_address)
 );
 
@@ -183,6 +195,8 @@ COMMENT ON COLUMN coin_streams.token_address IS 'Token-Adresse (Referenz zu disc
 COMMENT ON COLUMN coin_streams.current_phase_id IS 'Aktuelle Phase ID (Referenz zu ref_coin_phases)';
 COMMENT ON COLUMN coin_streams.is_active IS 'Ob der Stream noch aktiv ist';
 COMMENT ON COLUMN coin_streams.is_graduated IS 'Ob der Token bereits graduiert ist';
+COMMENT ON COLUMN coin_streams.change_seq IS 'Wird bei Insert und Änderung von Phase/Status per Trigger hochgezählt (inkrementeller Sync)';
+COMMENT ON COLUMN coin_streams.owner_replica IS 'Replika, die den Stream trackt (NULL = noch nicht zugeteilt)';
 
 -- ============================================================================
 -- REF COIN PHASES - Referenztabelle für Coin-Phasen